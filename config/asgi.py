@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# El chat del asistente de IA (ai-chat/stream/) es una vista asíncrona que
+# transmite la respuesta por server-sent events. Para que las esperas a
+# OpenAI no ocupen un worker, servir el proyecto con un servidor ASGI, por
+# ejemplo: uvicorn config.asgi:application
 application = get_asgi_application()
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'mi_condominio',
 ]
 
@@ -51,6 +52,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mi_condominio.middleware.PerfilUsuarioMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -133,6 +135,54 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Almacenamientos. Los archivos de evidencia se guardan una vez por contenido
+# (ver mi_condominio/almacenamiento.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'evidencias': {
+        'BACKEND': 'mi_condominio.almacenamiento.AlmacenamientoEvidencias',
+    },
+}
+
+# Manejadores de subida: los de Django, calculando además el SHA-256 de cada
+# archivo mientras se recibe
+FILE_UPLOAD_HANDLERS = [
+    'mi_condominio.almacenamiento.MemoriaConHashUploadHandler',
+    'mi_condominio.almacenamiento.TemporalConHashUploadHandler',
+]
+
+# Horas que se conserva un archivo de evidencia sin referencias antes de que
+# recolectar_archivos_evidencias lo elimine
+EVIDENCIAS_GRACIA_RECOLECCION_HORAS = 24
+# Un archivo que queda sin referencias se elimina al confirmarse la
+# transacción, salvo que se haya reutilizado en estos últimos minutos
+EVIDENCIAS_ELIMINACION_MARGEN_MINUTOS = 15
+
+# Subida de evidencias por bloques (ver SubidaEvidencia)
+# Directorio de los archivos en curso; debe estar en el mismo sistema de
+# archivos que MEDIA_ROOT para que el archivo terminado se mueva sin copiarlo
+EVIDENCIAS_SUBIDAS_DIR = MEDIA_ROOT / 'subidas_pendientes'
+# Tamaño de bloque que usa el navegador (bytes)
+EVIDENCIAS_TAMANO_BLOQUE = 2 * 1024 * 1024
+# Horas que una subida incompleta se puede reanudar
+EVIDENCIAS_SUBIDA_VIGENCIA_HORAS = 24
+
+# Miniaturas y vistas previas de evidencias (ver mi_condominio/derivados.py).
+# Los pósters de video requieren el ejecutable ffmpeg (opcional)
+EVIDENCIAS_DERIVADOS_HILOS = 2
+EVIDENCIAS_FFMPEG = os.getenv('EVIDENCIAS_FFMPEG', 'ffmpeg')
+
+# Descarga de evidencias (ver mi_condominio/descargas.py). Si se define, el
+# envío del archivo se delega a nginx con X-Accel-Redirect. Debe ser una
+# location "internal" que apunte a MEDIA_ROOT, por ejemplo:
+#     location /media-protegido/ { internal; alias /ruta/al/proyecto/media/; }
+EVIDENCIAS_X_ACCEL_REDIRECT = os.getenv('EVIDENCIAS_X_ACCEL_REDIRECT', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -142,3 +192,36 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'landing'
+
+# Cachés
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Resultados de las herramientas de consulta del asistente de IA.
+    # LocMemCache es por proceso: con varios workers conviene un backend
+    # compartido (por ejemplo FileBasedCache) para que la invalidación
+    # llegue a todos.
+    'ai_herramientas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ai-herramientas',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+# Asistente de IA
+# Backend del modelo: 'openai', 'simulado' (guiones locales, sin red) o una ruta a una clase
+AI_BACKEND = os.getenv('AI_BACKEND', 'openai')
+# Máximo de herramientas de solo lectura ejecutadas en paralelo (cada hilo usa su propia conexión)
+AI_HERRAMIENTAS_HILOS = 4
+# Segundos que se conserva en caché el resultado de una herramienta de consulta
+AI_CACHE_TTL = 300
+# Tokens (aproximados) de historial reciente enviados en cada turno; lo anterior
+# pasa a una transcripción abreviada (una línea truncada por mensaje)
+AI_CONTEXTO_PRESUPUESTO_TOKENS = 3000
+# Tokens máximos de la transcripción abreviada; sobre ese límite se descartan las líneas más antiguas
+AI_CONTEXTO_TOKENS_TRANSCRIPCION = 600
+# Minutos que una propuesta del asistente espera la confirmación del usuario
+AI_PROPUESTA_VIGENCIA_MINUTOS = 30
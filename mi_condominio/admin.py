@@ -9,9 +9,12 @@ from .models import (
     Incidencia,
     Bitacora,
     EvidenciaIncidencia,
+    ArchivoEvidencia,
+    SubidaEvidencia,
     Amonestacion,
     ChatSession,
-    ChatMessage
+    ChatMessage,
+    ChatSesionArchivada
 )
 
 
@@ -147,8 +150,8 @@ class BitacoraAdmin(admin.ModelAdmin):
 
 @admin.register(EvidenciaIncidencia)
 class EvidenciaIncidenciaAdmin(admin.ModelAdmin):
-    list_display = ['incidencia', 'tipo_archivo_evidencia', 'archivo_evidencia', 'created_at']
-    search_fields = ['incidencia__titulo', 'archivo_evidencia']
+    list_display = ['incidencia', 'tipo_archivo_evidencia', 'nombre_original', 'archivo_evidencia', 'created_at']
+    search_fields = ['incidencia__titulo', 'nombre_original', 'archivo_evidencia']
     list_filter = ['tipo_archivo_evidencia', 'incidencia']
     ordering = ['-created_at']
 
@@ -164,6 +167,27 @@ class EvidenciaIncidenciaAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 
+@admin.register(ArchivoEvidencia)
+class ArchivoEvidenciaAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'tamano', 'referencias', 'liberado_at', 'created_at']
+    search_fields = ['nombre', 'sha256']
+    list_filter = ['liberado_at']
+    ordering = ['-created_at']
+
+    readonly_fields = ['nombre', 'sha256', 'tamano', 'referencias', 'liberado_at', 'created_at']
+
+
+@admin.register(SubidaEvidencia)
+class SubidaEvidenciaAdmin(admin.ModelAdmin):
+    list_display = ['nombre_archivo', 'incidencia', 'user', 'recibido', 'tamano', 'estado', 'updated_at']
+    search_fields = ['nombre_archivo', 'incidencia__titulo', 'user__username']
+    list_filter = ['estado', 'tipo_archivo_evidencia']
+    ordering = ['-created_at']
+
+    readonly_fields = ['id', 'user', 'incidencia', 'nombre_archivo', 'tipo_archivo_evidencia', 'tamano',
+                       'recibido', 'estado', 'error', 'evidencia', 'created_at', 'updated_at']
+
+
 @admin.register(Amonestacion)
 class AmonestacionAdmin(admin.ModelAdmin):
     list_display = ['nombre_amonestado', 'apellidos_amonestado', 'rut_amonestado', 'tipo_amonestacion', 'motivo', 'fecha_amonestacion', 'usuario_reporta']
@@ -221,3 +245,14 @@ class ChatMessageAdmin(admin.ModelAdmin):
     def preview_contenido(self, obj):
         return obj.contenido[:100] + "..." if len(obj.contenido) > 100 else obj.contenido
     preview_contenido.short_description = 'Contenido'
+
+
+@admin.register(ChatSesionArchivada)
+class ChatSesionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ['sesion_id', 'usuario', 'titulo', 'total_mensajes', 'updated_at', 'archivada_at']
+    search_fields = ['titulo', 'usuario__nombres', 'usuario__apellido']
+    date_hierarchy = 'updated_at'
+    ordering = ['-updated_at']
+
+    exclude = ['mensajes_comprimidos']
+    readonly_fields = ['sesion_id', 'usuario', 'titulo', 'total_mensajes', 'created_at', 'updated_at', 'archivada_at']
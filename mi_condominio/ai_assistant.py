@@ -1,17 +1,46 @@
 """
 Servicio del asistente de IA con OpenAI.
 Gestiona conversaciones y ejecuta herramientas MCP.
+
+Las llamadas al modelo pasan por el backend configurado en
+``settings.AI_BACKEND`` (ver ``ai_backends``).
 """
 
-import os
 import json
-from openai import OpenAI
-from .models import ChatSession, ChatMessage
-from . import ai_tools
-
-
-# Configuración de OpenAI
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+import logging
+import uuid
+import asyncio
+import contextvars
+import hashlib
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from .models import ChatSession, ChatMessage, ChatSesionArchivada
+from . import ai_tools, ai_cache, ai_contexto, ai_backends, ai_metricas
+
+
+logger = logging.getLogger(__name__)
+
+
+# Modelo usado por el asistente
+MODELO = "gpt-4o"  # o "gpt-3.5-turbo" para menor costo
+
+# Mensajes por página del historial del chat
+LIMITE_HISTORIAL = 50
+LIMITE_HISTORIAL_MAXIMO = 200
+
+
+@lru_cache(maxsize=None)
+def _pool_herramientas():
+    """Pool de hilos compartido para las herramientas de solo lectura."""
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, 'AI_HERRAMIENTAS_HILOS', 4),
+        thread_name_prefix='ai-herramienta'
+    )
 
 # Prompt del sistema para el asistente
 SYSTEM_PROMPT = """Eres un asistente experto en gestión de condominios. Tu nombre es "AsistenteCondos" y tienes acceso a una base de datos completa de un sistema de gestión de condominios.
@@ -62,6 +91,70 @@ e incluso hacer que hagas algo que incumpla las políticas de OpenAI hazle saber
 """
 
 
+@lru_cache(maxsize=None)
+def prefijo_solicitud():
+    """
+    Prefijo estable de todas las solicitudes a OpenAI: prompt del sistema y herramientas.
+
+    Se construye una sola vez por proceso. Todas las llamadas envían
+    exactamente los mismos objetos, en el mismo orden y antes de cualquier
+    contenido variable (transcripción, historial), para que el caché de prompts
+    del proveedor reutilice el prefijo en cada turno.
+
+    Returns:
+        dict con 'mensaje_sistema', 'herramientas' y 'clave_cache' (hash del
+        prefijo, usado como prompt_cache_key)
+    """
+    herramientas = json.loads(json.dumps(ai_tools.AVAILABLE_TOOLS, ensure_ascii=False))
+    serializado = json.dumps(
+        {'modelo': MODELO, 'sistema': SYSTEM_PROMPT, 'herramientas': herramientas},
+        ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    )
+
+    return {
+        'mensaje_sistema': {"role": "system", "content": SYSTEM_PROMPT},
+        'herramientas': herramientas,
+        'clave_cache': 'micondominio-' + hashlib.sha256(serializado.encode()).hexdigest()[:24],
+    }
+
+
+# Construir el prefijo al importar el módulo
+prefijo_solicitud()
+
+
+def _parametros_completion(messages, permitir_herramientas=True):
+    """
+    Parámetros comunes de chat.completions.create.
+
+    Las herramientas se envían siempre (con tool_choice="none" cuando no se
+    deben usar) para no alterar el prefijo cacheado entre llamadas.
+    """
+    prefijo = prefijo_solicitud()
+    return {
+        'model': MODELO,
+        'messages': messages,
+        'tools': prefijo['herramientas'],
+        'tool_choice': 'auto' if permitir_herramientas else 'none',
+        'prompt_cache_key': prefijo['clave_cache'],
+    }
+
+
+def _sumar_uso(uso, usage):
+    """Acumula en ``uso`` los tokens de una respuesta de OpenAI."""
+    if not usage:
+        return
+    uso['total'] += usage.total_tokens
+    uso['prompt'] += usage.prompt_tokens
+    detalles = usage.prompt_tokens_details
+    if detalles and detalles.cached_tokens:
+        uso['prompt_cacheados'] += detalles.cached_tokens
+
+
+def _uso_vacio():
+    """Acumulador de tokens de un turno (puede abarcar varias llamadas)."""
+    return {'total': 0, 'prompt': 0, 'prompt_cacheados': 0}
+
+
 def get_or_create_session(usuario):
     """
     Obtiene la sesión activa del usuario o crea una nueva.
@@ -98,184 +191,311 @@ def _detectar_confirmacion(mensaje):
     return None
 
 
-def chat(usuario, mensaje_usuario):
+def _obtener_propuesta_pendiente(session):
+    """Retorna la propuesta vigente de la sesión (ya cargada junto con ella), si existe."""
+    if session.propuesta_pendiente and session.propuesta_expira and session.propuesta_expira > timezone.now():
+        return session.propuesta_pendiente
+    return None
+
+
+def _nueva_propuesta(session, propuesta):
     """
-    Procesa un mensaje del usuario y devuelve la respuesta del asistente.
+    Asigna a la sesión la propuesta que espera confirmación, con un token nuevo y su vencimiento.
+
+    Returns:
+        dict con los campos de la sesión a guardar (ver _guardar_mensajes)
+    """
+    minutos = getattr(settings, 'AI_PROPUESTA_VIGENCIA_MINUTOS', 30)
+    session.propuesta_pendiente = propuesta
+    session.propuesta_token = uuid.uuid4()
+    session.propuesta_expira = timezone.now() + timedelta(minutes=minutos)
+    return {
+        'propuesta_pendiente': session.propuesta_pendiente,
+        'propuesta_token': session.propuesta_token,
+        'propuesta_expira': session.propuesta_expira,
+    }
+
+
+def _guardar_mensajes(session, mensajes, **campos_sesion):
+    """
+    Escribe los mensajes de un turno y actualiza la sesión en una sola transacción.
+
+    Los mensajes se acumulan sin guardar durante el turno y se insertan con
+    un único bulk_create; la sesión se actualiza con un único UPDATE que
+    incluye ``updated_at``, la transcripción abreviada del contexto y los
+    ``campos_sesion``.
 
     Args:
-        usuario: Objeto Usuario de Django
-        mensaje_usuario: str con el mensaje del usuario
+        session: ChatSession del turno
+        mensajes: lista de ChatMessage sin guardar, en orden
+        campos_sesion: otros campos de la sesión a actualizar
 
     Returns:
-        dict con la respuesta del asistente y metadata
+        ID del último mensaje guardado
     """
-    # Obtener o crear sesión
-    session = get_or_create_session(usuario)
+    session.updated_at = timezone.now()
+    with transaction.atomic():
+        ChatMessage.objects.bulk_create(mensajes)
+        ChatSession.objects.filter(pk=session.pk).update(
+            updated_at=session.updated_at,
+            transcripcion=session.transcripcion,
+            transcripcion_hasta_id=session.transcripcion_hasta_id,
+            **campos_sesion
+        )
+    return mensajes[-1].id if mensajes else None
 
-    # Verificar si hay una propuesta pendiente en el último mensaje del asistente
-    ultimo_mensaje_asistente = ChatMessage.objects.filter(
-        sesion=session,
-        role='assistant'
-    ).order_by('-created_at').first()
 
-    propuesta_pendiente = None
-    if ultimo_mensaje_asistente and ultimo_mensaje_asistente.tool_calls:
-        try:
-            tool_calls_data = json.loads(ultimo_mensaje_asistente.tool_calls) if isinstance(ultimo_mensaje_asistente.tool_calls, str) else ultimo_mensaje_asistente.tool_calls
-            propuesta_pendiente = tool_calls_data.get('propuesta_pendiente')
-        except:
-            pass
-
-    # Detectar si el usuario está confirmando o cancelando
-    if propuesta_pendiente:
-        decision = _detectar_confirmacion(mensaje_usuario)
-
-        if decision == 'confirmar':
-            # Ejecutar la acción
-            accion = propuesta_pendiente['accion']
-            datos = propuesta_pendiente['datos']
-
-            # Guardar mensaje del usuario
-            ChatMessage.objects.create(
-                sesion=session,
-                role='user',
-                contenido=mensaje_usuario
-            )
+def _reclamar_propuesta(session, token):
+    """
+    Retira la propuesta pendiente de la sesión si sigue vigente.
 
-            resultado = ai_tools.EXECUTION_FUNCTIONS[accion](datos)
+    La actualización es condicional al token, así que ante solicitudes
+    concurrentes solo una obtiene la propuesta y la acción no se ejecuta
+    dos veces.
 
-            if resultado['exito']:
-                respuesta = f"✅ {resultado['mensaje']}"
-            else:
-                respuesta = f"❌ Error: {resultado['error']}"
+    Returns:
+        dict con la propuesta, o None si ya fue procesada o expiró
+    """
+    propuesta = session.propuesta_pendiente
+    reclamada = ChatSession.objects.filter(
+        pk=session.pk,
+        propuesta_token=token,
+        propuesta_expira__gt=timezone.now()
+    ).update(propuesta_pendiente=None, propuesta_token=None, propuesta_expira=None)
 
-            # Guardar respuesta
-            ChatMessage.objects.create(
-                sesion=session,
-                role='assistant',
-                contenido=respuesta
-            )
+    session.propuesta_pendiente = session.propuesta_token = session.propuesta_expira = None
+    return propuesta if reclamada else None
 
-            return {
-                'exito': True,
-                'respuesta': respuesta,
-                'session_id': session.id
-            }
 
-        elif decision == 'cancelar':
-            # Guardar mensaje del usuario
-            ChatMessage.objects.create(
-                sesion=session,
-                role='user',
-                contenido=mensaje_usuario
-            )
+def _datos_propuesta(session):
+    """Propuesta pendiente en el formato entregado al cliente (incluye el token para confirmar)."""
+    propuesta = session.propuesta_pendiente
+    return {
+        'token': str(session.propuesta_token),
+        'accion': propuesta['accion'],
+        'tipo_registro': propuesta.get('tipo_registro'),
+        'datos': propuesta['datos'],
+        'mensaje_confirmacion': propuesta.get('mensaje_confirmacion'),
+        'expira': session.propuesta_expira.isoformat(),
+    }
 
-            respuesta = "❌ Operación cancelada."
 
-            # Guardar respuesta
-            ChatMessage.objects.create(
-                sesion=session,
-                role='assistant',
-                contenido=respuesta
-            )
+def _ejecutar_propuesta(propuesta):
+    """Ejecuta la acción de una propuesta confirmada y retorna (resultado, texto para el chat)."""
+    resultado = ai_tools.EXECUTION_FUNCTIONS[propuesta['accion']](propuesta['datos'])
 
-            return {
-                'exito': True,
-                'respuesta': respuesta,
-                'session_id': session.id
-            }
+    if resultado['exito']:
+        return resultado, f"✅ {resultado['mensaje']}"
+    return resultado, f"❌ Error: {resultado['error']}"
 
-    # Guardar mensaje del usuario (si no fue una confirmación/cancelación procesada arriba)
-    ChatMessage.objects.create(
-        sesion=session,
-        role='user',
-        contenido=mensaje_usuario
-    )
 
-    # Construir historial de mensajes para OpenAI
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+def _resolver_propuesta(session, mensaje):
+    """
+    Ejecuta o cancela la propuesta pendiente si el mensaje es una decisión.
 
-    # Agregar mensajes previos de la sesión (últimos 20 para mantener contexto)
-    previous_messages = ChatMessage.objects.filter(sesion=session).order_by('created_at')[:20]
+    Args:
+        session: ChatSession actual
+        mensaje: ChatMessage del usuario, aún sin guardar
 
-    for msg in previous_messages:
-        messages.append({
-            "role": msg.role,
-            "content": msg.contenido
-        })
+    Returns:
+        dict con la respuesta, o None si el mensaje no confirma ni cancela
+    """
+    decision = _detectar_confirmacion(mensaje.contenido)
+    if decision is None:
+        return None
+
+    propuesta = _reclamar_propuesta(session, session.propuesta_token)
+    if propuesta is None:
+        respuesta = "Esta operación ya fue procesada o expiró."
+    elif decision == 'confirmar':
+        _, respuesta = _ejecutar_propuesta(propuesta)
+    else:
+        respuesta = "❌ Operación cancelada."
+
+    # Guardar el mensaje del usuario y la respuesta
+    ultimo_mensaje_id = _guardar_mensajes(session, [
+        mensaje,
+        ChatMessage(sesion=session, role='assistant', contenido=respuesta)
+    ])
+
+    return {
+        'exito': True,
+        'respuesta': respuesta,
+        'session_id': session.id,
+        'ultimo_mensaje_id': ultimo_mensaje_id
+    }
+
+
+def confirmar_propuesta(usuario, token):
+    """
+    Ejecuta la propuesta pendiente identificada por ``token`` (botón "Confirmar" del chat).
+
+    Args:
+        usuario: Objeto Usuario de Django
+        token: token de la propuesta entregado junto con ella
+
+    Returns:
+        dict con el resultado de la acción, o None si la propuesta ya fue
+        procesada o expiró
+    """
+    session = ChatSession.objects.filter(usuario=usuario, activa=True, propuesta_token=token).first()
+    propuesta = _reclamar_propuesta(session, token) if session else None
+    if propuesta is None:
+        return None
+
+    resultado, respuesta = _ejecutar_propuesta(propuesta)
+
+    # Guardar en el historial del chat el resultado
+    ultimo_mensaje_id = _guardar_mensajes(session, [ChatMessage(sesion=session, role='assistant', contenido=respuesta)])
+
+    return {**resultado, 'ultimo_mensaje_id': ultimo_mensaje_id}
+
+
+@ai_metricas.fase('contexto')
+def _preparar_turno(usuario, mensaje_usuario):
+    """
+    Arma el historial para OpenAI con el mensaje del usuario.
 
+    El mensaje del usuario no se guarda todavía: se escribe junto con la
+    respuesta al final del turno (ver _guardar_respuesta). Si el mensaje
+    confirma o cancela una propuesta pendiente, la resuelve directamente
+    sin consultar al modelo.
+
+    Returns:
+        tuple (session, mensaje, messages, respuesta_directa); mensaje es el
+        ChatMessage del usuario y respuesta_directa es None cuando se debe
+        consultar al modelo
+    """
+    # Obtener o crear sesión
+    session = get_or_create_session(usuario)
+    mensaje = ChatMessage(sesion=session, role='user', contenido=mensaje_usuario)
+
+    # Detectar si el usuario está confirmando o cancelando una propuesta pendiente
+    if _obtener_propuesta_pendiente(session):
+        respuesta_directa = _resolver_propuesta(session, mensaje)
+        if respuesta_directa:
+            return session, mensaje, None, respuesta_directa
+
+    # Construir historial de mensajes para OpenAI: transcripción abreviada + mensajes recientes
+    # dentro del presupuesto de tokens
+    messages = ai_contexto.construir_mensajes(session, prefijo_solicitud()['mensaje_sistema'], [mensaje])
+
+    return session, mensaje, messages, None
+
+
+def _llamar_herramienta(nombre, argumentos):
+    """Ejecuta una herramienta, usando el caché de resultados si es cacheable."""
+    return ai_cache.ejecutar(nombre, ai_tools.TOOL_FUNCTIONS[nombre], argumentos)
+
+
+def _ejecutar_en_hilo(nombre, argumentos):
+    """Ejecuta una herramienta en un hilo del pool y libera su conexión al terminar."""
     try:
-        # Llamar a OpenAI con function calling
-        response = client.chat.completions.create(
-            model="gpt-4o",  # o "gpt-3.5-turbo" para menor costo
-            messages=messages,
-            tools=ai_tools.AVAILABLE_TOOLS,
-            tool_choice="auto"
-        )
+        with ai_metricas.registrar_consultas():
+            return _llamar_herramienta(nombre, argumentos)
+    finally:
+        connections.close_all()
 
-        response_message = response.choices[0].message
-        tool_calls_made = []
 
-        # Procesar tool calls si existen
-        if response_message.tool_calls:
-            # Agregar la respuesta del asistente con tool calls al historial
-            messages.append(response_message)
+@ai_metricas.fase('herramientas')
+def _ejecutar_herramientas(usuario, tool_calls, messages):
+    """
+    Ejecuta las herramientas pedidas por el modelo y agrega sus resultados al historial.
 
-            # Ejecutar cada tool call
-            confirmacion_pendiente = None
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-
-                print(f"[AI Assistant] Llamando a {function_name} con args: {function_args}")
-
-                # Inyectar usuario actual si la función lo requiere
-                # Las funciones que requieren el usuario tienen el parámetro _usuario_actual
-                if function_name in ['proponer_crear_incidencia', 'proponer_crear_bitacora']:
-                    function_args['_usuario_actual'] = usuario
-
-                # Ejecutar la función
-                if function_name in ai_tools.TOOL_FUNCTIONS:
-                    function_response = ai_tools.TOOL_FUNCTIONS[function_name](**function_args)
-                else:
-                    function_response = {"error": f"Función {function_name} no encontrada"}
-
-                # Verificar si requiere confirmación del usuario
-                if function_response.get('requiere_confirmacion'):
-                    confirmacion_pendiente = function_response
-                    print(f"[AI Assistant] Confirmación requerida para {function_name}")
-                    # No agregamos al historial ni llamamos a OpenAI nuevamente
-                    # Retornamos directamente la propuesta de confirmación
-                    break
-
-                # Agregar la respuesta de la función al historial
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": function_name,
-                    "content": json.dumps(function_response, ensure_ascii=False)
-                })
+    Las herramientas de solo lectura se lanzan en paralelo en un pool de
+    hilos acotado (cada hilo con su propia conexión a la base de datos); las
+    de escritura se ejecutan en orden en el hilo actual. Los resultados se
+    agregan al historial en el mismo orden de ``tool_calls``.
 
-                tool_calls_made.append({
-                    "function": function_name,
-                    "arguments": function_args,
-                    "result": function_response
-                })
+    Args:
+        usuario: Usuario actual (se inyecta en las herramientas que lo requieren)
+        tool_calls: lista de dicts {'id', 'name', 'arguments'} con los argumentos en JSON
+        messages: historial de mensajes, se modifica en el lugar
 
-            # Si hay confirmación pendiente, formatear datos y pedir confirmación al usuario via IA
-            if confirmacion_pendiente:
-                # Agregar la propuesta al contexto y pedir a la IA que la presente
+    Returns:
+        tuple (tool_calls_made, confirmacion_pendiente)
+    """
+    tool_calls_made = []
+    confirmacion_pendiente = None
+
+    argumentos = []
+    for tool_call in tool_calls:
+        function_name = tool_call['name']
+        function_args = json.loads(tool_call['arguments'])
+
+        print(f"[AI Assistant] Llamando a {function_name} con args: {function_args}")
+
+        # Inyectar usuario actual si la función lo requiere
+        # Las funciones que requieren el usuario tienen el parámetro _usuario_actual
+        if function_name in ['proponer_crear_incidencia', 'proponer_crear_bitacora']:
+            function_args['_usuario_actual'] = usuario
+        argumentos.append(function_args)
+
+    # Lanzar en paralelo las consultas; con una sola no vale la pena otro hilo
+    paralelas = [
+        posicion for posicion, tool_call in enumerate(tool_calls)
+        if tool_call['name'] in ai_tools.HERRAMIENTAS_SOLO_LECTURA
+    ]
+    futuros = {}
+    if len(paralelas) > 1:
+        futuros = {
+            # Copiar el contexto para que la medición del turno siga activa en el hilo
+            posicion: _pool_herramientas().submit(
+                contextvars.copy_context().run,
+                _ejecutar_en_hilo, tool_calls[posicion]['name'], argumentos[posicion]
+            )
+            for posicion in paralelas
+        }
+
+    for posicion, tool_call in enumerate(tool_calls):
+        function_name = tool_call['name']
+        function_args = argumentos[posicion]
+
+        # Ejecutar la función
+        if posicion in futuros:
+            function_response = futuros[posicion].result()
+        elif function_name in ai_tools.TOOL_FUNCTIONS:
+            function_response = _llamar_herramienta(function_name, function_args)
+        else:
+            function_response = {"error": f"Función {function_name} no encontrada"}
+
+        # Agregar la respuesta de la función al historial
+        messages.append({
+            "role": "tool",
+            "tool_call_id": tool_call['id'],
+            "name": function_name,
+            "content": json.dumps(function_response, ensure_ascii=False)
+        })
+
+        # Verificar si requiere confirmación del usuario
+        if function_response.get('requiere_confirmacion'):
+            confirmacion_pendiente = function_response
+            print(f"[AI Assistant] Confirmación requerida para {function_name}")
+            # No se ejecutan más herramientas: se pide la confirmación al usuario.
+            # La API exige una respuesta por cada tool call, así que se marcan
+            # las restantes como no ejecutadas.
+            for omitida in tool_calls[posicion + 1:]:
                 messages.append({
                     "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "name": function_name,
-                    "content": json.dumps(confirmacion_pendiente, ensure_ascii=False)
+                    "tool_call_id": omitida['id'],
+                    "name": omitida['name'],
+                    "content": json.dumps({"error": "No ejecutada: hay una confirmación pendiente"}, ensure_ascii=False)
                 })
+            for futuro in futuros.values():
+                futuro.cancel()
+            break
+
+        tool_calls_made.append({
+            "function": function_name,
+            "arguments": function_args,
+            "result": function_response
+        })
 
-                # Agregar instrucción especial para que la IA presente la confirmación
-                messages.append({
-                    "role": "system",
-                    "content": f"""La herramienta ha devuelto una propuesta que requiere confirmación del usuario.
+    if confirmacion_pendiente:
+        # Agregar instrucción especial para que la IA presente la confirmación
+        messages.append({
+            "role": "system",
+            "content": f"""La herramienta ha devuelto una propuesta que requiere confirmación del usuario.
 
 Presenta los datos al usuario en formato claro y legible, y pregúntale si desea confirmar la operación.
 
@@ -286,68 +506,142 @@ IMPORTANTE: Pregunta explícitamente "¿Deseas confirmar esta operación? Respon
 
 Guarda mentalmente que la acción pendiente es: {confirmacion_pendiente['accion']}
 """
-                })
+        })
 
-                # Llamar a OpenAI para que presente la confirmación
-                conf_response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages
-                )
+    return tool_calls_made, confirmacion_pendiente
 
-                final_message = conf_response.choices[0].message.content
-                tokens_used = conf_response.usage.total_tokens
-
-                # Guardar mensaje del asistente
-                mensaje_guardado = ChatMessage.objects.create(
-                    sesion=session,
-                    role='assistant',
-                    contenido=final_message,
-                    tokens_usados=tokens_used,
-                    tool_calls=json.dumps({
-                        'propuesta_pendiente': confirmacion_pendiente
-                    })
-                )
 
-                return {
-                    'exito': True,
-                    'respuesta': final_message,
-                    'tokens_usados': tokens_used,
-                    'session_id': session.id
-                }
+def _mensaje_asistente_con_herramientas(content, tool_calls):
+    """Mensaje del asistente que pidió herramientas, en el formato de la API."""
+    return {
+        "role": "assistant",
+        "content": content,
+        "tool_calls": [
+            {
+                "id": tool_call['id'],
+                "type": "function",
+                "function": {"name": tool_call['name'], "arguments": tool_call['arguments']}
+            }
+            for tool_call in tool_calls
+        ]
+    }
+
+
+@ai_metricas.fase('persistencia')
+def _guardar_respuesta(session, mensaje, final_message, uso, tool_calls_made, confirmacion_pendiente):
+    """
+    Guarda el mensaje del usuario y la respuesta del asistente con su metadata
+    y el uso de tokens del turno.
+
+    Si el turno terminó con una propuesta, queda registrada en la sesión
+    como pendiente de confirmación.
+
+    Returns:
+        ID del mensaje del asistente
+    """
+    campos_sesion = {}
+    if confirmacion_pendiente:
+        tool_calls = json.dumps({'propuesta_pendiente': confirmacion_pendiente})
+        campos_sesion = _nueva_propuesta(session, confirmacion_pendiente)
+    else:
+        tool_calls = tool_calls_made if tool_calls_made else None
+
+    return _guardar_mensajes(session, [
+        mensaje,
+        ChatMessage(
+            sesion=session,
+            role='assistant',
+            contenido=final_message,
+            tokens_usados=uso['total'],
+            tokens_prompt=uso['prompt'],
+            tokens_prompt_cacheados=uso['prompt_cacheados'],
+            tool_calls=tool_calls
+        )
+    ], **campos_sesion)
+
+
+def _guardar_mensaje_sin_respuesta(session, mensaje):
+    """Guarda el mensaje del usuario cuando el turno falló antes de responder."""
+    if mensaje.pk is None:
+        try:
+            _guardar_mensajes(session, [mensaje])
+        except Exception:
+            logger.exception('No se pudo guardar el mensaje del usuario de la sesión %s', session.pk)
+
+
+def chat(usuario, mensaje_usuario):
+    """
+    Procesa un mensaje del usuario y devuelve la respuesta del asistente.
+
+    Args:
+        usuario: Objeto Usuario de Django
+        mensaje_usuario: str con el mensaje del usuario
+
+    Returns:
+        dict con la respuesta del asistente y metadata
+    """
+    session, mensaje, messages, respuesta_directa = _preparar_turno(usuario, mensaje_usuario)
+    if respuesta_directa:
+        return respuesta_directa
+
+    try:
+        uso = _uso_vacio()
+
+        # Llamar a OpenAI con function calling
+        with ai_metricas.fase('modelo'):
+            response = ai_backends.obtener_backend().completar(**_parametros_completion(messages))
+        _sumar_uso(uso, response.usage)
+
+        response_message = response.choices[0].message
+        tool_calls_made = []
+        confirmacion_pendiente = None
+
+        # Procesar tool calls si existen
+        if response_message.tool_calls:
+            tool_calls = [
+                {'id': tc.id, 'name': tc.function.name, 'arguments': tc.function.arguments}
+                for tc in response_message.tool_calls
+            ]
+            # Agregar la respuesta del asistente con tool calls al historial
+            messages.append(_mensaje_asistente_con_herramientas(response_message.content, tool_calls))
+
+            tool_calls_made, confirmacion_pendiente = _ejecutar_herramientas(usuario, tool_calls, messages)
 
             # Llamar nuevamente a OpenAI para generar la respuesta final
-            second_response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages
-            )
+            # (o para que presente la propuesta de confirmación)
+            with ai_metricas.fase('modelo'):
+                second_response = ai_backends.obtener_backend().completar(
+                    **_parametros_completion(messages, permitir_herramientas=False)
+                )
+            _sumar_uso(uso, second_response.usage)
 
             final_message = second_response.choices[0].message.content
-            tokens_used = second_response.usage.total_tokens
         else:
             # No hubo tool calls, usar la respuesta directa
             final_message = response_message.content
-            tokens_used = response.usage.total_tokens
 
         # Guardar mensaje del asistente
-        ChatMessage.objects.create(
-            sesion=session,
-            role='assistant',
-            contenido=final_message,
-            tokens_usados=tokens_used,
-            tool_calls=tool_calls_made if tool_calls_made else None
+        ultimo_mensaje_id = _guardar_respuesta(
+            session, mensaje, final_message, uso, tool_calls_made, confirmacion_pendiente
         )
 
-        return {
+        resultado = {
             'exito': True,
             'respuesta': final_message,
-            'tokens_usados': tokens_used,
-            'tool_calls': tool_calls_made,
-            'session_id': session.id
+            'tokens_usados': uso['total'],
+            'session_id': session.id,
+            'ultimo_mensaje_id': ultimo_mensaje_id
         }
+        if confirmacion_pendiente:
+            resultado['propuesta'] = _datos_propuesta(session)
+        else:
+            resultado['tool_calls'] = tool_calls_made
+        return resultado
 
     except Exception as e:
         error_message = f"Error al procesar la solicitud: {str(e)}"
         print(f"[AI Assistant Error] {error_message}")
+        _guardar_mensaje_sin_respuesta(session, mensaje)
 
         return {
             'exito': False,
@@ -355,43 +649,264 @@ Guarda mentalmente que la acción pendiente es: {confirmacion_pendiente['accion'
         }
 
 
-def get_session_history(session_id):
+async def _stream_completion(messages, eventos, con_herramientas, uso):
+    """
+    Consume una respuesta en streaming de OpenAI.
+
+    Cada fragmento de texto se agrega a ``eventos`` a medida que llega y
+    el uso de tokens se acumula en ``uso``.
+
+    Returns:
+        tuple (contenido, tool_calls)
+    """
+    with ai_metricas.fase('modelo'):
+        return await _consumir_stream(messages, eventos, con_herramientas, uso)
+
+
+async def _consumir_stream(messages, eventos, con_herramientas, uso):
+    stream = await ai_backends.obtener_backend().completar_stream(
+        **_parametros_completion(messages, permitir_herramientas=con_herramientas)
+    )
+
+    contenido = []
+    tool_calls = {}
+
+    async for chunk in stream:
+        _sumar_uso(uso, chunk.usage)
+        if not chunk.choices:
+            continue
+
+        delta = chunk.choices[0].delta
+        if delta.content:
+            contenido.append(delta.content)
+            await eventos.put(('token', {'texto': delta.content}))
+
+        # Los argumentos de cada tool call llegan fragmentados por índice
+        for fragmento in delta.tool_calls or []:
+            tool_call = tool_calls.setdefault(fragmento.index, {'id': None, 'name': '', 'arguments': ''})
+            if fragmento.id:
+                tool_call['id'] = fragmento.id
+            if fragmento.function and fragmento.function.name:
+                tool_call['name'] += fragmento.function.name
+            if fragmento.function and fragmento.function.arguments:
+                tool_call['arguments'] += fragmento.function.arguments
+
+    return ''.join(contenido), [tool_calls[i] for i in sorted(tool_calls)]
+
+
+async def chat_stream(usuario, mensaje_usuario):
+    """
+    Versión asíncrona de ``chat`` que entrega la respuesta a medida que se genera.
+
+    Usa el cliente asíncrono de OpenAI y ejecuta el acceso a la base de datos
+    y las herramientas con ``sync_to_async``, de modo que no bloquea el
+    event loop del servidor ASGI.
+
+    Args:
+        usuario: Objeto Usuario de Django
+        mensaje_usuario: str con el mensaje del usuario
+
+    Yields:
+        tuple (evento, datos) con evento 'token', 'herramienta', 'fin' o 'error'
+    """
+    session, mensaje, messages, respuesta_directa = await sync_to_async(_preparar_turno)(usuario, mensaje_usuario)
+    if respuesta_directa:
+        yield 'token', {'texto': respuesta_directa['respuesta']}
+        yield 'fin', respuesta_directa
+        return
+
+    eventos = asyncio.Queue()
+
+    async def producir():
+        try:
+            uso = _uso_vacio()
+            final_message, tool_calls = await _stream_completion(messages, eventos, True, uso)
+            tool_calls_made = []
+            confirmacion_pendiente = None
+
+            if tool_calls:
+                messages.append(_mensaje_asistente_con_herramientas(final_message or None, tool_calls))
+                for tool_call in tool_calls:
+                    await eventos.put(('herramienta', {'nombre': tool_call['name']}))
+
+                tool_calls_made, confirmacion_pendiente = await sync_to_async(_ejecutar_herramientas)(
+                    usuario, tool_calls, messages
+                )
+                final_message, _ = await _stream_completion(messages, eventos, False, uso)
+
+            ultimo_mensaje_id = await sync_to_async(_guardar_respuesta)(
+                session, mensaje, final_message, uso, tool_calls_made, confirmacion_pendiente
+            )
+
+            resultado = {
+                'exito': True,
+                'respuesta': final_message,
+                'tokens_usados': uso['total'],
+                'session_id': session.id,
+                'ultimo_mensaje_id': ultimo_mensaje_id
+            }
+            if confirmacion_pendiente:
+                resultado['propuesta'] = _datos_propuesta(session)
+            else:
+                resultado['tool_calls'] = tool_calls_made
+            await eventos.put(('fin', resultado))
+
+        except Exception as e:
+            error_message = f"Error al procesar la solicitud: {str(e)}"
+            print(f"[AI Assistant Error] {error_message}")
+            await sync_to_async(_guardar_mensaje_sin_respuesta)(session, mensaje)
+            await eventos.put(('error', {'exito': False, 'error': error_message}))
+
+    tarea = asyncio.create_task(producir())
+    try:
+        while True:
+            evento, datos = await eventos.get()
+            yield evento, datos
+            if evento in ('fin', 'error'):
+                break
+    finally:
+        # Si el cliente se desconecta, no dejar la tarea huérfana
+        if not tarea.done():
+            tarea.cancel()
+
+
+def _mensaje_historial(mensaje_id, role, contenido, created_at, tokens):
+    return {
+        'id': mensaje_id,
+        'role': role,
+        'contenido': contenido,
+        'timestamp': created_at.strftime('%H:%M'),
+        'tokens': tokens
+    }
+
+
+def _paginar_mensajes(mensajes, antes, despues, limite):
+    """
+    Recorta una página de una lista de mensajes ordenada por id.
+
+    Returns:
+        tuple (pagina, hay_anteriores, hay_posteriores)
+    """
+    if despues:
+        posteriores = [mensaje for mensaje in mensajes if mensaje['id'] > despues]
+        return posteriores[:limite], False, len(posteriores) > limite
+    if antes:
+        mensajes = [mensaje for mensaje in mensajes if mensaje['id'] < antes]
+    return mensajes[-limite:], len(mensajes) > limite, False
+
+
+def obtener_sesion_historial(session_id, usuario):
+    """
+    Sesión (viva o archivada) cuyo historial se consulta.
+
+    Returns:
+        tuple (sesion, archivada), o (None, False) si no existe
+    """
+    sesiones = ChatSession.objects.select_related('usuario').filter(id=session_id)
+    if usuario is not None:
+        sesiones = sesiones.filter(usuario=usuario)
+    session = sesiones.first()
+    if session is not None:
+        return session, False
+
+    archivos = ChatSesionArchivada.objects.select_related('usuario').filter(sesion_id=session_id)
+    if usuario is not None:
+        archivos = archivos.filter(usuario=usuario)
+    archivo = archivos.first()
+    return archivo, archivo is not None
+
+
+def etag_historial(session, **parametros):
+    """
+    ETag de una página del historial.
+
+    Depende de ``updated_at`` de la sesión, que cambia cada vez que se
+    guardan mensajes (ver _guardar_mensajes), así que no requiere leer los
+    mensajes para responder 304 a un cliente que ya tiene la página.
+    """
+    version = f"{session.pk}:{session.updated_at.isoformat()}:{sorted(parametros.items())}"
+    return '"' + hashlib.md5(version.encode()).hexdigest() + '"'
+
+
+def get_session_history(session_id, usuario=None, antes=None, despues=None, limite=LIMITE_HISTORIAL, session=None):
     """
-    Obtiene el historial de una sesión de chat.
+    Obtiene una página del historial de una sesión de chat.
+
+    Sin cursores se retornan los ``limite`` mensajes más recientes. Con
+    ``antes`` se retornan los anteriores a ese mensaje (cargar mensajes
+    más antiguos) y con ``despues`` los posteriores (consultar si hay
+    mensajes nuevos). Los mensajes van siempre en orden cronológico. Si la
+    sesión ya fue archivada, se lee desde ChatSesionArchivada.
 
     Args:
         session_id: ID de la sesión
+        usuario: si se indica, la sesión debe pertenecer a este usuario
+        antes: ID de mensaje; solo se retornan mensajes anteriores a él
+        despues: ID de mensaje; solo se retornan mensajes posteriores a él
+        limite: cantidad máxima de mensajes
+        session: ChatSession o ChatSesionArchivada ya obtenida (evita buscarla)
 
     Returns:
-        list de mensajes
+        dict con la sesión, los mensajes, 'hay_anteriores', 'cursor_anterior'
+        (valor de ``antes`` para la página previa), 'hay_posteriores' y
+        'cursor_siguiente' (valor de ``despues`` para consultar mensajes nuevos)
     """
-    try:
-        session = ChatSession.objects.get(id=session_id)
-        messages = ChatMessage.objects.filter(sesion=session).order_by('created_at')
+    limite = max(1, min(limite, LIMITE_HISTORIAL_MAXIMO))
 
-        return {
-            'exito': True,
-            'session': {
-                'id': session.id,
-                'usuario': f"{session.usuario.nombres} {session.usuario.apellido}",
-                'titulo': session.titulo,
-                'created_at': session.created_at.strftime('%d/%m/%Y %H:%M')
-            },
-            'messages': [
-                {
-                    'role': msg.role,
-                    'contenido': msg.contenido,
-                    'timestamp': msg.created_at.strftime('%H:%M'),
-                    'tokens': msg.tokens_usados
-                }
-                for msg in messages
-            ]
-        }
-    except ChatSession.DoesNotExist:
-        return {
-            'exito': False,
-            'error': 'Sesión no encontrada'
-        }
+    if session is None:
+        session, archivada = obtener_sesion_historial(session_id, usuario)
+        if session is None:
+            return {
+                'exito': False,
+                'error': 'Sesión no encontrada'
+            }
+    else:
+        archivada = isinstance(session, ChatSesionArchivada)
+    duenio = usuario or session.usuario
+
+    if archivada:
+        pagina, hay_anteriores, hay_posteriores = _paginar_mensajes(session.mensajes(), antes, despues, limite)
+        mensajes = [
+            _mensaje_historial(
+                mensaje['id'], mensaje['role'], mensaje['contenido'],
+                datetime.fromisoformat(mensaje['created_at']), mensaje['tokens_usados']
+            )
+            for mensaje in pagina
+        ]
+    else:
+        messages = ChatMessage.objects.filter(sesion=session).only(
+            'id', 'role', 'contenido', 'created_at', 'tokens_usados'
+        )
+        if despues:
+            pagina = list(messages.filter(id__gt=despues).order_by('id')[:limite + 1])
+            hay_anteriores, hay_posteriores = False, len(pagina) > limite
+            pagina = pagina[:limite]
+        else:
+            if antes:
+                messages = messages.filter(id__lt=antes)
+            pagina = list(messages.order_by('-id')[:limite + 1])
+            hay_anteriores, hay_posteriores = len(pagina) > limite, False
+            pagina = list(reversed(pagina[:limite]))
+        mensajes = [
+            _mensaje_historial(msg.id, msg.role, msg.contenido, msg.created_at, msg.tokens_usados)
+            for msg in pagina
+        ]
+
+    return {
+        'exito': True,
+        'session': {
+            'id': session_id,
+            'usuario': f"{duenio.nombres} {duenio.apellido}",
+            'titulo': session.titulo,
+            'created_at': session.created_at.strftime('%d/%m/%Y %H:%M'),
+            'archivada': archivada
+        },
+        'messages': mensajes,
+        'hay_anteriores': hay_anteriores,
+        'cursor_anterior': mensajes[0]['id'] if hay_anteriores else None,
+        'hay_posteriores': hay_posteriores,
+        'cursor_siguiente': mensajes[-1]['id'] if mensajes else despues
+    }
 
 
 def clear_session(usuario):
@@ -0,0 +1,290 @@
+"""
+Backends de modelo de lenguaje para el asistente de IA.
+
+``ai_assistant`` no usa el SDK de OpenAI directamente: pide el backend
+configurado en ``settings.AI_BACKEND`` y llama a ``completar`` (respuesta
+completa) o ``completar_stream`` (respuesta en streaming). Ambos reciben los
+mismos parámetros que ``chat.completions.create`` y retornan objetos del SDK.
+
+Backends disponibles:
+
+- ``openai``: llama a la API de OpenAI (por defecto).
+- ``simulado``: responde localmente a partir de guiones, con latencia
+  configurable. Permite medir el asistente sin red ni costo de API
+  (ver el comando ``benchmark_asistente``).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from functools import cached_property
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from openai import OpenAI, AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from .ai_contexto import contar_tokens
+
+
+class BackendLLM:
+    """Interfaz común de los backends del asistente."""
+
+    def completar(self, **parametros):
+        """Retorna un ChatCompletion para los parámetros de chat.completions.create."""
+        raise NotImplementedError
+
+    async def completar_stream(self, **parametros):
+        """Retorna un iterador asíncrono de ChatCompletionChunk (el último trae el uso)."""
+        raise NotImplementedError
+
+
+class BackendOpenAI(BackendLLM):
+    """Backend que usa la API de OpenAI. Los clientes se crean en el primer uso."""
+
+    @cached_property
+    def cliente(self):
+        return OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+    @cached_property
+    def cliente_async(self):
+        return AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+    def completar(self, **parametros):
+        return self.cliente.chat.completions.create(**parametros)
+
+    async def completar_stream(self, **parametros):
+        return await self.cliente_async.chat.completions.create(
+            stream=True,
+            stream_options={'include_usage': True},
+            **parametros
+        )
+
+
+# Guiones del backend simulado: mensaje del usuario -> pasos del modelo.
+# Cada paso es una respuesta de texto ({'contenido': ...}) o una lista de
+# llamadas a herramientas ({'herramientas': [{'nombre', 'argumentos'}]}).
+GUIONES_PREDETERMINADOS = {
+    'Dame un resumen del dashboard': [
+        {'herramientas': [{'nombre': 'get_estadisticas_dashboard', 'argumentos': {}}]},
+        {'contenido': 'Este es el resumen general del sistema con los totales de condominios, usuarios e incidencias.'},
+    ],
+    '¿Qué incidencias están abiertas?': [
+        {'herramientas': [{'nombre': 'get_incidencias_abiertas', 'argumentos': {}}]},
+        {'contenido': 'Estas son las incidencias abiertas ordenadas por prioridad.'},
+    ],
+    'Lista los condominios y las categorías de incidencias': [
+        {'herramientas': [
+            {'nombre': 'listar_todos_condominios', 'argumentos': {}},
+            {'nombre': 'listar_todas_categorias', 'argumentos': {}},
+        ]},
+        {'contenido': 'Estos son los condominios registrados y las categorías disponibles.'},
+    ],
+    'Busca incidencias sobre filtraciones de agua': [
+        {'herramientas': [{'nombre': 'buscar_incidencias', 'argumentos': {'termino_busqueda': 'agua'}}]},
+        {'contenido': 'Encontré estas incidencias relacionadas con filtraciones de agua.'},
+    ],
+    '¿Cómo han evolucionado las incidencias en los últimos meses?': [
+        {'herramientas': [
+            {'nombre': 'analizar_tendencias_incidencias', 'argumentos': {'dias': 90}},
+            {'nombre': 'obtener_estadisticas_incidencias_por_condominio', 'argumentos': {}},
+        ]},
+        {'contenido': 'En los últimos 90 días las incidencias se concentran en pocas categorías y condominios.'},
+    ],
+    'Gracias, eso es todo': [
+        {'contenido': '¡De nada! Si necesitas algo más, aquí estaré.'},
+    ],
+}
+
+# Respuesta para mensajes sin guion
+RESPUESTA_PREDETERMINADA = 'Entendido. ¿En qué más te puedo ayudar?'
+
+# El proveedor cachea prefijos de al menos este largo, en bloques de este tamaño
+TOKENS_MINIMOS_CACHE = 1024
+BLOQUE_CACHE = 128
+
+
+class BackendSimulado(BackendLLM):
+    """
+    Backend local y determinista que reproduce guiones.
+
+    El paso del guion se elige a partir del historial recibido: el último
+    mensaje del usuario identifica el guion y la cantidad de rondas de
+    herramientas ya respondidas indica el paso. Así el backend no guarda
+    estado por conversación y se puede usar desde varios hilos a la vez.
+
+    Args:
+        guiones: dict {mensaje_usuario: pasos}; por defecto GUIONES_PREDETERMINADOS
+        latencia: segundos de espera antes de la respuesta (tiempo al primer token)
+        latencia_por_token: segundos adicionales por token generado
+    """
+
+    def __init__(self, guiones=None, latencia=0.0, latencia_por_token=0.0):
+        self.guiones = GUIONES_PREDETERMINADOS if guiones is None else guiones
+        self.latencia = latencia
+        self.latencia_por_token = latencia_por_token
+        self._claves_cacheadas = set()
+        self._lock = threading.Lock()
+        self._llamadas = 0
+
+    @classmethod
+    def desde_archivo(cls, ruta, **opciones):
+        """Crea el backend con los guiones de un archivo JSON."""
+        with open(ruta, encoding='utf-8') as archivo:
+            return cls(guiones=json.load(archivo), **opciones)
+
+    def _siguiente_id(self, prefijo):
+        with self._lock:
+            self._llamadas += 1
+            return f'{prefijo}-sim-{self._llamadas}'
+
+    def _paso(self, messages, permitir_herramientas):
+        """Paso del guion que corresponde al historial recibido."""
+        ultimo_usuario = 0
+        for posicion, mensaje in enumerate(messages):
+            if mensaje['role'] == 'user':
+                ultimo_usuario = posicion
+
+        pasos = self.guiones.get(messages[ultimo_usuario]['content'] if messages else None)
+        if not pasos:
+            return {'contenido': RESPUESTA_PREDETERMINADA}
+
+        rondas = sum(
+            1 for mensaje in messages[ultimo_usuario + 1:]
+            if mensaje['role'] == 'assistant' and mensaje.get('tool_calls')
+        )
+        paso = pasos[min(rondas, len(pasos) - 1)]
+
+        if 'herramientas' in paso and not permitir_herramientas:
+            # Con tool_choice="none" el modelo debe responder con texto
+            textos = [p for p in pasos if 'contenido' in p]
+            return textos[-1] if textos else {'contenido': RESPUESTA_PREDETERMINADA}
+        return paso
+
+    def _tool_calls(self, paso):
+        return [
+            {
+                'id': self._siguiente_id('call'),
+                'type': 'function',
+                'function': {
+                    'name': herramienta['nombre'],
+                    'arguments': json.dumps(herramienta.get('argumentos', {}), ensure_ascii=False),
+                },
+            }
+            for herramienta in paso.get('herramientas', [])
+        ]
+
+    def _uso(self, parametros, tokens_respuesta):
+        """Uso de tokens aproximado, incluyendo el caché de prefijo del proveedor."""
+        tokens_prompt = sum(
+            contar_tokens(mensaje.get('content') or '') + 4 for mensaje in parametros['messages']
+        )
+        tokens_herramientas = contar_tokens(json.dumps(parametros.get('tools') or [], ensure_ascii=False))
+        tokens_prompt += tokens_herramientas
+
+        # Prefijo cacheable: herramientas y mensaje de sistema inicial
+        tokens_prefijo = tokens_herramientas
+        if parametros['messages'] and parametros['messages'][0]['role'] == 'system':
+            tokens_prefijo += contar_tokens(parametros['messages'][0]['content'])
+
+        clave = parametros.get('prompt_cache_key')
+        cacheados = 0
+        with self._lock:
+            if clave in self._claves_cacheadas and tokens_prefijo >= TOKENS_MINIMOS_CACHE:
+                cacheados = tokens_prefijo - tokens_prefijo % BLOQUE_CACHE
+            elif clave:
+                self._claves_cacheadas.add(clave)
+
+        return {
+            'prompt_tokens': tokens_prompt,
+            'completion_tokens': tokens_respuesta,
+            'total_tokens': tokens_prompt + tokens_respuesta,
+            'prompt_tokens_details': {'cached_tokens': cacheados},
+        }
+
+    def _responder(self, parametros):
+        paso = self._paso(parametros['messages'], parametros.get('tool_choice') != 'none')
+        contenido = paso.get('contenido')
+        tool_calls = self._tool_calls(paso)
+        tokens = contar_tokens(contenido) + sum(
+            contar_tokens(tc['function']['arguments']) for tc in tool_calls
+        )
+        return contenido, tool_calls, self._uso(parametros, tokens)
+
+    def completar(self, **parametros):
+        contenido, tool_calls, uso = self._responder(parametros)
+        time.sleep(self.latencia + self.latencia_por_token * uso['completion_tokens'])
+
+        return ChatCompletion.model_validate({
+            'id': self._siguiente_id('chatcmpl'),
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': parametros.get('model', 'simulado'),
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'tool_calls' if tool_calls else 'stop',
+                'message': {'role': 'assistant', 'content': contenido, 'tool_calls': tool_calls or None},
+            }],
+            'usage': uso,
+        })
+
+    async def completar_stream(self, **parametros):
+        contenido, tool_calls, uso = self._responder(parametros)
+        identificador = self._siguiente_id('chatcmpl')
+        modelo = parametros.get('model', 'simulado')
+
+        def chunk(delta=None, usage=None):
+            return ChatCompletionChunk.model_validate({
+                'id': identificador,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': modelo,
+                'choices': [] if delta is None else [{'index': 0, 'delta': delta}],
+                'usage': usage,
+            })
+
+        async def generar():
+            await asyncio.sleep(self.latencia)
+            for posicion, tool_call in enumerate(tool_calls):
+                await asyncio.sleep(self.latencia_por_token * contar_tokens(tool_call['function']['arguments']))
+                yield chunk({'tool_calls': [{'index': posicion, **tool_call}]})
+            for posicion, palabra in enumerate((contenido or '').split(' ')):
+                await asyncio.sleep(self.latencia_por_token * contar_tokens(palabra))
+                yield chunk({'content': (' ' if posicion else '') + palabra})
+            yield chunk(usage=uso)
+
+        return generar()
+
+
+# Backends por nombre corto; AI_BACKEND también acepta una ruta importable
+BACKENDS = {
+    'openai': BackendOpenAI,
+    'simulado': BackendSimulado,
+}
+
+_backend = None
+
+
+def obtener_backend():
+    """Backend configurado en ``settings.AI_BACKEND`` (se crea una vez por proceso)."""
+    global _backend
+    if _backend is None:
+        nombre = getattr(settings, 'AI_BACKEND', 'openai')
+        clase = BACKENDS[nombre] if nombre in BACKENDS else import_string(nombre)
+        _backend = clase()
+    return _backend
+
+
+def establecer_backend(backend):
+    """
+    Reemplaza el backend del proceso (por ejemplo, por uno simulado).
+
+    Returns:
+        el backend anterior, para poder restaurarlo
+    """
+    global _backend
+    anterior = _backend
+    _backend = backend
+    return anterior
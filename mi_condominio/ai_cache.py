@@ -0,0 +1,161 @@
+"""
+Caché de resultados de las herramientas de consulta del asistente de IA.
+
+Las herramientas que listan catálogos o calculan estadísticas se repiten
+mucho entre sesiones y devuelven los mismos datos. Sus resultados se
+guardan en el caché ``ai_herramientas`` (ver ``CACHES`` en settings) con
+una clave formada por el nombre de la herramienta, sus argumentos
+normalizados y la versión actual de cada modelo que la herramienta lee.
+
+Cada vez que se guarda o elimina una fila de uno de esos modelos, las
+señales de ``signals.py`` incrementan su versión, por lo que las entradas
+anteriores dejan de usarse y expiran solas por TTL.
+"""
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import (
+    Region,
+    Comuna,
+    Condominio,
+    Usuario,
+    Reunion,
+    CategoriaIncidencia,
+    Incidencia,
+)
+
+
+# Alias del caché en settings.CACHES
+ALIAS_CACHE = 'ai_herramientas'
+
+# Herramientas cacheables y los modelos cuyos cambios las invalidan.
+# ContadorIncidencias no se lista: solo cambia junto con Incidencia.
+HERRAMIENTAS_CACHEABLES = {
+    'listar_todos_condominios': (Condominio, Comuna, Region),
+    'listar_todas_categorias': (CategoriaIncidencia,),
+    'listar_condominios_por_region': (Condominio, Comuna, Region),
+    'get_estadisticas_dashboard': (Condominio, Usuario, Reunion, Incidencia, CategoriaIncidencia),
+    'obtener_estadisticas_incidencias_por_condominio': (Condominio, Region, Incidencia, CategoriaIncidencia),
+    'buscar_condominio_por_nombre': (Condominio, Comuna, Region),
+    'buscar_categoria_por_nombre': (CategoriaIncidencia,),
+}
+
+# Modelos cuyos cambios se deben escuchar
+MODELOS_OBSERVADOS = frozenset(
+    modelo for modelos in HERRAMIENTAS_CACHEABLES.values() for modelo in modelos
+)
+
+_CLAVE_ACIERTOS = 'ai:estadisticas:aciertos'
+_CLAVE_FALLOS = 'ai:estadisticas:fallos'
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def _clave_version(modelo):
+    return f'ai:version:{modelo._meta.label_lower}'
+
+
+def _normalizar_argumentos(argumentos):
+    """
+    Serializa los argumentos de forma estable.
+
+    Se ignoran los argumentos en None (equivalen a omitirlos, ya que todas
+    las herramientas usan None como valor por defecto).
+    """
+    normalizados = {nombre: valor for nombre, valor in argumentos.items() if valor is not None}
+    return json.dumps(normalizados, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _incrementar(clave, inicial=1):
+    cache = _cache()
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # La clave no existe (primer uso o fue desalojada)
+        cache.set(clave, inicial, timeout=None)
+
+
+def _versiones(modelos):
+    """Versión actual de cada modelo, inicializándola si no existe."""
+    cache = _cache()
+    claves = [_clave_version(modelo) for modelo in modelos]
+    versiones = cache.get_many(claves)
+
+    for clave in claves:
+        if clave not in versiones:
+            # Partir desde la hora actual (y no desde 0) garantiza que una
+            # versión desalojada del caché no coincida con entradas antiguas
+            cache.add(clave, time.time_ns(), timeout=None)
+            versiones[clave] = cache.get(clave)
+
+    return [versiones[clave] for clave in claves]
+
+
+def construir_clave(nombre, argumentos):
+    """Clave de caché para una llamada, incluyendo la versión de sus modelos."""
+    version = '.'.join(str(v) for v in _versiones(HERRAMIENTAS_CACHEABLES[nombre]))
+    resumen = hashlib.sha1(_normalizar_argumentos(argumentos).encode()).hexdigest()
+    return f'ai:herramienta:{nombre}:{resumen}:{version}'
+
+
+def ejecutar(nombre, funcion, argumentos):
+    """
+    Ejecuta una herramienta usando el caché si es cacheable.
+
+    Args:
+        nombre: nombre de la herramienta
+        funcion: callable de la herramienta
+        argumentos: dict de argumentos
+
+    Returns:
+        el resultado de la herramienta (desde el caché o recién calculado)
+    """
+    if nombre not in HERRAMIENTAS_CACHEABLES:
+        return funcion(**argumentos)
+
+    cache = _cache()
+    clave = construir_clave(nombre, argumentos)
+    resultado = cache.get(clave)
+
+    if resultado is not None:
+        _incrementar(_CLAVE_ACIERTOS)
+        return resultado
+
+    _incrementar(_CLAVE_FALLOS)
+    resultado = funcion(**argumentos)
+    # Los errores (por ejemplo "no se encontró") no se guardan
+    if 'error' not in resultado:
+        cache.set(clave, resultado, timeout=getattr(settings, 'AI_CACHE_TTL', 300))
+    return resultado
+
+
+def invalidar_modelo(modelo):
+    """Invalida los resultados de todas las herramientas que leen ``modelo``."""
+    _incrementar(_clave_version(modelo), inicial=time.time_ns())
+
+
+def obtener_estadisticas():
+    """
+    Retorna los contadores de aciertos y fallos del caché.
+
+    Returns:
+        dict con aciertos, fallos y tasa_aciertos (0 a 1)
+    """
+    valores = _cache().get_many([_CLAVE_ACIERTOS, _CLAVE_FALLOS])
+    aciertos = valores.get(_CLAVE_ACIERTOS, 0)
+    fallos = valores.get(_CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+
+    return {
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'tasa_aciertos': round(aciertos / total, 3) if total else 0,
+        'herramientas_cacheables': sorted(HERRAMIENTAS_CACHEABLES),
+    }
@@ -0,0 +1,152 @@
+"""
+Construcción del contexto de conversación para el asistente de IA.
+
+En cada turno se envían al modelo el prompt del sistema, una transcripción
+abreviada de los mensajes antiguos de la sesión y los mensajes más recientes
+que caben en un presupuesto de tokens (``AI_CONTEXTO_PRESUPUESTO_TOKENS``).
+
+La transcripción abreviada no es un resumen: cada mensaje antiguo queda
+como una línea truncada y, al superar su límite de tokens, se descartan
+las líneas más antiguas. Los mensajes que quedan fuera del presupuesto se
+agregan de forma incremental (``transcripcion`` y ``transcripcion_hasta_id``
+de la ChatSession), así que cada mensaje se procesa una sola vez y las
+sesiones largas no vuelven a leer todo su historial. La transcripción se
+guarda junto con los mensajes al final del turno.
+"""
+
+import math
+import re
+
+from django.conf import settings
+
+from .models import ChatMessage
+
+
+# Tokens adicionales que la API cobra por cada mensaje (rol y separadores)
+TOKENS_POR_MENSAJE = 4
+
+# Caracteres por token aproximados para palabras en español
+CARACTERES_POR_TOKEN = 4
+
+# Largo máximo de cada mensaje dentro de la transcripción abreviada
+CARACTERES_POR_LINEA_TRANSCRIPCION = 240
+
+_PIEZAS = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+_ETIQUETAS_ROL = {
+    'user': 'Usuario',
+    'assistant': 'Asistente',
+    'system': 'Sistema',
+}
+
+
+def contar_tokens(texto):
+    """
+    Aproxima la cantidad de tokens de un texto sin llamar a un tokenizador externo.
+
+    Cada palabra cuenta como un token cada ``CARACTERES_POR_TOKEN``
+    caracteres y cada signo de puntuación como un token, lo que se acerca
+    a los tokenizadores BPE de OpenAI para texto en español.
+    """
+    if not texto:
+        return 0
+    return sum(
+        math.ceil(len(pieza) / CARACTERES_POR_TOKEN) if pieza[0].isalnum() or pieza[0] == '_' else 1
+        for pieza in _PIEZAS.findall(texto)
+    )
+
+
+def tokens_mensaje(mensaje):
+    """Tokens aproximados de un ChatMessage dentro de la lista de mensajes."""
+    return contar_tokens(mensaje.contenido) + TOKENS_POR_MENSAJE
+
+
+def _linea_transcripcion(mensaje):
+    contenido = ' '.join(mensaje.contenido.split())
+    if len(contenido) > CARACTERES_POR_LINEA_TRANSCRIPCION:
+        contenido = contenido[:CARACTERES_POR_LINEA_TRANSCRIPCION].rstrip() + '…'
+    return f"- {_ETIQUETAS_ROL.get(mensaje.role, mensaje.role)}: {contenido}"
+
+
+def actualizar_transcripcion(session, mensajes):
+    """
+    Agrega mensajes (del más antiguo al más reciente) a la transcripción abreviada de la sesión.
+
+    Cada mensaje queda como una línea truncada a
+    ``CARACTERES_POR_LINEA_TRANSCRIPCION`` caracteres; si el total supera
+    ``AI_CONTEXTO_TOKENS_TRANSCRIPCION`` se descartan las líneas más
+    antiguas. Solo se modifica la sesión en memoria; se guarda al final del
+    turno.
+    """
+    if not mensajes:
+        return
+
+    limite = getattr(settings, 'AI_CONTEXTO_TOKENS_TRANSCRIPCION', 600)
+    lineas = session.transcripcion.splitlines() if session.transcripcion else []
+    lineas.extend(_linea_transcripcion(mensaje) for mensaje in mensajes)
+
+    tokens = [contar_tokens(linea) for linea in lineas]
+    total = sum(tokens)
+    inicio = 0
+    while total > limite and inicio < len(lineas) - 1:
+        total -= tokens[inicio]
+        inicio += 1
+
+    session.transcripcion = '\n'.join(lineas[inicio:])
+    session.transcripcion_hasta_id = mensajes[-1].id
+
+
+def construir_mensajes(session, mensaje_sistema, nuevos=()):
+    """
+    Arma la lista de mensajes para OpenAI con el historial reciente de la sesión.
+
+    Recorre los mensajes aún no transcritos desde el más reciente hacia
+    atrás hasta agotar el presupuesto de tokens; los mensajes nuevos del
+    turno siempre se incluyen. Los más antiguos que no caben se agregan a la
+    transcripción abreviada.
+
+    Args:
+        session: ChatSession actual
+        mensaje_sistema: mensaje de sistema (prefijo estable de la solicitud)
+        nuevos: ChatMessage del turno actual que aún no se guardan
+
+    Returns:
+        list de dicts {'role', 'content'}
+    """
+    presupuesto = getattr(settings, 'AI_CONTEXTO_PRESUPUESTO_TOKENS', 3000)
+
+    pendientes = ChatMessage.objects.filter(sesion=session).only('id', 'role', 'contenido').order_by('-id')
+    if session.transcripcion_hasta_id:
+        pendientes = pendientes.filter(id__gt=session.transcripcion_hasta_id)
+
+    recientes = list(reversed(nuevos))
+    fuera_de_presupuesto = []
+    usados = sum(tokens_mensaje(mensaje) for mensaje in nuevos)
+    for mensaje in pendientes.iterator(chunk_size=50):
+        costo = tokens_mensaje(mensaje)
+        if fuera_de_presupuesto or (recientes and usados + costo > presupuesto):
+            fuera_de_presupuesto.append(mensaje)
+            continue
+        recientes.append(mensaje)
+        usados += costo
+
+    fuera_de_presupuesto.reverse()
+    actualizar_transcripcion(session, fuera_de_presupuesto)
+
+    # La transcripción y el historial van después del prefijo estable para no
+    # invalidar el caché de prompts del proveedor
+    messages = [mensaje_sistema]
+
+    if session.transcripcion:
+        messages.append({
+            "role": "system",
+            "content": f"Transcripción abreviada de los mensajes anteriores de esta conversación:\n{session.transcripcion}"
+        })
+
+    for mensaje in reversed(recientes):
+        messages.append({
+            "role": mensaje.role,
+            "content": mensaje.contenido
+        })
+
+    return messages
@@ -0,0 +1,116 @@
+"""
+Medición de tiempos y consultas de los turnos del asistente de IA.
+
+``ai_assistant`` marca sus fases con ``fase(nombre)``: ``contexto``
+(sesión e historial), ``modelo`` (espera al modelo), ``herramientas`` y
+``persistencia``. Fuera de ``medir_turno()`` las marcas no hacen nada, así
+que en producción no tienen costo.
+
+Dentro de ``medir_turno()`` se acumula la duración de cada fase y se
+cuentan las consultas SQL con ``connection.execute_wrapper``, también las
+de los hilos que ejecutan herramientas en paralelo.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Fase asignada a las consultas hechas fuera de una fase marcada
+SIN_FASE = 'otros'
+
+_medicion = ContextVar('ai_medicion', default=None)
+_fase_actual = ContextVar('ai_fase_actual', default=SIN_FASE)
+
+
+class MedicionTurno:
+    """Tiempos por fase y consultas SQL de un turno."""
+
+    def __init__(self):
+        self.duracion = 0.0
+        self.fases = defaultdict(float)
+        self.consultas = defaultdict(int)
+        self._conexiones = set()
+        self._lock = threading.Lock()
+
+    @property
+    def total_consultas(self):
+        return sum(self.consultas.values())
+
+    def _registrar_consulta(self, execute, sql, params, many, context):
+        with self._lock:
+            self.consultas[_fase_actual.get()] += 1
+        return execute(sql, params, many, context)
+
+    def _sumar_fase(self, nombre, segundos):
+        with self._lock:
+            self.fases[nombre] += segundos
+
+
+def registrar_consultas():
+    """
+    Cuenta las consultas de la conexión del hilo actual en la medición activa.
+
+    Se usa en los hilos que no pasan por ``medir_turno`` (por ejemplo, los
+    del pool de herramientas). Retorna un context manager.
+    """
+    medicion = _medicion.get()
+    # connections[...] retorna la conexión propia del hilo actual
+    conexion = connections[DEFAULT_DB_ALIAS]
+    if medicion is None or id(conexion) in medicion._conexiones:
+        return nullcontext()
+    return _registrar_en_conexion(medicion, conexion)
+
+
+@contextmanager
+def _registrar_en_conexion(medicion, conexion):
+    clave = id(conexion)
+    medicion._conexiones.add(clave)
+    try:
+        with conexion.execute_wrapper(medicion._registrar_consulta):
+            yield
+    finally:
+        medicion._conexiones.discard(clave)
+
+
+@contextmanager
+def fase(nombre):
+    """Mide una fase del turno actual (no hace nada si no hay medición activa)."""
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+
+    token = _fase_actual.set(nombre)
+    inicio = time.perf_counter()
+    try:
+        with registrar_consultas():
+            yield
+    finally:
+        medicion._sumar_fase(nombre, time.perf_counter() - inicio)
+        _fase_actual.reset(token)
+
+
+@contextmanager
+def medir_turno():
+    """
+    Mide el turno ejecutado dentro del bloque.
+
+    Uso:
+        with medir_turno() as medicion:
+            ai_assistant.chat(usuario, mensaje)
+        medicion.fases, medicion.consultas
+    """
+    medicion = MedicionTurno()
+    token = _medicion.set(medicion)
+    inicio = time.perf_counter()
+    try:
+        with registrar_consultas():
+            yield medicion
+    finally:
+        medicion.duracion = time.perf_counter() - inicio
+        _medicion.reset(token)
@@ -13,8 +13,17 @@ from .models import (
     EvidenciaIncidencia,
     Amonestacion,
     Reunion,
-    CategoriaIncidencia
+    CategoriaIncidencia,
+    ContadorIncidencias
 )
+from .busqueda import buscar, ORDEN_RELEVANCIA
+from .resolucion_nombres import buscar_condominios, buscar_usuarios, buscar_categorias, elegir_candidato
+from .estadisticas import obtener_estadisticas, obtener_detalle_incidencias, sumar_contadores
+
+
+# Agrupaciones de estados usadas por las estadísticas por condominio
+ESTADOS_ABIERTOS = [Incidencia.Estado.PENDIENTE, Incidencia.Estado.EN_PROCESO]
+ESTADOS_FINALIZADOS = [Incidencia.Estado.RESUELTA, Incidencia.Estado.CERRADA]
 
 
 # ==================== HERRAMIENTAS DE CONSULTA ====================
@@ -68,53 +77,19 @@ def get_estadisticas_dashboard(condominio_id=None):
     Returns:
         dict con estadísticas del sistema
     """
-    condominios_query = Condominio.objects.all()
-    usuarios_query = Usuario.objects.all()
-    incidencias_query = Incidencia.objects.all()
-    reuniones_query = Reunion.objects.all()
+    stats = obtener_estadisticas(condominio_id)
 
-    if condominio_id:
-        condominios_query = condominios_query.filter(id=condominio_id)
-        usuarios_query = usuarios_query.filter(condominio_id=condominio_id)
-        incidencias_query = incidencias_query.filter(condominio_id=condominio_id)
-        reuniones_query = reuniones_query.filter(condominio_id=condominio_id)
-
-    # Calcular estadísticas
-    incidencias_abiertas = incidencias_query.exclude(estado__in=['CERRADA', 'CANCELADA']).count()
-
-    stats = {
-        'total_condominios': condominios_query.count(),
-        'total_usuarios': usuarios_query.count(),
-        'total_incidencias': incidencias_query.count(),
-        'incidencias_abiertas': incidencias_abiertas,
-        'total_reuniones': reuniones_query.count(),
-        'incidencias_por_estado': {},
-        'incidencias_por_prioridad': {},
-        'categorias_mas_comunes': []
+    return {
+        'total_condominios': stats['total_condominios'],
+        'total_usuarios': stats['total_usuarios'],
+        'total_incidencias': stats['total_incidencias'],
+        'incidencias_abiertas': stats['incidencias_abiertas'],
+        'total_reuniones': stats['total_reuniones'],
+        'incidencias_por_estado': stats['incidencias_por_estado'],
+        'incidencias_por_prioridad': stats['incidencias_por_prioridad'],
+        'categorias_mas_comunes': stats['categorias_mas_comunes']
     }
 
-    # Incidencias por estado
-    for estado_code, estado_name in Incidencia.Estado.choices:
-        count = incidencias_query.filter(estado=estado_code).count()
-        stats['incidencias_por_estado'][estado_name] = count
-
-    # Incidencias por prioridad
-    for prioridad_code, prioridad_name in Incidencia.Prioridad.choices:
-        count = incidencias_query.filter(prioridad=prioridad_code).count()
-        stats['incidencias_por_prioridad'][prioridad_name] = count
-
-    # Categorías más comunes (top 5)
-    categorias = incidencias_query.values('tipo_incidencia__nombre_categoria_incidencia').annotate(
-        total=Count('id')
-    ).order_by('-total')[:5]
-
-    stats['categorias_mas_comunes'] = [
-        {'categoria': cat['tipo_incidencia__nombre_categoria_incidencia'], 'total': cat['total']}
-        for cat in categorias
-    ]
-
-    return stats
-
 
 def get_amonestaciones_recientes(dias=30, condominio_id=None):
     """
@@ -160,7 +135,7 @@ def get_amonestaciones_recientes(dias=30, condominio_id=None):
 
 def buscar_incidencias(termino_busqueda, condominio_id=None):
     """
-    Busca incidencias por título o descripción.
+    Busca incidencias por título o descripción, ordenadas por relevancia.
 
     Args:
         termino_busqueda: Término a buscar
@@ -169,15 +144,13 @@ def buscar_incidencias(termino_busqueda, condominio_id=None):
     Returns:
         dict con incidencias que coinciden con la búsqueda
     """
-    query = Incidencia.objects.filter(
-        Q(titulo__icontains=termino_busqueda) |
-        Q(descripcion__icontains=termino_busqueda)
-    )
+    query = Incidencia.objects.all()
 
     if condominio_id:
         query = query.filter(condominio_id=condominio_id)
 
-    incidencias = query.select_related('condominio', 'tipo_incidencia', 'usuario_reporta').order_by('-fecha_reporte')[:10]
+    query = buscar(query, termino_busqueda)
+    incidencias = query.select_related('condominio', 'tipo_incidencia', 'usuario_reporta').order_by(*ORDEN_RELEVANCIA)[:10]
 
     return {
         'total_encontradas': query.count(),
@@ -246,18 +219,18 @@ def analizar_tendencias_incidencias(dias=90, condominio_id=None):
 
 def buscar_condominio_por_nombre(nombre):
     """
-    Busca un condominio por nombre (búsqueda flexible).
+    Busca un condominio por nombre (búsqueda flexible, tolera errores de tipeo).
 
     Args:
         nombre: Nombre del condominio (puede ser parcial)
 
     Returns:
-        dict con condominios encontrados
+        dict con condominios encontrados, ordenados por similitud
     """
-    condominios = Condominio.objects.filter(nombre__icontains=nombre)
+    condominios = buscar_condominios(nombre)
 
     return {
-        'total_encontrados': condominios.count(),
+        'total_encontrados': len(condominios),
         'condominios': [
             {
                 'id': c.id,
@@ -265,9 +238,10 @@ def buscar_condominio_por_nombre(nombre):
                 'rut': c.rut,
                 'direccion': c.direccion,
                 'comuna': c.comuna.nombre if c.comuna else None,
-                'region': c.region.nombre if c.region else None
+                'region': c.region.nombre if c.region else None,
+                'similitud': round(c.similitud, 2)
             }
-            for c in condominios[:10]
+            for c in condominios
         ]
     }
 
@@ -282,21 +256,15 @@ def buscar_usuario_por_nombre(nombre=None, apellido=None, condominio_nombre=None
         condominio_nombre: Nombre del condominio (opcional)
 
     Returns:
-        dict con usuarios encontrados
+        dict con usuarios encontrados, ordenados por similitud
     """
-    query = Usuario.objects.all()
-
-    if nombre:
-        query = query.filter(nombres__icontains=nombre)
-    if apellido:
-        query = query.filter(apellido__icontains=apellido)
-    if condominio_nombre:
-        query = query.filter(condominio__nombre__icontains=condominio_nombre)
-
-    usuarios = query.select_related('condominio')
+    if nombre or apellido or condominio_nombre:
+        usuarios = buscar_usuarios(nombre, apellido, condominio_nombre)
+    else:
+        usuarios = list(Usuario.objects.select_related('condominio').order_by('apellido', 'nombres', 'id')[:10])
 
     return {
-        'total_encontrados': usuarios.count(),
+        'total_encontrados': len(usuarios),
         'usuarios': [
             {
                 'id': u.id,
@@ -307,7 +275,7 @@ def buscar_usuario_por_nombre(nombre=None, apellido=None, condominio_nombre=None
                 'condominio_id': u.condominio.id if u.condominio else None,
                 'condominio_nombre': u.condominio.nombre if u.condominio else None
             }
-            for u in usuarios[:10]
+            for u in usuarios
         ]
     }
 
@@ -320,16 +288,17 @@ def buscar_categoria_por_nombre(nombre):
         nombre: Nombre de la categoría (puede ser parcial)
 
     Returns:
-        dict con categorías encontradas
+        dict con categorías encontradas, ordenadas por similitud
     """
-    categorias = CategoriaIncidencia.objects.filter(nombre_categoria_incidencia__icontains=nombre)
+    categorias = buscar_categorias(nombre)
 
     return {
-        'total_encontradas': categorias.count(),
+        'total_encontradas': len(categorias),
         'categorias': [
             {
                 'id': c.id,
-                'nombre': c.nombre_categoria_incidencia
+                'nombre': c.nombre_categoria_incidencia,
+                'similitud': round(c.similitud, 2)
             }
             for c in categorias
         ]
@@ -548,49 +517,31 @@ def obtener_estadisticas_incidencias_por_condominio(condominio_id=None, condomin
                 'error': f'No se encontró el condominio con ID {condominio_id}'
             }
 
-        incidencias = Incidencia.objects.filter(condominio=condominio)
-
-        # Estadísticas por estado
-        estadisticas_estado = {}
-        for estado, nombre in Incidencia.Estado.choices:
-            count = incidencias.filter(estado=estado).count()
-            if count > 0:
-                estadisticas_estado[nombre] = count
+        # Una sola lectura de los contadores del condominio
+        detalle = obtener_detalle_incidencias(condominio.id)
+        por_estado = detalle['incidencias_por_estado']
 
-        # Estadísticas por prioridad
-        estadisticas_prioridad = {}
-        for prioridad, nombre in Incidencia.Prioridad.choices:
-            count = incidencias.filter(prioridad=prioridad).count()
-            if count > 0:
-                estadisticas_prioridad[nombre] = count
-
-        # Estadísticas por categoría (top 5)
-        categorias_count = incidencias.values('tipo_incidencia__nombre_categoria_incidencia').annotate(
-            total=Count('id')
-        ).order_by('-total')[:5]
+        def contar_estados(estados):
+            return sum(por_estado[Incidencia.Estado(estado).label] for estado in estados)
 
         return {
             'condominio_id': condominio.id,
             'condominio_nombre': condominio.nombre,
-            'total_incidencias': incidencias.count(),
-            'incidencias_abiertas': incidencias.filter(estado__in=['PENDIENTE', 'EN_PROCESO']).count(),
-            'incidencias_cerradas': incidencias.filter(estado__in=['RESUELTA', 'CERRADA']).count(),
-            'por_estado': estadisticas_estado,
-            'por_prioridad': estadisticas_prioridad,
-            'top_categorias': [
-                {
-                    'categoria': cat['tipo_incidencia__nombre_categoria_incidencia'],
-                    'total': cat['total']
-                }
-                for cat in categorias_count
-            ]
+            'total_incidencias': sum(por_estado.values()),
+            'incidencias_abiertas': contar_estados(ESTADOS_ABIERTOS),
+            'incidencias_cerradas': contar_estados(ESTADOS_FINALIZADOS),
+            'por_estado': {nombre: total for nombre, total in por_estado.items() if total > 0},
+            'por_prioridad': {
+                nombre: total for nombre, total in detalle['incidencias_por_prioridad'].items() if total > 0
+            },
+            'top_categorias': detalle['categorias_mas_comunes']
         }
 
     elif condominio_nombre:
         # Buscar por nombre
-        condominios = Condominio.objects.filter(nombre__icontains=condominio_nombre)
+        condominios = buscar_condominios(condominio_nombre)
 
-        if not condominios.exists():
+        if not condominios:
             # Listar condominios disponibles
             todos_condominios = Condominio.objects.all()[:10]
             lista_condominios = ', '.join([c.nombre for c in todos_condominios])
@@ -598,42 +549,45 @@ def obtener_estadisticas_incidencias_por_condominio(condominio_id=None, condomin
                 'error': f'No se encontró ningún condominio con nombre similar a "{condominio_nombre}". Condominios disponibles: {lista_condominios}'
             }
 
-        if condominios.count() > 1:
+        condominio = elegir_candidato(condominios, condominio_nombre, 'nombre')
+        if condominio is None:
             # Si hay múltiples coincidencias, mostrar opciones
             lista_opciones = ', '.join([f'{c.nombre} (ID: {c.id})' for c in condominios])
             return {
-                'error': f'Se encontraron {condominios.count()} condominios con nombre similar. Por favor, sé más específico. Opciones: {lista_opciones}'
+                'error': f'Se encontraron {len(condominios)} condominios con nombre similar. Por favor, sé más específico. Opciones: {lista_opciones}'
             }
 
         # Llamar recursivamente con el ID encontrado
-        return obtener_estadisticas_incidencias_por_condominio(condominio_id=condominios.first().id)
+        return obtener_estadisticas_incidencias_por_condominio(condominio_id=condominio.id)
 
     else:
-        # Estadísticas de todos los condominios
-        condominios = Condominio.objects.all().select_related('region', 'comuna')
-        resultado = {
-            'total_condominios': condominios.count(),
-            'condominios': []
-        }
-
-        for condominio in condominios:
-            incidencias = Incidencia.objects.filter(condominio=condominio)
-            total = incidencias.count()
-
-            if total > 0:  # Solo incluir condominios con incidencias
-                resultado['condominios'].append({
-                    'id': condominio.id,
-                    'nombre': condominio.nombre,
-                    'region': condominio.region.nombre if condominio.region else None,
-                    'total_incidencias': total,
-                    'abiertas': incidencias.filter(estado__in=['PENDIENTE', 'EN_PROCESO']).count(),
-                    'cerradas': incidencias.filter(estado__in=['RESUELTA', 'CERRADA']).count()
-                })
-
-        # Ordenar por total de incidencias (descendente)
-        resultado['condominios'].sort(key=lambda x: x['total_incidencias'], reverse=True)
+        # Estadísticas de todos los condominios: una lectura agrupada de los contadores
+        por_condominio = (
+            ContadorIncidencias.objects.order_by()
+            .values('condominio_id', 'condominio__nombre', 'condominio__region__nombre')
+            .annotate(
+                total_incidencias=sumar_contadores(),
+                abiertas=sumar_contadores(Q(estado__in=ESTADOS_ABIERTOS)),
+                cerradas=sumar_contadores(Q(estado__in=ESTADOS_FINALIZADOS)),
+            )
+            .filter(total_incidencias__gt=0)  # Solo incluir condominios con incidencias
+            .order_by('-total_incidencias')
+        )
 
-        return resultado
+        return {
+            'total_condominios': Condominio.objects.count(),
+            'condominios': [
+                {
+                    'id': fila['condominio_id'],
+                    'nombre': fila['condominio__nombre'],
+                    'region': fila['condominio__region__nombre'],
+                    'total_incidencias': fila['total_incidencias'],
+                    'abiertas': fila['abiertas'],
+                    'cerradas': fila['cerradas']
+                }
+                for fila in por_condominio
+            ]
+        }
 
 
 # ==================== HERRAMIENTAS DE ESCRITURA (CON CONFIRMACIÓN) ====================
@@ -762,8 +716,8 @@ def proponer_crear_incidencia(condominio_nombre, categoria_nombre, titulo, descr
     Busca el condominio y la categoría por nombre. El usuario reportante se obtiene automáticamente de la sesión.
 
     Args:
-        condominio_nombre: Nombre del condominio (búsqueda flexible, case-insensitive)
-        categoria_nombre: Nombre de la categoría de incidencia (búsqueda flexible, case-insensitive)
+        condominio_nombre: Nombre del condominio (búsqueda flexible, tolera errores de tipeo)
+        categoria_nombre: Nombre de la categoría de incidencia (búsqueda flexible, tolera errores de tipeo)
         titulo: Título de la incidencia
         descripcion: Descripción detallada
         prioridad: Prioridad (BAJA, MEDIA, ALTA, URGENTE). Default: MEDIA
@@ -784,9 +738,9 @@ def proponer_crear_incidencia(condominio_nombre, categoria_nombre, titulo, descr
         }
 
     # Buscar condominio por nombre (case-insensitive, búsqueda flexible)
-    condominios = Condominio.objects.filter(nombre__icontains=condominio_nombre)
+    condominios = buscar_condominios(condominio_nombre)
 
-    if not condominios.exists():
+    if not condominios:
         # Listar condominios disponibles
         todos_condominios = Condominio.objects.all()[:10]
         lista_condominios = ', '.join([c.nombre for c in todos_condominios])
@@ -796,21 +750,20 @@ def proponer_crear_incidencia(condominio_nombre, categoria_nombre, titulo, descr
             'error': f'No se encontró ningún condominio con nombre similar a "{condominio_nombre}". Condominios disponibles: {lista_condominios}'
         }
 
-    if condominios.count() > 1:
+    condominio = elegir_candidato(condominios, condominio_nombre, 'nombre')
+    if condominio is None:
         # Si hay múltiples coincidencias, mostrar opciones
         lista_opciones = ', '.join([c.nombre for c in condominios])
         return {
             'requiere_confirmacion': False,
             'exito': False,
-            'error': f'Se encontraron {condominios.count()} condominios con nombre similar a "{condominio_nombre}". Por favor, sé más específico. Opciones: {lista_opciones}'
+            'error': f'Se encontraron {len(condominios)} condominios con nombre similar a "{condominio_nombre}". Por favor, sé más específico. Opciones: {lista_opciones}'
         }
 
-    condominio = condominios.first()
-
     # Buscar categoría por nombre (case-insensitive, búsqueda flexible)
-    categorias = CategoriaIncidencia.objects.filter(nombre_categoria_incidencia__icontains=categoria_nombre)
+    categorias = buscar_categorias(categoria_nombre)
 
-    if not categorias.exists():
+    if not categorias:
         # Listar categorías disponibles
         todas_categorias = CategoriaIncidencia.objects.all()
         lista_categorias = ', '.join([c.nombre_categoria_incidencia for c in todas_categorias])
@@ -820,17 +773,16 @@ def proponer_crear_incidencia(condominio_nombre, categoria_nombre, titulo, descr
             'error': f'No se encontró ninguna categoría con nombre similar a "{categoria_nombre}". Categorías disponibles: {lista_categorias}'
         }
 
-    if categorias.count() > 1:
+    categoria = elegir_candidato(categorias, categoria_nombre, 'nombre_categoria_incidencia')
+    if categoria is None:
         # Si hay múltiples coincidencias, mostrar opciones
         lista_opciones = ', '.join([c.nombre_categoria_incidencia for c in categorias])
         return {
             'requiere_confirmacion': False,
             'exito': False,
-            'error': f'Se encontraron {categorias.count()} categorías con nombre similar. Por favor, sé más específico. Opciones: {lista_opciones}'
+            'error': f'Se encontraron {len(categorias)} categorías con nombre similar. Por favor, sé más específico. Opciones: {lista_opciones}'
         }
 
-    categoria = categorias.first()
-
     return {
         'requiere_confirmacion': True,
         'accion': 'crear_incidencia',
@@ -1315,7 +1267,7 @@ AVAILABLE_TOOLS = [
         "type": "function",
         "function": {
             "name": "buscar_condominio_por_nombre",
-            "description": "Busca condominios por nombre (búsqueda flexible, case-insensitive).",
+            "description": "Busca condominios por nombre (búsqueda flexible, tolera errores de tipeo).",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -1332,7 +1284,7 @@ AVAILABLE_TOOLS = [
         "type": "function",
         "function": {
             "name": "buscar_categoria_por_nombre",
-            "description": "Busca categorías de incidencias por nombre (búsqueda flexible, case-insensitive).",
+            "description": "Busca categorías de incidencias por nombre (búsqueda flexible, tolera errores de tipeo).",
             "parameters": {
                 "type": "object",
                 "properties": {
@@ -1631,3 +1583,9 @@ TOOL_FUNCTIONS = {
     "proponer_crear_categoria": proponer_crear_categoria,
     "proponer_crear_amonestacion": proponer_crear_amonestacion,
 }
+
+# Herramientas que solo consultan la base de datos y pueden ejecutarse en paralelo
+HERRAMIENTAS_SOLO_LECTURA = frozenset(
+    nombre for nombre in TOOL_FUNCTIONS
+    if not nombre.startswith('proponer_') and nombre != 'crear_bitacora_incidencia'
+)
@@ -0,0 +1,203 @@
+"""
+Almacenamiento direccionado por contenido de los archivos de evidencia.
+
+Cada archivo se guarda una sola vez, con el SHA-256 de su contenido como
+nombre:
+
+    evidencias/cas/ab/cd/abcd1234...<sha256>.jpg
+
+Si la misma foto se adjunta a varias incidencias, o se vuelve a subir al
+editar una evidencia, todas las filas apuntan al mismo archivo. El modelo
+ArchivoEvidencia lleva la cuenta de cuántas evidencias lo usan; los que
+quedan sin referencias se eliminan al confirmarse la transacción (ver
+limpieza_archivos.py).
+
+El hash se calcula mientras se recibe la subida (ver los manejadores de
+subida de este módulo, configurados en settings.FILE_UPLOAD_HANDLERS), así
+que guardar el archivo no requiere volver a leerlo.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+# Carpeta (dentro de MEDIA_ROOT) de los archivos direccionados por contenido
+PREFIJO_CONTENIDO = 'evidencias/cas/'
+
+# Tamaño de lectura al calcular el hash de un archivo ya guardado en disco
+_TAMANO_LECTURA = 1024 * 1024
+
+
+def ruta_contenido(sha256, extension):
+    """Nombre en el almacenamiento del archivo con el hash indicado."""
+    return f'{PREFIJO_CONTENIDO}{sha256[:2]}/{sha256[2:4]}/{sha256}{extension.lower()}'
+
+
+def es_ruta_contenido(nombre):
+    return bool(nombre) and nombre.startswith(PREFIJO_CONTENIDO)
+
+
+def _es_nombre_provisorio(nombre):
+    """Nombre que entrega evidencia_upload_path (evidencias/cas/<archivo>), aún sin hash."""
+    return es_ruta_contenido(nombre) and '/' not in nombre[len(PREFIJO_CONTENIDO):]
+
+
+def _es_derivado(nombre):
+    """Miniaturas y vistas previas (ver derivados.py): se sobrescriben en su lugar."""
+    return '/derivados/' in nombre
+
+
+def sha256_de_ruta(nombre):
+    """SHA-256 contenido en un nombre de ``ruta_contenido``, o None."""
+    if not es_ruta_contenido(nombre):
+        return None
+    return os.path.splitext(os.path.basename(nombre))[0]
+
+
+def almacenamiento_evidencias():
+    """Almacenamiento de los archivos de evidencia (settings.STORAGES['evidencias'])."""
+    return storages['evidencias']
+
+
+class ArchivoLocal(File):
+    """Archivo ya escrito en disco que el almacenamiento puede mover en lugar de copiar."""
+
+    def __init__(self, ruta, sha256=None):
+        super().__init__(open(ruta, 'rb'), name=ruta)
+        self.ruta = ruta
+        if sha256:
+            self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.ruta
+
+
+class AlmacenamientoEvidencias(FileSystemStorage):
+    """
+    FileSystemStorage que guarda por contenido los archivos bajo PREFIJO_CONTENIDO.
+
+    ``evidencia_upload_path`` entrega ``evidencias/cas/<nombre original>``; al
+    guardar, ese nombre provisorio se reemplaza por
+    ``ruta_contenido(sha256, extensión)``. Si el contenido ya existe no se
+    escribe de nuevo.
+
+    Los derivados (``.../derivados/``) conservan su nombre: el archivo se
+    reemplaza de forma atómica, así dos evidencias que comparten original
+    pueden generarlos a la vez sin crear copias. Los demás nombres se
+    guardan como en FileSystemStorage.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo depende del contenido y se reutiliza a propósito
+        if _es_nombre_provisorio(name) or _es_derivado(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if _es_derivado(name):
+            return self._reemplazar(name, content)
+        if not _es_nombre_provisorio(name):
+            return super()._save(name, content)
+
+        extension = os.path.splitext(name)[1]
+        sha256 = getattr(content, 'sha256', None)
+
+        if hasattr(content, 'temporary_file_path'):
+            origen = content.temporary_file_path()
+            if sha256 is None:
+                sha256 = _sha256_archivo(origen)
+            return self._colocar(origen, ruta_contenido(sha256, extension))
+
+        # Contenido en memoria o en un flujo: se escribe a un temporal calculando el hash
+        directorio = self.path(PREFIJO_CONTENIDO)
+        os.makedirs(directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        try:
+            calculo = hashlib.sha256()
+            with os.fdopen(descriptor, 'wb') as destino:
+                for bloque in content.chunks():
+                    calculo.update(bloque)
+                    destino.write(bloque)
+            return self._colocar(temporal, ruta_contenido(sha256 or calculo.hexdigest(), extension))
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _reemplazar(self, nombre, content):
+        """Escribe ``content`` en un temporal y lo renombra a ``nombre``."""
+        destino = self.path(nombre)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                for bloque in content.chunks():
+                    archivo.write(bloque)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporal, self.file_permissions_mode)
+            os.replace(temporal, destino)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        return nombre
+
+    def _colocar(self, origen, nombre):
+        """Mueve ``origen`` a ``nombre`` salvo que ese contenido ya exista."""
+        destino = self.path(nombre)
+        if os.path.exists(destino):
+            try:
+                # Renovar la fecha: la recolección no borra archivos usados recientemente
+                os.utime(destino)
+                return nombre
+            except FileNotFoundError:
+                # La limpieza lo retiró entretanto (ver limpieza_archivos.eliminar_ruta)
+                pass
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Si otra subida lo guardó al mismo tiempo el contenido es idéntico
+        file_move_safe(origen, destino, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(destino, self.file_permissions_mode)
+        return nombre
+
+
+def _sha256_archivo(ruta):
+    calculo = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        while bloque := archivo.read(_TAMANO_LECTURA):
+            calculo.update(bloque)
+    return calculo.hexdigest()
+
+
+class _CalculoHashMixin:
+    """Calcula el SHA-256 de cada archivo mientras se recibe y lo deja en ``archivo.sha256``."""
+
+    def new_file(self, *args, **kwargs):
+        # Antes de super(): el manejador en memoria termina con StopFutureHandlers
+        self._calculo_sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # El manejador en memoria solo procesa los archivos pequeños
+        if getattr(self, 'activated', True):
+            self._calculo_sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        if archivo is not None:
+            archivo.sha256 = self._calculo_sha256.hexdigest()
+        return archivo
+
+
+class MemoriaConHashUploadHandler(_CalculoHashMixin, MemoryFileUploadHandler):
+    pass
+
+
+class TemporalConHashUploadHandler(_CalculoHashMixin, TemporaryFileUploadHandler):
+    pass
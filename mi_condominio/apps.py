@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MiCondominioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mi_condominio'
+
+    def ready(self):
+        # Registrar las señales de la aplicación
+        from . import signals  # noqa: F401
@@ -0,0 +1,135 @@
+"""
+Búsqueda de texto completo sobre incidencias, bitácoras y amonestaciones.
+
+Cada modelo buscable tiene una columna generada ``vector_busqueda``
+(``tsvector`` con configuración ``spanish``) indexada con GIN. Este módulo
+es la única puerta de entrada para las búsquedas: arma la consulta a partir
+del texto ingresado, filtra usando el índice y ordena por relevancia.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import BooleanField, F, FloatField, Func, Value
+from django.db.models.functions import Cast
+
+from .paginacion import TAMANO_PAGINA, paginar_por_cursor
+
+
+# Configuración de idioma usada por los vectores de búsqueda
+CONFIGURACION = 'spanish'
+
+# Orden de los resultados de una búsqueda: más relevantes primero
+ORDEN_RELEVANCIA = ('-rango', '-id')
+
+# Largo mínimo del texto para buscar por subcadena: con menos caracteres
+# pg_trgm no genera trigramas y el índice no sirve
+LARGO_MINIMO_CONTIENE = 3
+
+# Caracteres con significado especial en la sintaxis de tsquery
+_CARACTERES_TSQUERY = re.compile(r"[&|!():*<>'\\]")
+
+
+class _Contiene(Func):
+    """
+    ``campo ILIKE '%texto%'``.
+
+    Se usa en lugar de ``icontains`` porque Django lo traduce a
+    ``UPPER(campo) LIKE UPPER(...)``, que no aprovecha el índice
+    ``gin_trgm_ops`` de la columna; ``ILIKE`` sí.
+    """
+
+    arg_joiner = ' ILIKE '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def __init__(self, campo, texto):
+        patron = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        super().__init__(F(campo), Value(f'%{patron}%'))
+
+
+def construir_consulta(texto):
+    """
+    Convierte el texto ingresado por el usuario en un SearchQuery.
+
+    Todas las palabras deben aparecer y la última coincide por prefijo,
+    de modo que "ascen" encuentra "ascensor".
+
+    Returns:
+        SearchQuery, o None si el texto no contiene palabras
+    """
+    palabras = _CARACTERES_TSQUERY.sub(' ', texto or '').split()
+    if not palabras:
+        return None
+
+    terminos = [f"'{palabra}'" for palabra in palabras]
+    terminos[-1] += ':*'
+    return SearchQuery(' & '.join(terminos), search_type='raw', config=CONFIGURACION)
+
+
+def buscar(queryset, texto, campos_contiene=()):
+    """
+    Filtra un queryset por texto completo y anota la relevancia en ``rango``.
+
+    El rango se convierte a doble precisión para que el cursor de la
+    paginación lo pueda comparar sin pérdida.
+
+    Los ``campos_contiene`` no se mezclan con un OR en el filtro del vector
+    (eso obliga a recorrer la tabla completa): cada uno se resuelve en una
+    consulta aparte que usa su índice de trigramas, y las claves primarias
+    se combinan con UNION junto con las que coinciden por texto completo.
+
+    Args:
+        queryset: QuerySet de un modelo con campo ``vector_busqueda``
+        texto: texto ingresado por el usuario
+        campos_contiene: campos fuera del vector (por ejemplo, de modelos
+            relacionados o un RUT) con índice ``gin_trgm_ops`` que también
+            coinciden si contienen el texto; esas filas quedan con rango 0,
+            después de las demás
+
+    Returns:
+        QuerySet filtrado y anotado (vacío si el texto no tiene palabras)
+    """
+    consulta = construir_consulta(texto)
+    if consulta is None:
+        return queryset.none()
+
+    texto = texto.strip()
+    if campos_contiene and len(texto) >= LARGO_MINIMO_CONTIENE:
+        manager = queryset.model._default_manager
+        claves = manager.filter(vector_busqueda=consulta).order_by().values('pk')
+        claves = claves.union(*(
+            manager.filter(_Contiene(campo, texto)).order_by().values('pk')
+            for campo in campos_contiene
+        ))
+        queryset = queryset.filter(pk__in=claves)
+    else:
+        queryset = queryset.filter(vector_busqueda=consulta)
+
+    return (
+        queryset
+        .annotate(rango=Cast(SearchRank(F('vector_busqueda'), consulta), FloatField()))
+        .defer('vector_busqueda')
+    )
+
+
+def paginar_busqueda(request, queryset, texto, orden, tamano_pagina=TAMANO_PAGINA, campos_contiene=()):
+    """
+    Pagina un listado con búsqueda opcional.
+
+    Si hay texto, los resultados se ordenan por relevancia; si no, se usa
+    el orden normal del listado.
+
+    Args:
+        request: HttpRequest actual
+        queryset: QuerySet ya filtrado por los demás filtros del listado
+        texto: texto de búsqueda (puede ser vacío)
+        orden: orden del listado cuando no hay búsqueda
+        campos_contiene: ver ``buscar``
+
+    Returns:
+        PaginaCursor
+    """
+    if texto:
+        return paginar_por_cursor(request, buscar(queryset, texto, campos_contiene), ORDEN_RELEVANCIA, tamano_pagina)
+    return paginar_por_cursor(request, queryset, orden, tamano_pagina)
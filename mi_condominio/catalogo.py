@@ -0,0 +1,126 @@
+"""
+Catálogo de regiones y comunas de Chile.
+
+Las regiones y sus ~346 comunas casi nunca cambian, así que se arman una
+sola vez en un JSON compacto que se guarda en la memoria del proceso:
+
+    {"version": "3fa1c2d4e5f6",
+     "regiones": [[id, nombre], ...],
+     "comunas": {"<id región>": [[id, nombre], ...]}}
+
+- La vista ``catalogo_regiones_comunas`` lo entrega con ETag (y comprimido
+  si el navegador acepta gzip). Con la versión vigente en la URL (ver
+  ``url_catalogo``) el navegador lo guarda un año sin volver a consultar.
+- region_comuna_cascade.js lo descarga una vez y arma la lista de comunas
+  desde memoria al cambiar la región.
+- CondominioForm toma de aquí las opciones de sus selects, así que mostrar
+  el formulario no consulta regiones ni comunas.
+
+``invalidar_catalogo`` lo descarta: lo llaman las señales de Region y
+Comuna y el comando cargar_regiones_comunas. Como el perfil en
+middleware.py, la invalidación cambia una versión en el caché de Django;
+además cada proceso reconstruye su copia pasados CATALOGO_TTL segundos, lo
+que acota el desfase cuando el caché es local a cada proceso.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import Comuna, Region
+
+
+# Segundos máximos que un proceso usa su copia sin reconstruirla
+CATALOGO_TTL = 300
+
+_CLAVE_INVALIDACION = 'catalogo_regiones_comunas:invalidacion'
+
+_bloqueo = threading.Lock()
+_catalogo = None
+
+
+class Catalogo:
+    """Regiones y comunas ya armadas, con su JSON listo para enviar."""
+
+    def __init__(self, regiones, comunas, invalidacion):
+        # Listas de (id, nombre); las comunas por id de región, ordenadas por nombre
+        self.regiones = regiones
+        self.comunas = comunas
+
+        cuerpo = {'regiones': regiones, 'comunas': {str(region_id): lista for region_id, lista in comunas.items()}}
+        compacto = json.dumps(cuerpo, ensure_ascii=False, separators=(',', ':'))
+        self.version = hashlib.sha256(compacto.encode()).hexdigest()[:12]
+        self.contenido = json.dumps(
+            {'version': self.version, **cuerpo}, ensure_ascii=False, separators=(',', ':')
+        ).encode()
+        self.comprimido = gzip.compress(self.contenido, mtime=0)
+
+        self.invalidacion = invalidacion
+        self.cargado = time.monotonic()
+
+    def comunas_de(self, region_id):
+        """Comunas (id, nombre) de la región, o una lista vacía."""
+        try:
+            return self.comunas.get(int(region_id), [])
+        except (TypeError, ValueError):
+            return []
+
+
+def _invalidacion():
+    """Marca de la última invalidación, inicializándola si no existe en el caché."""
+    cache.add(_CLAVE_INVALIDACION, time.time_ns(), timeout=None)
+    return cache.get(_CLAVE_INVALIDACION)
+
+
+def _vigente(catalogo, invalidacion):
+    return (
+        catalogo is not None
+        and catalogo.invalidacion == invalidacion
+        and time.monotonic() - catalogo.cargado < CATALOGO_TTL
+    )
+
+
+def obtener_catalogo():
+    """Catálogo vigente; lo arma (dos consultas) si no está en memoria o fue invalidado."""
+    global _catalogo
+
+    invalidacion = _invalidacion()
+    catalogo = _catalogo
+    if _vigente(catalogo, invalidacion):
+        return catalogo
+
+    with _bloqueo:
+        # Otro hilo pudo haberlo armado mientras se esperaba el bloqueo
+        if not _vigente(_catalogo, invalidacion):
+            _catalogo = _construir(invalidacion)
+        return _catalogo
+
+
+def _construir(invalidacion):
+    regiones = [list(fila) for fila in Region.objects.order_by('codigo').values_list('id', 'nombre')]
+    comunas = defaultdict(list)
+    for comuna_id, region_id, nombre in Comuna.objects.order_by('nombre').values_list('id', 'region_id', 'nombre'):
+        comunas[region_id].append([comuna_id, nombre])
+    return Catalogo(regiones, dict(comunas), invalidacion)
+
+
+def invalidar_catalogo():
+    """Descarta el catálogo en este proceso y en los que comparten el caché."""
+    global _catalogo
+
+    _catalogo = None
+    try:
+        cache.incr(_CLAVE_INVALIDACION)
+    except ValueError:
+        cache.set(_CLAVE_INVALIDACION, time.time_ns(), timeout=None)
+
+
+def url_catalogo():
+    """URL del catálogo con su versión, para que el navegador lo guarde en caché."""
+    return f"{reverse('catalogo_regiones_comunas')}?v={obtener_catalogo().version}"
@@ -0,0 +1,223 @@
+"""
+Miniaturas y vistas previas de las evidencias.
+
+Por cada EvidenciaIncidencia de imagen o video se generan dos archivos WebP:
+
+- ``miniatura``: hasta 160x160, para la lista de evidencias.
+- ``vista_previa``: hasta 800x800, para ver la evidencia sin descargar el
+  original.
+
+En los videos ambas se obtienen de un fotograma (póster) extraído con
+ffmpeg. Se guardan junto al original, en una carpeta ``derivados/``:
+
+    evidencias/cas/3f/a1/3fa1...c9.jpg
+    evidencias/cas/3f/a1/derivados/3fa1...c9_miniatura.webp
+
+La generación no bloquea la subida: ``programar_derivados`` la encola en un
+pool de hilos cuando la transacción que guardó la evidencia se confirma.
+Para las evidencias existentes está el comando ``generar_derivados_evidencias``.
+
+Requiere Pillow (``pip install pillow``) y, para los videos, el ejecutable
+ffmpeg. Si no están disponibles las evidencias se muestran como antes.
+"""
+
+import io
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from .models import EvidenciaIncidencia
+
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo (ancho, alto) de cada derivado
+TAMANOS = {
+    'vista_previa': (800, 800),
+    'miniatura': (160, 160),
+}
+
+CALIDAD_WEBP = 80
+
+# Segundo del video del que se extrae el póster (si dura menos, el primer fotograma)
+SEGUNDO_POSTER = 1
+
+
+def _pillow():
+    """Módulo Image de Pillow, o None si no está instalado."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def _ffmpeg():
+    """Ruta del ejecutable ffmpeg, o None si no está disponible."""
+    return shutil.which(getattr(settings, 'EVIDENCIAS_FFMPEG', 'ffmpeg'))
+
+
+def pillow_disponible():
+    return _pillow() is not None
+
+
+def ffmpeg_disponible():
+    return _ffmpeg() is not None
+
+
+@lru_cache(maxsize=None)
+def _pool_derivados():
+    """Pool de hilos compartido para generar derivados."""
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, 'EVIDENCIAS_DERIVADOS_HILOS', 2),
+        thread_name_prefix='evidencia-derivados'
+    )
+
+
+def admite_derivados(evidencia):
+    """Indica si se pueden generar derivados para la evidencia en este servidor."""
+    if not evidencia.archivo_evidencia or not pillow_disponible():
+        return False
+    if evidencia.es_video:
+        return ffmpeg_disponible()
+    # Pillow no abre SVG
+    return evidencia.es_imagen and evidencia.extension != '.svg'
+
+
+def ruta_derivado(nombre_original, variante):
+    """Ruta (en el almacenamiento) del derivado ``variante`` de un archivo."""
+    carpeta, archivo = os.path.split(nombre_original)
+    base = os.path.splitext(archivo)[0]
+    return os.path.join(carpeta, 'derivados', f'{base}_{variante}.webp')
+
+
+def programar_derivados(evidencia):
+    """
+    Encola la generación de derivados de la evidencia.
+
+    Se ejecuta al confirmarse la transacción actual, para que el hilo lea la
+    evidencia ya guardada; si la transacción se revierte no se hace nada.
+    """
+    if not admite_derivados(evidencia):
+        return
+    evidencia_id = evidencia.pk
+    transaction.on_commit(lambda: _pool_derivados().submit(_generar_en_segundo_plano, evidencia_id))
+
+
+def _generar_en_segundo_plano(evidencia_id):
+    try:
+        evidencia = EvidenciaIncidencia.objects.filter(pk=evidencia_id).first()
+        if evidencia is not None:
+            generar_derivados(evidencia)
+    except Exception:
+        logger.exception('No se pudieron generar los derivados de la evidencia %s', evidencia_id)
+    finally:
+        # Los hilos del pool son de larga duración: no dejar conexiones abiertas
+        connection.close()
+
+
+def _abrir_imagen(evidencia):
+    """Imagen de Pillow del original (o del póster si es un video), o None."""
+    Image = _pillow()
+    campo = evidencia.archivo_evidencia
+
+    if evidencia.es_video:
+        try:
+            ruta = campo.path
+        except NotImplementedError:
+            return None  # ffmpeg necesita un archivo local
+        datos = _extraer_poster(ruta)
+        return Image.open(io.BytesIO(datos)) if datos else None
+
+    with campo.storage.open(campo.name, 'rb') as archivo:
+        imagen = Image.open(archivo)
+        # En JPEG, decodificar directamente a una escala reducida (mucho más rápido)
+        imagen.draft('RGB', TAMANOS['vista_previa'])
+        imagen.load()
+    return imagen
+
+
+def _extraer_poster(ruta):
+    """Fotograma del video en PNG (bytes), o None si ffmpeg falla."""
+    for segundo in (SEGUNDO_POSTER, 0):
+        resultado = subprocess.run(
+            [
+                _ffmpeg(), '-v', 'error', '-ss', str(segundo), '-i', ruta,
+                '-frames:v', '1', '-vf', f'scale={TAMANOS["vista_previa"][0]}:-2',
+                '-f', 'image2pipe', '-vcodec', 'png', '-',
+            ],
+            capture_output=True,
+            timeout=60,
+        )
+        if resultado.returncode == 0 and resultado.stdout:
+            return resultado.stdout
+    return None
+
+
+def _codificar_webp(imagen):
+    buffer = io.BytesIO()
+    imagen.save(buffer, 'WEBP', quality=CALIDAD_WEBP, method=4)
+    return buffer.getvalue()
+
+
+def generar_derivados(evidencia, regenerar=False):
+    """
+    Genera y guarda la miniatura y la vista previa de la evidencia.
+
+    Se ejecuta en el hilo que lo llama (el pool o el comando de respaldo).
+    Los derivados pertenecen al archivo original, que puede ser compartido
+    por varias evidencias: si ya existen se reutilizan, salvo con
+    ``regenerar=True``. Se eliminan junto con el original (ver
+    limpieza_archivos.py).
+
+    Returns:
+        True si la evidencia quedó con derivados
+    """
+    if not admite_derivados(evidencia):
+        return False
+
+    nombre_original = evidencia.archivo_evidencia.name
+    storage = evidencia.archivo_evidencia.storage
+    nombres = {variante: ruta_derivado(nombre_original, variante) for variante in TAMANOS}
+
+    if regenerar or not all(storage.exists(nombre) for nombre in nombres.values()):
+        if not _crear_derivados(evidencia, nombres):
+            return False
+
+    # Solo si el original no cambió mientras se generaban; update() no emite señales
+    actualizadas = EvidenciaIncidencia.objects.filter(
+        pk=evidencia.pk, archivo_evidencia=nombre_original
+    ).update(**nombres)
+
+    if actualizadas:
+        for variante, nombre in nombres.items():
+            setattr(evidencia, variante, nombre)
+    return bool(actualizadas)
+
+
+def _crear_derivados(evidencia, nombres):
+    """Escribe los derivados en las rutas de ``nombres``; retorna False si no se pudo leer el original."""
+    from PIL import ImageOps
+
+    imagen = _abrir_imagen(evidencia)
+    if imagen is None:
+        return False
+
+    storage = evidencia.archivo_evidencia.storage
+    with imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() or 'transparency' in imagen.info else 'RGB')
+
+        # De mayor a menor: cada derivado se reduce desde el anterior
+        for variante, tamano in TAMANOS.items():
+            imagen.thumbnail(tamano)
+            # El almacenamiento de evidencias reemplaza el derivado si ya existe
+            storage.save(nombres[variante], ContentFile(_codificar_webp(imagen)))
+    return True
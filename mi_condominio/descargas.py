@@ -0,0 +1,247 @@
+"""
+Descarga de los archivos de evidencia.
+
+Los archivos de evidencia no se publican en MEDIA_URL: se entregan con la
+vista ``evidencia_descargar``, que exige sesión iniciada. ``respuesta_archivo``
+arma la respuesta:
+
+- Peticiones condicionales: ETag y Last-Modified, con 304 Not Modified si el
+  navegador ya tiene el archivo.
+- Peticiones parciales (Range, un solo rango): 206 Partial Content, para que
+  al adelantar un video no se descargue el archivo completo.
+- El archivo se entrega con FileResponse, que los servidores WSGI como
+  gunicorn envían con os.sendfile. Si settings.EVIDENCIAS_X_ACCEL_REDIRECT
+  está definido, el envío se delega a nginx (X-Accel-Redirect), que también
+  atiende los rangos.
+
+Los archivos los suben los usuarios: solo se muestran en el navegador los
+tipos de TIPOS_EN_LINEA (imágenes rasterizadas, audio, video y PDF); el
+resto, incluido SVG y HTML, se entrega como adjunto. Todas las respuestas
+llevan ``Content-Security-Policy: sandbox``, para que un archivo con código
+no se ejecute con la sesión del usuario.
+
+Las URLs de descarga llevan la versión del archivo (``?v=``, ver
+``version_archivo``): cambia cuando cambia el contenido, así que con la
+versión vigente el navegador puede guardar la respuesta en caché sin volver
+a consultar.
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .almacenamiento import sha256_de_ruta
+
+
+# Encabezado Range con un solo rango: "bytes=inicio-fin", "bytes=inicio-" o "bytes=-sufijo"
+_RANGO = re.compile(r'bytes=(\d*)-(\d*)')
+
+# Caché del navegador cuando la URL lleva la versión vigente (un año)
+CACHE_VERSIONADA_SEGUNDOS = 365 * 24 * 60 * 60
+
+
+# Tipos que se pueden mostrar en el navegador (además de audio/* y video/*).
+# SVG queda fuera: puede contener scripts.
+TIPOS_EN_LINEA = frozenset({
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp', 'image/avif',
+    'application/pdf',
+})
+
+
+class RangoNoSatisfacible(Exception):
+    """El rango pedido está fuera del archivo (416)."""
+
+
+def version_archivo(nombre, storage=None):
+    """
+    Versión corta de un archivo para las URLs de descarga.
+
+    Los originales nunca cambian de contenido sin cambiar de nombre, así que
+    basta con el nombre. Los derivados se regeneran en su lugar
+    (generar_derivados_evidencias --regenerar): su versión incluye además
+    el tamaño y la fecha de modificación.
+    """
+    base = nombre
+    if '/derivados/' in nombre and storage is not None:
+        try:
+            estado = os.stat(storage.path(nombre))
+            base = f'{nombre}:{estado.st_size}:{estado.st_mtime_ns}'
+        except (NotImplementedError, OSError):
+            pass
+    return hashlib.sha256(base.encode()).hexdigest()[:12]
+
+
+def etag_archivo(nombre, estado):
+    """
+    ETag fuerte del archivo.
+
+    Los originales guardados por contenido usan su SHA-256: el
+    almacenamiento renueva la fecha de modificación al reutilizarlos. El
+    resto (derivados y archivos antiguos), el tamaño y la fecha.
+    """
+    if '/derivados/' not in nombre and (sha256 := sha256_de_ruta(nombre)):
+        return f'"{sha256}"'
+    return f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+
+
+def parsear_rango(encabezado, tamano):
+    """
+    Interpreta el encabezado Range.
+
+    Returns:
+        (inicio, fin) inclusivos, o None si se debe entregar el archivo
+        completo (sin Range, con varios rangos o con otra unidad)
+
+    Raises:
+        RangoNoSatisfacible: si el rango no tiene bytes dentro del archivo
+    """
+    coincidencia = _RANGO.fullmatch((encabezado or '').replace(' ', ''))
+    if not coincidencia:
+        return None
+
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+
+    if not inicio:
+        # Sufijo: los últimos N bytes
+        largo = int(fin)
+        if largo == 0 or tamano == 0:
+            raise RangoNoSatisfacible()
+        return max(tamano - largo, 0), tamano - 1
+
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        raise RangoNoSatisfacible()
+    return inicio, fin
+
+
+def _rango_aplicable(request, etag, modificado):
+    """
+    If-Range: el rango solo vale si el archivo sigue siendo el que el
+    navegador descargó en parte; si no, se entrega completo.
+    """
+    condicion = request.headers.get('If-Range')
+    if not condicion:
+        return True
+    if condicion.startswith('"') or condicion.startswith('W/'):
+        return condicion == etag
+    fecha = parse_http_date_safe(condicion)
+    return fecha is not None and int(modificado) == fecha
+
+
+class _TramoArchivo:
+    """
+    Lectura limitada a ``largo`` bytes de un archivo ya posicionado.
+
+    Expone ``fileno`` para que el servidor WSGI pueda usar os.sendfile desde
+    la posición actual (acota el envío con Content-Length).
+    """
+
+    def __init__(self, archivo, largo):
+        self.archivo = archivo
+        self.restante = largo
+
+    def read(self, tamano=-1):
+        if self.restante <= 0:
+            return b''
+        if tamano is None or tamano < 0 or tamano > self.restante:
+            tamano = self.restante
+        datos = self.archivo.read(tamano)
+        self.restante -= len(datos)
+        return datos
+
+    def fileno(self):
+        return self.archivo.fileno()
+
+    def close(self):
+        self.archivo.close()
+
+
+def respuesta_archivo(request, storage, nombre, nombre_descarga, adjunto=False, versionada=False):
+    """
+    Respuesta HTTP con el archivo ``nombre`` del almacenamiento.
+
+    Args:
+        storage: almacenamiento del archivo (debe ser local)
+        nombre: nombre del archivo en el almacenamiento
+        nombre_descarga: nombre que ve el usuario (Content-Disposition)
+        adjunto: True para forzar la descarga en lugar de mostrarlo (los
+            tipos fuera de TIPOS_EN_LINEA siempre se descargan)
+        versionada: True si la URL pedida lleva la versión vigente del
+            archivo; la respuesta se puede guardar en caché sin revalidar
+
+    Raises:
+        FileNotFoundError: si el archivo no existe
+    """
+    ruta = storage.path(nombre)
+    estado = os.stat(ruta)
+    etag = etag_archivo(nombre, estado)
+    modificado = estado.st_mtime
+
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=int(modificado))
+    if no_modificado is not None:
+        # 304 o 412; los encabezados de caché deben acompañar también al 304
+        no_modificado['Content-Security-Policy'] = 'sandbox'
+        return _encabezados_cache(no_modificado, etag, modificado, versionada)
+
+    tamano = estado.st_size
+    rango = None
+    if request.headers.get('Range') and _rango_aplicable(request, etag, modificado):
+        try:
+            rango = parsear_rango(request.headers['Range'], tamano)
+        except RangoNoSatisfacible:
+            respuesta = HttpResponse(status=416)
+            respuesta['Content-Range'] = f'bytes */{tamano}'
+            return respuesta
+
+    aceleracion = getattr(settings, 'EVIDENCIAS_X_ACCEL_REDIRECT', '')
+    if aceleracion:
+        # nginx lee el archivo de una location "internal" y resuelve el Range
+        respuesta = HttpResponse(content_type=_tipo_contenido(nombre_descarga))
+        respuesta['X-Accel-Redirect'] = quote(aceleracion.rstrip('/') + '/' + nombre)
+    else:
+        archivo = open(ruta, 'rb')
+        if rango:
+            inicio, fin = rango
+            archivo.seek(inicio)
+            respuesta = FileResponse(
+                _TramoArchivo(archivo, fin - inicio + 1), status=206,
+                content_type=_tipo_contenido(nombre_descarga)
+            )
+            respuesta['Content-Length'] = fin - inicio + 1
+            respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        else:
+            respuesta = FileResponse(archivo, content_type=_tipo_contenido(nombre_descarga))
+        respuesta['Accept-Ranges'] = 'bytes'
+
+    tipo = _tipo_contenido(nombre_descarga)
+    en_linea = tipo in TIPOS_EN_LINEA or tipo.startswith(('audio/', 'video/'))
+    respuesta['Content-Disposition'] = content_disposition_header(adjunto or not en_linea, nombre_descarga)
+    respuesta['X-Content-Type-Options'] = 'nosniff'
+    respuesta['Content-Security-Policy'] = 'sandbox'
+    return _encabezados_cache(respuesta, etag, modificado, versionada)
+
+
+def _encabezados_cache(respuesta, etag, modificado, versionada):
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(modificado)
+    if versionada:
+        patch_cache_control(respuesta, private=True, max_age=CACHE_VERSIONADA_SEGUNDOS, immutable=True)
+    else:
+        # Se puede guardar, pero se revalida con ETag en cada uso
+        patch_cache_control(respuesta, private=True, no_cache=True)
+    return respuesta
+
+
+def _tipo_contenido(nombre):
+    tipo, _ = mimetypes.guess_type(nombre)
+    return tipo or 'application/octet-stream'
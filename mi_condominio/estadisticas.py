@@ -0,0 +1,152 @@
+"""
+Servicio de estadísticas del sistema.
+
+Calcula las métricas del dashboard y del asistente de IA con agregación
+condicional (``Count(filter=Q(...))``), de modo que todos los conteos se
+resuelven en una o dos consultas en lugar de un COUNT por métrica. Las
+distribuciones de incidencias se leen de la tabla ContadorIncidencias.
+"""
+
+from datetime import date
+
+from django.db.models import CharField, Count, Q, Sum, Value
+
+from .models import Condominio, Usuario, Incidencia, Reunion, ContadorIncidencias
+
+
+# Estados que se consideran "cerrados" para el conteo de incidencias abiertas
+ESTADOS_CERRADOS = [Incidencia.Estado.CERRADA, Incidencia.Estado.CANCELADA]
+
+
+def sumar_contadores(filtro=None):
+    """Suma de ContadorIncidencias.total, opcionalmente condicionada a ``filtro``."""
+    return Sum('total', filter=filtro, default=0)
+
+
+def _conteo(queryset, metrica, filtro_parcial=None):
+    """
+    Arma una consulta que retorna una sola fila (metrica, total, parcial).
+
+    ``parcial`` es el conteo de las filas que cumplen ``filtro_parcial``
+    (o el total si no se indica). Todas las consultas tienen las mismas
+    columnas para poder unirlas con UNION ALL.
+    """
+    parcial = Count('id', filter=filtro_parcial) if filtro_parcial is not None else Count('id')
+    return (
+        queryset.order_by()
+        .annotate(metrica=Value(metrica, output_field=CharField()))
+        .values('metrica')
+        .annotate(total=Count('id'), parcial=parcial)
+        .values_list('metrica', 'total', 'parcial')
+    )
+
+
+def obtener_resumen(condominio_id=None):
+    """
+    Obtiene los conteos generales del sistema en una sola consulta.
+
+    Args:
+        condominio_id: ID opcional del condominio para filtrar
+
+    Returns:
+        dict con total_condominios, total_usuarios, usuarios_activos,
+        total_incidencias, incidencias_abiertas, total_reuniones y
+        reuniones_proximas
+    """
+    condominios = Condominio.objects.all()
+    usuarios = Usuario.objects.all()
+    incidencias = Incidencia.objects.all()
+    reuniones = Reunion.objects.all()
+
+    if condominio_id:
+        condominios = condominios.filter(id=condominio_id)
+        usuarios = usuarios.filter(condominio_id=condominio_id)
+        incidencias = incidencias.filter(condominio_id=condominio_id)
+        reuniones = reuniones.filter(condominio_id=condominio_id)
+
+    consulta = _conteo(condominios, 'condominios').union(
+        _conteo(usuarios, 'usuarios', Q(estado_cuenta='ACTIVO')),
+        _conteo(incidencias, 'incidencias', ~Q(estado__in=ESTADOS_CERRADOS)),
+        _conteo(reuniones, 'reuniones', Q(fecha_reunion__gte=date.today())),
+        all=True,
+    )
+    conteos = {metrica: (total, parcial) for metrica, total, parcial in consulta}
+
+    return {
+        'total_condominios': conteos['condominios'][0],
+        'total_usuarios': conteos['usuarios'][0],
+        'usuarios_activos': conteos['usuarios'][1],
+        'total_incidencias': conteos['incidencias'][0],
+        'incidencias_abiertas': conteos['incidencias'][1],
+        'total_reuniones': conteos['reuniones'][0],
+        'reuniones_proximas': conteos['reuniones'][1],
+    }
+
+
+def obtener_detalle_incidencias(condominio_id=None, limite_categorias=5):
+    """
+    Obtiene la distribución de incidencias por estado, prioridad y categoría.
+
+    Se ejecuta una única consulta sobre ContadorIncidencias agrupada por
+    categoría, con una suma condicional por cada estado y prioridad; los
+    totales generales se suman en Python a partir de esas filas.
+
+    Args:
+        condominio_id: ID opcional del condominio para filtrar
+        limite_categorias: número de categorías más comunes a retornar
+
+    Returns:
+        dict con incidencias_por_estado, incidencias_por_prioridad y
+        categorias_mas_comunes
+    """
+    contadores = ContadorIncidencias.objects.filter(total__gt=0)
+    if condominio_id:
+        contadores = contadores.filter(condominio_id=condominio_id)
+
+    agregados = {'suma_total': sumar_contadores()}
+    for codigo, _ in Incidencia.Estado.choices:
+        agregados[f'estado_{codigo}'] = sumar_contadores(Q(estado=codigo))
+    for codigo, _ in Incidencia.Prioridad.choices:
+        agregados[f'prioridad_{codigo}'] = sumar_contadores(Q(prioridad=codigo))
+
+    filas = list(
+        contadores.order_by()
+        .values('tipo_incidencia__nombre_categoria_incidencia')
+        .annotate(**agregados)
+    )
+
+    por_estado = {
+        nombre: sum(fila[f'estado_{codigo}'] for fila in filas)
+        for codigo, nombre in Incidencia.Estado.choices
+    }
+    por_prioridad = {
+        nombre: sum(fila[f'prioridad_{codigo}'] for fila in filas)
+        for codigo, nombre in Incidencia.Prioridad.choices
+    }
+
+    filas.sort(key=lambda fila: fila['suma_total'], reverse=True)
+    categorias = [
+        {'categoria': fila['tipo_incidencia__nombre_categoria_incidencia'], 'total': fila['suma_total']}
+        for fila in filas[:limite_categorias]
+    ]
+
+    return {
+        'incidencias_por_estado': por_estado,
+        'incidencias_por_prioridad': por_prioridad,
+        'categorias_mas_comunes': categorias,
+    }
+
+
+def obtener_estadisticas(condominio_id=None):
+    """
+    Obtiene todas las estadísticas del dashboard en dos consultas.
+
+    Args:
+        condominio_id: ID opcional del condominio para filtrar
+
+    Returns:
+        dict con el resumen general y el detalle de incidencias
+    """
+    estadisticas = obtener_resumen(condominio_id)
+    estadisticas.update(obtener_detalle_incidencias(condominio_id))
+    return estadisticas
@@ -5,6 +5,7 @@ Incluye validaciones personalizadas para garantizar integridad de datos.
 
 from django import forms
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.utils import timezone
 from datetime import date
 import re
@@ -18,6 +19,8 @@ from .models import (
     EvidenciaIncidencia,
     Amonestacion
 )
+from . import validacion_archivos
+from .catalogo import obtener_catalogo, url_catalogo
 
 
 # ==================== VALIDADORES PERSONALIZADOS ====================
@@ -105,6 +108,20 @@ class CondominioForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Opciones desde el catálogo en memoria (ver catalogo.py): mostrar el
+        # formulario no consulta regiones ni comunas. La validación sigue
+        # usando el queryset de cada campo.
+        catalogo = obtener_catalogo()
+        region = self.fields['region']
+        comuna = self.fields['comuna']
+        region.widget.choices = [('', region.empty_label)] + catalogo.regiones
+        comuna.widget.choices = [('', comuna.empty_label)] + catalogo.comunas_de(self['region'].value())
+        # region_comuna_cascade.js descarga el catálogo desde esta URL
+        region.widget.attrs['data-catalogo-url'] = url_catalogo()
+
     def clean_rut(self):
         rut = self.cleaned_data.get('rut')
         if rut:
@@ -428,33 +445,13 @@ class EvidenciaIncidenciaForm(forms.ModelForm):
     def clean_archivo_evidencia(self):
         archivo = self.cleaned_data.get('archivo_evidencia')
         if archivo:
-            # Validar tamaño del archivo (máximo 50MB)
-            max_size = 50 * 1024 * 1024  # 50MB en bytes
-            if archivo.size > max_size:
-                raise ValidationError(f'El archivo es demasiado grande. Tamaño máximo: 50MB. Tamaño actual: {archivo.size / (1024*1024):.2f}MB')
-
-            # Obtener extensión del archivo
-            import os
-            extension = os.path.splitext(archivo.name)[1].lower()
-
-            # Validar extensión según tipo de archivo
             tipo_archivo = self.data.get('tipo_archivo_evidencia')
-            extensiones_validas = {
-                'IMAGEN': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp'],
-                'VIDEO': ['.mp4', '.avi', '.mov', '.wmv', '.webm', '.mkv'],
-                'DOCUMENTO': ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.txt', '.odt', '.ods'],
-                'AUDIO': ['.mp3', '.wav', '.ogg', '.m4a', '.aac'],
-                'OTRO': []  # Acepta cualquier extensión
-            }
-
-            # Validar extensión si se especificó un tipo
-            if tipo_archivo and tipo_archivo in extensiones_validas and extensiones_validas[tipo_archivo]:
-                if extension not in extensiones_validas[tipo_archivo]:
-                    extensiones_texto = ', '.join(extensiones_validas[tipo_archivo])
-                    raise ValidationError(
-                        f'El archivo no corresponde al tipo "{tipo_archivo}". '
-                        f'Extensiones válidas: {extensiones_texto}'
-                    )
+            if isinstance(archivo, UploadedFile):
+                # Tamaño, extensión según el tipo y firma del contenido
+                validacion_archivos.validar_archivo(archivo, tipo_archivo)
+            else:
+                # Archivo ya guardado: solo debe coincidir con el tipo elegido
+                validacion_archivos.validar_extension(archivo.name, tipo_archivo)
 
         return archivo
 
@@ -465,19 +462,7 @@ class EvidenciaIncidenciaForm(forms.ModelForm):
 
         # Autodetectar tipo de archivo si no se especificó
         if archivo and not tipo_archivo:
-            import os
-            extension = os.path.splitext(archivo.name)[1].lower()
-
-            if extension in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp']:
-                cleaned_data['tipo_archivo_evidencia'] = 'IMAGEN'
-            elif extension in ['.mp4', '.avi', '.mov', '.wmv', '.webm', '.mkv']:
-                cleaned_data['tipo_archivo_evidencia'] = 'VIDEO'
-            elif extension in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.txt', '.odt', '.ods']:
-                cleaned_data['tipo_archivo_evidencia'] = 'DOCUMENTO'
-            elif extension in ['.mp3', '.wav', '.ogg', '.m4a', '.aac']:
-                cleaned_data['tipo_archivo_evidencia'] = 'AUDIO'
-            else:
-                cleaned_data['tipo_archivo_evidencia'] = 'OTRO'
+            cleaned_data['tipo_archivo_evidencia'] = validacion_archivos.detectar_tipo(archivo.name)
 
         return cleaned_data
 
@@ -0,0 +1,144 @@
+"""
+Eliminación de los archivos de evidencia que quedan sin uso.
+
+Cuando ArchivoEvidencia.liberar resta la última referencia a un archivo
+(al eliminar una evidencia, también en cascada desde su incidencia, o al
+reemplazar su archivo), ``programar_eliminacion`` encola la eliminación para
+cuando la transacción se confirme: si se revierte, el archivo sigue en uso y
+no se toca. La eliminación se hace en un hilo aparte, sin demorar la
+respuesta.
+
+Lo que la cola no alcanza a eliminar (el proceso terminó antes o el archivo
+se reutilizó hace poco) queda para recolectar_archivos_evidencias y
+reconciliar_archivos_evidencias. Este módulo tiene también las funciones
+de eliminación que usan esos comandos.
+"""
+
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .almacenamiento import almacenamiento_evidencias
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _pool_limpieza():
+    """Hilo compartido para eliminar archivos; las eliminaciones se atienden en orden."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='evidencia-limpieza')
+
+
+def programar_eliminacion(nombre):
+    """
+    Encola la eliminación del archivo ``nombre`` si, al confirmarse la
+    transacción actual, ya no tiene referencias.
+    """
+    transaction.on_commit(lambda: _pool_limpieza().submit(_eliminar_si_liberado, nombre))
+
+
+def _eliminar_si_liberado(nombre):
+    from .models import ArchivoEvidencia
+
+    try:
+        # Condicional: si otra evidencia lo volvió a usar, la fila no se elimina
+        borrados, _ = ArchivoEvidencia.objects.filter(nombre=nombre, referencias=0).delete()
+        if borrados:
+            margen = timedelta(minutes=settings.EVIDENCIAS_ELIMINACION_MARGEN_MINUTOS)
+            eliminar_archivo(almacenamiento_evidencias(), nombre, timezone.now() - margen)
+    except Exception:
+        logger.exception('No se pudo eliminar el archivo de evidencia %s', nombre)
+    finally:
+        # El hilo es de larga duración: no dejar la conexión abierta
+        connection.close()
+
+
+def es_anterior(ruta, limite):
+    """Indica si el archivo existe y se modificó antes de ``limite``."""
+    try:
+        return os.stat(ruta).st_mtime < limite.timestamp()
+    except FileNotFoundError:
+        return False
+
+
+def eliminar_ruta(ruta, limite, en_uso=None, simular=False):
+    """
+    Elimina un archivo del disco si se modificó antes de ``limite`` y
+    ``en_uso()`` (consulta a la base de datos) indica que nadie lo usa.
+
+    Una subida que reutiliza el contenido (almacenamiento._colocar o
+    importar_evidencias) puede llegar en cualquier momento. Por eso el
+    archivo primero se renombra, de forma atómica, a una lápida, y después
+    se vuelve a comprobar:
+    - si la subida renovó la fecha antes del renombre, la lápida la muestra;
+    - si la subida llega después, ya no encuentra el archivo y lo escribe
+      de nuevo;
+    - si la subida ya registró el archivo en la base de datos, ``en_uso``
+      lo indica.
+    En los dos casos en que el archivo sigue en uso, la lápida vuelve a su
+    nombre; si no, se elimina.
+
+    Returns:
+        Bytes liberados, o None si no se eliminó
+    """
+    if not es_anterior(ruta, limite) or (en_uso is not None and en_uso()):
+        return None
+    if simular:
+        try:
+            return os.stat(ruta).st_size
+        except FileNotFoundError:
+            return None
+
+    lapida = f'{ruta}.{uuid.uuid4().hex}.eliminando'
+    try:
+        os.rename(ruta, lapida)
+    except FileNotFoundError:
+        return None
+
+    if not es_anterior(lapida, limite) or (en_uso is not None and en_uso()):
+        # Mismo nombre, mismo contenido: se puede reemplazar lo que haya escrito la subida
+        os.replace(lapida, ruta)
+        return None
+
+    tamano = os.stat(lapida).st_size
+    os.remove(lapida)
+    return tamano
+
+
+def eliminar_archivo(storage, nombre, limite, simular=False):
+    """
+    Elimina un archivo de evidencia y sus derivados.
+
+    No se elimina si se modificó después de ``limite`` (el almacenamiento
+    renueva la fecha al reutilizar un contenido existente) ni si vuelve a
+    estar registrado en ArchivoEvidencia (ver ``eliminar_ruta``). Si no se
+    vuelve a registrar, la reconciliación lo elimina como huérfano.
+
+    Returns:
+        Bytes liberados, o None si no se eliminó
+    """
+    from .derivados import TAMANOS, ruta_derivado
+    from .models import ArchivoEvidencia
+
+    try:
+        ruta = storage.path(nombre)
+    except NotImplementedError:
+        return None
+
+    def en_uso():
+        return ArchivoEvidencia.objects.filter(nombre=nombre).exists()
+
+    liberados = eliminar_ruta(ruta, limite, en_uso, simular)
+    if liberados is None:
+        return None
+    for variante in TAMANOS:
+        liberados += eliminar_ruta(storage.path(ruta_derivado(nombre, variante)), limite, en_uso, simular) or 0
+    return liberados
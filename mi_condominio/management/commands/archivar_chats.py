@@ -0,0 +1,74 @@
+"""
+Comando de Django para archivar las sesiones de chat cerradas antiguas.
+
+Mueve las sesiones inactivas (``activa=False``) sin actividad en los
+últimos N días a la tabla ChatSesionArchivada, con sus mensajes en JSON
+comprimido, y elimina las filas originales de ChatSession y ChatMessage.
+Las sesiones archivadas se siguen pudiendo consultar desde el historial
+del chat.
+
+Uso:
+    python manage.py archivar_chats
+    python manage.py archivar_chats --dias 60 --lote 500
+    python manage.py archivar_chats --simular
+
+Programación sugerida (cron, todos los días a las 03:30):
+    30 3 * * * cd /ruta/al/proyecto && python manage.py archivar_chats --dias 30
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from mi_condominio.models import ChatSession, ChatSesionArchivada
+
+
+class Command(BaseCommand):
+    help = 'Archiva y comprime las sesiones de chat cerradas sin actividad en los últimos N días'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30,
+                            help='Días sin actividad para archivar una sesión cerrada (por defecto: 30)')
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Sesiones archivadas por transacción (por defecto: 200)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo muestra cuántas sesiones se archivarían')
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        limite = timezone.now() - timedelta(days=options['dias'])
+        candidatas = ChatSession.objects.filter(activa=False, updated_at__lt=limite)
+
+        self.stdout.write(self.style.SUCCESS('=== Archivando sesiones de chat ===\n'))
+        self.stdout.write(f'  • Sesiones cerradas antes de: {limite.strftime("%d/%m/%Y %H:%M")}')
+
+        if options['simular']:
+            resumen = candidatas.aggregate(sesiones=Count('id', distinct=True), mensajes=Count('messages'))
+            self.stdout.write(f'  • Sesiones a archivar: {resumen["sesiones"]}')
+            self.stdout.write(f'  • Mensajes a archivar: {resumen["mensajes"]}')
+            self.stdout.write('\n' + self.style.WARNING('Simulación: no se modificó la base de datos'))
+            return
+
+        total_sesiones = 0
+        total_mensajes = 0
+        ultimo_id = 0
+        campos = ['id', 'usuario_id', 'titulo', 'created_at', 'updated_at']
+
+        while True:
+            # Recorrer por id para no volver a leer las sesiones ya procesadas
+            lote = list(candidatas.filter(id__gt=ultimo_id).order_by('id').only(*campos)[:options['lote']])
+            if not lote:
+                break
+
+            total_mensajes += ChatSesionArchivada.archivar(lote)
+            total_sesiones += len(lote)
+            ultimo_id = lote[-1].id
+            self.stdout.write(f'  ✓ Lote archivado: {len(lote)} sesiones (hasta id {ultimo_id})')
+
+        self.stdout.write(f'\n  • Sesiones archivadas: {total_sesiones}')
+        self.stdout.write(f'  • Mensajes archivados: {total_mensajes}')
+        self.stdout.write('\n' + self.style.SUCCESS('✓ Proceso completado exitosamente'))
@@ -0,0 +1,176 @@
+"""
+Comando de Django para medir el rendimiento del asistente de IA sin llamar a OpenAI.
+
+Simula varios usuarios concurrentes que conversan con el asistente siguiendo
+los guiones del backend simulado (ver ``ai_backends``). El modelo responde
+localmente con la latencia indicada, mientras que la base de datos, las
+herramientas y la persistencia son las reales.
+
+Reporta la latencia por fase de cada turno (contexto, modelo, herramientas,
+persistencia) y la cantidad de consultas SQL por turno.
+
+Las conversaciones se hacen en sesiones nuevas que se eliminan al terminar;
+las sesiones activas de los usuarios se restauran.
+
+Uso:
+    python manage.py benchmark_asistente
+    python manage.py benchmark_asistente --usuarios 10 --rondas 3 --latencia 0.8
+    python manage.py benchmark_asistente --stream --guiones guiones.json
+"""
+
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Sum
+
+from mi_condominio import ai_assistant, ai_backends, ai_metricas
+from mi_condominio.models import Usuario, ChatSession, ChatMessage
+
+
+FASES = ['contexto', 'modelo', 'herramientas', 'persistencia', ai_metricas.SIN_FASE]
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p * len(ordenados)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia y las consultas por turno del asistente de IA con un modelo simulado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=5,
+                            help='Usuarios concurrentes (por defecto: 5)')
+        parser.add_argument('--rondas', type=int, default=1,
+                            help='Veces que cada usuario recorre los guiones (por defecto: 1)')
+        parser.add_argument('--latencia', type=float, default=0.4,
+                            help='Segundos de espera del modelo por llamada (por defecto: 0.4)')
+        parser.add_argument('--latencia-token', type=float, default=0.01,
+                            help='Segundos adicionales por token generado (por defecto: 0.01)')
+        parser.add_argument('--guiones', help='Archivo JSON con guiones {mensaje: pasos}')
+        parser.add_argument('--stream', action='store_true',
+                            help='Usar la versión en streaming (chat_stream) en lugar de chat')
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        opciones_backend = {'latencia': options['latencia'], 'latencia_por_token': options['latencia_token']}
+        if options['guiones']:
+            backend = ai_backends.BackendSimulado.desde_archivo(options['guiones'], **opciones_backend)
+        else:
+            backend = ai_backends.BackendSimulado(**opciones_backend)
+
+        usuarios = list(Usuario.objects.order_by('id')[:options['usuarios']])
+        if not usuarios:
+            raise CommandError('No hay usuarios registrados. Ejecuta primero cargar_datos_prueba.')
+        if len(usuarios) < options['usuarios']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Solo hay {len(usuarios)} usuarios; se simularán {len(usuarios)} en paralelo'
+            ))
+
+        mensajes = list(backend.guiones)
+        conversaciones = [
+            (usuario, (mensajes[i % len(mensajes):] + mensajes[:i % len(mensajes)]) * options['rondas'])
+            for i, usuario in enumerate(usuarios)
+        ]
+
+        self.stdout.write(self.style.SUCCESS('=== Benchmark del asistente de IA ===\n'))
+        self.stdout.write(f'  • Usuarios concurrentes: {len(usuarios)}')
+        self.stdout.write(f'  • Turnos por usuario: {len(mensajes) * options["rondas"]}')
+        self.stdout.write(f'  • Modo: {"streaming" if options["stream"] else "síncrono"}\n')
+
+        sesiones_previas = list(
+            ChatSession.objects.filter(usuario__in=usuarios, activa=True).values_list('id', flat=True)
+        )
+        ultima_sesion = ChatSession.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        ChatSession.objects.filter(id__in=sesiones_previas).update(activa=False)
+
+        anterior = ai_backends.establecer_backend(backend)
+        inicio = time.perf_counter()
+        try:
+            if options['stream']:
+                mediciones = asyncio.run(self._ejecutar_stream(conversaciones))
+            else:
+                mediciones = self._ejecutar_hilos(conversaciones)
+            duracion = time.perf_counter() - inicio
+
+            sesiones_benchmark = ChatSession.objects.filter(usuario__in=usuarios, id__gt=ultima_sesion)
+            tokens = ChatMessage.objects.filter(sesion__in=sesiones_benchmark).aggregate(
+                prompt=Sum('tokens_prompt', default=0),
+                cacheados=Sum('tokens_prompt_cacheados', default=0),
+            )
+        finally:
+            ai_backends.establecer_backend(anterior)
+            ChatSession.objects.filter(usuario__in=usuarios, id__gt=ultima_sesion).delete()
+            ChatSession.objects.filter(id__in=sesiones_previas).update(activa=True)
+
+        self._reportar(mediciones, duracion, tokens)
+
+    def _ejecutar_hilos(self, conversaciones):
+        """Un hilo por usuario, cada uno con sus turnos en orden."""
+        def conversar(usuario, mensajes):
+            resultados = []
+            try:
+                for mensaje in mensajes:
+                    with ai_metricas.medir_turno() as medicion:
+                        respuesta = ai_assistant.chat(usuario, mensaje)
+                    resultados.append((medicion, respuesta.get('exito', False)))
+            finally:
+                connections.close_all()
+            return resultados
+
+        with ThreadPoolExecutor(max_workers=len(conversaciones)) as pool:
+            futuros = [pool.submit(conversar, usuario, mensajes) for usuario, mensajes in conversaciones]
+            return [resultado for futuro in futuros for resultado in futuro.result()]
+
+    async def _ejecutar_stream(self, conversaciones):
+        """Una tarea asíncrona por usuario, consumiendo chat_stream."""
+        async def conversar(usuario, mensajes):
+            resultados = []
+            for mensaje in mensajes:
+                exito = False
+                with ai_metricas.medir_turno() as medicion:
+                    async for evento, _ in ai_assistant.chat_stream(usuario, mensaje):
+                        exito = evento == 'fin'
+                resultados.append((medicion, exito))
+            return resultados
+
+        por_usuario = await asyncio.gather(*(conversar(u, m) for u, m in conversaciones))
+        return [resultado for resultados in por_usuario for resultado in resultados]
+
+    def _reportar(self, mediciones, duracion, tokens):
+        errores = sum(1 for _, exito in mediciones if not exito)
+        turnos = [medicion for medicion, _ in mediciones]
+
+        self.stdout.write(f'  • Turnos ejecutados: {len(turnos)} (errores: {errores})')
+        self.stdout.write(f'  • Duración total: {duracion:.2f} s ({len(turnos) / duracion:.1f} turnos/s)')
+        if tokens['prompt']:
+            self.stdout.write(
+                f'  • Tokens de prompt cacheados: {tokens["cacheados"]} de {tokens["prompt"]} '
+                f'({tokens["cacheados"] / tokens["prompt"]:.0%})'
+            )
+
+        self.stdout.write('\n' + self.style.SUCCESS('Latencia por turno (ms):'))
+        self.stdout.write(f'  {"fase":<14}{"p50":>9}{"p95":>9}{"máx":>9}')
+        filas = [('total', [m.duracion for m in turnos])]
+        filas += [(nombre, [m.fases.get(nombre, 0.0) for m in turnos]) for nombre in FASES[:-1]]
+        for nombre, valores in filas:
+            self.stdout.write(
+                f'  • {nombre:<12}{_percentil(valores, 0.5) * 1000:>9.1f}'
+                f'{_percentil(valores, 0.95) * 1000:>9.1f}{max(valores) * 1000:>9.1f}'
+            )
+
+        self.stdout.write('\n' + self.style.SUCCESS('Consultas SQL por turno:'))
+        totales = [m.total_consultas for m in turnos]
+        self.stdout.write(f'  • total: promedio {sum(totales) / len(totales):.1f}, máx {max(totales)}')
+        for nombre in FASES:
+            valores = [m.consultas.get(nombre, 0) for m in turnos]
+            if any(valores):
+                self.stdout.write(f'  • {nombre}: promedio {sum(valores) / len(valores):.1f}, máx {max(valores)}')
+
+        self.stdout.write('\n' + self.style.SUCCESS('✓ Benchmark completado'))
@@ -1,25 +1,263 @@
 """
 Management command para cargar datos de prueba en el sistema.
-Carga 50 registros de cada modelo (excepto Comuna, Region, ChatSession, ChatMessage).
+
+Genera condominios, usuarios, reuniones, incidencias, bitácoras, evidencias
+y amonestaciones en el volumen elegido con --escala, desde las 50 filas
+por modelo de siempre hasta un volumen de producción (1.000 condominios,
+1 millón de incidencias y 5 millones de bitácoras) para reproducir
+problemas de rendimiento.
+
+- Las filas se generan por lotes y se insertan con bulk_create: la memoria
+  no crece con la escala (solo se guardan los ids que otras tablas usan).
+- La contraseña de los usuarios de Django se cifra una sola vez y todos
+  comparten el mismo hash.
+- Las incidencias se reparten entre los condominios con una distribución de
+  Zipf (pocos condominios concentran la mayoría) y sus fechas siguen la
+  estacionalidad del año (más en invierno, menos los fines de semana) a lo
+  largo de los últimos dos años. Su estado depende de su antigüedad.
+- Con la misma --semilla se generan los mismos datos (las fechas son
+  relativas al día de la carga).
+
+bulk_create no emite señales ni llama a Incidencia.save(): al terminar se
+reconstruyen los contadores de incidencias y se invalida el caché del
+asistente de IA.
+
+Requiere una base de datos sin condominios (ver limpiar_datos_prueba).
+
+Uso:
+    python manage.py cargar_datos_prueba
+    python manage.py cargar_datos_prueba --escala media --semilla 7
+    python manage.py cargar_datos_prueba --escala grande --factor 0.1 --lote 10000
 """
 
-from django.core.management.base import BaseCommand
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta
+from datetime import time as hora_del_dia
+from itertools import accumulate, batched
+
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from mi_condominio import ai_cache
 from mi_condominio.models import (
     Condominio, Usuario, Reunion, CategoriaIncidencia,
     Incidencia, Bitacora, EvidenciaIncidencia, Amonestacion,
-    Region, Comuna
+    Region, Comuna, ContadorIncidencias
 )
-from datetime import datetime, timedelta
-import random
+
+
+# Filas por modelo de cada escala
+ESCALAS = {
+    'pequena': {
+        'condominios': 50, 'usuarios': 50, 'reuniones': 50, 'incidencias': 50,
+        'bitacoras': 50, 'evidencias': 50, 'amonestaciones': 50,
+    },
+    'media': {
+        'condominios': 100, 'usuarios': 3_000, 'reuniones': 1_200, 'incidencias': 50_000,
+        'bitacoras': 250_000, 'evidencias': 25_000, 'amonestaciones': 5_000,
+    },
+    'grande': {
+        'condominios': 1_000, 'usuarios': 30_000, 'reuniones': 12_000, 'incidencias': 1_000_000,
+        'bitacoras': 5_000_000, 'evidencias': 500_000, 'amonestaciones': 50_000,
+    },
+}
+
+# Contraseña de los usuarios de Django generados
+CONTRASENA_PRUEBA = 'prueba1234'
+
+# Exponente de la distribución de Zipf de incidencias y usuarios por condominio
+EXPONENTE_ZIPF = 1.1
+
+# Días hacia atrás en que se reparten las incidencias y amonestaciones
+DIAS_HISTORIA = 730
+
+# Estacionalidad: más incidencias en los meses de lluvia y frío...
+FACTOR_MES = {
+    1: 0.85, 2: 0.8, 3: 0.95, 4: 1.0, 5: 1.15, 6: 1.3,
+    7: 1.35, 8: 1.25, 9: 1.0, 10: 0.95, 11: 0.9, 12: 0.9,
+}
+# ...y menos los fines de semana (lunes = 0)
+FACTOR_DIA_SEMANA = (1.2, 1.1, 1.05, 1.0, 1.0, 0.75, 0.6)
+
+# Estados de las incidencias según su antigüedad: (días máximos, pesos por estado)
+ESTADOS_POR_ANTIGUEDAD = (
+    (7, {'PENDIENTE': 55, 'EN_PROCESO': 35, 'RESUELTA': 7, 'CERRADA': 2, 'CANCELADA': 1}),
+    (30, {'PENDIENTE': 25, 'EN_PROCESO': 35, 'RESUELTA': 25, 'CERRADA': 10, 'CANCELADA': 5}),
+    (None, {'PENDIENTE': 5, 'EN_PROCESO': 8, 'RESUELTA': 40, 'CERRADA': 40, 'CANCELADA': 7}),
+)
+PESOS_PRIORIDAD = {'BAJA': 30, 'MEDIA': 45, 'ALTA': 20, 'URGENTE': 5}
+PESOS_TIPO_USUARIO = {'ADMIN': 15, 'SUPERVISOR': 25, 'CONSERJE': 60}
+PESOS_TIPO_ARCHIVO = {'IMAGEN': 70, 'VIDEO': 10, 'DOCUMENTO': 12, 'AUDIO': 3, 'OTRO': 5}
+
+NOMBRES_CONDOMINIOS = [
+    'Edificio Las Condes', 'Condominio Los Olivos', 'Torres del Sol',
+    'Residencial El Parque', 'Edificio Vista Hermosa', 'Condominio Los Aromos',
+    'Torres Mirador', 'Residencial San Martín', 'Edificio Portal del Mar',
+    'Condominio Los Pinos', 'Torres Andalucía', 'Residencial Santa Rosa',
+    'Edificio Alameda Central', 'Condominio Los Jardines', 'Torres del Valle',
+    'Residencial Las Palmas', 'Edificio Providencia', 'Condominio El Bosque',
+    'Torres Cordillera', 'Residencial Los Castaños', 'Edificio Bello Horizonte',
+    'Condominio Los Cerezos', 'Torres Plaza Mayor', 'Residencial San Andrés',
+    'Edificio Costa Azul', 'Condominio Los Robles', 'Torres del Pacífico',
+    'Residencial Las Acacias', 'Edificio Nueva Aurora', 'Condominio El Arrayán',
+    'Torres Los Leones', 'Residencial Monte Verde', 'Edificio Bellavista',
+    'Condominio Los Sauces', 'Torres Ñuñoa', 'Residencial San Jorge',
+    'Edificio Portal Oriente', 'Condominio Los Almendros', 'Torres Mapocho',
+    'Residencial El Olivar', 'Edificio Las Lilas', 'Condominio Los Nogales',
+    'Torres Apoquindo', 'Residencial Santa Elena', 'Edificio Plaza Norte',
+    'Condominio Los Laureles', 'Torres Del Carmen', 'Residencial San Rafael',
+    'Edificio Costanera', 'Condominio Los Eucaliptos'
+]
+
+NOMBRES = [
+    'Juan', 'María', 'Pedro', 'Ana', 'Carlos', 'Luisa', 'Jorge', 'Carmen',
+    'Roberto', 'Patricia', 'Francisco', 'Isabel', 'Miguel', 'Rosa', 'José',
+    'Teresa', 'Antonio', 'Laura', 'Manuel', 'Silvia', 'Ricardo', 'Elena',
+    'Fernando', 'Mónica', 'Alejandro', 'Claudia', 'Sergio', 'Andrea',
+    'Diego', 'Beatriz', 'Raúl', 'Gabriela', 'Andrés', 'Cecilia', 'Pablo',
+    'Verónica', 'Javier', 'Marcela', 'Rodrigo', 'Daniela', 'Cristian',
+    'Alejandra', 'Gonzalo', 'Paulina', 'Eduardo', 'Francisca', 'Hernán',
+    'Carolina', 'Mauricio', 'Valentina'
+]
+
+APELLIDOS = [
+    'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras',
+    'Silva', 'Martínez', 'Sepúlveda', 'Morales', 'Rodríguez', 'López',
+    'Fuentes', 'Hernández', 'Torres', 'Araya', 'Flores', 'Espinoza',
+    'Valenzuela', 'Castillo', 'Reyes', 'Vergara', 'Castro', 'Ramírez'
+]
+
+CALLES = ['Los Pinos', 'Las Rosas', 'El Bosque', 'Santa María', 'San José']
+
+TEMAS_REUNION = [
+    'Asamblea', 'Presupuesto', 'Obras', 'Normativa', 'Reparaciones',
+    'Gastos Comunes', 'Seguridad', 'Áreas Comunes', 'Reglamento',
+    'Directiva', 'Mantención', 'Deudores', 'Cámaras', 'Pintura',
+    'Portones', 'Quincho', 'Iluminación', 'Jardines', 'Riego',
+    'Ascensores', 'Estacionamiento', 'Bicicleteros', 'Eventos',
+    'Gimnasio', 'Piscina'
+]
+
+LUGARES_REUNION = [
+    'Quincho del Condominio', 'Sala de Eventos', 'Salón Multiuso',
+    'Sala de Reuniones', 'Hall Principal', 'Terraza Común'
+]
+
+TITULOS_POR_CATEGORIA = {
+    'Mantenimiento': ['Puerta dañada en hall', 'Pintura descascarada', 'Manija rota'],
+    'Seguridad': ['Portón no cierra', 'Cámara sin funcionar', 'Cerradura forzada'],
+    'Limpieza': ['Basura en escaleras', 'Vidrios sucios', 'Jardín descuidado'],
+    'Ruidos Molestos': ['Música alta nocturna', 'Obras fuera de horario', 'Perro ladrando'],
+    'Estacionamientos': ['Auto mal estacionado', 'Goteras en subterráneo', 'Iluminación apagada'],
+    'Áreas Comunes': ['Quincho sucio', 'Mobiliario roto', 'Piscina sin cloro'],
+    'Agua': ['Fuga en baño común', 'Cañería rota', 'Presión baja'],
+    'Electricidad': ['Corte de luz', 'Ampolleta quemada', 'Cortocircuito'],
+    'Ascensores': ['Ascensor detenido', 'Botones sin funcionar', 'Puerta atascada']
+}
+
+ACCIONES_BITACORA = [
+    'Se contactó al proveedor',
+    'Se realizó inspección del lugar',
+    'Se solicitó cotización',
+    'Se programó visita técnica',
+    'Se ejecutó reparación',
+    'Se verificó solución',
+    'Se cerró caso',
+    'Se escaló a supervisor',
+    'Se notificó a los residentes',
+    'Se actualizó estado'
+]
+
+DETALLES_BITACORA = [
+    'Proveedor confirmó visita para mañana',
+    'Inspección reveló daño mayor al esperado',
+    'Cotización recibida por $150.000',
+    'Técnico visitará el viernes en la tarde',
+    'Reparación completada exitosamente',
+    'Solución verificada y funcionando correctamente',
+    'Caso cerrado tras confirmación de residente',
+    'Caso requiere aprobación de directiva',
+    'Se envió circular a todos los departamentos',
+    'Estado actualizado según avance del trabajo'
+]
+
+# Campos con auto_now/auto_now_add que se llenan con fechas generadas
+CAMPOS_FECHA_MANUAL = (
+    (Incidencia, ('fecha_reporte', 'created_at', 'updated_at')),
+    (Bitacora, ('fecha_bitacora', 'created_at')),
+)
+
+
+def rut_con_digito(numero):
+    """RUT con su dígito verificador (módulo 11), por ejemplo 12345678-5."""
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    digito_verificador = {10: 'K', 11: '0'}.get(resto, str(resto))
+    return f'{numero}-{digito_verificador}'
+
+
+def pesos_acumulados(pesos):
+    """Pesos acumulados para random.choices (más rápido que pasar los pesos)."""
+    return list(accumulate(pesos))
+
+
+def pesos_zipf(cantidad, exponente, rng):
+    """
+    Pesos acumulados de una distribución de Zipf sobre ``cantidad`` elementos.
+
+    Los rangos se asignan al azar: el condominio con más actividad no es
+    siempre el primero creado.
+    """
+    rangos = list(range(1, cantidad + 1))
+    rng.shuffle(rangos)
+    return pesos_acumulados(rango ** -exponente for rango in rangos)
+
+
+class _FechasManuales:
+    """
+    Desactiva auto_now y auto_now_add de CAMPOS_FECHA_MANUAL mientras dura el
+    bloque, para que bulk_create guarde las fechas generadas.
+    """
+
+    def __enter__(self):
+        self.originales = []
+        for modelo, campos in CAMPOS_FECHA_MANUAL:
+            for nombre in campos:
+                campo = modelo._meta.get_field(nombre)
+                self.originales.append((campo, campo.auto_now, campo.auto_now_add))
+                campo.auto_now = campo.auto_now_add = False
+
+    def __exit__(self, *exc):
+        for campo, auto_now, auto_now_add in self.originales:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
 
 
 class Command(BaseCommand):
-    help = 'Carga 50 registros de prueba para cada modelo del sistema'
+    help = 'Genera datos de prueba para cada modelo del sistema, a la escala indicada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=ESCALAS, default='pequena',
+                            help='Volumen de datos: pequena (50 por modelo), media o grande '
+                                 '(1.000 condominios, 1M incidencias, 5M bitácoras). Por defecto: pequena')
+        parser.add_argument('--factor', type=float, default=1.0,
+                            help='Multiplica las cantidades de la escala (por ejemplo 0.1 o 3)')
+        parser.add_argument('--semilla', type=int, default=42,
+                            help='Semilla de los datos generados (por defecto: 42)')
+        parser.add_argument('--lote', type=int, default=5000,
+                            help='Filas por inserción (por defecto: 5000)')
 
     def handle(self, *args, **options):
-        self.stdout.write('Iniciando carga de datos de prueba...\n')
-
+        """
+        Método principal que ejecuta el comando.
+        """
         # Verificar que existan regiones y comunas
         if not Region.objects.exists():
             self.stdout.write(self.style.ERROR(
@@ -36,374 +274,329 @@ class Command(BaseCommand):
             ))
             return
 
-        # Cargar condominios
-        self.cargar_condominios()
-
-        # Cargar usuarios
-        self.cargar_usuarios()
-
-        # Cargar reuniones
-        self.cargar_reuniones()
-
-        # Cargar incidencias
-        self.cargar_incidencias()
-
-        # Cargar bitácoras
-        self.cargar_bitacoras()
-
-        # Cargar evidencias
-        self.cargar_evidencias()
-
-        # Cargar amonestaciones
-        self.cargar_amonestaciones()
-
-        self.stdout.write(self.style.SUCCESS('\n¡Datos de prueba cargados exitosamente!'))
-
-    def cargar_condominios(self):
-        """Carga 50 condominios de prueba."""
-        self.stdout.write('Cargando condominios...')
-
-        nombres_condominios = [
-            'Edificio Las Condes', 'Condominio Los Olivos', 'Torres del Sol',
-            'Residencial El Parque', 'Edificio Vista Hermosa', 'Condominio Los Aromos',
-            'Torres Mirador', 'Residencial San Martín', 'Edificio Portal del Mar',
-            'Condominio Los Pinos', 'Torres Andalucía', 'Residencial Santa Rosa',
-            'Edificio Alameda Central', 'Condominio Los Jardines', 'Torres del Valle',
-            'Residencial Las Palmas', 'Edificio Providencia', 'Condominio El Bosque',
-            'Torres Cordillera', 'Residencial Los Castaños', 'Edificio Bello Horizonte',
-            'Condominio Los Cerezos', 'Torres Plaza Mayor', 'Residencial San Andrés',
-            'Edificio Costa Azul', 'Condominio Los Robles', 'Torres del Pacífico',
-            'Residencial Las Acacias', 'Edificio Nueva Aurora', 'Condominio El Arrayán',
-            'Torres Los Leones', 'Residencial Monte Verde', 'Edificio Bellavista',
-            'Condominio Los Sauces', 'Torres Ñuñoa', 'Residencial San Jorge',
-            'Edificio Portal Oriente', 'Condominio Los Almendros', 'Torres Mapocho',
-            'Residencial El Olivar', 'Edificio Las Lilas', 'Condominio Los Nogales',
-            'Torres Apoquindo', 'Residencial Santa Elena', 'Edificio Plaza Norte',
-            'Condominio Los Laureles', 'Torres Del Carmen', 'Residencial San Rafael',
-            'Edificio Costanera', 'Condominio Los Eucaliptos'
-        ]
-
-        comunas = list(Comuna.objects.all())
-
-        for i in range(len(nombres_condominios)):
-            comuna = random.choice(comunas)
-            # RUT fijo basado en el índice (sin componente aleatorio)
-            rut_num = 70000000 + (i + 1) * 1000
-            rut = f"{rut_num // 10}-{rut_num % 10}"
-
-            condominio, created = Condominio.objects.get_or_create(
-                rut=rut,
-                defaults={
-                    'nombre': nombres_condominios[i],
-                    'direccion': f'{random.choice(["Av.", "Calle", "Pasaje"])} {random.choice(["Los Pinos", "Las Rosas", "El Bosque", "Santa María", "San José"])} {random.randint(100, 9999)}',
-                    'region': comuna.region,
-                    'comuna': comuna,
-                    'mail_contacto': f'contacto{i+1}@{nombres_condominios[i].lower().replace(" ", "")}.cl'
-                }
-            )
-
-            if created:
-                self.stdout.write(f'  ✓ Condominio: {condominio.nombre}')
-
-    def cargar_usuarios(self):
-        """Carga 50 usuarios de prueba."""
-        self.stdout.write('\nCargando usuarios...')
-
-        nombres = [
-            'Juan', 'María', 'Pedro', 'Ana', 'Carlos', 'Luisa', 'Jorge', 'Carmen',
-            'Roberto', 'Patricia', 'Francisco', 'Isabel', 'Miguel', 'Rosa', 'José',
-            'Teresa', 'Antonio', 'Laura', 'Manuel', 'Silvia', 'Ricardo', 'Elena',
-            'Fernando', 'Mónica', 'Alejandro', 'Claudia', 'Sergio', 'Andrea',
-            'Diego', 'Beatriz', 'Raúl', 'Gabriela', 'Andrés', 'Cecilia', 'Pablo',
-            'Verónica', 'Javier', 'Marcela', 'Rodrigo', 'Daniela', 'Cristian',
-            'Alejandra', 'Gonzalo', 'Paulina', 'Eduardo', 'Francisca', 'Hernán',
-            'Carolina', 'Mauricio', 'Valentina'
-        ]
-
-        apellidos = [
-            'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras',
-            'Silva', 'Martínez', 'Sepúlveda', 'Morales', 'Rodríguez', 'López',
-            'Fuentes', 'Hernández', 'Torres', 'Araya', 'Flores', 'Espinoza',
-            'Valenzuela', 'Castillo', 'Reyes', 'Vergara', 'Castro', 'Ramírez'
-        ]
-
-        condominios = list(Condominio.objects.all())
-        tipos_usuario = ['ADMIN', 'SUPERVISOR', 'CONSERJE']
-        generos = ['M', 'F', 'O', 'N']
-
-        for i in range(50):
-            rut_num = 15000000 + i * 100000 + random.randint(1000, 9999)
-            rut = f"{rut_num // 10}-{rut_num % 10}"
-            nombre = nombres[i]
-            apellido = f"{random.choice(apellidos)} {random.choice(apellidos)}"
-
-            # Crear usuario Django si es ADMIN
-            tipo = random.choice(tipos_usuario)
-            django_user = None
-
-            if tipo == 'ADMIN':
-                username = f"{nombre.lower()}.{apellido.split()[0].lower()}.{i}.{random.randint(100, 999)}"
-                django_user, _ = User.objects.get_or_create(
-                    username=username,
-                    defaults={
-                        'email': f'{username}@condominio.cl',
-                        'first_name': nombre,
-                        'last_name': apellido.split()[0]
-                    }
-                )
-
-            # Generar email único usando timestamp
-            email_unico = f'{nombre.lower()}.{apellido.split()[0].lower()}.{i}.{random.randint(1000, 9999)}@email.cl'
-
-            usuario, created = Usuario.objects.get_or_create(
-                rut=rut,
-                defaults={
-                    'user': django_user,
-                    'condominio': random.choice(condominios),
-                    'nombres': nombre,
-                    'apellido': apellido,
-                    'genero': random.choice(generos),
-                    'correo': email_unico,
-                    'residencia': f'Depto {random.randint(100, 999)}',
-                    'tipo_usuario': tipo,
-                    'estado_cuenta': random.choice(['ACTIVO', 'ACTIVO', 'ACTIVO', 'INACTIVO'])  # 75% activos
-                }
-            )
-
-            if created:
-                self.stdout.write(f'  ✓ Usuario: {usuario.nombres} {usuario.apellido} ({usuario.tipo_usuario})')
-
-    def cargar_reuniones(self):
-        """Carga 50 reuniones de prueba."""
-        self.stdout.write('\nCargando reuniones...')
-
-        condominios = list(Condominio.objects.all())
-        tipos_reunion = ['ORDINARIA', 'EXTRAORDINARIA', 'INFORMATIVA']
-
-        temas_reunion = [
-            'Asamblea', 'Presupuesto', 'Obras', 'Normativa', 'Reparaciones',
-            'Gastos Comunes', 'Seguridad', 'Áreas Comunes', 'Reglamento',
-            'Directiva', 'Mantención', 'Deudores', 'Cámaras', 'Pintura',
-            'Portones', 'Quincho', 'Iluminación', 'Jardines', 'Riego',
-            'Ascensores', 'Estacionamiento', 'Bicicleteros', 'Eventos',
-            'Gimnasio', 'Piscina'
-        ]
-
-        lugares = [
-            'Quincho del Condominio', 'Sala de Eventos', 'Salón Multiuso',
-            'Sala de Reuniones', 'Hall Principal', 'Terraza Común'
-        ]
+        # Los RUT y correos se generan desde cero: no deben chocar con datos previos
+        if Condominio.objects.exists():
+            self.stdout.write(self.style.ERROR(
+                'Error: Ya hay condominios en la base de datos. '
+                'Ejecuta primero: python manage.py limpiar_datos_prueba --confirmar'
+            ))
+            return
 
-        for i in range(50):
-            dias_offset = random.randint(-180, 180)  # Reuniones en los últimos 6 meses y próximos 6 meses
-            fecha = datetime.now().date() + timedelta(days=dias_offset)
-
-            # Nombre de reunión corto (máx 20 caracteres)
-            nombre_corto = f"{random.choice(temas_reunion)[:10]} {i+1}"
-
-            reunion, created = Reunion.objects.get_or_create(
-                condominio=random.choice(condominios),
-                fecha_reunion=fecha,
-                nombre_reunion=nombre_corto[:20],  # Asegurar máximo 20 caracteres
-                defaults={
-                    'tipo_reunion': random.choice(tipos_reunion),
-                    'lugar_reunion': random.choice(lugares),
-                    'motivo_reunion': f'Reunión para tratar temas relacionados con {random.choice(temas_reunion).lower()}',
-                    'acta_reunion_url': f'https://drive.google.com/actas/reunion-{i+1}' if random.choice([True, False]) else None
-                }
-            )
-
-            if created:
-                self.stdout.write(f'  ✓ Reunión: {reunion.nombre_reunion} ({reunion.tipo_reunion})')
-
-    def cargar_incidencias(self):
-        """Carga 50 incidencias de prueba."""
-        self.stdout.write('\nCargando incidencias...')
-
-        condominios = list(Condominio.objects.all())
-        categorias = list(CategoriaIncidencia.objects.all())
-        usuarios = list(Usuario.objects.all())
-        estados = ['PENDIENTE', 'EN_PROCESO', 'RESUELTA', 'CERRADA', 'CANCELADA']
-        prioridades = ['BAJA', 'MEDIA', 'ALTA', 'URGENTE']
-
-        titulos_por_categoria = {
-            'Mantenimiento': ['Puerta dañada en hall', 'Pintura descascarada', 'Manija rota'],
-            'Seguridad': ['Portón no cierra', 'Cámara sin funcionar', 'Cerradura forzada'],
-            'Limpieza': ['Basura en escaleras', 'Vidrios sucios', 'Jardín descuidado'],
-            'Ruidos Molestos': ['Música alta nocturna', 'Obras fuera de horario', 'Perro ladrando'],
-            'Estacionamientos': ['Auto mal estacionado', 'Goteras en subterráneo', 'Iluminación apagada'],
-            'Áreas Comunes': ['Quincho sucio', 'Mobiliario roto', 'Piscina sin cloro'],
-            'Agua': ['Fuga en baño común', 'Cañería rota', 'Presión baja'],
-            'Electricidad': ['Corte de luz', 'Ampolleta quemada', 'Cortocircuito'],
-            'Ascensores': ['Ascensor detenido', 'Botones sin funcionar', 'Puerta atascada']
+        self.verbosity = options['verbosity']
+        self.semilla = options['semilla']
+        self.lote = max(options['lote'], 1)
+        self.hoy = timezone.localdate()
+        self.zona = timezone.get_current_timezone()
+        cantidades = {
+            modelo: max(round(cantidad * options['factor']), 1)
+            for modelo, cantidad in ESCALAS[options['escala']].items()
         }
 
-        for i in range(50):
-            categoria = random.choice(categorias)
-            condominio = random.choice(condominios)
-
-            # Obtener títulos para esta categoría o usar genéricos
-            titulos = titulos_por_categoria.get(categoria.nombre_categoria_incidencia, ['Incidencia reportada'])
-
-            dias_offset = random.randint(-90, 0)  # Incidencias en los últimos 3 meses
-            fecha_reporte = datetime.now().date() + timedelta(days=dias_offset)
-
-            estado = random.choice(estados)
-            fecha_cierre = None
-            if estado in ['RESUELTA', 'CERRADA', 'CANCELADA']:
-                fecha_cierre = fecha_reporte + timedelta(days=random.randint(1, 30))
-
-            # Generar coordenadas ficticias de Santiago, Chile
-            lat_base = -33.4489  # Santiago
-            lon_base = -70.6693
-            lat = str(lat_base + random.uniform(-0.1, 0.1))
-            lon = str(lon_base + random.uniform(-0.1, 0.1))
-
-            incidencia, created = Incidencia.objects.get_or_create(
-                condominio=condominio,
-                titulo=f"{random.choice(titulos)} - Caso {i+1}",
-                defaults={
-                    'tipo_incidencia': categoria,
-                    'descripcion': f'Descripción detallada de la incidencia {i+1}. Se requiere atención para resolver el problema reportado.',
-                    'estado': estado,
-                    'prioridad': random.choice(prioridades),
-                    'ubicacion_latitud_reporte': lat,
-                    'ubicacion_longitud_reporte': lon,
-                    'direccion_condominio_incidencia': condominio.direccion,
-                    'usuario_reporta': random.choice(usuarios),
-                    'fecha_cierre': fecha_cierre
-                }
-            )
-
-            if created:
-                self.stdout.write(f'  ✓ Incidencia: {incidencia.titulo} ({incidencia.estado})')
-
-    def cargar_bitacoras(self):
-        """Carga 50 entradas de bitácora de prueba."""
-        self.stdout.write('\nCargando bitácoras...')
-
-        incidencias = list(Incidencia.objects.all())
-
-        acciones = [
-            'Se contactó al proveedor',
-            'Se realizó inspección del lugar',
-            'Se solicitó cotización',
-            'Se programó visita técnica',
-            'Se ejecutó reparación',
-            'Se verificó solución',
-            'Se cerró caso',
-            'Se escaló a supervisor',
-            'Se notificó a los residentes',
-            'Se actualizó estado'
+        self.stdout.write(self.style.SUCCESS(
+            f'=== Generando datos de prueba (escala {options["escala"]}, semilla {self.semilla}) ===\n'
+        ))
+
+        inicio = time.perf_counter()
+        # Se calcula una vez: cifrar la contraseña de cada usuario tomaría horas
+        self.hash_contrasena = make_password(CONTRASENA_PRUEBA)
+
+        pasos = (
+            ('Condominios', 'condominios', self.cargar_condominios),
+            ('Usuarios', 'usuarios', self.cargar_usuarios),
+            ('Reuniones', 'reuniones', self.cargar_reuniones),
+            ('Incidencias', 'incidencias', self.cargar_incidencias),
+            ('Bitácoras', 'bitacoras', self.cargar_bitacoras),
+            ('Evidencias', 'evidencias', self.cargar_evidencias),
+            ('Amonestaciones', 'amonestaciones', self.cargar_amonestaciones),
+        )
+        with _FechasManuales():
+            for etiqueta, modelo, cargar in pasos:
+                inicio_paso = time.perf_counter()
+                total = cargar(cantidades[modelo])
+                duracion = time.perf_counter() - inicio_paso
+                self.stdout.write(f'  ✓ {etiqueta}: {total:,} en {duracion:.1f} s '
+                                  f'({total / max(duracion, 1e-6):,.0f} filas/s)')
+
+        # bulk_create no pasa por Incidencia.save() ni emite señales
+        contadores = ContadorIncidencias.reconstruir()
+        for modelo in (Condominio, Usuario, Reunion, Incidencia):
+            ai_cache.invalidar_modelo(modelo)
+
+        self.stdout.write(f'\n  • Contadores de incidencias reconstruidos: {contadores}')
+        self.stdout.write(f'  • Contraseña de los usuarios administradores: {CONTRASENA_PRUEBA}')
+        self.stdout.write(f'  • Duración total: {time.perf_counter() - inicio:.1f} s')
+        self.stdout.write('\n' + self.style.SUCCESS('✓ Datos de prueba cargados exitosamente'))
+
+    def _rng(self, modelo):
+        """
+        Generador aleatorio propio de cada modelo: cambiar la cantidad de un
+        modelo no altera los datos de los demás.
+        """
+        return random.Random(f'{self.semilla}:{modelo}')
+
+    def _guardar(self, modelo, objetos):
+        """Inserta un lote en su propia transacción y retorna los objetos con su id."""
+        with transaction.atomic():
+            creados = modelo.objects.bulk_create(objetos)
+        if self.verbosity >= 2:
+            self.stdout.write(f'    {modelo._meta.verbose_name_plural}: +{len(creados)}')
+        return creados
+
+    def _momento(self, fecha, rng):
+        """Fecha y hora (entre 7:00 y 22:59) del día indicado."""
+        return datetime.combine(fecha, hora_del_dia(rng.randint(7, 22), rng.randrange(60)), tzinfo=self.zona)
+
+    def _fechas_estacionales(self):
+        """Días de DIAS_HISTORIA con sus pesos acumulados según la estacionalidad."""
+        fechas = [self.hoy - timedelta(days=atras) for atras in range(DIAS_HISTORIA)]
+        pesos = (
+            FACTOR_MES[fecha.month] * FACTOR_DIA_SEMANA[fecha.weekday()]
+            # Tendencia: el uso del sistema crece con el tiempo
+            * (1.5 - atras / DIAS_HISTORIA)
+            for atras, fecha in enumerate(fechas)
+        )
+        return fechas, pesos_acumulados(pesos)
+
+    def cargar_condominios(self, cantidad):
+        """Genera los condominios; guarda sus ids, direcciones y pesos de actividad."""
+        rng = self._rng('condominios')
+        comunas = list(Comuna.objects.values_list('id', 'region_id'))
+
+        self.condominios = []
+        self.direcciones = []
+        for indices in batched(range(cantidad), self.lote):
+            objetos = []
+            for i in indices:
+                comuna_id, region_id = rng.choice(comunas)
+                nombre = NOMBRES_CONDOMINIOS[i % len(NOMBRES_CONDOMINIOS)]
+                if i >= len(NOMBRES_CONDOMINIOS):
+                    nombre = f'{nombre} {i // len(NOMBRES_CONDOMINIOS) + 1}'
+                direccion = f'{rng.choice(["Av.", "Calle", "Pasaje"])} {rng.choice(CALLES)} {rng.randint(100, 9999)}'
+                objetos.append(Condominio(
+                    # RUT fijo basado en el índice
+                    rut=rut_con_digito(70_000_000 + i),
+                    nombre=nombre,
+                    direccion=direccion,
+                    region_id=region_id,
+                    comuna_id=comuna_id,
+                    mail_contacto=f'contacto{i + 1}@condominio{i + 1}.cl',
+                ))
+            for condominio in self._guardar(Condominio, objetos):
+                self.condominios.append(condominio.pk)
+                self.direcciones.append(condominio.direccion)
+
+        self.pesos_condominios = pesos_zipf(len(self.condominios), EXPONENTE_ZIPF, rng)
+        return len(self.condominios)
+
+    def cargar_usuarios(self, cantidad):
+        """
+        Genera los usuarios, repartidos entre los condominios con los mismos
+        pesos que las incidencias. Los administradores tienen usuario de Django.
+        """
+        rng = self._rng('usuarios')
+        tipos = list(PESOS_TIPO_USUARIO)
+        pesos_tipos = pesos_acumulados(PESOS_TIPO_USUARIO.values())
+        generos = Usuario.Genero.values
+
+        self.usuarios = array('q')
+        self.usuarios_por_condominio = [[] for _ in self.condominios]
+        for indices in batched(range(cantidad), self.lote):
+            indices_condominios = rng.choices(range(len(self.condominios)), cum_weights=self.pesos_condominios,
+                                              k=len(indices))
+            filas = []
+            usuarios_django = []
+            for i, indice_condominio in zip(indices, indices_condominios):
+                nombre = rng.choice(NOMBRES)
+                apellido = f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}'
+                tipo = rng.choices(tipos, cum_weights=pesos_tipos)[0]
+                base_correo = f'{nombre.lower()}.{apellido.split()[0].lower()}.{i}'
+
+                usuario_django = None
+                if tipo == 'ADMIN':
+                    usuario_django = User(
+                        username=base_correo,
+                        email=f'{base_correo}@condominio.cl',
+                        first_name=nombre,
+                        last_name=apellido.split()[0],
+                        password=self.hash_contrasena,
+                    )
+                    usuarios_django.append(usuario_django)
+
+                filas.append((indice_condominio, usuario_django, Usuario(
+                    condominio_id=self.condominios[indice_condominio],
+                    nombres=nombre,
+                    apellido=apellido,
+                    genero=rng.choice(generos),
+                    rut=rut_con_digito(15_000_000 + i),
+                    correo=f'{base_correo}@email.cl',
+                    residencia=f'Depto {rng.randint(100, 999)}',
+                    tipo_usuario=tipo,
+                    estado_cuenta=rng.choice(['ACTIVO', 'ACTIVO', 'ACTIVO', 'INACTIVO']),  # 75% activos
+                )))
+
+            if usuarios_django:
+                self._guardar(User, usuarios_django)
+            for _, usuario_django, usuario in filas:
+                if usuario_django is not None:
+                    usuario.user_id = usuario_django.pk
+            self._guardar(Usuario, [usuario for _, _, usuario in filas])
+
+            for indice_condominio, _, usuario in filas:
+                self.usuarios.append(usuario.pk)
+                self.usuarios_por_condominio[indice_condominio].append(usuario.pk)
+        return len(self.usuarios)
+
+    def cargar_reuniones(self, cantidad):
+        """Genera reuniones en los últimos 6 meses y los próximos 6 meses."""
+        rng = self._rng('reuniones')
+        tipos = Reunion.TipoReunion.values
+
+        for indices in batched(range(cantidad), self.lote):
+            objetos = []
+            for i in indices:
+                # Nombre de reunión corto (máx 20 caracteres)
+                nombre_corto = f'{rng.choice(TEMAS_REUNION)[:10]} {i + 1}'
+                objetos.append(Reunion(
+                    condominio_id=rng.choice(self.condominios),
+                    tipo_reunion=rng.choice(tipos),
+                    nombre_reunion=nombre_corto[:20],
+                    fecha_reunion=self.hoy + timedelta(days=rng.randint(-180, 180)),
+                    lugar_reunion=rng.choice(LUGARES_REUNION),
+                    motivo_reunion=f'Reunión para tratar temas relacionados con {rng.choice(TEMAS_REUNION).lower()}',
+                    acta_reunion_url=f'https://drive.google.com/actas/reunion-{i + 1}' if rng.random() < 0.5 else None,
+                ))
+            self._guardar(Reunion, objetos)
+        return cantidad
+
+    def cargar_incidencias(self, cantidad):
+        """
+        Genera incidencias con condominios según Zipf y fechas estacionales.
+        Guarda sus ids y fechas para las bitácoras y evidencias.
+        """
+        rng = self._rng('incidencias')
+        categorias = list(CategoriaIncidencia.objects.values_list('id', 'nombre_categoria_incidencia'))
+        fechas, pesos_fechas = self._fechas_estacionales()
+        estados_por_antiguedad = [
+            (dias, list(pesos), pesos_acumulados(pesos.values())) for dias, pesos in ESTADOS_POR_ANTIGUEDAD
         ]
-
-        detalles = [
-            'Proveedor confirmó visita para mañana',
-            'Inspección reveló daño mayor al esperado',
-            'Cotización recibida por $150.000',
-            'Técnico visitará el viernes en la tarde',
-            'Reparación completada exitosamente',
-            'Solución verificada y funcionando correctamente',
-            'Caso cerrado tras confirmación de residente',
-            'Caso requiere aprobación de directiva',
-            'Se envió circular a todos los departamentos',
-            'Estado actualizado según avance del trabajo'
-        ]
-
-        for i in range(50):
-            incidencia = random.choice(incidencias)
-
-            bitacora, created = Bitacora.objects.get_or_create(
-                incidencia=incidencia,
-                detalle=random.choice(detalles),
-                accion=random.choice(acciones),
-                defaults={}
-            )
-
-            if created:
-                self.stdout.write(f'  ✓ Bitácora: {bitacora.accion} (Incidencia #{bitacora.incidencia.id})')
-
-    def cargar_evidencias(self):
-        """Carga 50 evidencias de prueba."""
-        self.stdout.write('\nCargando evidencias...')
-
-        incidencias = list(Incidencia.objects.all())
-        tipos_archivo = ['IMAGEN', 'VIDEO', 'DOCUMENTO', 'AUDIO', 'OTRO']
-
-        for i in range(50):
-            incidencia = random.choice(incidencias)
-            tipo = random.choice(tipos_archivo)
-
-            # Crear evidencia sin archivo (campo nullable)
-            # En producción se cargarían archivos reales
-            evidencia = EvidenciaIncidencia.objects.create(
-                incidencia=incidencia,
-                tipo_archivo_evidencia=tipo,
-                archivo_evidencia=None  # Sin archivo por ahora
-            )
-
-            self.stdout.write(f'  ✓ Evidencia: {evidencia.tipo_archivo_evidencia} (Incidencia #{evidencia.incidencia.id})')
-
-    def cargar_amonestaciones(self):
-        """Carga 50 amonestaciones de prueba."""
-        self.stdout.write('\nCargando amonestaciones...')
-
-        usuarios = list(Usuario.objects.all())
-        condominios = list(Condominio.objects.all())
-
-        tipos_amonestacion = ['VERBAL', 'ESCRITA', 'MULTA', 'SUSPENSION']
-
-        motivos = [
-            'RUIDOS_MOLESTOS', 'USO_INDEBIDO_ESTACIONAMIENTOS', 'DANO_BIEN_COMUN',
-            'MAL_USO_AREA_COMUN', 'INCUMPLIMIENTO_NORMAS_SANITARIAS', 'TENENCIA_IRRESPONSABLE',
-            'MAL_USO_DUCTOS_BASURA', 'ARRIENDO_ILEGAL', 'INCUMPLIMIENTO_OBRAS_REMODELACIONES',
-            'IMPEDIMENTO_LABORES_ADMINISTRATIVAS', 'SEGURIDAD', 'OTRO'
-        ]
-
-        nombres = [
-            'Pedro', 'Ana', 'Carlos', 'Luisa', 'Jorge', 'Carmen', 'Roberto',
-            'Patricia', 'Francisco', 'Isabel', 'Miguel', 'Rosa', 'José',
-            'Teresa', 'Antonio', 'Laura', 'Manuel', 'Silvia', 'Ricardo'
-        ]
-
-        apellidos = [
-            'González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras',
-            'Silva', 'Martínez', 'Sepúlveda', 'Morales', 'Rodríguez'
-        ]
-
-        for i in range(50):
-            tipo = random.choice(tipos_amonestacion)
-            motivo = random.choice(motivos)
-
-            dias_offset = random.randint(-180, 0)  # Amonestaciones en los últimos 6 meses
-            fecha_amonestacion = datetime.now().date() + timedelta(days=dias_offset)
-
-            rut_num = 16000000 + i * 100000 + random.randint(1000, 9999)
-            rut = f"{rut_num // 10}-{rut_num % 10}"
-
-            # Fecha límite de pago solo si es MULTA
-            fecha_limite = None
-            if tipo == 'MULTA':
-                fecha_limite = fecha_amonestacion + timedelta(days=30)
-
-            motivo_detalle = None
-            if motivo == 'OTRO':
-                motivo_detalle = f'Motivo detallado de la amonestación número {i+1}'
-
-            amonestacion, created = Amonestacion.objects.get_or_create(
-                rut_amonestado=rut,
-                fecha_amonestacion=fecha_amonestacion,
-                defaults={
-                    'tipo_amonestacion': tipo,
-                    'motivo': motivo,
-                    'motivo_detalle': motivo_detalle,
-                    'nombre_amonestado': random.choice(nombres),
-                    'apellidos_amonestado': f"{random.choice(apellidos)} {random.choice(apellidos)}",
-                    'numero_departamento': f'{random.randint(1, 20)}{random.randint(1, 15):02d}',
-                    'fecha_limite_pago': fecha_limite,
-                    'usuario_reporta': random.choice(usuarios)
-                }
-            )
-
-            if created:
-                self.stdout.write(f'  ✓ Amonestación: {amonestacion.tipo_amonestacion} - {amonestacion.nombre_amonestado}')
+        prioridades = list(PESOS_PRIORIDAD)
+        pesos_prioridades = pesos_acumulados(PESOS_PRIORIDAD.values())
+        estados_cerrados = {'RESUELTA', 'CERRADA', 'CANCELADA'}
+
+        # Coordenadas ficticias de Santiago, Chile
+        lat_base = -33.4489
+        lon_base = -70.6693
+
+        self.incidencias = array('q')
+        self.fechas_incidencias = array('l')
+        for indices in batched(range(cantidad), self.lote):
+            indices_condominios = rng.choices(range(len(self.condominios)), cum_weights=self.pesos_condominios,
+                                              k=len(indices))
+            fechas_reporte = rng.choices(fechas, cum_weights=pesos_fechas, k=len(indices))
+            objetos = []
+            for i, indice_condominio, fecha_reporte in zip(indices, indices_condominios, fechas_reporte):
+                categoria_id, nombre_categoria = rng.choice(categorias)
+                titulos = TITULOS_POR_CATEGORIA.get(nombre_categoria, ['Incidencia reportada'])
+
+                antiguedad = (self.hoy - fecha_reporte).days
+                for dias, estados, pesos_estados in estados_por_antiguedad:
+                    if dias is None or antiguedad < dias:
+                        break
+                estado = rng.choices(estados, cum_weights=pesos_estados)[0]
+                fecha_cierre = None
+                if estado in estados_cerrados:
+                    fecha_cierre = min(fecha_reporte + timedelta(days=rng.randint(1, 30)), self.hoy)
+
+                # Quien reporta es del mismo condominio, si tiene usuarios
+                usuarios = self.usuarios_por_condominio[indice_condominio] or self.usuarios
+                creada = self._momento(fecha_reporte, rng)
+                objetos.append(Incidencia(
+                    condominio_id=self.condominios[indice_condominio],
+                    tipo_incidencia_id=categoria_id,
+                    titulo=f'{rng.choice(titulos)} - Caso {i + 1}',
+                    descripcion=f'Descripción detallada de la incidencia {i + 1}. '
+                                'Se requiere atención para resolver el problema reportado.',
+                    estado=estado,
+                    prioridad=rng.choices(prioridades, cum_weights=pesos_prioridades)[0],
+                    ubicacion_latitud_reporte=str(lat_base + rng.uniform(-0.1, 0.1)),
+                    ubicacion_longitud_reporte=str(lon_base + rng.uniform(-0.1, 0.1)),
+                    direccion_condominio_incidencia=self.direcciones[indice_condominio],
+                    usuario_reporta_id=rng.choice(usuarios),
+                    fecha_reporte=fecha_reporte,
+                    fecha_cierre=fecha_cierre,
+                    created_at=creada,
+                    updated_at=self._momento(fecha_cierre, rng) if fecha_cierre else creada,
+                ))
+
+            for incidencia in self._guardar(Incidencia, objetos):
+                self.incidencias.append(incidencia.pk)
+                self.fechas_incidencias.append(incidencia.fecha_reporte.toordinal())
+        return len(self.incidencias)
+
+    def cargar_bitacoras(self, cantidad):
+        """Genera entradas de bitácora en los 30 días siguientes al reporte de su incidencia."""
+        rng = self._rng('bitacoras')
+
+        for indices in batched(range(cantidad), self.lote):
+            objetos = []
+            for _ in indices:
+                posicion = rng.randrange(len(self.incidencias))
+                fecha = min(
+                    date.fromordinal(self.fechas_incidencias[posicion]) + timedelta(days=rng.randint(0, 30)),
+                    self.hoy
+                )
+                objetos.append(Bitacora(
+                    incidencia_id=self.incidencias[posicion],
+                    detalle=rng.choice(DETALLES_BITACORA),
+                    accion=rng.choice(ACCIONES_BITACORA),
+                    fecha_bitacora=fecha,
+                    created_at=self._momento(fecha, rng),
+                ))
+            self._guardar(Bitacora, objetos)
+        return cantidad
+
+    def cargar_evidencias(self, cantidad):
+        """Genera evidencias sin archivo (en producción se cargarían archivos reales)."""
+        rng = self._rng('evidencias')
+        tipos = list(PESOS_TIPO_ARCHIVO)
+        pesos_tipos = pesos_acumulados(PESOS_TIPO_ARCHIVO.values())
+
+        for indices in batched(range(cantidad), self.lote):
+            self._guardar(EvidenciaIncidencia, [
+                EvidenciaIncidencia(
+                    incidencia_id=rng.choice(self.incidencias),
+                    tipo_archivo_evidencia=tipo,
+                    archivo_evidencia=None,
+                )
+                for tipo in rng.choices(tipos, cum_weights=pesos_tipos, k=len(indices))
+            ])
+        return cantidad
+
+    def cargar_amonestaciones(self, cantidad):
+        """Genera amonestaciones con fechas estacionales."""
+        rng = self._rng('amonestaciones')
+        tipos = Amonestacion.TipoAmonestacion.values
+        motivos = Amonestacion.MotivoAmonestacion.values
+        fechas, pesos_fechas = self._fechas_estacionales()
+
+        for indices in batched(range(cantidad), self.lote):
+            objetos = []
+            fechas_amonestacion = rng.choices(fechas, cum_weights=pesos_fechas, k=len(indices))
+            for i, fecha_amonestacion in zip(indices, fechas_amonestacion):
+                tipo = rng.choice(tipos)
+                motivo = rng.choice(motivos)
+                objetos.append(Amonestacion(
+                    tipo_amonestacion=tipo,
+                    motivo=motivo,
+                    motivo_detalle=f'Motivo detallado de la amonestación número {i + 1}' if motivo == 'OTRO' else None,
+                    fecha_amonestacion=fecha_amonestacion,
+                    nombre_amonestado=rng.choice(NOMBRES),
+                    apellidos_amonestado=f'{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}',
+                    rut_amonestado=rut_con_digito(rng.randint(5_000_000, 25_000_000)),
+                    numero_departamento=f'{rng.randint(1, 20)}{rng.randint(1, 15):02d}',
+                    # Fecha límite de pago solo si es MULTA
+                    fecha_limite_pago=fecha_amonestacion + timedelta(days=30) if tipo == 'MULTA' else None,
+                    usuario_reporta_id=rng.choice(self.usuarios),
+                ))
+            self._guardar(Amonestacion, objetos)
+        return cantidad
@@ -2,145 +2,301 @@
 Management command para cargar las regiones y comunas de Chile.
 
 Este comando pobla la base de datos con las 16 regiones de Chile
-y sus respectivas comunas.
+y sus respectivas comunas. Se puede volver a ejecutar sin problemas: lee
+las filas existentes en una consulta, calcula en memoria qué falta o
+cambió y aplica solo esa diferencia, con inserciones masivas dentro de
+una transacción.
+
+Por defecto usa los datos incluidos en este archivo. Con --fuente se
+cargan desde un archivo externo:
+
+- CSV con encabezado y una fila por comuna:
+      codigo,region,numero_romano,comuna
+      RM,Región Metropolitana de Santiago,XIII,Santiago
+- JSON con la misma estructura que REGIONES_COMUNAS:
+      {"RM": {"nombre": "...", "numero_romano": "XIII", "comunas": ["Santiago", ...]}}
+
+Las regiones y comunas que no están en la fuente no se eliminan (pueden
+tener condominios asociados); solo se informan.
 
 Uso:
     python manage.py cargar_regiones_comunas
+    python manage.py cargar_regiones_comunas --fuente regiones.csv
+    python manage.py cargar_regiones_comunas --fuente regiones.json --simular
 """
 
-from django.core.management.base import BaseCommand
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from mi_condominio import ai_cache
+from mi_condominio.catalogo import invalidar_catalogo
 from mi_condominio.models import Region, Comuna
 
 
+# Datos de regiones y comunas
+REGIONES_COMUNAS = {
+    'XV': {
+        'nombre': 'Región de Arica y Parinacota',
+        'numero_romano': 'XV',
+        'comunas': ['Arica', 'Camarones', 'Putre', 'General Lagos']
+    },
+    'I': {
+        'nombre': 'Región de Tarapacá',
+        'numero_romano': 'I',
+        'comunas': ['Iquique', 'Alto Hospicio', 'Pozo Almonte', 'Camiña', 'Colchane', 'Huara', 'Pica']
+    },
+    'II': {
+        'nombre': 'Región de Antofagasta',
+        'numero_romano': 'II',
+        'comunas': ['Antofagasta', 'Mejillones', 'Sierra Gorda', 'Taltal', 'Calama', 'Ollagüe', 'San Pedro de Atacama', 'Tocopilla', 'María Elena']
+    },
+    'III': {
+        'nombre': 'Región de Atacama',
+        'numero_romano': 'III',
+        'comunas': ['Copiapó', 'Caldera', 'Tierra Amarilla', 'Chañaral', 'Diego de Almagro', 'Vallenar', 'Alto del Carmen', 'Freirina', 'Huasco']
+    },
+    'IV': {
+        'nombre': 'Región de Coquimbo',
+        'numero_romano': 'IV',
+        'comunas': ['La Serena', 'Coquimbo', 'Andacollo', 'La Higuera', 'Paiguano', 'Vicuña', 'Illapel', 'Canela', 'Los Vilos', 'Salamanca', 'Ovalle', 'Combarbalá', 'Monte Patria', 'Punitaqui', 'Río Hurtado']
+    },
+    'V': {
+        'nombre': 'Región de Valparaíso',
+        'numero_romano': 'V',
+        'comunas': ['Valparaíso', 'Casablanca', 'Concón', 'Juan Fernández', 'Puchuncaví', 'Quintero', 'Viña del Mar', 'Isla de Pascua', 'Los Andes', 'Calle Larga', 'Rinconada', 'San Esteban', 'La Ligua', 'Cabildo', 'Papudo', 'Petorca', 'Zapallar', 'Quillota', 'Calera', 'Hijuelas', 'La Cruz', 'Nogales', 'San Antonio', 'Algarrobo', 'Cartagena', 'El Quisco', 'El Tabo', 'Santo Domingo', 'San Felipe', 'Catemu', 'Llaillay', 'Panquehue', 'Putaendo', 'Santa María', 'Quilpué', 'Limache', 'Olmué', 'Villa Alemana']
+    },
+    'RM': {
+        'nombre': 'Región Metropolitana de Santiago',
+        'numero_romano': 'XIII',
+        'comunas': ['Cerrillos', 'Cerro Navia', 'Conchalí', 'El Bosque', 'Estación Central', 'Huechuraba', 'Independencia', 'La Cisterna', 'La Florida', 'La Granja', 'La Pintana', 'La Reina', 'Las Condes', 'Lo Barnechea', 'Lo Espejo', 'Lo Prado', 'Macul', 'Maipú', 'Ñuñoa', 'Pedro Aguirre Cerda', 'Peñalolén', 'Providencia', 'Pudahuel', 'Quilicura', 'Quinta Normal', 'Recoleta', 'Renca', 'San Joaquín', 'San Miguel', 'San Ramón', 'Vitacura', 'Puente Alto', 'Pirque', 'San José de Maipo', 'Colina', 'Lampa', 'Tiltil', 'San Bernardo', 'Buin', 'Calera de Tango', 'Paine', 'Melipilla', 'Alhué', 'Curacaví', 'María Pinto', 'San Pedro', 'Talagante', 'El Monte', 'Isla de Maipo', 'Padre Hurtado', 'Peñaflor', 'Santiago']
+    },
+    'VI': {
+        'nombre': 'Región del Libertador General Bernardo O\'Higgins',
+        'numero_romano': 'VI',
+        'comunas': ['Rancagua', 'Codegua', 'Coinco', 'Coltauco', 'Doñihue', 'Graneros', 'Las Cabras', 'Machalí', 'Malloa', 'Mostazal', 'Olivar', 'Peumo', 'Pichidegua', 'Quinta de Tilcoco', 'Rengo', 'Requínoa', 'San Vicente', 'Pichilemu', 'La Estrella', 'Litueche', 'Marchihue', 'Navidad', 'Paredones', 'San Fernando', 'Chépica', 'Chimbarongo', 'Lolol', 'Nancagua', 'Palmilla', 'Peralillo', 'Placilla', 'Pumanque', 'Santa Cruz']
+    },
+    'VII': {
+        'nombre': 'Región del Maule',
+        'numero_romano': 'VII',
+        'comunas': ['Talca', 'ConsVitución', 'Curepto', 'Empedrado', 'Maule', 'Pelarco', 'Pencahue', 'Río Claro', 'San Clemente', 'San Rafael', 'Cauquenes', 'Chanco', 'Pelluhue', 'Curicó', 'Hualañé', 'Licantén', 'Molina', 'Rauco', 'Romeral', 'Sagrada Familia', 'Teno', 'Vichuquén', 'Linares', 'Colbún', 'Longaví', 'Parral', 'Retiro', 'San Javier', 'Villa Alegre', 'Yerbas Buenas']
+    },
+    'VIII': {
+        'nombre': 'Región del Biobío',
+        'numero_romano': 'VIII',
+        'comunas': ['Concepción', 'Coronel', 'Chiguayante', 'Florida', 'Hualqui', 'Lota', 'Penco', 'San Pedro de la Paz', 'Santa Juana', 'Talcahuano', 'Tomé', 'Hualpén', 'Lebu', 'Arauco', 'Cañete', 'Contulmo', 'Curanilahue', 'Los Álamos', 'Tirúa', 'Los Ángeles', 'Antuco', 'Cabrero', 'Laja', 'Mulchén', 'Nacimiento', 'Negrete', 'Quilaco', 'Quilleco', 'San Rosendo', 'Santa Bárbara', 'Tucapel', 'Yumbel', 'Alto Biobío', 'Chillán', 'Bulnes', 'Cobquecura', 'Coelemu', 'Coihueco', 'Chillán Viejo', 'El Carmen', 'Ninhue', 'Ñiquén', 'Pemuco', 'Pinto', 'Portezuelo', 'Quillón', 'Quirihue', 'Ránquil', 'San Carlos', 'San Fabián', 'San Ignacio', 'San Nicolás', 'Treguaco', 'Yungay']
+    },
+    'IX': {
+        'nombre': 'Región de La Araucanía',
+        'numero_romano': 'IX',
+        'comunas': ['Temuco', 'Carahue', 'Cunco', 'Curarrehue', 'Freire', 'Galvarino', 'Gorbea', 'Lautaro', 'Loncoche', 'Melipeuco', 'Nueva Imperial', 'Padre Las Casas', 'Perquenco', 'Pitrufquén', 'Pucón', 'Saavedra', 'Teodoro Schmidt', 'Toltén', 'Vilcún', 'Villarrica', 'Cholchol', 'Angol', 'Collipulli', 'Curacautín', 'Ercilla', 'Lonquimay', 'Los Sauces', 'Lumaco', 'Purén', 'Renaico', 'Traiguén', 'Victoria']
+    },
+    'XIV': {
+        'nombre': 'Región de Los Ríos',
+        'numero_romano': 'XIV',
+        'comunas': ['Valdivia', 'Corral', 'Lanco', 'Los Lagos', 'Máfil', 'Mariquina', 'Paillaco', 'Panguipulli', 'La Unión', 'Futrono', 'Lago Ranco', 'Río Bueno']
+    },
+    'X': {
+        'nombre': 'Región de Los Lagos',
+        'numero_romano': 'X',
+        'comunas': ['Puerto Montt', 'Calbuco', 'Cochamó', 'Fresia', 'Frutillar', 'Los Muermos', 'Llanquihue', 'Maullín', 'Puerto Varas', 'Castro', 'Ancud', 'Chonchi', 'Curaco de Vélez', 'Dalcahue', 'Puqueldón', 'Queilén', 'Quellón', 'Quemchi', 'Quinchao', 'Osorno', 'Puerto Octay', 'Purranque', 'Puyehue', 'Río Negro', 'San Juan de la Costa', 'San Pablo', 'Chaitén', 'Futaleufú', 'Hualaihué', 'Palena']
+    },
+    'XI': {
+        'nombre': 'Región Aysén del General Carlos Ibáñez del Campo',
+        'numero_romano': 'XI',
+        'comunas': ['Coyhaique', 'Lago Verde', 'Aysén', 'Cisnes', 'Guaitecas', 'Cochrane', 'O\'Higgins', 'Tortel', 'Chile Chico', 'Río Ibáñez']
+    },
+    'XII': {
+        'nombre': 'Región de Magallanes y de la Antártica Chilena',
+        'numero_romano': 'XII',
+        'comunas': ['Punta Arenas', 'Laguna Blanca', 'Río Verde', 'San Gregorio', 'Cabo de Hornos', 'Antártica', 'Porvenir', 'Primavera', 'Timaukel', 'Natales', 'Torres del Paine']
+    },
+}
+
+
 class Command(BaseCommand):
     help = 'Carga las regiones y comunas de Chile en la base de datos'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--fuente',
+                            help='Archivo CSV o JSON con las regiones y comunas (por defecto: datos incluidos)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Muestra los cambios sin aplicarlos')
+
     def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
         self.stdout.write('Iniciando carga de regiones y comunas de Chile...\n')
+        inicio = time.perf_counter()
 
-        # Datos de regiones y comunas
-        regiones_comunas = {
-            'XV': {
-                'nombre': 'Región de Arica y Parinacota',
-                'numero_romano': 'XV',
-                'comunas': ['Arica', 'Camarones', 'Putre', 'General Lagos']
-            },
-            'I': {
-                'nombre': 'Región de Tarapacá',
-                'numero_romano': 'I',
-                'comunas': ['Iquique', 'Alto Hospicio', 'Pozo Almonte', 'Camiña', 'Colchane', 'Huara', 'Pica']
-            },
-            'II': {
-                'nombre': 'Región de Antofagasta',
-                'numero_romano': 'II',
-                'comunas': ['Antofagasta', 'Mejillones', 'Sierra Gorda', 'Taltal', 'Calama', 'Ollagüe', 'San Pedro de Atacama', 'Tocopilla', 'María Elena']
-            },
-            'III': {
-                'nombre': 'Región de Atacama',
-                'numero_romano': 'III',
-                'comunas': ['Copiapó', 'Caldera', 'Tierra Amarilla', 'Chañaral', 'Diego de Almagro', 'Vallenar', 'Alto del Carmen', 'Freirina', 'Huasco']
-            },
-            'IV': {
-                'nombre': 'Región de Coquimbo',
-                'numero_romano': 'IV',
-                'comunas': ['La Serena', 'Coquimbo', 'Andacollo', 'La Higuera', 'Paiguano', 'Vicuña', 'Illapel', 'Canela', 'Los Vilos', 'Salamanca', 'Ovalle', 'Combarbalá', 'Monte Patria', 'Punitaqui', 'Río Hurtado']
-            },
-            'V': {
-                'nombre': 'Región de Valparaíso',
-                'numero_romano': 'V',
-                'comunas': ['Valparaíso', 'Casablanca', 'Concón', 'Juan Fernández', 'Puchuncaví', 'Quintero', 'Viña del Mar', 'Isla de Pascua', 'Los Andes', 'Calle Larga', 'Rinconada', 'San Esteban', 'La Ligua', 'Cabildo', 'Papudo', 'Petorca', 'Zapallar', 'Quillota', 'Calera', 'Hijuelas', 'La Cruz', 'Nogales', 'San Antonio', 'Algarrobo', 'Cartagena', 'El Quisco', 'El Tabo', 'Santo Domingo', 'San Felipe', 'Catemu', 'Llaillay', 'Panquehue', 'Putaendo', 'Santa María', 'Quilpué', 'Limache', 'Olmué', 'Villa Alemana']
-            },
-            'RM': {
-                'nombre': 'Región Metropolitana de Santiago',
-                'numero_romano': 'XIII',
-                'comunas': ['Cerrillos', 'Cerro Navia', 'Conchalí', 'El Bosque', 'Estación Central', 'Huechuraba', 'Independencia', 'La Cisterna', 'La Florida', 'La Granja', 'La Pintana', 'La Reina', 'Las Condes', 'Lo Barnechea', 'Lo Espejo', 'Lo Prado', 'Macul', 'Maipú', 'Ñuñoa', 'Pedro Aguirre Cerda', 'Peñalolén', 'Providencia', 'Pudahuel', 'Quilicura', 'Quinta Normal', 'Recoleta', 'Renca', 'San Joaquín', 'San Miguel', 'San Ramón', 'Vitacura', 'Puente Alto', 'Pirque', 'San José de Maipo', 'Colina', 'Lampa', 'Tiltil', 'San Bernardo', 'Buin', 'Calera de Tango', 'Paine', 'Melipilla', 'Alhué', 'Curacaví', 'María Pinto', 'San Pedro', 'Talagante', 'El Monte', 'Isla de Maipo', 'Padre Hurtado', 'Peñaflor', 'Santiago']
-            },
-            'VI': {
-                'nombre': 'Región del Libertador General Bernardo O\'Higgins',
-                'numero_romano': 'VI',
-                'comunas': ['Rancagua', 'Codegua', 'Coinco', 'Coltauco', 'Doñihue', 'Graneros', 'Las Cabras', 'Machalí', 'Malloa', 'Mostazal', 'Olivar', 'Peumo', 'Pichidegua', 'Quinta de Tilcoco', 'Rengo', 'Requínoa', 'San Vicente', 'Pichilemu', 'La Estrella', 'Litueche', 'Marchihue', 'Navidad', 'Paredones', 'San Fernando', 'Chépica', 'Chimbarongo', 'Lolol', 'Nancagua', 'Palmilla', 'Peralillo', 'Placilla', 'Pumanque', 'Santa Cruz']
-            },
-            'VII': {
-                'nombre': 'Región del Maule',
-                'numero_romano': 'VII',
-                'comunas': ['Talca', 'ConsVitución', 'Curepto', 'Empedrado', 'Maule', 'Pelarco', 'Pencahue', 'Río Claro', 'San Clemente', 'San Rafael', 'Cauquenes', 'Chanco', 'Pelluhue', 'Curicó', 'Hualañé', 'Licantén', 'Molina', 'Rauco', 'Romeral', 'Sagrada Familia', 'Teno', 'Vichuquén', 'Linares', 'Colbún', 'Longaví', 'Parral', 'Retiro', 'San Javier', 'Villa Alegre', 'Yerbas Buenas']
-            },
-            'VIII': {
-                'nombre': 'Región del Biobío',
-                'numero_romano': 'VIII',
-                'comunas': ['Concepción', 'Coronel', 'Chiguayante', 'Florida', 'Hualqui', 'Lota', 'Penco', 'San Pedro de la Paz', 'Santa Juana', 'Talcahuano', 'Tomé', 'Hualpén', 'Lebu', 'Arauco', 'Cañete', 'Contulmo', 'Curanilahue', 'Los Álamos', 'Tirúa', 'Los Ángeles', 'Antuco', 'Cabrero', 'Laja', 'Mulchén', 'Nacimiento', 'Negrete', 'Quilaco', 'Quilleco', 'San Rosendo', 'Santa Bárbara', 'Tucapel', 'Yumbel', 'Alto Biobío', 'Chillán', 'Bulnes', 'Cobquecura', 'Coelemu', 'Coihueco', 'Chillán Viejo', 'El Carmen', 'Ninhue', 'Ñiquén', 'Pemuco', 'Pinto', 'Portezuelo', 'Quillón', 'Quirihue', 'Ránquil', 'San Carlos', 'San Fabián', 'San Ignacio', 'San Nicolás', 'Treguaco', 'Yungay']
-            },
-            'IX': {
-                'nombre': 'Región de La Araucanía',
-                'numero_romano': 'IX',
-                'comunas': ['Temuco', 'Carahue', 'Cunco', 'Curarrehue', 'Freire', 'Galvarino', 'Gorbea', 'Lautaro', 'Loncoche', 'Melipeuco', 'Nueva Imperial', 'Padre Las Casas', 'Perquenco', 'Pitrufquén', 'Pucón', 'Saavedra', 'Teodoro Schmidt', 'Toltén', 'Vilcún', 'Villarrica', 'Cholchol', 'Angol', 'Collipulli', 'Curacautín', 'Ercilla', 'Lonquimay', 'Los Sauces', 'Lumaco', 'Purén', 'Renaico', 'Traiguén', 'Victoria']
-            },
-            'XIV': {
-                'nombre': 'Región de Los Ríos',
-                'numero_romano': 'XIV',
-                'comunas': ['Valdivia', 'Corral', 'Lanco', 'Los Lagos', 'Máfil', 'Mariquina', 'Paillaco', 'Panguipulli', 'La Unión', 'Futrono', 'Lago Ranco', 'Río Bueno']
-            },
-            'X': {
-                'nombre': 'Región de Los Lagos',
-                'numero_romano': 'X',
-                'comunas': ['Puerto Montt', 'Calbuco', 'Cochamó', 'Fresia', 'Frutillar', 'Los Muermos', 'Llanquihue', 'Maullín', 'Puerto Varas', 'Castro', 'Ancud', 'Chonchi', 'Curaco de Vélez', 'Dalcahue', 'Puqueldón', 'Queilén', 'Quellón', 'Quemchi', 'Quinchao', 'Osorno', 'Puerto Octay', 'Purranque', 'Puyehue', 'Río Negro', 'San Juan de la Costa', 'San Pablo', 'Chaitén', 'Futaleufú', 'Hualaihué', 'Palena']
-            },
-            'XI': {
-                'nombre': 'Región Aysén del General Carlos Ibáñez del Campo',
-                'numero_romano': 'XI',
-                'comunas': ['Coyhaique', 'Lago Verde', 'Aysén', 'Cisnes', 'Guaitecas', 'Cochrane', 'O\'Higgins', 'Tortel', 'Chile Chico', 'Río Ibáñez']
-            },
-            'XII': {
-                'nombre': 'Región de Magallanes y de la Antártica Chilena',
-                'numero_romano': 'XII',
-                'comunas': ['Punta Arenas', 'Laguna Blanca', 'Río Verde', 'San Gregorio', 'Cabo de Hornos', 'Antártica', 'Porvenir', 'Primavera', 'Timaukel', 'Natales', 'Torres del Paine']
-            },
-        }
+        if options['fuente']:
+            regiones_comunas = self._leer_fuente(options['fuente'])
+        else:
+            regiones_comunas = REGIONES_COMUNAS
+        regiones_comunas = self._normalizar(regiones_comunas)
 
-        # Contadores
-        regiones_creadas = 0
-        regiones_existentes = 0
-        comunas_creadas = 0
-        comunas_existentes = 0
+        # Filas existentes: una consulta por modelo
+        regiones_existentes = {
+            codigo: (nombre, numero_romano)
+            for codigo, nombre, numero_romano in Region.objects.values_list('codigo', 'nombre', 'numero_romano')
+        }
+        comunas_existentes = set(Comuna.objects.values_list('region__codigo', 'nombre'))
 
-        # Cargar regiones y comunas
+        # Diferencia calculada en memoria
+        regiones_nuevas = []
+        regiones_modificadas = []
         for codigo, data in regiones_comunas.items():
-            # Crear o obtener región
-            region, created = Region.objects.get_or_create(
-                codigo=codigo,
-                defaults={
-                    'nombre': data['nombre'],
-                    'numero_romano': data['numero_romano']
-                }
-            )
-
-            if created:
-                regiones_creadas += 1
-                self.stdout.write(f'  ✅ Región creada: {region.nombre}')
-            else:
-                regiones_existentes += 1
-                self.stdout.write(f'  ℹ️  Región ya existe: {region.nombre}')
-
-            # Crear comunas para esta región
-            for nombre_comuna in data['comunas']:
-                comuna, created = Comuna.objects.get_or_create(
-                    region=region,
-                    nombre=nombre_comuna
-                )
-
-                if created:
-                    comunas_creadas += 1
-                else:
-                    comunas_existentes += 1
+            valores = (data['nombre'], data['numero_romano'])
+            if codigo not in regiones_existentes:
+                regiones_nuevas.append(codigo)
+            elif regiones_existentes[codigo] != valores:
+                regiones_modificadas.append(codigo)
+
+        comunas_nuevas = [
+            (codigo, nombre_comuna)
+            for codigo, data in regiones_comunas.items()
+            for nombre_comuna in data['comunas']
+            if (codigo, nombre_comuna) not in comunas_existentes
+        ]
+        comunas_fuente = {
+            (codigo, nombre_comuna)
+            for codigo, data in regiones_comunas.items() for nombre_comuna in data['comunas']
+        }
+        regiones_ausentes = set(regiones_existentes) - set(regiones_comunas)
+        comunas_ausentes = comunas_existentes - comunas_fuente
+
+        for codigo in regiones_nuevas:
+            self.stdout.write(f'  ✅ Región nueva: {regiones_comunas[codigo]["nombre"]}')
+        for codigo in regiones_modificadas:
+            self.stdout.write(f'  🔄 Región modificada: {regiones_comunas[codigo]["nombre"]}')
+
+        hay_cambios = regiones_nuevas or regiones_modificadas or comunas_nuevas
+        if options['simular']:
+            self.stdout.write(self.style.WARNING('\n⚠️  Simulación: no se aplicaron cambios'))
+        elif hay_cambios:
+            self._aplicar(regiones_comunas, regiones_nuevas + regiones_modificadas, comunas_nuevas)
+
+            # bulk_create no emite señales: se invalidan aquí el catálogo de
+            # los formularios (catalogo.py) y el caché del asistente de IA
+            invalidar_catalogo()
+            ai_cache.invalidar_modelo(Region)
+            ai_cache.invalidar_modelo(Comuna)
 
         # Resumen
         self.stdout.write('\n' + '='*60)
         self.stdout.write(self.style.SUCCESS('✅ Carga completada exitosamente!\n'))
         self.stdout.write(f'📊 Resumen:')
-        self.stdout.write(f'   • Regiones creadas: {regiones_creadas}')
-        self.stdout.write(f'   • Regiones existentes: {regiones_existentes}')
-        self.stdout.write(f'   • Comunas creadas: {comunas_creadas}')
-        self.stdout.write(f'   • Comunas existentes: {comunas_existentes}')
-        self.stdout.write(f'   • Total regiones: {Region.objects.count()}')
-        self.stdout.write(f'   • Total comunas: {Comuna.objects.count()}')
+        self.stdout.write(f'   • Regiones creadas: {len(regiones_nuevas)}')
+        self.stdout.write(f'   • Regiones actualizadas: {len(regiones_modificadas)}')
+        self.stdout.write(f'   • Regiones sin cambios: '
+                          f'{len(regiones_comunas) - len(regiones_nuevas) - len(regiones_modificadas)}')
+        self.stdout.write(f'   • Comunas creadas: {len(comunas_nuevas)}')
+        self.stdout.write(f'   • Comunas existentes: {len(comunas_fuente) - len(comunas_nuevas)}')
+        if regiones_ausentes or comunas_ausentes:
+            self.stdout.write(self.style.WARNING(
+                f'   ⚠️  En la base de datos pero no en la fuente: {len(regiones_ausentes)} regiones, '
+                f'{len(comunas_ausentes)} comunas (no se eliminan)'
+            ))
+        self.stdout.write(f'   • Duración: {(time.perf_counter() - inicio) * 1000:.0f} ms')
         self.stdout.write('='*60)
+
+    def _aplicar(self, regiones_comunas, codigos_regiones, comunas_nuevas):
+        """Inserta o actualiza las regiones y crea las comunas faltantes, en una transacción."""
+        try:
+            with transaction.atomic():
+                if codigos_regiones:
+                    Region.objects.bulk_create(
+                        [
+                            Region(
+                                codigo=codigo,
+                                nombre=regiones_comunas[codigo]['nombre'],
+                                numero_romano=regiones_comunas[codigo]['numero_romano'],
+                            )
+                            for codigo in codigos_regiones
+                        ],
+                        update_conflicts=True,
+                        unique_fields=['codigo'],
+                        update_fields=['nombre', 'numero_romano', 'updated_at'],
+                    )
+
+                if comunas_nuevas:
+                    ids_regiones = dict(Region.objects.values_list('codigo', 'id'))
+                    # Comuna solo tiene su clave (región, nombre): no hay columnas
+                    # que actualizar, así que un conflicto (otra carga en paralelo)
+                    # se ignora
+                    Comuna.objects.bulk_create(
+                        [Comuna(region_id=ids_regiones[codigo], nombre=nombre) for codigo, nombre in comunas_nuevas],
+                        ignore_conflicts=True,
+                    )
+        except DatabaseError as e:
+            # Por ejemplo, una región nueva con el nombre de otra ya existente
+            raise CommandError(f'No se pudo aplicar la carga (no se guardó ningún cambio): {e}')
+
+    def _leer_fuente(self, ruta):
+        """Lee un archivo CSV o JSON y lo convierte a la estructura de REGIONES_COMUNAS."""
+        extension = os.path.splitext(ruta)[1].lower()
+        try:
+            with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+                if extension == '.json':
+                    return json.load(archivo)
+                if extension == '.csv':
+                    return self._leer_csv(archivo)
+        except OSError as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+        except (ValueError, KeyError) as e:
+            raise CommandError(f'Formato inválido en {ruta}: {e}')
+        raise CommandError('La fuente debe ser un archivo .csv o .json')
+
+    def _leer_csv(self, archivo):
+        regiones_comunas = {}
+        for fila in csv.DictReader(archivo):
+            codigo = fila['codigo'].strip()
+            region = regiones_comunas.setdefault(codigo, {
+                'nombre': fila['region'].strip(),
+                'numero_romano': (fila.get('numero_romano') or '').strip(),
+                'comunas': [],
+            })
+            if fila['region'].strip() != region['nombre']:
+                raise ValueError(f'la región {codigo} tiene más de un nombre')
+            if comuna := (fila.get('comuna') or '').strip():
+                region['comunas'].append(comuna)
+        return regiones_comunas
+
+    def _normalizar(self, regiones_comunas):
+        """Valida la fuente antes de tocar la base de datos y la retorna normalizada."""
+        if not isinstance(regiones_comunas, dict) or not regiones_comunas:
+            raise CommandError('La fuente no contiene regiones')
+
+        normalizadas = {}
+        nombres = set()
+        for codigo, data in regiones_comunas.items():
+            if (not isinstance(data, dict) or not isinstance(data.get('nombre'), str) or not data['nombre']
+                    or not isinstance(data.get('comunas', []), list)
+                    or not isinstance(data.get('numero_romano') or '', str)):
+                raise CommandError(f'Región {codigo}: se requieren "nombre" y una lista "comunas" (textos)')
+            if not all(isinstance(comuna, str) and comuna.strip() for comuna in data.get('comunas', [])):
+                raise CommandError(f'Región {codigo}: hay comunas sin nombre')
+            for campo, valor in (('codigo', codigo), ('nombre', data['nombre']),
+                                 ('numero_romano', data.get('numero_romano') or '')):
+                largo = Region._meta.get_field(campo).max_length
+                if len(valor) > largo:
+                    raise CommandError(f'Región {codigo}: "{campo}" admite hasta {largo} caracteres')
+            largo_comuna = Comuna._meta.get_field('nombre').max_length
+            if any(len(comuna.strip()) > largo_comuna for comuna in data.get('comunas', [])):
+                raise CommandError(f'Región {codigo}: los nombres de comuna admiten hasta {largo_comuna} caracteres')
+            if data['nombre'] in nombres:
+                raise CommandError(f'Región {codigo}: el nombre "{data["nombre"]}" está repetido')
+            nombres.add(data['nombre'])
+
+            normalizadas[codigo] = {
+                'nombre': data['nombre'],
+                'numero_romano': data.get('numero_romano') or None,
+                # Una comuna repetida en la misma región se carga una sola vez
+                'comunas': list(dict.fromkeys(comuna.strip() for comuna in data.get('comunas', []))),
+            }
+        return normalizadas
@@ -0,0 +1,78 @@
+"""
+Comando de Django para generar las miniaturas y vistas previas de las evidencias.
+
+Las evidencias nuevas obtienen sus derivados en segundo plano al subirse
+(ver ``mi_condominio/derivados.py``). Este comando genera los de las
+evidencias que no los tienen: las anteriores a esta funcionalidad o las
+subidas cuando Pillow o ffmpeg no estaban instalados.
+
+Uso:
+    python manage.py generar_derivados_evidencias
+    python manage.py generar_derivados_evidencias --hilos 4
+    python manage.py generar_derivados_evidencias --regenerar
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from mi_condominio import derivados
+from mi_condominio.models import EvidenciaIncidencia
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas y vistas previas WebP de las evidencias de imagen y video'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=2,
+                            help='Evidencias procesadas en paralelo (por defecto: 2)')
+        parser.add_argument('--regenerar', action='store_true',
+                            help='Vuelve a generar también los derivados existentes')
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        if not derivados.pillow_disponible():
+            raise CommandError('Pillow no está instalado. Instálalo con: pip install pillow')
+
+        self.stdout.write(self.style.SUCCESS('=== Generando derivados de evidencias ===\n'))
+        if not derivados.ffmpeg_disponible():
+            self.stdout.write(self.style.WARNING('⚠️  ffmpeg no está disponible: se omitirán los videos'))
+
+        evidencias = EvidenciaIncidencia.objects.filter(
+            tipo_archivo_evidencia__in=[EvidenciaIncidencia.TipoArchivo.IMAGEN, EvidenciaIncidencia.TipoArchivo.VIDEO]
+        ).exclude(Q(archivo_evidencia='') | Q(archivo_evidencia__isnull=True))
+        if not options['regenerar']:
+            evidencias = evidencias.filter(Q(miniatura='') | Q(miniatura__isnull=True))
+
+        pendientes = [e for e in evidencias.order_by('id') if derivados.admite_derivados(e)]
+        self.stdout.write(f'  • Evidencias a procesar: {len(pendientes)}')
+
+        def procesar(evidencia):
+            try:
+                return derivados.generar_derivados(evidencia, regenerar=options['regenerar']), None
+            except Exception as e:
+                return False, f'{evidencia.id}: {e}'
+            finally:
+                connection.close()
+
+        inicio = time.perf_counter()
+        generadas = 0
+        errores = []
+        with ThreadPoolExecutor(max_workers=max(options['hilos'], 1)) as pool:
+            for generado, error in pool.map(procesar, pendientes):
+                generadas += generado
+                if error:
+                    errores.append(error)
+
+        for error in errores:
+            self.stdout.write(self.style.ERROR(f'  ✗ Evidencia {error}'))
+
+        self.stdout.write(f'\n  • Derivados generados: {generadas}')
+        self.stdout.write(f'  • Omitidas o con error: {len(pendientes) - generadas}')
+        self.stdout.write(f'  • Duración: {time.perf_counter() - inicio:.1f} s')
+        self.stdout.write('\n' + self.style.SUCCESS('✓ Proceso completado exitosamente'))
@@ -0,0 +1,365 @@
+"""
+Comando de Django para importar evidencias en masa desde un directorio.
+
+Pensado para las carpetas de fotos que entregan los equipos en terreno. Cada
+archivo se asigna a una incidencia con --incidencia (todo el directorio) o
+con un archivo de mapeo (--mapeo) que asocia carpetas o archivos a IDs de
+incidencia. El mapeo puede ser CSV (columnas ruta,incidencia) o JSON
+({"ruta": incidencia}); las rutas son relativas al directorio importado y
+gana la más específica:
+
+    ruta,incidencia
+    edificio_a,120
+    edificio_a/filtraciones,121
+
+Los archivos se procesan en varios procesos: en cada uno se valida el tipo
+por su firma (magic bytes; los archivos sin extensión conocida reciben la
+que corresponde a su contenido), se calcula el SHA-256 y se copia al
+almacenamiento por contenido con os.copy_file_range (o sendfile), sin pasar
+los datos por Python. Los contenidos que ya estaban guardados no se copian.
+Las evidencias se insertan con bulk_create por lotes; un archivo que ya
+está como evidencia de la misma incidencia se omite, así que el comando se
+puede repetir si se interrumpe.
+
+Las miniaturas se generan después con generar_derivados_evidencias.
+
+Uso:
+    python manage.py importar_evidencias /ruta/fotos --incidencia 120
+    python manage.py importar_evidencias /ruta/fotos --mapeo mapeo.csv
+    python manage.py importar_evidencias /ruta/fotos --mapeo mapeo.json --procesos 8 --simular
+"""
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mi_condominio import validacion_archivos
+from mi_condominio.almacenamiento import almacenamiento_evidencias, ruta_contenido
+from mi_condominio.models import ArchivoEvidencia, EvidenciaIncidencia, Incidencia
+
+
+# Tamaño de lectura al calcular el hash
+TAMANO_LECTURA = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Importa en masa los archivos de un directorio como evidencias de incidencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directorio', help='Directorio con los archivos a importar')
+        destino = parser.add_mutually_exclusive_group(required=True)
+        destino.add_argument('--incidencia', type=int,
+                             help='ID de la incidencia a la que se asignan todos los archivos')
+        destino.add_argument('--mapeo',
+                             help='Archivo CSV (ruta,incidencia) o JSON ({"ruta": incidencia}) con la incidencia de cada carpeta o archivo')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Procesos para validar, calcular el hash y copiar (por defecto: núcleos del equipo)')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Evidencias insertadas por consulta (por defecto: 500)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Valida y calcula los hashes sin copiar archivos ni crear evidencias')
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        raiz = os.path.abspath(options['directorio'])
+        if not os.path.isdir(raiz):
+            raise CommandError(f'No existe el directorio: {raiz}')
+
+        storage = almacenamiento_evidencias()
+        try:
+            destino = storage.path('')
+        except NotImplementedError:
+            raise CommandError('El almacenamiento de evidencias no es local; este comando copia a un disco local.')
+
+        if options['mapeo']:
+            mapeo = self._leer_mapeo(options['mapeo'])
+        else:
+            mapeo = {'': options['incidencia']}
+
+        ids = set(mapeo.values())
+        existentes = set(Incidencia.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if ids - existentes:
+            raise CommandError(f'No existen las incidencias: {", ".join(map(str, sorted(ids - existentes)))}')
+
+        self.simular = options['simular']
+        self.verbosity = options['verbosity']
+        self.lote = max(options['lote'], 1)
+
+        self.stdout.write(self.style.SUCCESS('=== Importando evidencias ===\n'))
+        self.stdout.write(f'  • Directorio: {raiz}')
+
+        archivos, sin_incidencia = self._listar(raiz, mapeo)
+        self.stdout.write(f'  • Archivos a procesar: {len(archivos)}')
+        if sin_incidencia:
+            self.stdout.write(self.style.WARNING(f'⚠️  Archivos sin incidencia en el mapeo (se omiten): {len(sin_incidencia)}'))
+            self._detalle(sin_incidencia)
+
+        self.estadisticas = Counter()
+        self.rechazados = []
+        pendientes = []
+        inicio = time.perf_counter()
+        self.tiempo_bd = 0.0
+
+        argumentos = [
+            (ruta, destino, storage.file_permissions_mode, not self.simular)
+            for ruta, _ in archivos
+        ]
+        with ProcessPoolExecutor(max_workers=max(options['procesos'], 1)) as pool:
+            resultados = pool.map(procesar_archivo, argumentos, chunksize=8)
+            for (ruta, incidencia_id), resultado in zip(archivos, resultados):
+                if resultado['error']:
+                    self.rechazados.append(f'{os.path.relpath(ruta, raiz)}: {resultado["error"]}')
+                    continue
+
+                self.estadisticas['bytes'] += resultado['tamano']
+                self.estadisticas['copiados' if resultado['copiado'] else 'existentes'] += 1
+                pendientes.append((incidencia_id, resultado))
+                if len(pendientes) >= self.lote:
+                    self._guardar(pendientes)
+                    pendientes = []
+        if pendientes:
+            self._guardar(pendientes)
+
+        self._informe(time.perf_counter() - inicio)
+
+    def _leer_mapeo(self, ruta):
+        """Lee el mapeo {ruta relativa: id de incidencia} de un CSV o un JSON."""
+        try:
+            with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+                if ruta.lower().endswith('.json'):
+                    datos = json.load(archivo)
+                    filas = datos.items() if isinstance(datos, dict) else []
+                else:
+                    filas = [
+                        (fila.get('ruta', ''), fila.get('incidencia'))
+                        for fila in csv.DictReader(archivo)
+                    ]
+            mapeo = {_normalizar(r): int(i) for r, i in filas}
+        except (OSError, ValueError, TypeError) as e:
+            raise CommandError(f'No se pudo leer el mapeo {ruta}: {e}')
+
+        if not mapeo:
+            raise CommandError(f'El mapeo {ruta} está vacío o no tiene las columnas ruta,incidencia')
+        return mapeo
+
+    def _listar(self, raiz, mapeo):
+        """Archivos del directorio con la incidencia que les corresponde según el mapeo."""
+        archivos = []
+        sin_incidencia = []
+        for directorio, subdirectorios, nombres in os.walk(raiz):
+            subdirectorios[:] = sorted(d for d in subdirectorios if not d.startswith('.'))
+            for nombre in sorted(nombres):
+                if nombre.startswith('.'):
+                    continue
+                ruta = os.path.join(directorio, nombre)
+                relativa = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+                incidencia_id = _incidencia_de(relativa, mapeo)
+                if incidencia_id is None:
+                    sin_incidencia.append(relativa)
+                else:
+                    archivos.append((ruta, incidencia_id))
+        return archivos, sin_incidencia
+
+    def _guardar(self, pendientes):
+        """Crea las evidencias de un lote y suma sus referencias."""
+        if self.simular:
+            self.estadisticas['importados'] += len(pendientes)
+            return
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            # Las que ya se importaron (por ejemplo, en una ejecución interrumpida)
+            ya_importadas = set(EvidenciaIncidencia.objects.filter(
+                incidencia_id__in={incidencia_id for incidencia_id, _ in pendientes},
+                archivo_evidencia__in={resultado['nombre'] for _, resultado in pendientes},
+            ).values_list('incidencia_id', 'archivo_evidencia'))
+
+            evidencias = []
+            for incidencia_id, resultado in pendientes:
+                clave = (incidencia_id, resultado['nombre'])
+                if clave in ya_importadas:
+                    self.estadisticas['omitidos'] += 1
+                    continue
+                ya_importadas.add(clave)
+                evidencias.append(EvidenciaIncidencia(
+                    incidencia_id=incidencia_id,
+                    tipo_archivo_evidencia=resultado['tipo'],
+                    archivo_evidencia=resultado['nombre'],
+                    nombre_original=resultado['nombre_original'][:255],
+                ))
+
+            EvidenciaIncidencia.objects.bulk_create(evidencias, batch_size=self.lote)
+            # bulk_create no pasa por save(): las referencias se suman aquí
+            ArchivoEvidencia.referenciar_varios(
+                Counter(evidencia.archivo_evidencia.name for evidencia in evidencias),
+                tamanos={resultado['nombre']: resultado['tamano'] for _, resultado in pendientes},
+            )
+
+        self.estadisticas['importados'] += len(evidencias)
+        self.tiempo_bd += time.perf_counter() - inicio
+
+    def _informe(self, duracion):
+        e = self.estadisticas
+        megabytes = e['bytes'] / (1024 * 1024)
+        procesados = e['copiados'] + e['existentes']
+
+        if self.rechazados:
+            self.stdout.write(self.style.WARNING(f'\n⚠️  Archivos rechazados: {len(self.rechazados)}'))
+            self._detalle(self.rechazados)
+
+        self.stdout.write(f'\n  • Evidencias creadas: {e["importados"]}')
+        self.stdout.write(f'  • Omitidas (ya importadas): {e["omitidos"]}')
+        self.stdout.write(f'  • Archivos {"a copiar" if self.simular else "copiados"}: {e["copiados"]}')
+        self.stdout.write(f'  • Contenido ya guardado (no se copió): {e["existentes"]}')
+        self.stdout.write(f'  • Datos procesados: {megabytes:.1f} MB')
+        self.stdout.write(f'  • Duración: {duracion:.1f} s (base de datos: {self.tiempo_bd:.1f} s)')
+        if duracion > 0:
+            self.stdout.write(f'  • Rendimiento: {procesados / duracion:.1f} archivos/s, {megabytes / duracion:.1f} MB/s')
+
+        if self.simular:
+            self.stdout.write('\n' + self.style.WARNING('Simulación: no se copió ningún archivo ni se creó ninguna evidencia'))
+        else:
+            if e['importados']:
+                self.stdout.write('\n  Para generar las miniaturas: python manage.py generar_derivados_evidencias')
+            self.stdout.write('\n' + self.style.SUCCESS('✓ Proceso completado exitosamente'))
+
+    def _detalle(self, lineas, maximo=20):
+        """Muestra las primeras líneas (todas con -v 2)."""
+        visibles = lineas if self.verbosity >= 2 else lineas[:maximo]
+        for linea in visibles:
+            self.stdout.write(f'    - {linea}')
+        if len(lineas) > len(visibles):
+            self.stdout.write(f'    ... y {len(lineas) - len(visibles)} más (use -v 2 para verlos todos)')
+
+
+def _normalizar(ruta):
+    """Ruta del mapeo en el formato de las rutas relativas de los archivos ('' es la raíz)."""
+    ruta = os.path.normpath(ruta or '.').replace(os.sep, '/').strip('/')
+    return '' if ruta == '.' else ruta
+
+
+def _incidencia_de(relativa, mapeo):
+    """Incidencia de la entrada más específica del mapeo que contiene ``relativa``."""
+    ruta = relativa
+    while True:
+        if ruta in mapeo:
+            return mapeo[ruta]
+        if not ruta:
+            return None
+        ruta = os.path.dirname(ruta)
+
+
+def procesar_archivo(argumentos):
+    """
+    Valida, calcula el hash y copia un archivo (se ejecuta en otro proceso).
+
+    Returns:
+        dict con nombre (en el almacenamiento), nombre_original, tipo, tamano,
+        copiado (False si el contenido ya estaba guardado) y error
+    """
+    ruta, destino, permisos, copiar = argumentos
+    nombre_original = os.path.basename(ruta)
+    resultado = {'nombre_original': nombre_original, 'error': None}
+    try:
+        tamano = os.path.getsize(ruta)
+        validacion_archivos.validar_tamano(tamano)
+
+        calculo = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            cabecera = archivo.read(validacion_archivos.BYTES_CABECERA)
+            calculo.update(cabecera)
+            while bloque := archivo.read(TAMANO_LECTURA):
+                calculo.update(bloque)
+
+        base, extension = os.path.splitext(nombre_original)
+        if validacion_archivos.detectar_tipo(nombre_original) == 'OTRO':
+            # Sin extensión conocida: la que corresponde al contenido
+            extension = validacion_archivos.detectar_extension(cabecera) or extension
+        nombre_validado = base + extension
+        tipo = validacion_archivos.detectar_tipo(nombre_validado)
+        validacion_archivos.validar_cabecera(nombre_validado, cabecera)
+
+        nombre = ruta_contenido(calculo.hexdigest(), extension)
+        if copiar:
+            copiado = _copiar(ruta, os.path.join(destino, nombre), tamano, permisos)
+        else:
+            copiado = not os.path.exists(os.path.join(destino, nombre))
+    except ValidationError as e:
+        resultado['error'] = e.messages[0]
+        return resultado
+    except OSError as e:
+        resultado['error'] = str(e)
+        return resultado
+
+    resultado.update(nombre=nombre, tipo=tipo, tamano=tamano, copiado=copiado)
+    return resultado
+
+
+def _copiar(origen, destino, tamano, permisos):
+    """Copia ``origen`` al almacenamiento salvo que el contenido ya exista; retorna True si lo copió."""
+    if os.path.exists(destino):
+        try:
+            # Renovar la fecha: la limpieza no elimina archivos reutilizados recién
+            os.utime(destino)
+            return False
+        except FileNotFoundError:
+            # La limpieza lo retiró entretanto (ver limpieza_archivos.eliminar_ruta)
+            pass
+
+    directorio = os.path.dirname(destino)
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with open(origen, 'rb') as fuente, os.fdopen(descriptor, 'wb') as copia:
+            _copiar_contenido(fuente, copia, tamano)
+        if permisos is not None:
+            os.chmod(temporal, permisos)
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return True
+
+
+def _copiar_contenido(fuente, copia, tamano):
+    """
+    Copia el contenido dentro del kernel: copy_file_range (que en algunos
+    sistemas de archivos solo clona los bloques) o, si no está disponible,
+    sendfile. Como último recurso, una copia normal.
+    """
+    copiados = 0
+    try:
+        while copiados < tamano:
+            enviados = os.copy_file_range(fuente.fileno(), copia.fileno(), tamano - copiados)
+            if not enviados:
+                break
+            copiados += enviados
+        return
+    except (AttributeError, OSError):
+        pass
+
+    try:
+        while copiados < tamano:
+            enviados = os.sendfile(copia.fileno(), fuente.fileno(), copiados, tamano - copiados)
+            if not enviados:
+                break
+            copiados += enviados
+        return
+    except (AttributeError, OSError):
+        pass
+
+    fuente.seek(copiados)
+    copia.seek(copiados)
+    shutil.copyfileobj(fuente, copia)
@@ -0,0 +1,115 @@
+"""
+Comando de Django para eliminar los archivos de evidencia que ya nadie usa.
+
+Los archivos de evidencia se guardan una vez por contenido y ArchivoEvidencia
+cuenta cuántas evidencias usan cada uno (ver almacenamiento.py). Un archivo
+que queda sin referencias normalmente se elimina al confirmarse la
+transacción (ver limpieza_archivos.py); este comando elimina, junto con su
+miniatura y vista previa, los que quedaron sin referencias hace más del
+período de gracia y siguen en el disco (por ejemplo, porque el proceso se
+detuvo antes de eliminarlos).
+
+El período de gracia evita borrar un archivo que una subida en curso está
+reutilizando. Los archivos sin registro en la base de datos los elimina
+reconciliar_archivos_evidencias.
+
+Uso:
+    python manage.py recolectar_archivos_evidencias
+    python manage.py recolectar_archivos_evidencias --gracia 48
+    python manage.py recolectar_archivos_evidencias --simular
+
+Programación sugerida (cron, todos los días a las 04:00):
+    0 4 * * * cd /ruta/al/proyecto && python manage.py recolectar_archivos_evidencias
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from mi_condominio.almacenamiento import PREFIJO_CONTENIDO, almacenamiento_evidencias
+from mi_condominio.limpieza_archivos import eliminar_archivo
+from mi_condominio.models import ArchivoEvidencia
+
+
+class Command(BaseCommand):
+    help = 'Elimina los archivos de evidencia que quedaron sin referencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gracia', type=float, default=settings.EVIDENCIAS_GRACIA_RECOLECCION_HORAS,
+                            help='Horas que se conserva un archivo sin uso antes de eliminarlo '
+                                 f'(por defecto: {settings.EVIDENCIAS_GRACIA_RECOLECCION_HORAS})')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Archivos sin referencias procesados por consulta (por defecto: 500)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo muestra lo que se eliminaría')
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        self.storage = almacenamiento_evidencias()
+        try:
+            self.storage.path(PREFIJO_CONTENIDO)
+        except NotImplementedError:
+            raise CommandError('El almacenamiento de evidencias no es local; este comando solo recorre discos locales.')
+
+        self.simular = options['simular']
+        self.limite = timezone.now() - timedelta(hours=options['gracia'])
+        self.bytes_liberados = 0
+
+        self.stdout.write(self.style.SUCCESS('=== Recolectando archivos de evidencias ===\n'))
+        self.stdout.write(f'  • Sin uso desde antes de: {self.limite.strftime("%d/%m/%Y %H:%M")}')
+
+        liberados = self._recolectar_liberados(options['lote'])
+
+        self.stdout.write(f'\n  • Archivos sin referencias eliminados: {liberados}')
+        self.stdout.write(f'  • Espacio liberado: {self.bytes_liberados / (1024 * 1024):.1f} MB')
+        self._resumen_almacenamiento()
+
+        if self.simular:
+            self.stdout.write('\n' + self.style.WARNING('Simulación: no se eliminó ningún archivo'))
+        else:
+            self.stdout.write('\n' + self.style.SUCCESS('✓ Proceso completado exitosamente'))
+
+    def _recolectar_liberados(self, lote):
+        """Elimina los archivos registrados que quedaron sin referencias."""
+        candidatos = ArchivoEvidencia.objects.filter(referencias=0, liberado_at__lt=self.limite)
+        total = 0
+        ultimo_id = 0
+
+        while True:
+            archivos = list(candidatos.filter(id__gt=ultimo_id).order_by('id')[:lote])
+            if not archivos:
+                break
+            ultimo_id = archivos[-1].id
+
+            for archivo in archivos:
+                if self.simular:
+                    total += 1
+                    self.bytes_liberados += archivo.tamano or 0
+                    continue
+
+                with transaction.atomic():
+                    # Condicional: si una subida volvió a referenciarlo, no se elimina
+                    borrados, _ = candidatos.filter(pk=archivo.pk).delete()
+                if not borrados:
+                    continue
+                liberados = eliminar_archivo(self.storage, archivo.nombre, self.limite)
+                if liberados is not None:
+                    total += 1
+                    self.bytes_liberados += liberados
+        return total
+
+    def _resumen_almacenamiento(self):
+        """Espacio usado y ahorrado por la deduplicación."""
+        resumen = ArchivoEvidencia.objects.filter(referencias__gt=0).aggregate(
+            guardado=Sum('tamano', default=0),
+            referenciado=Sum(F('tamano') * F('referencias'), default=0),
+        )
+        ahorro = resumen['referenciado'] - resumen['guardado']
+        self.stdout.write(f'  • Espacio en uso: {resumen["guardado"] / (1024 * 1024):.1f} MB')
+        self.stdout.write(f'  • Ahorrado por deduplicación: {ahorro / (1024 * 1024):.1f} MB')
@@ -0,0 +1,227 @@
+"""
+Comando de Django para reconciliar los archivos de evidencia del disco con la base de datos.
+
+1. Corrige los contadores de ArchivoEvidencia que no coinciden con las
+   evidencias que usan cada archivo, y registra los archivos de evidencias
+   que no tienen fila en ArchivoEvidencia.
+2. Recorre MEDIA_ROOT/evidencias/ directorio por directorio, con varios
+   hilos, y busca:
+   - Huérfanos: archivos (originales, derivados o temporales abandonados)
+     que ninguna evidencia usa. Por ejemplo, de una subida cuya transacción
+     se revirtió o de una eliminación que no alcanzó a hacerse. Solo se
+     consideran los modificados antes del período de gracia.
+   - Registros de ArchivoEvidencia cuyo archivo ya no existe.
+
+Por defecto solo informa; con --purgar corrige los contadores y elimina los
+huérfanos. Los directorios se procesan en orden y el comando informa su
+avance: si se interrumpe, se puede continuar con --desde.
+
+Uso:
+    python manage.py reconciliar_archivos_evidencias
+    python manage.py reconciliar_archivos_evidencias --purgar
+    python manage.py reconciliar_archivos_evidencias --purgar --hilos 8 --desde evidencias/cas/7f
+
+Programación sugerida (cron, los domingos a las 05:00):
+    0 5 * * 0 cd /ruta/al/proyecto && python manage.py reconciliar_archivos_evidencias --purgar
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from mi_condominio.almacenamiento import almacenamiento_evidencias
+from mi_condominio.limpieza_archivos import eliminar_ruta, es_anterior
+from mi_condominio.models import ArchivoEvidencia, EvidenciaIncidencia
+
+
+# Carpeta de las evidencias dentro del almacenamiento
+CARPETA_EVIDENCIAS = 'evidencias'
+
+
+class Command(BaseCommand):
+    help = 'Compara los archivos de evidencia del disco con la base de datos y elimina los huérfanos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purgar', action='store_true',
+                            help='Elimina los huérfanos y corrige los contadores (por defecto solo informa)')
+        parser.add_argument('--hilos', type=int, default=4,
+                            help='Directorios revisados en paralelo (por defecto: 4)')
+        parser.add_argument('--desde', default='',
+                            help='Continúa desde este directorio (por ejemplo, evidencias/cas/7f)')
+        parser.add_argument('--gracia', type=float, default=settings.EVIDENCIAS_GRACIA_RECOLECCION_HORAS,
+                            help='Horas sin modificar para considerar huérfano un archivo '
+                                 f'(por defecto: {settings.EVIDENCIAS_GRACIA_RECOLECCION_HORAS})')
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        self.storage = almacenamiento_evidencias()
+        try:
+            raiz = self.storage.path(CARPETA_EVIDENCIAS)
+        except NotImplementedError:
+            raise CommandError('El almacenamiento de evidencias no es local; este comando solo recorre discos locales.')
+
+        self.purgar = options['purgar']
+        self.verbosity = options['verbosity']
+        self.limite = timezone.now() - timedelta(hours=options['gracia'])
+        hilos = max(options['hilos'], 1)
+
+        self.stdout.write(self.style.SUCCESS('=== Reconciliando archivos de evidencias ===\n'))
+        if not self.purgar:
+            self.stdout.write(self.style.WARNING('⚠️  Solo se informa; use --purgar para aplicar los cambios\n'))
+
+        inicio = time.perf_counter()
+        self._reconciliar_contadores()
+
+        directorios = [d for d in self._directorios(raiz) if d >= options['desde']]
+        self.stdout.write(f'\n  • Directorios a revisar: {len(directorios)}')
+
+        totales = {'archivos': 0, 'huerfanos': 0, 'bytes': 0, 'sin_archivo': 0}
+        # Se envían por tandas: la memoria no crece con la cantidad de directorios
+        tanda = hilos * 8
+        siguiente = None
+        try:
+            with ThreadPoolExecutor(max_workers=hilos) as pool:
+                for desde in range(0, len(directorios), tanda):
+                    siguiente = directorios[desde]
+                    for resultado in pool.map(self._revisar, directorios[desde:desde + tanda]):
+                        for clave, valor in resultado.items():
+                            totales[clave] += valor
+                    self._informar(f'    Revisado hasta: {directorios[min(desde + tanda, len(directorios)) - 1]}')
+        except KeyboardInterrupt:
+            raise CommandError(f'Interrumpido. Para continuar: --desde {siguiente}')
+
+        accion = 'eliminados' if self.purgar else 'encontrados'
+        self.stdout.write(f'\n  • Archivos revisados: {totales["archivos"]}')
+        self.stdout.write(f'  • Huérfanos {accion}: {totales["huerfanos"]} '
+                          f'({totales["bytes"] / (1024 * 1024):.1f} MB)')
+        self.stdout.write(f'  • Registros sin archivo en el disco: {totales["sin_archivo"]}')
+        self.stdout.write(f'  • Duración: {time.perf_counter() - inicio:.1f} s')
+        self.stdout.write('\n' + self.style.SUCCESS('✓ Proceso completado exitosamente'))
+
+    def _directorios(self, raiz):
+        """Directorios bajo ``raiz`` (nombres relativos al almacenamiento), ordenados."""
+        directorios = []
+        for directorio, _, _ in os.walk(raiz):
+            directorios.append(os.path.relpath(directorio, self.storage.location).replace(os.sep, '/'))
+        return sorted(directorios)
+
+    def _reconciliar_contadores(self):
+        """Compara ArchivoEvidencia.referencias con las evidencias que usan cada archivo."""
+        usos = EvidenciaIncidencia.objects.filter(
+            archivo_evidencia=OuterRef('nombre')
+        ).order_by().values('archivo_evidencia').annotate(total=Count('pk')).values('total')
+        desajustados = list(
+            ArchivoEvidencia.objects.annotate(usos=Coalesce(Subquery(usos), 0))
+            .exclude(referencias=F('usos')).values_list('pk', flat=True)
+        )
+
+        sin_registro = list(
+            EvidenciaIncidencia.objects.exclude(Q(archivo_evidencia='') | Q(archivo_evidencia__isnull=True))
+            .exclude(archivo_evidencia__in=ArchivoEvidencia.objects.values('nombre'))
+            .values('archivo_evidencia').annotate(total=Count('pk')).values_list('archivo_evidencia', 'total')
+        )
+
+        self.stdout.write(f'  • Contadores de referencias incorrectos: {len(desajustados)}')
+        self.stdout.write(f'  • Archivos en uso sin registro: {len(sin_registro)}')
+        if not self.purgar:
+            return
+
+        for pk in desajustados:
+            with transaction.atomic():
+                # Con la fila bloqueada, referenciar/liberar esperan al recuento
+                archivo = ArchivoEvidencia.objects.select_for_update().filter(pk=pk).first()
+                if archivo is None:
+                    continue
+                archivo.referencias = EvidenciaIncidencia.objects.filter(archivo_evidencia=archivo.nombre).count()
+                if archivo.referencias:
+                    archivo.liberado_at = None
+                elif archivo.liberado_at is None:
+                    archivo.liberado_at = timezone.now()
+                archivo.save(update_fields=['referencias', 'liberado_at'])
+
+        for nombre, total in sin_registro:
+            try:
+                tamano = self.storage.size(nombre)
+            except OSError:
+                tamano = None
+            try:
+                with transaction.atomic():
+                    ArchivoEvidencia.objects.create(nombre=nombre, tamano=tamano, referencias=total)
+            except IntegrityError:
+                pass  # Se registró mientras tanto; la próxima ejecución lo verifica
+
+    def _revisar(self, directorio):
+        """Revisa los archivos de un directorio (sin sus subdirectorios)."""
+        try:
+            return self._revisar_directorio(directorio)
+        finally:
+            # Cada hilo usa su propia conexión
+            connection.close()
+
+    def _revisar_directorio(self, directorio):
+        ruta_directorio = self.storage.path(directorio)
+        with os.scandir(ruta_directorio) as entradas:
+            nombres = {
+                f'{directorio}/{entrada.name}': entrada.path
+                for entrada in entradas if entrada.is_file(follow_symlinks=False)
+            }
+
+        resultado = {'archivos': len(nombres), 'huerfanos': 0, 'bytes': 0, 'sin_archivo': 0}
+
+        registrados = ArchivoEvidencia.objects.filter(nombre__startswith=f'{directorio}/')
+        for nombre in registrados.values_list('nombre', flat=True):
+            if os.path.dirname(nombre) == directorio and nombre not in nombres:
+                resultado['sin_archivo'] += 1
+                self._informar(f'  ⚠️  Registrado sin archivo: {nombre}')
+
+        antiguos = [nombre for nombre, ruta in nombres.items() if es_anterior(ruta, self.limite)]
+        if not antiguos:
+            return resultado
+
+        en_uso = set(
+            ArchivoEvidencia.objects.filter(nombre__in=antiguos, referencias__gt=0).values_list('nombre', flat=True)
+        )
+        for campo in ('archivo_evidencia', 'miniatura', 'vista_previa'):
+            en_uso.update(
+                EvidenciaIncidencia.objects.filter(**{f'{campo}__in': antiguos}).values_list(campo, flat=True)
+            )
+
+        huerfanos = [nombre for nombre in antiguos if nombre not in en_uso]
+        if huerfanos and self.purgar:
+            ArchivoEvidencia.objects.filter(nombre__in=huerfanos, referencias=0).delete()
+
+        for nombre in huerfanos:
+            # Se vuelven a comprobar la fecha y la base de datos: una subida
+            # puede haberlo reutilizado recién (ver eliminar_ruta)
+            liberados = eliminar_ruta(
+                nombres[nombre], self.limite, en_uso=lambda nombre=nombre: self._en_uso(nombre),
+                simular=not self.purgar,
+            )
+            if liberados is not None:
+                resultado['huerfanos'] += 1
+                resultado['bytes'] += liberados
+                self._informar(f'  • Huérfano: {nombre}')
+        return resultado
+
+    def _en_uso(self, nombre):
+        """Indica si alguna evidencia usa ``nombre`` como archivo o derivado."""
+        return (
+            ArchivoEvidencia.objects.filter(nombre=nombre, referencias__gt=0).exists()
+            or EvidenciaIncidencia.objects.filter(
+                Q(archivo_evidencia=nombre) | Q(miniatura=nombre) | Q(vista_previa=nombre)
+            ).exists()
+        )
+
+    def _informar(self, mensaje):
+        if self.verbosity >= 2:
+            self.stdout.write(mensaje)
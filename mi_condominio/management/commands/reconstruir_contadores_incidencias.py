@@ -0,0 +1,29 @@
+"""
+Comando de Django para reconstruir los contadores de incidencias.
+
+Recalcula la tabla ContadorIncidencias desde cero a partir de las
+incidencias existentes. Útil después de cargas o actualizaciones masivas
+que no pasan por Incidencia.save().
+
+Uso:
+    python manage.py reconstruir_contadores_incidencias
+"""
+
+from django.core.management.base import BaseCommand
+from mi_condominio.models import ContadorIncidencias, Incidencia
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de incidencias por condominio, estado, prioridad y categoría'
+
+    def handle(self, *args, **options):
+        """
+        Método principal que ejecuta el comando.
+        """
+        self.stdout.write(self.style.SUCCESS('=== Reconstruyendo contadores de incidencias ===\n'))
+
+        total_contadores = ContadorIncidencias.reconstruir()
+
+        self.stdout.write(f'  • Incidencias contadas: {Incidencia.objects.count()}')
+        self.stdout.write(f'  • Contadores creados: {total_contadores}')
+        self.stdout.write('\n' + self.style.SUCCESS('✓ Proceso completado exitosamente'))
@@ -0,0 +1,118 @@
+"""
+Middleware de la aplicación Mi Condominio.
+
+``PerfilUsuarioMiddleware`` agrega ``request.usuario``: el Usuario vinculado
+al User autenticado mediante la relación ``perfil_usuario``. Se resuelve
+solo cuando una vista lo usa y se guarda en la sesión, de modo que las
+solicitudes siguientes no consultan la base de datos.
+
+La copia en la sesión se descarta cuando:
+
+- el perfil se modifica o elimina (las señales de ``signals.py`` cambian
+  su versión en el caché; ver ``invalidar_perfil_usuario``), o
+- tiene más de ``PERFIL_USUARIO_TTL`` segundos, lo que acota el desfase en
+  despliegues con varios procesos y caché local por proceso.
+"""
+
+import time
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core import serializers
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Usuario
+
+
+# Clave de la sesión donde se guarda el perfil
+CLAVE_SESION = 'perfil_usuario'
+
+# Segundos máximos que se reutiliza el perfil guardado en la sesión
+PERFIL_USUARIO_TTL = 300
+
+
+def _clave_version(usuario_id):
+    return f'perfil_usuario:version:{usuario_id}'
+
+
+def _version(usuario_id):
+    """Versión actual del perfil, inicializándola si no existe en el caché."""
+    clave = _clave_version(usuario_id)
+    # Partir desde la hora actual para que una versión desalojada no
+    # coincida con la guardada en sesiones anteriores
+    cache.add(clave, time.time_ns(), timeout=None)
+    return cache.get(clave)
+
+
+def invalidar_perfil_usuario(usuario_id):
+    """Descarta las copias en sesión del perfil indicado."""
+    try:
+        cache.incr(_clave_version(usuario_id))
+    except ValueError:
+        cache.set(_clave_version(usuario_id), time.time_ns(), timeout=None)
+
+
+def obtener_perfil_usuario(request):
+    """
+    Usuario vinculado al User autenticado, o None si no hay sesión o no tiene perfil.
+
+    Usa la copia guardada en la sesión si sigue vigente; si no, lo lee a
+    través de ``user.perfil_usuario`` y actualiza la sesión.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    guardado = request.session.get(CLAVE_SESION)
+    if (
+        guardado
+        and guardado['user_id'] == user.pk
+        and time.time() - guardado['cargado'] < PERFIL_USUARIO_TTL
+        and (guardado['usuario_id'] is None or guardado['version'] == _version(guardado['usuario_id']))
+    ):
+        if guardado['usuario_id'] is None:
+            return None
+        return next(serializers.deserialize('json', guardado['datos'])).object
+
+    try:
+        usuario = user.perfil_usuario
+    except Usuario.DoesNotExist:
+        usuario = None
+
+    request.session[CLAVE_SESION] = {
+        'user_id': user.pk,
+        'usuario_id': usuario.pk if usuario else None,
+        'version': _version(usuario.pk) if usuario else None,
+        'cargado': time.time(),
+        'datos': serializers.serialize('json', [usuario]) if usuario else None,
+    }
+    return usuario
+
+
+async def aobtener_perfil_usuario(request):
+    """Versión asíncrona de ``obtener_perfil_usuario``."""
+    return await sync_to_async(obtener_perfil_usuario)(request)
+
+
+class PerfilUsuarioMiddleware:
+    """
+    Agrega ``request.usuario`` (perezoso) y ``request.ausuario()`` para vistas asíncronas.
+
+    Funciona en modo síncrono y asíncrono. Debe ubicarse después de
+    ``AuthenticationMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.usuario = SimpleLazyObject(lambda: obtener_perfil_usuario(request))
+        request.ausuario = partial(aobtener_perfil_usuario, request)
+        # En modo asíncrono get_response retorna una corrutina que espera Django
+        return self.get_response(request)
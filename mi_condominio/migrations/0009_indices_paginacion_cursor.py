@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0008_alter_condominio_comuna_alter_condominio_region'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='amonestacion',
+            index=models.Index(fields=['-fecha_amonestacion', '-id'], name='amonestaciones_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=models.Index(fields=['-fecha_bitacora', '-id'], name='bitacoras_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='condominio',
+            index=models.Index(fields=['nombre', 'id'], name='condominios_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['-fecha_reporte', '-id'], name='incidencias_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reunion',
+            index=models.Index(fields=['-fecha_reunion', '-id'], name='reuniones_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['apellido', 'nombres', 'id'], name='usuarios_nombre_id_idx'),
+        ),
+    ]
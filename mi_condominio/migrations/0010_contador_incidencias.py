@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    """Calcula los contadores iniciales a partir de las incidencias existentes."""
+    Incidencia = apps.get_model('mi_condominio', 'Incidencia')
+    ContadorIncidencias = apps.get_model('mi_condominio', 'ContadorIncidencias')
+
+    grupos = (
+        Incidencia.objects.order_by()
+        .values('condominio_id', 'estado', 'prioridad', 'tipo_incidencia_id')
+        .annotate(total=Count('id'))
+    )
+    ContadorIncidencias.objects.bulk_create(ContadorIncidencias(**grupo) for grupo in grupos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0009_indices_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorIncidencias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('RESUELTA', 'Resuelta'), ('CERRADA', 'Cerrada'), ('CANCELADA', 'Cancelada')], help_text='Estado de las incidencias contadas', max_length=15)),
+                ('prioridad', models.CharField(choices=[('BAJA', 'Baja'), ('MEDIA', 'Media'), ('ALTA', 'Alta'), ('URGENTE', 'Urgente')], help_text='Prioridad de las incidencias contadas', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0, help_text='Cantidad de incidencias')),
+                ('condominio', models.ForeignKey(help_text='Condominio asociado', on_delete=django.db.models.deletion.CASCADE, related_name='contadores_incidencias', to='mi_condominio.condominio')),
+                ('tipo_incidencia', models.ForeignKey(help_text='Categoría de las incidencias contadas', on_delete=django.db.models.deletion.CASCADE, related_name='contadores_incidencias', to='mi_condominio.categoriaincidencia')),
+            ],
+            options={
+                'verbose_name': 'Contador de Incidencias',
+                'verbose_name_plural': 'Contadores de Incidencias',
+                'db_table': 'contador_incidencias',
+                'constraints': [models.UniqueConstraint(fields=('condominio', 'estado', 'prioridad', 'tipo_incidencia'), name='contador_incidencias_clave_unica')],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
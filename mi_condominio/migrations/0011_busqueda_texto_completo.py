@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:36
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0010_contador_incidencias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amonestacion',
+            name='vector_busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('motivo_detalle', config='spanish', weight='A'), '||', django.contrib.postgres.search.SearchVector('nombre_amonestado', 'apellidos_amonestado', config='spanish', weight='B'), django.contrib.postgres.search.SearchConfig('spanish')), '||', django.contrib.postgres.search.SearchVector('rut_amonestado', config='spanish', weight='C'), django.contrib.postgres.search.SearchConfig('spanish')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='bitacora',
+            name='vector_busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('accion', config='spanish', weight='A'), '||', django.contrib.postgres.search.SearchVector('detalle', config='spanish', weight='B'), django.contrib.postgres.search.SearchConfig('spanish')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='incidencia',
+            name='vector_busqueda',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('titulo', config='spanish', weight='A'), '||', django.contrib.postgres.search.SearchVector('descripcion', config='spanish', weight='B'), django.contrib.postgres.search.SearchConfig('spanish')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='amonestacion',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector_busqueda'], name='amonestaciones_busqueda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bitacora',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector_busqueda'], name='bitacoras_busqueda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector_busqueda'], name='incidencias_busqueda_idx'),
+        ),
+    ]
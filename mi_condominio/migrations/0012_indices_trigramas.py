@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:38
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0011_busqueda_texto_completo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='categoriaincidencia',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre_categoria_incidencia'], name='categorias_nombre_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='condominio',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre'], name='condominios_nombre_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombres'], name='usuarios_nombres_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['apellido'], name='usuarios_apellido_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
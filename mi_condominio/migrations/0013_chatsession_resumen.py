@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0012_indices_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='resumen',
+            field=models.TextField(blank=True, default='', help_text='Resumen de los mensajes antiguos de la sesión'),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='resumen_hasta_id',
+            field=models.BigIntegerField(blank=True, help_text='ID del último mensaje incluido en el resumen', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0013_chatsession_resumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='tokens_prompt',
+            field=models.IntegerField(blank=True, help_text='Tokens de prompt enviados en esta respuesta', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='tokens_prompt_cacheados',
+            field=models.IntegerField(blank=True, help_text='Tokens de prompt servidos desde el caché del proveedor', null=True),
+        ),
+    ]
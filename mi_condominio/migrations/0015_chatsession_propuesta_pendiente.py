@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0014_chatmessage_tokens_prompt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='propuesta_expira',
+            field=models.DateTimeField(blank=True, help_text='Fecha y hora en que vence la propuesta pendiente', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='propuesta_pendiente',
+            field=models.JSONField(blank=True, help_text='Acción propuesta pendiente de confirmación', null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='propuesta_token',
+            field=models.UUIDField(blank=True, help_text='Token que identifica la propuesta pendiente', null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0015_chatsession_propuesta_pendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSesionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sesion_id', models.BigIntegerField(help_text='ID que tenía la sesión antes de archivarse', unique=True)),
+                ('titulo', models.CharField(blank=True, max_length=255, null=True)),
+                ('total_mensajes', models.PositiveIntegerField(default=0)),
+                ('mensajes_comprimidos', models.BinaryField(help_text='Mensajes de la sesión en JSON comprimido con zlib')),
+                ('created_at', models.DateTimeField(help_text='Fecha de creación de la sesión original')),
+                ('updated_at', models.DateTimeField(help_text='Última actividad de la sesión original')),
+                ('archivada_at', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_sesiones_archivadas', to='mi_condominio.usuario')),
+            ],
+            options={
+                'verbose_name': 'Sesión de Chat Archivada',
+                'verbose_name_plural': 'Sesiones de Chat Archivadas',
+                'db_table': 'chat_sesiones_archivadas',
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['usuario', '-updated_at'], name='chat_arch_usuario_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:58
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0016_chatsesionarchivada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaEvidencia',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(help_text='Nombre original del archivo', max_length=255)),
+                ('tipo_archivo_evidencia', models.CharField(choices=[('IMAGEN', 'Imagen'), ('VIDEO', 'Video'), ('DOCUMENTO', 'Documento'), ('AUDIO', 'Audio'), ('OTRO', 'Otro')], help_text='Tipo de evidencia', max_length=15)),
+                ('tamano', models.BigIntegerField(help_text='Tamaño total declarado del archivo en bytes')),
+                ('recibido', models.BigIntegerField(default=0, help_text='Bytes recibidos hasta ahora')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('COMPLETADA', 'Completada'), ('RECHAZADA', 'Rechazada')], default='PENDIENTE', max_length=12)),
+                ('error', models.CharField(blank=True, default='', help_text='Motivo del rechazo', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('evidencia', models.ForeignKey(blank=True, help_text='Evidencia creada al completar la subida', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mi_condominio.evidenciaincidencia')),
+                ('incidencia', models.ForeignKey(help_text='Incidencia a la que se agregará la evidencia', on_delete=django.db.models.deletion.CASCADE, related_name='subidas_evidencia', to='mi_condominio.incidencia')),
+                ('user', models.ForeignKey(help_text='Usuario que realiza la subida', on_delete=django.db.models.deletion.CASCADE, related_name='subidas_evidencia', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida de Evidencia',
+                'verbose_name_plural': 'Subidas de Evidencias',
+                'db_table': 'evidencias_subidas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'updated_at'], name='evid_subida_estado_idx')],
+            },
+        ),
+    ]
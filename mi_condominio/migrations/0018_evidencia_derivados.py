@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0017_subidaevidencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenciaincidencia',
+            name='miniatura',
+            field=models.FileField(blank=True, editable=False, help_text='Miniatura WebP para listados', max_length=500, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='evidenciaincidencia',
+            name='vista_previa',
+            field=models.FileField(blank=True, editable=False, help_text='Vista previa WebP de tamaño medio', max_length=500, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:04
+
+import os
+import re
+
+import mi_condominio.almacenamiento
+import mi_condominio.models.evidencia
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Prefijo de fecha que agregaba la ruta anterior: 20231219_143025_foto.jpg
+_PREFIJO_FECHA = re.compile(r'^\d{8}_\d{6}_')
+
+
+def poblar_archivos(apps, schema_editor):
+    """
+    Registra los archivos existentes en ArchivoEvidencia con sus referencias
+    y recupera el nombre original de las evidencias.
+
+    Los archivos anteriores se mantienen en su ruta; solo los nuevos se
+    guardan por contenido.
+    """
+    EvidenciaIncidencia = apps.get_model('mi_condominio', 'EvidenciaIncidencia')
+    ArchivoEvidencia = apps.get_model('mi_condominio', 'ArchivoEvidencia')
+
+    con_archivo = EvidenciaIncidencia.objects.exclude(archivo_evidencia='').exclude(archivo_evidencia__isnull=True)
+
+    evidencias = list(con_archivo.only('id', 'archivo_evidencia'))
+    for evidencia in evidencias:
+        evidencia.nombre_original = _PREFIJO_FECHA.sub('', os.path.basename(evidencia.archivo_evidencia.name))[:255]
+    EvidenciaIncidencia.objects.bulk_update(evidencias, ['nombre_original'], batch_size=500)
+
+    storage = EvidenciaIncidencia._meta.get_field('archivo_evidencia').storage
+    archivos = []
+    for grupo in con_archivo.order_by().values('archivo_evidencia').annotate(total=Count('id')):
+        nombre = grupo['archivo_evidencia']
+        tamano = storage.size(nombre) if storage.exists(nombre) else None
+        archivos.append(ArchivoEvidencia(nombre=nombre, tamano=tamano, referencias=grupo['total']))
+    ArchivoEvidencia.objects.bulk_create(archivos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0018_evidencia_derivados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenciaincidencia',
+            name='nombre_original',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Nombre del archivo tal como se subió', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='evidenciaincidencia',
+            name='archivo_evidencia',
+            field=models.FileField(blank=True, help_text='Archivo de evidencia (imagen, video, documento, etc.)', max_length=500, null=True, storage=mi_condominio.almacenamiento.almacenamiento_evidencias, upload_to=mi_condominio.models.evidencia.evidencia_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='evidenciaincidencia',
+            name='miniatura',
+            field=models.FileField(blank=True, editable=False, help_text='Miniatura WebP para listados', max_length=500, null=True, storage=mi_condominio.almacenamiento.almacenamiento_evidencias, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='evidenciaincidencia',
+            name='vista_previa',
+            field=models.FileField(blank=True, editable=False, help_text='Vista previa WebP de tamaño medio', max_length=500, null=True, storage=mi_condominio.almacenamiento.almacenamiento_evidencias, upload_to=''),
+        ),
+        migrations.CreateModel(
+            name='ArchivoEvidencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Ruta del archivo en el almacenamiento', max_length=500, unique=True)),
+                ('sha256', models.CharField(blank=True, default='', help_text='Hash del contenido (vacío en archivos anteriores al almacenamiento por contenido)', max_length=64)),
+                ('tamano', models.BigIntegerField(blank=True, help_text='Tamaño en bytes', null=True)),
+                ('referencias', models.PositiveIntegerField(default=0, help_text='Evidencias que usan este archivo')),
+                ('liberado_at', models.DateTimeField(blank=True, help_text='Fecha en que quedó sin referencias', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo de Evidencia',
+                'verbose_name_plural': 'Archivos de Evidencias',
+                'db_table': 'evidencias_archivos',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('referencias', 0)), fields=['liberado_at'], name='evid_archivo_liberado_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_archivos, migrations.RunPython.noop),
+    ]
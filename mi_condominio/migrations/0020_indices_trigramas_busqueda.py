@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:39
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0019_almacenamiento_por_contenido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='amonestacion',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['rut_amonestado'], name='amonestaciones_rut_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['titulo'], name='incidencias_titulo_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
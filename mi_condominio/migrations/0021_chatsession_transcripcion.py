@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mi_condominio', '0020_indices_trigramas_busqueda'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='chatsession',
+            old_name='resumen',
+            new_name='transcripcion',
+        ),
+        migrations.RenameField(
+            model_name='chatsession',
+            old_name='resumen_hasta_id',
+            new_name='transcripcion_hasta_id',
+        ),
+        migrations.AlterField(
+            model_name='chatsession',
+            name='transcripcion',
+            field=models.TextField(blank=True, default='', help_text='Transcripción abreviada de los mensajes antiguos de la sesión'),
+        ),
+        migrations.AlterField(
+            model_name='chatsession',
+            name='transcripcion_hasta_id',
+            field=models.BigIntegerField(blank=True, help_text='ID del último mensaje incluido en la transcripción', null=True),
+        ),
+    ]
@@ -14,14 +14,15 @@ from .reunion import Reunion
 
 # Importar modelos de incidencias
 from .incidencia import CategoriaIncidencia, Incidencia
+from .contador_incidencias import ContadorIncidencias
 from .bitacora import Bitacora
-from .evidencia import EvidenciaIncidencia, evidencia_upload_path
+from .evidencia import EvidenciaIncidencia, ArchivoEvidencia, SubidaEvidencia, evidencia_upload_path
 
 # Importar modelo de amonestaciones
 from .amonestacion import Amonestacion
 
 # Importar modelos de chat (Asistente IA)
-from .chat import ChatSession, ChatMessage
+from .chat import ChatSession, ChatMessage, ChatSesionArchivada
 
 
 # Definir qué se exporta cuando se hace "from mi_condominio.models import *"
@@ -38,8 +39,11 @@ __all__ = [
     # Modelos de incidencias
     'CategoriaIncidencia',
     'Incidencia',
+    'ContadorIncidencias',
     'Bitacora',
     'EvidenciaIncidencia',
+    'ArchivoEvidencia',
+    'SubidaEvidencia',
     'evidencia_upload_path',
 
     # Modelo de amonestaciones
@@ -48,4 +52,5 @@ __all__ = [
     # Modelos de chat
     'ChatSession',
     'ChatMessage',
+    'ChatSesionArchivada',
 ]
@@ -5,6 +5,8 @@ Este módulo contiene el modelo Amonestacion que gestiona las sanciones
 aplicadas a los residentes de los condominios.
 """
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from .usuario import Usuario
 
@@ -100,11 +102,29 @@ class Amonestacion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Vector de búsqueda de texto completo, mantenido por PostgreSQL
+    vector_busqueda = models.GeneratedField(
+        expression=(
+            SearchVector('motivo_detalle', weight='A', config='spanish')
+            + SearchVector('nombre_amonestado', 'apellidos_amonestado', weight='B', config='spanish')
+            + SearchVector('rut_amonestado', weight='C', config='spanish')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+
     class Meta:
         db_table = 'amonestaciones'
         verbose_name = 'Amonestación'
         verbose_name_plural = 'Amonestaciones'
         ordering = ['-fecha_amonestacion']
+        indexes = [
+            # Clave de la paginación por cursor de los listados
+            models.Index(fields=['-fecha_amonestacion', '-id'], name='amonestaciones_fecha_id_idx'),
+            GinIndex(fields=['vector_busqueda'], name='amonestaciones_busqueda_idx'),
+            # Búsqueda por subcadena del RUT (pg_trgm)
+            GinIndex(fields=['rut_amonestado'], opclasses=['gin_trgm_ops'], name='amonestaciones_rut_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre_amonestado} {self.apellidos_amonestado} - {self.motivo}"
@@ -5,6 +5,8 @@ Este módulo contiene el modelo Bitacora que registra el seguimiento
 de las incidencias.
 """
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from .incidencia import Incidencia
 
@@ -44,11 +46,26 @@ class Bitacora(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Vector de búsqueda de texto completo, mantenido por PostgreSQL
+    vector_busqueda = models.GeneratedField(
+        expression=(
+            SearchVector('accion', weight='A', config='spanish')
+            + SearchVector('detalle', weight='B', config='spanish')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+
     class Meta:
         db_table = 'bitacoras'
         verbose_name = 'Bitácora'
         verbose_name_plural = 'Bitácoras'
         ordering = ['-fecha_bitacora']
+        indexes = [
+            # Clave de la paginación por cursor de los listados
+            models.Index(fields=['-fecha_bitacora', '-id'], name='bitacoras_fecha_id_idx'),
+            GinIndex(fields=['vector_busqueda'], name='bitacoras_busqueda_idx'),
+        ]
 
     def __str__(self):
         return f"Bitácora {self.id} - {self.incidencia.titulo}"
@@ -2,10 +2,15 @@
 Modelos para el Asistente de IA.
 
 Este módulo contiene los modelos ChatSession y ChatMessage que gestionan
-las conversaciones del asistente de IA con los usuarios.
+las conversaciones del asistente de IA con los usuarios, y
+ChatSesionArchivada, donde se guardan comprimidas las sesiones cerradas
+antiguas (ver el comando archivar_chats).
 """
 
-from django.db import models
+import json
+import zlib
+
+from django.db import models, transaction
 from .usuario import Usuario
 
 
@@ -18,6 +23,15 @@ class ChatSession(models.Model):
     titulo = models.CharField(max_length=255, blank=True, null=True, help_text="Título opcional para la sesión")
     activa = models.BooleanField(default=True, help_text="Indica si la sesión está activa")
 
+    # Transcripción abreviada de los mensajes que ya no caben en el contexto (ver ai_contexto.py)
+    transcripcion = models.TextField(blank=True, default='', help_text="Transcripción abreviada de los mensajes antiguos de la sesión")
+    transcripcion_hasta_id = models.BigIntegerField(null=True, blank=True, help_text="ID del último mensaje incluido en la transcripción")
+
+    # Propuesta del asistente que espera confirmación del usuario
+    propuesta_pendiente = models.JSONField(null=True, blank=True, help_text="Acción propuesta pendiente de confirmación")
+    propuesta_token = models.UUIDField(null=True, blank=True, help_text="Token que identifica la propuesta pendiente")
+    propuesta_expira = models.DateTimeField(null=True, blank=True, help_text="Fecha y hora en que vence la propuesta pendiente")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -48,6 +62,8 @@ class ChatMessage(models.Model):
 
     # Metadata para análisis y auditoría
     tokens_usados = models.IntegerField(null=True, blank=True, help_text="Tokens consumidos en esta respuesta")
+    tokens_prompt = models.IntegerField(null=True, blank=True, help_text="Tokens de prompt enviados en esta respuesta")
+    tokens_prompt_cacheados = models.IntegerField(null=True, blank=True, help_text="Tokens de prompt servidos desde el caché del proveedor")
     tool_calls = models.JSONField(null=True, blank=True, help_text="Llamadas a herramientas MCP realizadas")
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -61,3 +77,113 @@ class ChatMessage(models.Model):
     def __str__(self):
         preview = self.contenido[:50] + "..." if len(self.contenido) > 50 else self.contenido
         return f"{self.get_role_display()}: {preview}"
+
+
+class ChatSesionArchivada(models.Model):
+    """
+    Sesión de chat cerrada y archivada.
+
+    Guarda en una sola fila la sesión completa: sus mensajes se serializan
+    como JSON comprimido con zlib, y las filas originales de ChatSession y
+    ChatMessage se eliminan.
+    """
+    sesion_id = models.BigIntegerField(unique=True, help_text="ID que tenía la sesión antes de archivarse")
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='chat_sesiones_archivadas')
+    titulo = models.CharField(max_length=255, blank=True, null=True)
+    total_mensajes = models.PositiveIntegerField(default=0)
+    mensajes_comprimidos = models.BinaryField(help_text="Mensajes de la sesión en JSON comprimido con zlib")
+
+    created_at = models.DateTimeField(help_text="Fecha de creación de la sesión original")
+    updated_at = models.DateTimeField(help_text="Última actividad de la sesión original")
+    archivada_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'chat_sesiones_archivadas'
+        verbose_name = 'Sesión de Chat Archivada'
+        verbose_name_plural = 'Sesiones de Chat Archivadas'
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['usuario', '-updated_at'], name='chat_arch_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"Sesión archivada {self.sesion_id} - {self.usuario_id} ({self.created_at.strftime('%d/%m/%Y %H:%M')})"
+
+    @staticmethod
+    def comprimir(mensajes):
+        """Serializa y comprime una lista de mensajes (dicts)."""
+        return zlib.compress(
+            json.dumps(mensajes, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'),
+            level=9
+        )
+
+    @classmethod
+    def desde_sesion(cls, session, mensajes):
+        """
+        Crea (sin guardar) el archivo de una sesión.
+
+        Args:
+            session: ChatSession a archivar
+            mensajes: mensajes de la sesión como dicts, en orden
+        """
+        return cls(
+            sesion_id=session.id,
+            usuario_id=session.usuario_id,
+            titulo=session.titulo,
+            total_mensajes=len(mensajes),
+            mensajes_comprimidos=cls.comprimir(mensajes),
+            created_at=session.created_at,
+            updated_at=session.updated_at,
+        )
+
+    @classmethod
+    def archivar(cls, sesiones):
+        """
+        Archiva un lote de sesiones y elimina sus filas originales.
+
+        Las sesiones se bloquean (``select_for_update``) antes de leer sus
+        mensajes, y la lectura, la inserción de los archivos y el borrado
+        ocurren en la misma transacción: un mensaje que se guarde mientras
+        tanto espera el bloqueo y no se pierde sin quedar archivado. Los
+        mensajes de todo el lote se leen en una consulta y los archivos se
+        insertan con un bulk_create.
+
+        Args:
+            sesiones: lista de ChatSession
+
+        Returns:
+            int cantidad de mensajes archivados
+        """
+        with transaction.atomic():
+            bloqueadas = list(
+                ChatSession.objects.select_for_update()
+                .filter(id__in=[session.id for session in sesiones])
+                .order_by('id')
+                .only('id', 'usuario_id', 'titulo', 'created_at', 'updated_at')
+            )
+            por_sesion = {session.id: [] for session in bloqueadas}
+            filas = (
+                ChatMessage.objects.filter(sesion_id__in=por_sesion)
+                .order_by('sesion_id', 'id')
+                .values_list('sesion_id', 'id', 'role', 'contenido', 'created_at', 'tokens_usados')
+            )
+            for sesion_id, mensaje_id, role, contenido, created_at, tokens_usados in filas:
+                por_sesion[sesion_id].append({
+                    'id': mensaje_id,
+                    'role': role,
+                    'contenido': contenido,
+                    'created_at': created_at.isoformat(),
+                    'tokens_usados': tokens_usados,
+                })
+
+            cls.objects.bulk_create(
+                [cls.desde_sesion(session, por_sesion[session.id]) for session in bloqueadas],
+                ignore_conflicts=True
+            )
+            ChatSession.objects.filter(id__in=por_sesion).delete()
+
+        return sum(len(mensajes) for mensajes in por_sesion.values())
+
+    def mensajes(self):
+        """Lista de mensajes archivados (dicts con id, role, contenido, created_at, tokens_usados)."""
+        return json.loads(zlib.decompress(bytes(self.mensajes_comprimidos)).decode('utf-8'))
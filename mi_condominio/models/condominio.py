@@ -5,6 +5,7 @@ Este módulo contiene el modelo Condominio que representa las propiedades
 administradas en el sistema.
 """
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from .region import Region
 from .comuna import Comuna
@@ -67,6 +68,12 @@ class Condominio(models.Model):
         verbose_name = 'Condominio'
         verbose_name_plural = 'Condominios'
         ordering = ['nombre']
+        indexes = [
+            # Clave de la paginación por cursor de los listados
+            models.Index(fields=['nombre', 'id'], name='condominios_nombre_id_idx'),
+            # Resolución de nombres aproximados (pg_trgm)
+            GinIndex(fields=['nombre'], opclasses=['gin_trgm_ops'], name='condominios_nombre_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} - {self.comuna.nombre if self.comuna else 'Sin comuna'}"
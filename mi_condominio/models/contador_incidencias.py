@@ -0,0 +1,120 @@
+"""
+Modelo ContadorIncidencias.
+
+Este módulo contiene la tabla de contadores desnormalizados de incidencias
+por condominio, estado, prioridad y categoría, usada para las estadísticas
+de todo el portafolio sin recorrer la tabla de incidencias.
+"""
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
+
+from .condominio import Condominio
+from .incidencia import CategoriaIncidencia, Incidencia
+
+
+class ContadorIncidencias(models.Model):
+    """
+    Cantidad de incidencias por condominio × estado × prioridad × categoría.
+
+    Se mantiene de forma incremental en la misma transacción en que se
+    guarda o elimina cada Incidencia (ver ``Incidencia.save`` y
+    ``signals.py``). Las actualizaciones masivas con ``QuerySet.update()``
+    no pasan por esos caminos; después de ellas se debe ejecutar el
+    comando ``reconstruir_contadores_incidencias``.
+    """
+
+    condominio = models.ForeignKey(
+        Condominio,
+        on_delete=models.CASCADE,
+        related_name='contadores_incidencias',
+        help_text='Condominio asociado'
+    )
+
+    estado = models.CharField(
+        max_length=15,
+        choices=Incidencia.Estado.choices,
+        help_text='Estado de las incidencias contadas'
+    )
+
+    prioridad = models.CharField(
+        max_length=10,
+        choices=Incidencia.Prioridad.choices,
+        help_text='Prioridad de las incidencias contadas'
+    )
+
+    tipo_incidencia = models.ForeignKey(
+        CategoriaIncidencia,
+        on_delete=models.CASCADE,
+        related_name='contadores_incidencias',
+        help_text='Categoría de las incidencias contadas'
+    )
+
+    total = models.PositiveIntegerField(
+        default=0,
+        help_text='Cantidad de incidencias'
+    )
+
+    class Meta:
+        db_table = 'contador_incidencias'
+        verbose_name = 'Contador de Incidencias'
+        verbose_name_plural = 'Contadores de Incidencias'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['condominio', 'estado', 'prioridad', 'tipo_incidencia'],
+                name='contador_incidencias_clave_unica'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.condominio_id} / {self.estado} / {self.prioridad} / {self.tipo_incidencia_id}: {self.total}"
+
+    @classmethod
+    def ajustar(cls, clave, delta):
+        """
+        Suma ``delta`` al contador identificado por ``clave``.
+
+        Args:
+            clave: tupla (condominio_id, estado, prioridad, tipo_incidencia_id)
+            delta: cantidad a sumar (negativa para restar)
+        """
+        condominio_id, estado, prioridad, tipo_incidencia_id = clave
+        filtro = {
+            'condominio_id': condominio_id,
+            'estado': estado,
+            'prioridad': prioridad,
+            'tipo_incidencia_id': tipo_incidencia_id,
+        }
+
+        actualizados = cls.objects.filter(**filtro).update(total=F('total') + delta)
+        if actualizados or delta < 0:
+            # Un contador inexistente al restar significa que la fila ya fue
+            # eliminada en cascada junto a su condominio o categoría.
+            return
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(total=delta, **filtro)
+        except IntegrityError:
+            # Otra transacción creó la fila entre el UPDATE y el INSERT
+            cls.objects.filter(**filtro).update(total=F('total') + delta)
+
+    @classmethod
+    def reconstruir(cls):
+        """
+        Recalcula todos los contadores a partir de la tabla de incidencias.
+
+        Returns:
+            int: número de contadores creados
+        """
+        grupos = (
+            Incidencia.objects.order_by()
+            .values('condominio_id', 'estado', 'prioridad', 'tipo_incidencia_id')
+            .annotate(total=Count('id'))
+        )
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            contadores = cls.objects.bulk_create(cls(**grupo) for grupo in grupos)
+
+        return len(contadores)
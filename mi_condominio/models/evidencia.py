@@ -2,38 +2,142 @@
 Modelo de Evidencia.
 
 Este módulo contiene el modelo EvidenciaIncidencia y la función
-evidencia_upload_path para gestionar archivos de evidencia.
+evidencia_upload_path para gestionar archivos de evidencia, el modelo
+ArchivoEvidencia que cuenta las referencias a cada archivo guardado y el
+modelo SubidaEvidencia para subir archivos grandes por bloques.
 """
 
+import fcntl
 import os
-from datetime import datetime
-from django.db import models
-from django.utils.text import slugify
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, When
+from django.urls import reverse
+from django.utils import timezone
 from .incidencia import Incidencia
+from .. import validacion_archivos
+from ..almacenamiento import PREFIJO_CONTENIDO, ArchivoLocal, almacenamiento_evidencias, sha256_de_ruta
+from ..descargas import version_archivo
 
 
 def evidencia_upload_path(instance, filename):
     """
     Genera la ruta de upload para archivos de evidencia.
 
-    Estructura: evidencias/incidencia_{id}_{titulo_sanitizado}/{timestamp}_{filename}
+    Los archivos se guardan por contenido (ver almacenamiento.py): esta ruta
+    solo indica la carpeta y la extensión, y el almacenamiento la reemplaza
+    por evidencias/cas/ab/cd/{sha256}{extension}. El nombre original queda
+    en EvidenciaIncidencia.nombre_original.
 
-    Ejemplo: evidencias/incidencia_15_fuga-de-agua/20231219_143025_foto.jpg
+    Ejemplo: foto.jpg -> evidencias/cas/3f/a1/3fa1...c9.jpg
     """
-    # Sanitizar el título de la incidencia (eliminar caracteres especiales, espacios, etc.)
-    titulo_sanitizado = slugify(instance.incidencia.titulo)[:50]  # Limitar a 50 caracteres
+    return f'{PREFIJO_CONTENIDO}{os.path.basename(filename)}'
 
-    # ID de la incidencia
-    incidencia_id = instance.incidencia.id
 
-    # Timestamp para evitar colisiones de nombres
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+class ArchivoEvidencia(models.Model):
+    """
+    Archivo guardado en el almacenamiento de evidencias y cuántas evidencias lo usan.
+
+    Como los archivos se guardan por contenido, varias EvidenciaIncidencia
+    pueden apuntar al mismo archivo. EvidenciaIncidencia suma una referencia
+    al guardar un archivo nuevo y la resta al reemplazarlo o eliminarse.
+    Cuando un archivo queda sin referencias se registra ``liberado_at`` y se
+    elimina al confirmarse la transacción (ver limpieza_archivos.py); si eso
+    no ocurre, lo elimina recolectar_archivos_evidencias pasado el período
+    de gracia.
+    """
+
+    nombre = models.CharField(max_length=500, unique=True, help_text='Ruta del archivo en el almacenamiento')
+    sha256 = models.CharField(max_length=64, blank=True, default='', help_text='Hash del contenido (vacío en archivos anteriores al almacenamiento por contenido)')
+    tamano = models.BigIntegerField(null=True, blank=True, help_text='Tamaño en bytes')
+    referencias = models.PositiveIntegerField(default=0, help_text='Evidencias que usan este archivo')
+    liberado_at = models.DateTimeField(null=True, blank=True, help_text='Fecha en que quedó sin referencias')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'evidencias_archivos'
+        verbose_name = 'Archivo de Evidencia'
+        verbose_name_plural = 'Archivos de Evidencias'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['liberado_at'], name='evid_archivo_liberado_idx',
+                         condition=models.Q(referencias=0)),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
+
+    @classmethod
+    def referenciar(cls, nombre, tamano=None):
+        """Suma una referencia al archivo, registrándolo si es nuevo."""
+        for _ in range(2):
+            if cls.objects.filter(nombre=nombre).update(referencias=F('referencias') + 1, liberado_at=None):
+                return
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        nombre=nombre, sha256=sha256_de_ruta(nombre) or '', tamano=tamano, referencias=1
+                    )
+                return
+            except IntegrityError:
+                # Otra solicitud lo registró al mismo tiempo: sumar sobre esa fila
+                continue
+
+    @classmethod
+    def referenciar_varios(cls, referencias, tamanos=None):
+        """
+        Suma referencias a varios archivos con pocas consultas (importación masiva).
 
-    # Nombre del archivo original
-    nombre_original = os.path.basename(filename)
+        Args:
+            referencias: dict {nombre: referencias a sumar}
+            tamanos: dict {nombre: tamaño en bytes}, para los archivos nuevos
+        """
+        tamanos = tamanos or {}
+        for intento in range(2):
+            try:
+                with transaction.atomic():
+                    # Bloquear las filas existentes: la eliminación de archivos
+                    # liberados no puede borrarlas mientras se suman
+                    existentes = set(
+                        cls.objects.select_for_update().filter(nombre__in=list(referencias))
+                        .values_list('nombre', flat=True)
+                    )
+                    por_cantidad = defaultdict(list)
+                    for nombre in existentes:
+                        por_cantidad[referencias[nombre]].append(nombre)
+                    for cantidad, nombres in por_cantidad.items():
+                        cls.objects.filter(nombre__in=nombres).update(
+                            referencias=F('referencias') + cantidad, liberado_at=None
+                        )
+                    cls.objects.bulk_create([
+                        cls(nombre=nombre, sha256=sha256_de_ruta(nombre) or '',
+                            tamano=tamanos.get(nombre), referencias=cantidad)
+                        for nombre, cantidad in referencias.items() if nombre not in existentes
+                    ])
+                return
+            except IntegrityError:
+                # Otra solicitud registró alguno al mismo tiempo: repetir con esas filas
+                if intento:
+                    raise
 
-    # Construir la ruta: evidencias/incidencia_{id}_{titulo}/{timestamp}_{filename}
-    return f'evidencias/incidencia_{incidencia_id}_{titulo_sanitizado}/{timestamp}_{nombre_original}'
+    @classmethod
+    def liberar(cls, nombre):
+        """Resta una referencia al archivo; si llega a cero se elimina al confirmar la transacción."""
+        from ..limpieza_archivos import programar_eliminacion
+
+        cls.objects.filter(nombre=nombre, referencias__gt=0).update(
+            referencias=F('referencias') - 1,
+            liberado_at=Case(When(referencias=1, then=timezone.now()), default=F('liberado_at')),
+        )
+        # La tarea solo elimina el archivo si para entonces sigue sin referencias
+        programar_eliminacion(nombre)
 
 
 class EvidenciaIncidencia(models.Model):
@@ -44,10 +148,10 @@ class EvidenciaIncidencia(models.Model):
     que respaldan una incidencia reportada. Permite a los usuarios adjuntar pruebas
     visuales o documentales para facilitar la resolución del problema.
 
-    Los archivos se almacenan localmente en media/evidencias/ con estructura:
-    evidencias/incidencia_{id}_{titulo}/{timestamp}_{nombre_archivo}
+    Los archivos se almacenan localmente en media/evidencias/cas/, una sola
+    vez por contenido (ver evidencia_upload_path y ArchivoEvidencia).
 
-    Ejemplo: evidencias/incidencia_15_fuga-de-agua/20231219_143025_foto.jpg
+    Ejemplo: evidencias/cas/3f/a1/3fa1...c9.jpg
 
     Preparado para migración futura a S3.
     """
@@ -68,18 +172,45 @@ class EvidenciaIncidencia(models.Model):
 
     archivo_evidencia = models.FileField(
         upload_to=evidencia_upload_path,
+        storage=almacenamiento_evidencias,
         max_length=500,
         blank=True,
         null=True,
         help_text='Archivo de evidencia (imagen, video, documento, etc.)'
     )
 
+    nombre_original = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Nombre del archivo tal como se subió'
+    )
+
     tipo_archivo_evidencia = models.CharField(
         max_length=15,
         choices=TipoArchivo.choices,
         help_text='Tipo de evidencia'
     )
 
+    # Derivados WebP generados en segundo plano (ver derivados.py)
+    miniatura = models.FileField(
+        storage=almacenamiento_evidencias,
+        max_length=500,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text='Miniatura WebP para listados'
+    )
+    vista_previa = models.FileField(
+        storage=almacenamiento_evidencias,
+        max_length=500,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text='Vista previa WebP de tamaño medio'
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -91,6 +222,48 @@ class EvidenciaIncidencia(models.Model):
     def __str__(self):
         return f"Evidencia {self.tipo_archivo_evidencia} - {self.incidencia.titulo}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Recordar el archivo con el que se leyó la fila
+        instancia._archivo_original = instancia.__dict__.get('archivo_evidencia')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda la evidencia y, si cambió el archivo, actualiza las referencias
+        de ArchivoEvidencia y programa sus derivados.
+        """
+        from ..derivados import programar_derivados
+
+        if self.archivo_evidencia and not self.archivo_evidencia._committed:
+            self.nombre_original = os.path.basename(self.archivo_evidencia.name)[:255]
+
+        nombre_anterior = getattr(self, '_archivo_original', None)
+
+        archivo_nuevo = self.archivo_evidencia and not self.archivo_evidencia._committed
+        if archivo_nuevo or (self.archivo_evidencia.name or None) != nombre_anterior:
+            # Los derivados son del archivo anterior, que se libera (y con él
+            # sus derivados); los del nuevo se generan en segundo plano
+            self.miniatura = None
+            self.vista_previa = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'miniatura', 'vista_previa'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            nombre = self.archivo_evidencia.name or None
+            if nombre != nombre_anterior:
+                if nombre:
+                    ArchivoEvidencia.referenciar(nombre, tamano=self.archivo_evidencia.size)
+                    programar_derivados(self)
+                if nombre_anterior:
+                    ArchivoEvidencia.liberar(nombre_anterior)
+
+        self._archivo_original = nombre
+
     @property
     def extension(self):
         """Retorna la extensión del archivo en minúsculas."""
@@ -110,5 +283,239 @@ class EvidenciaIncidencia(models.Model):
 
     @property
     def nombre_archivo(self):
-        """Retorna solo el nombre del archivo sin la ruta."""
-        return os.path.basename(self.archivo_evidencia.name)
+        """Retorna el nombre original del archivo (sin la ruta)."""
+        return self.nombre_original or os.path.basename(self.archivo_evidencia.name)
+
+    def _url_descarga(self, campo, variante=None):
+        """URL de evidencia_descargar, con la versión del archivo para la caché del navegador."""
+        archivo = getattr(self, campo)
+        if not archivo:
+            return ''
+        argumentos = [self.pk, variante] if variante else [self.pk]
+        return f"{reverse('evidencia_descargar', args=argumentos)}?v={version_archivo(archivo.name, archivo.storage)}"
+
+    @property
+    def url_archivo_evidencia(self):
+        """URL (con control de acceso) del archivo de la evidencia."""
+        return self._url_descarga('archivo_evidencia')
+
+    @property
+    def url_miniatura(self):
+        return self._url_descarga('miniatura', 'miniatura')
+
+    @property
+    def url_vista_previa(self):
+        return self._url_descarga('vista_previa', 'vista_previa')
+
+
+class SubidaEvidencia(models.Model):
+    """
+    Subida de un archivo de evidencia por bloques, reanudable.
+
+    El cliente declara el nombre y el tamaño del archivo, y luego envía los
+    bloques en orden. Cada bloque se escribe directamente en un archivo
+    temporal dentro de settings.EVIDENCIAS_SUBIDAS_DIR y se registra cuántos
+    bytes van recibidos, de modo que si la conexión se corta el cliente
+    consulta ``recibido`` y continúa desde ahí.
+
+    El tamaño se controla con cada bloque y el tipo se verifica con la
+    cabecera del primero (ver validacion_archivos). Al recibir el último
+    bloque el archivo temporal se mueve (sin copiarlo) al almacenamiento de
+    evidencias y se crea la EvidenciaIncidencia.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        COMPLETADA = 'COMPLETADA', 'Completada'
+        RECHAZADA = 'RECHAZADA', 'Rechazada'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='subidas_evidencia',
+        help_text='Usuario que realiza la subida'
+    )
+
+    incidencia = models.ForeignKey(
+        Incidencia,
+        on_delete=models.CASCADE,
+        related_name='subidas_evidencia',
+        help_text='Incidencia a la que se agregará la evidencia'
+    )
+
+    nombre_archivo = models.CharField(max_length=255, help_text='Nombre original del archivo')
+    tipo_archivo_evidencia = models.CharField(
+        max_length=15,
+        choices=EvidenciaIncidencia.TipoArchivo.choices,
+        help_text='Tipo de evidencia'
+    )
+    tamano = models.BigIntegerField(help_text='Tamaño total declarado del archivo en bytes')
+    recibido = models.BigIntegerField(default=0, help_text='Bytes recibidos hasta ahora')
+
+    estado = models.CharField(max_length=12, choices=Estado.choices, default=Estado.PENDIENTE)
+    error = models.CharField(max_length=255, blank=True, default='', help_text='Motivo del rechazo')
+
+    evidencia = models.ForeignKey(
+        EvidenciaIncidencia,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Evidencia creada al completar la subida'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'evidencias_subidas'
+        verbose_name = 'Subida de Evidencia'
+        verbose_name_plural = 'Subidas de Evidencias'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', 'updated_at'], name='evid_subida_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Subida {self.nombre_archivo} ({self.recibido}/{self.tamano} bytes)"
+
+    @property
+    def ruta_temporal(self):
+        """Archivo donde se acumulan los bloques recibidos."""
+        return os.path.join(settings.EVIDENCIAS_SUBIDAS_DIR, f'{self.id}.part')
+
+    @property
+    def vencida(self):
+        """Indica si la subida lleva más tiempo del permitido sin recibir bloques."""
+        vigencia = timedelta(hours=settings.EVIDENCIAS_SUBIDA_VIGENCIA_HORAS)
+        return self.updated_at < timezone.now() - vigencia
+
+    def validar_inicio(self):
+        """Valida el nombre, el tipo y el tamaño declarados antes de recibir bloques."""
+        if self.tamano <= 0:
+            raise ValidationError('El archivo está vacío.')
+        validacion_archivos.validar_tamano(self.tamano)
+        validacion_archivos.validar_extension(self.nombre_archivo, self.tipo_archivo_evidencia)
+
+    @contextmanager
+    def abrir_temporal(self):
+        """
+        Abre el archivo temporal con un bloqueo exclusivo (``flock``).
+
+        El bloqueo se mantiene hasta cerrar el archivo: mientras un bloque se
+        lee de la red y se registra, otro bloque de la misma subida espera
+        sin tener abierta una transacción.
+        """
+        os.makedirs(settings.EVIDENCIAS_SUBIDAS_DIR, exist_ok=True)
+        descriptor = os.open(self.ruta_temporal, os.O_RDWR | os.O_CREAT, 0o666)
+        with open(descriptor, 'r+b') as destino:
+            fcntl.flock(destino.fileno(), fcntl.LOCK_EX)
+            yield destino
+
+    def escribir_bloque(self, destino, flujo, inicio, largo, tamano_lectura=64 * 1024):
+        """
+        Escribe en ``destino`` un bloque leído de ``flujo`` en la posición ``inicio``.
+
+        ``destino`` es el archivo temporal abierto con ``abrir_temporal``. Los
+        datos se copian en trozos de ``tamano_lectura`` bytes, sin acumular
+        el bloque en memoria. Solo si llega el bloque completo se avanza
+        ``recibido`` (no se guarda: lo hace quien llama).
+
+        Returns:
+            bytes escritos; si son menos que ``largo`` el bloque quedó incompleto
+
+        Raises:
+            ValidationError: si el bloque excede el tamaño declarado, si se
+                perdieron los bloques anteriores o si la cabecera no
+                corresponde a la extensión del archivo
+        """
+        if inicio + largo > self.tamano:
+            raise ValidationError('El bloque excede el tamaño declarado del archivo.')
+
+        if os.fstat(destino.fileno()).st_size < inicio:
+            raise ValidationError('Se perdieron los bloques recibidos. Inicie la subida nuevamente.')
+
+        # Descarta restos de un bloque anterior que quedó incompleto
+        destino.seek(inicio)
+        destino.truncate()
+
+        escritos = 0
+        while escritos < largo:
+            datos = flujo.read(min(tamano_lectura, largo - escritos))
+            if not datos:
+                break
+            destino.write(datos)
+            escritos += len(datos)
+
+        if escritos < largo:
+            return escritos
+        destino.flush()
+
+        recibido = inicio + largo
+        cabecera_completa = recibido >= validacion_archivos.BYTES_CABECERA or recibido == self.tamano
+        if inicio < validacion_archivos.BYTES_CABECERA and cabecera_completa:
+            destino.seek(0)
+            validacion_archivos.validar_cabecera(
+                self.nombre_archivo, destino.read(validacion_archivos.BYTES_CABECERA)
+            )
+
+        self.recibido = recibido
+        return escritos
+
+    def completar(self):
+        """
+        Mueve el archivo recibido al almacenamiento de evidencias y crea la evidencia.
+
+        El almacenamiento calcula el hash leyendo el archivo temporal por
+        partes y lo renombra a su ruta por contenido, sin copiarlo; si ese
+        contenido ya estaba guardado, el temporal se descarta.
+        """
+        evidencia = EvidenciaIncidencia(
+            incidencia=self.incidencia,
+            tipo_archivo_evidencia=self.tipo_archivo_evidencia,
+            nombre_original=self.nombre_archivo,
+        )
+
+        # EVIDENCIAS_SUBIDAS_DIR debe estar en el mismo sistema de archivos que MEDIA_ROOT
+        archivo = ArchivoLocal(self.ruta_temporal)
+        try:
+            evidencia.archivo_evidencia.save(self.nombre_archivo, archivo, save=False)
+        finally:
+            archivo.close()
+            self.eliminar_temporal()
+        evidencia.save()
+
+        self.evidencia = evidencia
+        self.estado = self.Estado.COMPLETADA
+        self.save(update_fields=['recibido', 'evidencia', 'estado', 'updated_at'])
+        return evidencia
+
+    def rechazar(self, motivo):
+        """Marca la subida como rechazada y elimina lo recibido."""
+        self.estado = self.Estado.RECHAZADA
+        self.error = motivo[:255]
+        self.save(update_fields=['estado', 'error', 'updated_at'])
+        self.eliminar_temporal()
+
+    def eliminar_temporal(self):
+        try:
+            os.remove(self.ruta_temporal)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def descartar_vencidas(cls):
+        """
+        Elimina las subidas pendientes vencidas y sus archivos temporales.
+
+        Returns:
+            cantidad de subidas eliminadas
+        """
+        limite = timezone.now() - timedelta(hours=settings.EVIDENCIAS_SUBIDA_VIGENCIA_HORAS)
+        vencidas = list(cls.objects.filter(estado=cls.Estado.PENDIENTE, updated_at__lt=limite))
+        for subida in vencidas:
+            subida.eliminar_temporal()
+        cls.objects.filter(pk__in=[subida.pk for subida in vencidas]).delete()
+        return len(vencidas)
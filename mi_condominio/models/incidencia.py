@@ -5,7 +5,9 @@ Este módulo contiene los modelos relacionados con las incidencias
 reportadas en los condominios y sus categorías.
 """
 
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
 from .condominio import Condominio
 from .usuario import Usuario
 
@@ -29,6 +31,14 @@ class CategoriaIncidencia(models.Model):
         verbose_name = 'Categoría de Incidencia'
         verbose_name_plural = 'Categorías de Incidencias'
         ordering = ['nombre_categoria_incidencia']
+        indexes = [
+            # Resolución de nombres aproximados (pg_trgm)
+            GinIndex(
+                fields=['nombre_categoria_incidencia'],
+                opclasses=['gin_trgm_ops'],
+                name='categorias_nombre_trgm_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.nombre_categoria_incidencia
@@ -139,11 +149,58 @@ class Incidencia(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Vector de búsqueda de texto completo, mantenido por PostgreSQL
+    vector_busqueda = models.GeneratedField(
+        expression=(
+            SearchVector('titulo', weight='A', config='spanish')
+            + SearchVector('descripcion', weight='B', config='spanish')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+
     class Meta:
         db_table = 'incidencias'
         verbose_name = 'Incidencia'
         verbose_name_plural = 'Incidencias'
         ordering = ['-fecha_reporte', '-prioridad']
+        indexes = [
+            # Clave de la paginación por cursor de los listados
+            models.Index(fields=['-fecha_reporte', '-id'], name='incidencias_fecha_id_idx'),
+            GinIndex(fields=['vector_busqueda'], name='incidencias_busqueda_idx'),
+            # Búsqueda por subcadena del título desde otros listados (pg_trgm)
+            GinIndex(fields=['titulo'], opclasses=['gin_trgm_ops'], name='incidencias_titulo_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.estado}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Recordar la clave de contador con la que se leyó la fila
+        instancia._clave_contador_original = instancia.clave_contador()
+        return instancia
+
+    def clave_contador(self):
+        """Clave de esta incidencia en la tabla ContadorIncidencias."""
+        return (self.condominio_id, self.estado, self.prioridad, self.tipo_incidencia_id)
+
+    def save(self, *args, **kwargs):
+        """
+        Guarda la incidencia y ajusta ContadorIncidencias en la misma transacción.
+        """
+        from .contador_incidencias import ContadorIncidencias
+
+        clave_original = getattr(self, '_clave_contador_original', None)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            clave_nueva = self.clave_contador()
+            if clave_nueva != clave_original:
+                if clave_original is not None:
+                    ContadorIncidencias.ajustar(clave_original, -1)
+                ContadorIncidencias.ajustar(clave_nueva, 1)
+
+        self._clave_contador_original = clave_nueva
@@ -73,6 +73,10 @@ class Reunion(models.Model):
         verbose_name = 'Reunión'
         verbose_name_plural = 'Reuniones'
         ordering = ['-fecha_reunion']
+        indexes = [
+            # Clave de la paginación por cursor de los listados
+            models.Index(fields=['-fecha_reunion', '-id'], name='reuniones_fecha_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre_reunion} - {self.fecha_reunion}"
@@ -5,6 +5,7 @@ Este módulo contiene el modelo Usuario que representa a los usuarios
 del sistema (administradores, supervisores, conserjes).
 """
 
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.contrib.auth.models import User
 from .condominio import Condominio
@@ -109,6 +110,13 @@ class Usuario(models.Model):
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
         ordering = ['apellido', 'nombres']
+        indexes = [
+            # Clave de la paginación por cursor de los listados
+            models.Index(fields=['apellido', 'nombres', 'id'], name='usuarios_nombre_id_idx'),
+            # Resolución de nombres aproximados (pg_trgm)
+            GinIndex(fields=['nombres'], opclasses=['gin_trgm_ops'], name='usuarios_nombres_trgm_idx'),
+            GinIndex(fields=['apellido'], opclasses=['gin_trgm_ops'], name='usuarios_apellido_trgm_idx'),
+        ]
 
     def set_password(self, raw_password):
         """Establece la contraseña hasheada"""
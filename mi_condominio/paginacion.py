@@ -0,0 +1,233 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+En lugar de usar OFFSET, cada página se obtiene "buscando" a partir de la
+clave de ordenamiento de la última fila mostrada (por ejemplo
+``(fecha_reporte, id)``). Así el costo de cada página es constante y se
+apoya en el índice de la clave, sin importar cuántas filas haya antes.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+
+# Tamaño fijo de página para todos los listados
+TAMANO_PAGINA = 25
+
+# Sobre este número de filas se usa la estimación de PostgreSQL en vez de COUNT(*)
+UMBRAL_ESTIMACION = 10000
+
+
+class PaginaCursor:
+    """
+    Página de resultados obtenida con paginación por cursor.
+
+    Atributos:
+        objetos: lista con las filas de la página
+        total: total de filas del listado (exacto o estimado)
+        total_estimado: True si el total proviene de una estimación
+        url_siguiente / url_anterior: query string para navegar, o None
+    """
+
+    def __init__(self, objetos, total, total_estimado, url_siguiente, url_anterior):
+        self.objetos = objetos
+        self.total = total
+        self.total_estimado = total_estimado
+        self.url_siguiente = url_siguiente
+        self.url_anterior = url_anterior
+
+    @property
+    def tiene_siguiente(self):
+        return self.url_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.url_anterior is not None
+
+    @property
+    def tiene_otras_paginas(self):
+        return self.tiene_siguiente or self.tiene_anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+
+def _codificar_cursor(valores):
+    """Codifica los valores de la clave como un token seguro para URLs."""
+    datos = json.dumps([str(valor) for valor in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def _decodificar_cursor(cursor, campos):
+    """
+    Decodifica un cursor y convierte cada valor al tipo de su campo.
+
+    Retorna None si el token es inválido o si algún valor no corresponde al
+    campo (por ejemplo, una fecha mal formada), de modo que un cursor
+    manipulado se trata como si no existiera en vez de fallar en la consulta.
+    """
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+    if not isinstance(valores, list) or len(valores) != len(campos):
+        return None
+
+    try:
+        valores = [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+    if any(valor is None for valor in valores):
+        return None
+    return valores
+
+
+def _campos_orden(queryset, orden):
+    """Campos (o anotaciones, como el rango de una búsqueda) de la clave de ordenamiento."""
+    campos = []
+    for campo in orden:
+        nombre = campo.lstrip('-')
+        anotacion = queryset.query.annotations.get(nombre)
+        campos.append(anotacion.output_field if anotacion is not None else queryset.model._meta.get_field(nombre))
+    return campos
+
+
+def _condicion_busqueda(orden, valores, hacia_atras=False):
+    """
+    Construye el filtro que "salta" a las filas posteriores a la clave dada.
+
+    Para orden ('-fecha', '-id') y valores (f, i) genera:
+        fecha < f OR (fecha = f AND id < i)
+    """
+    condicion = Q()
+    prefijo_igual = Q()
+
+    for campo, valor in zip(orden, valores):
+        descendente = campo.startswith('-')
+        nombre = campo.lstrip('-')
+        # En orden descendente la "siguiente" fila tiene un valor menor
+        operador = 'lt' if descendente != hacia_atras else 'gt'
+
+        condicion |= prefijo_igual & Q(**{f'{nombre}__{operador}': valor})
+        prefijo_igual &= Q(**{nombre: valor})
+
+    return condicion
+
+
+def _invertir_orden(orden):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+
+
+def _valores_clave(objeto, orden):
+    return [getattr(objeto, campo.lstrip('-')) for campo in orden]
+
+
+def contar_total(queryset):
+    """
+    Cuenta las filas de un queryset de la forma más barata posible.
+
+    Si el listado no tiene filtros y la base de datos es PostgreSQL, usa la
+    estimación de filas del catálogo (``pg_class.reltuples``) cuando la tabla
+    es grande. En otro caso ejecuta un único COUNT(*) sin ordenamiento.
+
+    Returns:
+        tuple (total, es_estimado)
+    """
+    conexion = connections[queryset.db]
+
+    if not queryset.query.where and conexion.vendor == 'postgresql':
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            fila = cursor.fetchone()
+
+        estimacion = fila[0] if fila else -1
+        if estimacion >= UMBRAL_ESTIMACION:
+            return estimacion, True
+
+    return queryset.order_by().count(), False
+
+
+def paginar_por_cursor(request, queryset, orden, tamano_pagina=TAMANO_PAGINA):
+    """
+    Pagina un queryset usando un cursor sobre la clave de ordenamiento.
+
+    Los parámetros ``despues`` y ``antes`` de la URL contienen el cursor de la
+    última/primera fila de la página visitada. Los enlaces generados mantienen
+    el resto de los parámetros GET (búsqueda y filtros).
+
+    Args:
+        request: HttpRequest actual
+        queryset: QuerySet ya filtrado
+        orden: tupla de campos que identifica de forma única cada fila,
+               por ejemplo ('-fecha_reporte', '-id'). El último campo debe ser único.
+        tamano_pagina: número de filas por página
+
+    Returns:
+        PaginaCursor
+    """
+    orden = list(orden)
+    total, total_estimado = contar_total(queryset)
+    queryset = queryset.order_by(*orden)
+
+    cursor_antes = request.GET.get('antes')
+    cursor_despues = request.GET.get('despues')
+    campos = _campos_orden(queryset, orden)
+    valores_antes = _decodificar_cursor(cursor_antes, campos) if cursor_antes else None
+    valores_despues = _decodificar_cursor(cursor_despues, campos) if cursor_despues else None
+
+    if valores_antes is not None:
+        # Página anterior: recorrer en orden inverso y luego dar vuelta el resultado
+        filas = list(
+            queryset.filter(_condicion_busqueda(orden, valores_antes, hacia_atras=True))
+            .order_by(*_invertir_orden(orden))[:tamano_pagina + 1]
+        )
+        hay_anterior = len(filas) > tamano_pagina
+        filas = filas[:tamano_pagina]
+        filas.reverse()
+        hay_siguiente = True
+    else:
+        if valores_despues is not None:
+            queryset = queryset.filter(_condicion_busqueda(orden, valores_despues))
+        filas = list(queryset[:tamano_pagina + 1])
+        hay_siguiente = len(filas) > tamano_pagina
+        filas = filas[:tamano_pagina]
+        hay_anterior = valores_despues is not None
+
+    url_siguiente = None
+    url_anterior = None
+    if filas:
+        if hay_siguiente:
+            url_siguiente = _construir_query(request, 'despues', _valores_clave(filas[-1], orden))
+        if hay_anterior:
+            url_anterior = _construir_query(request, 'antes', _valores_clave(filas[0], orden))
+    elif valores_despues is not None or valores_antes is not None:
+        # Cursor fuera de rango (por ejemplo, filas eliminadas): volver al inicio
+        url_anterior = _construir_query(request, None, None)
+
+    return PaginaCursor(filas, total, total_estimado, url_siguiente, url_anterior)
+
+
+def _construir_query(request, parametro, valores):
+    """Genera el query string conservando los filtros actuales."""
+    params = request.GET.copy()
+    params.pop('antes', None)
+    params.pop('despues', None)
+    if parametro:
+        params[parametro] = _codificar_cursor(valores)
+    return '?' + params.urlencode()
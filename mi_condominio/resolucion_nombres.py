@@ -0,0 +1,108 @@
+"""
+Resolución de nombres aproximados con trigramas (``pg_trgm``).
+
+Las herramientas del asistente reciben nombres escritos por el usuario
+("Torres del Sl", "mantencion"), que pueden venir incompletos o con errores
+de tipeo. Este módulo obtiene en una sola consulta los candidatos ordenados
+por similitud, apoyándose en los índices GIN ``gin_trgm_ops`` de
+``Condominio.nombre``, ``Usuario.nombres``/``apellido`` y
+``CategoriaIncidencia.nombre_categoria_incidencia``.
+"""
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .models import Condominio, Usuario, CategoriaIncidencia
+
+
+# Cantidad máxima de candidatos retornados por búsqueda
+LIMITE_CANDIDATOS = 10
+
+# Diferencia mínima de similitud para considerar que el mejor candidato
+# es inequívoco frente al segundo
+MARGEN_AMBIGUEDAD = 0.1
+
+
+def buscar_candidatos(queryset, criterios, limite=LIMITE_CANDIDATOS):
+    """
+    Busca filas cuyos campos se parezcan a los textos indicados.
+
+    Cada criterio debe coincidir (operador ``<%`` de pg_trgm, que usa el
+    índice GIN); la similitud de cada fila es la mayor entre sus criterios.
+
+    Args:
+        queryset: QuerySet base
+        criterios: dict {campo: texto}; se ignoran los textos vacíos
+        limite: número máximo de candidatos
+
+    Returns:
+        list de objetos con el atributo ``similitud``, de mayor a menor
+    """
+    criterios = {campo: texto.strip() for campo, texto in criterios.items() if texto and texto.strip()}
+    if not criterios:
+        return []
+
+    filtro = Q()
+    similitudes = []
+    for campo, texto in criterios.items():
+        filtro &= Q(**{f'{campo}__trigram_word_similar': texto})
+        similitudes.append(TrigramWordSimilarity(texto, campo))
+
+    similitud = similitudes[0] if len(similitudes) == 1 else Greatest(*similitudes)
+
+    return list(
+        queryset.filter(filtro)
+        .annotate(similitud=similitud)
+        .order_by('-similitud', 'id')[:limite]
+    )
+
+
+def elegir_candidato(candidatos, texto, campo):
+    """
+    Elige el candidato inequívoco de una lista ordenada por similitud.
+
+    Es inequívoco si es el único, si su ``campo`` coincide exactamente con
+    ``texto`` (sin distinguir mayúsculas) o si supera al segundo por al
+    menos ``MARGEN_AMBIGUEDAD``.
+
+    Returns:
+        el objeto elegido, o None si no hay candidatos o la búsqueda es ambigua
+    """
+    if not candidatos:
+        return None
+
+    exactos = [c for c in candidatos if getattr(c, campo).casefold() == texto.strip().casefold()]
+    if len(exactos) == 1:
+        return exactos[0]
+
+    if len(candidatos) == 1 or candidatos[0].similitud - candidatos[1].similitud >= MARGEN_AMBIGUEDAD:
+        return candidatos[0]
+    return None
+
+
+def buscar_condominios(nombre, limite=LIMITE_CANDIDATOS):
+    """Candidatos de Condominio para un nombre aproximado."""
+    return buscar_candidatos(
+        Condominio.objects.select_related('comuna', 'region'),
+        {'nombre': nombre},
+        limite
+    )
+
+
+def buscar_categorias(nombre, limite=LIMITE_CANDIDATOS):
+    """Candidatos de CategoriaIncidencia para un nombre aproximado."""
+    return buscar_candidatos(
+        CategoriaIncidencia.objects.all(),
+        {'nombre_categoria_incidencia': nombre},
+        limite
+    )
+
+
+def buscar_usuarios(nombre=None, apellido=None, condominio_nombre=None, limite=LIMITE_CANDIDATOS):
+    """Candidatos de Usuario por nombre, apellido y/o nombre del condominio."""
+    return buscar_candidatos(
+        Usuario.objects.select_related('condominio'),
+        {'nombres': nombre, 'apellido': apellido, 'condominio__nombre': condominio_nombre},
+        limite
+    )
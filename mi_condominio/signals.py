@@ -0,0 +1,74 @@
+"""
+Señales de la aplicación Mi Condominio.
+
+Se conectan en ``MiCondominioConfig.ready()``.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import ai_cache
+from .catalogo import invalidar_catalogo
+from .middleware import invalidar_perfil_usuario
+from .models import Incidencia, ContadorIncidencias, Usuario, EvidenciaIncidencia, ArchivoEvidencia, Region, Comuna
+
+
+@receiver(post_delete, sender=Incidencia)
+def descontar_incidencia_eliminada(sender, instance, **kwargs):
+    """
+    Resta la incidencia eliminada de su contador.
+
+    Se ejecuta dentro de la transacción del borrado, incluidos los borrados
+    en cascada y los de ``QuerySet.delete()``.
+    """
+    ContadorIncidencias.ajustar(
+        getattr(instance, '_clave_contador_original', instance.clave_contador()),
+        -1
+    )
+
+
+@receiver(post_delete, sender=EvidenciaIncidencia)
+def liberar_archivo_evidencia(sender, instance, **kwargs):
+    """
+    Resta la referencia de la evidencia eliminada a su archivo.
+
+    Se ejecuta también en las eliminaciones en cascada (por ejemplo, al
+    eliminar la incidencia). El archivo no se borra aquí: otras evidencias
+    pueden usar el mismo contenido; si queda sin uso se elimina al confirmar
+    la transacción (ver limpieza_archivos.py).
+    """
+    nombre = getattr(instance, '_archivo_original', instance.archivo_evidencia.name)
+    if nombre:
+        ArchivoEvidencia.liberar(nombre)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_perfil_en_sesiones(sender, instance, **kwargs):
+    """Descarta el perfil guardado en las sesiones (``request.usuario``) al editarlo o eliminarlo."""
+    invalidar_perfil_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=Comuna)
+@receiver(post_delete, sender=Comuna)
+def invalidar_catalogo_regiones_comunas(sender, instance, **kwargs):
+    """Descarta el catálogo de regiones y comunas en memoria (ver catalogo.py)."""
+    invalidar_catalogo()
+
+
+def invalidar_cache_asistente(sender, **kwargs):
+    """
+    Invalida los resultados cacheados de las herramientas que leen el modelo modificado.
+
+    Se hace al confirmar la transacción: si la versión cambiara antes, una
+    consulta concurrente guardaría los datos anteriores con la versión nueva.
+    """
+    transaction.on_commit(lambda: ai_cache.invalidar_modelo(sender))
+
+
+for modelo in ai_cache.MODELOS_OBSERVADOS:
+    post_save.connect(invalidar_cache_asistente, sender=modelo, dispatch_uid=f'ai_cache_save_{modelo._meta.label_lower}')
+    post_delete.connect(invalidar_cache_asistente, sender=modelo, dispatch_uid=f'ai_cache_delete_{modelo._meta.label_lower}')
@@ -14,16 +14,29 @@ class AIChatManager {
 
         this.apiUrls = {
             send: this.chatMessages.dataset.sendUrl,
+            stream: this.chatMessages.dataset.streamUrl,
             history: this.chatMessages.dataset.historyUrl,
             clear: this.chatMessages.dataset.clearUrl,
             confirm: '/ai-chat/confirm/'
         };
+
+        // Cursor para cargar mensajes anteriores del historial
+        this.historyCursor = null;
+        this.loadEarlierBtn = null;
+        this.loadingEarlier = false;
+
+        // Último mensaje mostrado y ETag de la última consulta de mensajes nuevos
+        this.lastMessageId = null;
+        this.pollEtag = null;
+        this.pollInterval = 15000;
+        this.sending = false;
     }
 
     init() {
         this.setupMarked();
         this.setupEventListeners();
         this.loadHistory();
+        setInterval(() => this.pollNewMessages(), this.pollInterval);
     }
 
     setupMarked() {
@@ -60,6 +73,13 @@ class AIChatManager {
             });
         });
 
+        // Cargar mensajes anteriores al llegar arriba del chat
+        this.chatMessages.addEventListener('scroll', () => {
+            if (this.chatMessages.scrollTop < 80 && this.historyCursor && !this.loadingEarlier) {
+                this.loadEarlier();
+            }
+        });
+
         // Auto-resize textarea
         this.chatInput.addEventListener('input', () => {
             this.chatInput.style.height = 'auto';
@@ -83,12 +103,16 @@ class AIChatManager {
         this.chatInput.style.height = 'auto';
 
         // Disable send button and show typing indicator
+        this.sending = true;
         this.sendBtn.disabled = true;
         this.typingIndicator.classList.add('show');
         this.scrollToBottom();
 
+        let assistantMessage = null;
+        let contenido = '';
+
         try {
-            const response = await fetch(this.apiUrls.send, {
+            const response = await fetch(this.apiUrls.stream, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -97,44 +121,108 @@ class AIChatManager {
                 body: JSON.stringify({ mensaje: mensaje })
             });
 
-            const data = await response.json();
-
-            // Hide typing indicator
-            this.typingIndicator.classList.remove('show');
-
-            if (data.exito) {
-                // Add assistant message to UI
-                this.addMessageToUI('assistant', data.respuesta, data.tool_calls);
-            } else {
-                alert('Error: ' + (data.error || 'Error desconocido'));
+            if (!response.ok) {
+                const data = await response.json();
+                throw new Error(data.error || 'Error desconocido');
             }
+
+            // Leer la respuesta como server-sent events a medida que llega
+            await this.readEventStream(response, (evento, data) => {
+                if (evento === 'token') {
+                    // Crear el mensaje del asistente con el primer fragmento
+                    if (!assistantMessage) {
+                        this.typingIndicator.classList.remove('show');
+                        assistantMessage = this.addMessageToUI('assistant', '');
+                    }
+                    contenido += data.texto;
+                    this.updateMessageContent(assistantMessage, contenido);
+                } else if (evento === 'fin') {
+                    if (!assistantMessage) {
+                        assistantMessage = this.addMessageToUI('assistant', data.respuesta || '');
+                    }
+                    this.updateMessageContent(assistantMessage, data.respuesta || contenido, data.tool_calls);
+                    if (data.ultimo_mensaje_id) {
+                        this.lastMessageId = data.ultimo_mensaje_id;
+                    }
+                } else if (evento === 'error') {
+                    alert('Error: ' + (data.error || 'Error desconocido'));
+                }
+            });
         } catch (error) {
-            this.typingIndicator.classList.remove('show');
             alert('Error de conexión: ' + error.message);
         } finally {
+            this.typingIndicator.classList.remove('show');
+            this.sending = false;
             this.sendBtn.disabled = false;
             this.chatInput.focus();
         }
     }
 
-    addMessageToUI(role, content, toolCalls = null) {
-        const messageDiv = document.createElement('div');
-        messageDiv.className = `message ${role}`;
+    async readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // Cada evento termina con una línea en blanco
+            let separator;
+            while ((separator = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, separator);
+                buffer = buffer.slice(separator + 2);
+
+                let evento = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) {
+                        evento = line.slice(6).trim();
+                    } else if (line.startsWith('data:')) {
+                        data += line.slice(5).trim();
+                    }
+                });
 
-        const avatarIcon = role === 'user' ? 'bi-person-fill' : 'bi-robot';
+                if (data) {
+                    onEvent(evento, JSON.parse(data));
+                }
+            }
+        }
+    }
 
+    renderContent(content) {
         // Render markdown content
-        const renderedContent = typeof marked !== 'undefined'
+        return typeof marked !== 'undefined'
             ? marked.parse(content)
             : content.replace(/\n/g, '<br>');
+    }
 
-        let toolCallsHTML = '';
-        if (toolCalls && toolCalls.length > 0) {
-            toolCallsHTML = `<div class="tool-calls-badge">
+    renderToolCalls(toolCalls) {
+        if (!toolCalls || toolCalls.length === 0) {
+            return '';
+        }
+        return `<div class="tool-calls-badge">
                 <i class="bi bi-tools me-1"></i>
                 ${toolCalls.length} herramienta${toolCalls.length > 1 ? 's' : ''} usada${toolCalls.length > 1 ? 's' : ''}
             </div>`;
-        }
+    }
+
+    updateMessageContent(messageDiv, content, toolCalls = null) {
+        const contentDiv = messageDiv.querySelector('.message-content');
+        contentDiv.innerHTML = this.renderContent(content) + this.renderToolCalls(toolCalls);
+        this.scrollToBottom();
+    }
+
+    addMessageToUI(role, content, toolCalls = null, before = null) {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `message ${role}`;
+
+        const avatarIcon = role === 'user' ? 'bi-person-fill' : 'bi-robot';
+
+        const renderedContent = this.renderContent(content);
+        const toolCallsHTML = this.renderToolCalls(toolCalls);
 
         messageDiv.innerHTML = `
             ${role === 'user' ? '' : `<div class="message-avatar"><i class="bi ${avatarIcon}"></i></div>`}
@@ -145,8 +233,14 @@ class AIChatManager {
             ${role === 'user' ? `<div class="message-avatar"><i class="bi ${avatarIcon}"></i></div>` : ''}
         `;
 
-        this.chatMessages.insertBefore(messageDiv, this.typingIndicator);
-        this.scrollToBottom();
+        if (before) {
+            // Mensajes anteriores: se insertan arriba sin mover la vista
+            this.chatMessages.insertBefore(messageDiv, before);
+        } else {
+            this.chatMessages.insertBefore(messageDiv, this.typingIndicator);
+            this.scrollToBottom();
+        }
+        return messageDiv;
     }
 
     async loadHistory() {
@@ -165,11 +259,117 @@ class AIChatManager {
                     }
                 });
             }
+            if (data.exito) {
+                this.lastMessageId = data.cursor_siguiente;
+            }
+            this.updateLoadEarlier(data);
         } catch (error) {
             console.error('Error loading history:', error);
         }
     }
 
+    updateLoadEarlier(data) {
+        this.historyCursor = data.exito && data.hay_anteriores ? data.cursor_anterior : null;
+
+        if (!this.historyCursor) {
+            if (this.loadEarlierBtn) {
+                this.loadEarlierBtn.remove();
+                this.loadEarlierBtn = null;
+            }
+            return;
+        }
+
+        if (!this.loadEarlierBtn) {
+            this.loadEarlierBtn = document.createElement('button');
+            this.loadEarlierBtn.type = 'button';
+            this.loadEarlierBtn.className = 'btn btn-link btn-sm d-block mx-auto mb-2';
+            this.loadEarlierBtn.innerHTML = '<i class="bi bi-arrow-up-circle me-1"></i>Cargar mensajes anteriores';
+            this.loadEarlierBtn.addEventListener('click', () => this.loadEarlier());
+            this.chatMessages.insertBefore(this.loadEarlierBtn, this.emptyState.nextSibling);
+        }
+    }
+
+    async loadEarlier() {
+        if (!this.historyCursor || this.loadingEarlier) return;
+
+        this.loadingEarlier = true;
+        this.loadEarlierBtn.disabled = true;
+        try {
+            const url = new URL(this.apiUrls.history, window.location.origin);
+            url.searchParams.set('antes', this.historyCursor);
+            const response = await fetch(url);
+            const data = await response.json();
+
+            if (data.exito) {
+                // Mantener la posición de lectura al agregar contenido arriba
+                const firstMessage = this.loadEarlierBtn.nextSibling;
+                const previousHeight = this.chatMessages.scrollHeight;
+
+                data.messages.forEach(msg => {
+                    if (msg.role !== 'system') {
+                        this.addMessageToUI(msg.role, msg.contenido, null, firstMessage);
+                    }
+                });
+                this.chatMessages.scrollTop += this.chatMessages.scrollHeight - previousHeight;
+            }
+            this.updateLoadEarlier(data);
+        } catch (error) {
+            console.error('Error loading earlier messages:', error);
+        } finally {
+            this.loadingEarlier = false;
+            if (this.loadEarlierBtn) {
+                this.loadEarlierBtn.disabled = false;
+            }
+        }
+    }
+
+    async pollNewMessages() {
+        // No consultar con la pestaña oculta ni mientras se envía un mensaje
+        if (document.hidden || this.sending) return;
+
+        const cursor = this.lastMessageId;
+        const url = new URL(this.apiUrls.history, window.location.origin);
+        if (cursor) {
+            url.searchParams.set('despues', cursor);
+        }
+
+        try {
+            const headers = {};
+            if (this.pollEtag && this.pollEtag.url === url.href) {
+                headers['If-None-Match'] = this.pollEtag.etag;
+            }
+            const response = await fetch(url, { headers: headers, cache: 'no-store' });
+            if (response.status === 304 || !response.ok) return;
+
+            this.pollEtag = { url: url.href, etag: response.headers.get('ETag') };
+            const data = await response.json();
+
+            // Descartar la respuesta si mientras tanto se envió un mensaje
+            if (!data.exito || this.sending || cursor !== this.lastMessageId) return;
+
+            const nuevos = data.messages.filter(msg => !cursor || msg.id > cursor);
+            if (nuevos.length > 0) {
+                this.emptyState.style.display = 'none';
+                nuevos.forEach(msg => {
+                    if (msg.role !== 'system') {
+                        this.addMessageToUI(msg.role, msg.contenido);
+                    }
+                });
+            }
+            if (data.cursor_siguiente) {
+                this.lastMessageId = data.cursor_siguiente;
+            }
+            if (!cursor) {
+                this.updateLoadEarlier(data);
+            }
+            if (data.hay_posteriores) {
+                this.pollNewMessages();
+            }
+        } catch (error) {
+            console.error('Error polling messages:', error);
+        }
+    }
+
     async clearChat() {
         if (!confirm('¿Estás seguro de que quieres comenzar una nueva conversación? El historial actual se archivará.')) {
             return;
@@ -190,6 +390,9 @@ class AIChatManager {
                 // Clear messages
                 const messages = this.chatMessages.querySelectorAll('.message');
                 messages.forEach(msg => msg.remove());
+                this.updateLoadEarlier({});
+                this.lastMessageId = null;
+                this.pollEtag = null;
 
                 // Show empty state
                 this.emptyState.style.display = 'block';
@@ -279,7 +482,7 @@ class AIChatManager {
             confirmBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Procesando...';
 
             try {
-                await this.confirmAction(propuesta.accion, propuesta.datos);
+                await this.confirmAction(propuesta.token);
                 modal.hide();
             } catch (error) {
                 alert('Error al confirmar la acción: ' + error.message);
@@ -375,8 +578,9 @@ class AIChatManager {
         return div.innerHTML;
     }
 
-    async confirmAction(accion, datos) {
+    async confirmAction(token) {
         try {
+            // Solo se envía el token: el servidor toma la acción de la propuesta pendiente
             const response = await fetch(this.apiUrls.confirm, {
                 method: 'POST',
                 headers: {
@@ -384,13 +588,16 @@ class AIChatManager {
                     'X-CSRFToken': this.getCookie('csrftoken')
                 },
                 body: JSON.stringify({
-                    accion: accion,
-                    datos: datos
+                    token: token
                 })
             });
 
             const result = await response.json();
 
+            if (result.ultimo_mensaje_id) {
+                this.lastMessageId = result.ultimo_mensaje_id;
+            }
+
             if (result.exito) {
                 this.addMessageToUI('assistant', `✓ ${result.mensaje}`);
             } else {
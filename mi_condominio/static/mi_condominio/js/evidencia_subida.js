@@ -0,0 +1,243 @@
+/**
+ * Subida de evidencias por bloques, reanudable.
+ *
+ * Reemplaza el envío del formulario de evidencias: el archivo se envía en
+ * bloques (PUT con Content-Range) y el servidor va guardando lo recibido.
+ * Si la conexión se corta, el script reintenta desde el último byte
+ * confirmado; si se recarga la página y se elige el mismo archivo, la
+ * subida continúa gracias al id guardado en localStorage.
+ */
+
+class EvidenciaSubida {
+    constructor(formId = 'evidencia-form') {
+        this.form = document.getElementById(formId);
+        if (!this.form || !this.form.dataset.subidaUrl || !window.fetch || !window.Blob?.prototype.slice) {
+            return; // Sin soporte: el formulario se envía de la forma tradicional
+        }
+
+        this.baseUrl = this.form.dataset.subidaUrl;
+        this.archivoInput = this.form.querySelector('input[type="file"]');
+        this.incidenciaSelect = this.form.querySelector('[name="incidencia"]');
+        this.tipoSelect = this.form.querySelector('[name="tipo_archivo_evidencia"]');
+        this.submitButton = this.form.querySelector('button[type="submit"]');
+        this.progreso = document.getElementById('subida-progreso');
+        this.barra = this.progreso?.querySelector('.progress-bar');
+        this.mensaje = document.getElementById('subida-mensaje');
+        this.subiendo = false;
+
+        this.maxReintentos = 8;
+
+        this.init();
+    }
+
+    init() {
+        this.form.addEventListener('submit', (event) => {
+            const archivo = this.archivoInput?.files[0];
+            if (!archivo) {
+                return; // Sin archivo: validación normal del formulario
+            }
+            event.preventDefault();
+            if (!this.subiendo) {
+                this.subir(archivo);
+            }
+        });
+    }
+
+    claveLocal(archivo) {
+        return `evidencia-subida:${this.incidenciaSelect.value}:${archivo.name}:${archivo.size}:${archivo.lastModified}`;
+    }
+
+    async subir(archivo) {
+        this.subiendo = true;
+        this.submitButton.disabled = true;
+        this.mostrarMensaje('');
+        this.actualizarProgreso(0, archivo.size);
+
+        const clave = this.claveLocal(archivo);
+        try {
+            let estado = await this.reanudar(clave);
+            if (!estado) {
+                estado = await this.iniciar(archivo);
+                localStorage.setItem(clave, estado.id);
+            }
+
+            estado = await this.enviarBloques(archivo, estado);
+
+            localStorage.removeItem(clave);
+            this.actualizarProgreso(archivo.size, archivo.size);
+            window.location.href = estado.redirect;
+        } catch (error) {
+            if (error.definitivo) {
+                localStorage.removeItem(clave);
+            }
+            this.mostrarMensaje(error.message);
+            this.subiendo = false;
+            this.submitButton.disabled = false;
+        }
+    }
+
+    async reanudar(clave) {
+        const id = localStorage.getItem(clave);
+        if (!id) {
+            return null;
+        }
+
+        try {
+            const respuesta = await fetch(`${this.baseUrl}${id}/`);
+            const estado = respuesta.ok ? await respuesta.json() : null;
+            if (estado && ['PENDIENTE', 'COMPLETADA'].includes(estado.estado)) {
+                return estado;
+            }
+        } catch (error) {
+            console.warn('No se pudo consultar la subida anterior:', error);
+        }
+        localStorage.removeItem(clave);
+        return null;
+    }
+
+    async iniciar(archivo) {
+        const respuesta = await fetch(this.baseUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.getCookie('csrftoken')
+            },
+            body: JSON.stringify({
+                incidencia: this.incidenciaSelect.value,
+                tipo: this.tipoSelect.value,
+                nombre: archivo.name,
+                tamano: archivo.size
+            })
+        });
+        const datos = await respuesta.json();
+        if (!datos.exito) {
+            throw new Error(datos.error || 'No se pudo iniciar la subida');
+        }
+        return datos;
+    }
+
+    async enviarBloques(archivo, estado) {
+        let fallos = 0;
+
+        while (estado.estado === 'PENDIENTE') {
+            const inicio = estado.recibido;
+            const fin = Math.min(inicio + estado.tamano_bloque, archivo.size);
+
+            let respuesta;
+            try {
+                await this.esperarConexion();
+                respuesta = await fetch(`${this.baseUrl}${estado.id}/bloque/`, {
+                    method: 'PUT',
+                    headers: {
+                        'Content-Range': `bytes ${inicio}-${fin - 1}/${archivo.size}`,
+                        'Content-Type': 'application/octet-stream',
+                        'X-CSRFToken': this.getCookie('csrftoken')
+                    },
+                    body: archivo.slice(inicio, fin)
+                });
+            } catch (error) {
+                respuesta = null; // Error de red: se reintenta
+            }
+
+            const datos = respuesta ? await respuesta.json().catch(() => null) : null;
+
+            if (respuesta && (respuesta.ok || respuesta.status === 409) && datos) {
+                if (!datos.exito && datos.estado === 'RECHAZADA') {
+                    throw this.errorDefinitivo(datos.error);
+                }
+                // 409: el servidor indica desde qué byte continuar
+                estado = datos;
+                fallos = 0;
+                this.actualizarProgreso(estado.recibido, archivo.size);
+                continue;
+            }
+
+            if (datos && datos.estado === 'RECHAZADA') {
+                throw this.errorDefinitivo(datos.error);
+            }
+            if (respuesta && respuesta.status === 404) {
+                throw this.errorDefinitivo('La subida ya no existe. Intente nuevamente.');
+            }
+
+            fallos += 1;
+            if (fallos > this.maxReintentos) {
+                throw new Error('No se pudo completar la subida. Puede reintentarla y continuará desde donde quedó.');
+            }
+            const espera = Math.min(1000 * 2 ** (fallos - 1), 30000);
+            this.mostrarMensaje(`Conexión interrumpida. Reintentando en ${Math.round(espera / 1000)} s...`);
+            await new Promise(resolve => setTimeout(resolve, espera));
+            estado = await this.consultarEstado(estado);
+            this.mostrarMensaje('');
+        }
+
+        if (estado.estado !== 'COMPLETADA') {
+            throw this.errorDefinitivo(estado.error || 'La subida no se pudo completar');
+        }
+        return estado;
+    }
+
+    async consultarEstado(estado) {
+        try {
+            const respuesta = await fetch(`${this.baseUrl}${estado.id}/`);
+            if (respuesta.ok) {
+                return await respuesta.json();
+            }
+        } catch (error) {
+            // Sin conexión: se mantiene el último estado conocido
+        }
+        return estado;
+    }
+
+    esperarConexion() {
+        if (navigator.onLine !== false) {
+            return Promise.resolve();
+        }
+        this.mostrarMensaje('Sin conexión. La subida continuará al recuperarla...');
+        return new Promise(resolve => window.addEventListener('online', resolve, { once: true }));
+    }
+
+    errorDefinitivo(mensaje) {
+        const error = new Error(mensaje || 'El archivo fue rechazado');
+        error.definitivo = true;
+        return error;
+    }
+
+    actualizarProgreso(recibido, total) {
+        if (!this.progreso) {
+            return;
+        }
+        const porcentaje = total ? Math.floor(recibido * 100 / total) : 0;
+        this.progreso.classList.remove('d-none');
+        this.barra.style.width = `${porcentaje}%`;
+        this.barra.textContent = `${porcentaje}%`;
+        this.barra.setAttribute('aria-valuenow', porcentaje);
+    }
+
+    mostrarMensaje(texto) {
+        if (!this.mensaje) {
+            return;
+        }
+        this.mensaje.textContent = texto;
+        this.mensaje.classList.toggle('d-none', !texto);
+    }
+
+    getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+}
+
+// Inicializar cuando el DOM esté listo
+document.addEventListener('DOMContentLoaded', () => {
+    new EvidenciaSubida();
+});
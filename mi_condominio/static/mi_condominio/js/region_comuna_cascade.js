@@ -3,9 +3,17 @@
  *
  * Este script maneja la dependencia entre los selectores de región y comuna,
  * cargando dinámicamente las comunas según la región seleccionada.
+ *
+ * Si el selector de región trae data-catalogo-url, descarga una sola vez el
+ * catálogo con todas las regiones y comunas (el navegador lo guarda en
+ * caché) y arma las comunas desde memoria. Si no, o si el catálogo no se
+ * puede descargar, consulta /api/comunas/<región>/ en cada cambio.
  */
 
 class RegionComunaCascade {
+    // Descargas del catálogo por URL, compartidas entre instancias
+    static catalogos = new Map();
+
     constructor(regionSelectId = 'id_region', comunaSelectId = 'id_comuna') {
         this.regionSelect = document.getElementById(regionSelectId);
         this.comunaSelect = document.getElementById(comunaSelectId);
@@ -16,6 +24,7 @@ class RegionComunaCascade {
         }
 
         this.comunaOriginalValue = this.comunaSelect.value; // Guardar valor original para modo edición
+        this.catalogoUrl = this.regionSelect.dataset.catalogoUrl;
         this.init();
     }
 
@@ -47,14 +56,7 @@ class RegionComunaCascade {
             this.comunaSelect.disabled = true;
             this.comunaSelect.innerHTML = '<option value="">Cargando comunas...</option>';
 
-            // Hacer petición al API
-            const response = await fetch(`/api/comunas/${regionId}/`);
-
-            if (!response.ok) {
-                throw new Error('Error al cargar las comunas');
-            }
-
-            const data = await response.json();
+            const data = await this.fetchComunas(regionId);
 
             // Limpiar select de comunas
             this.comunaSelect.innerHTML = '<option value="">Seleccione una comuna</option>';
@@ -88,6 +90,45 @@ class RegionComunaCascade {
         }
     }
 
+    async fetchComunas(regionId) {
+        const catalogo = await this.loadCatalogo();
+        if (catalogo) {
+            const comunas = catalogo.comunas[regionId] || [];
+            return { comunas: comunas.map(([id, nombre]) => ({ id, nombre })) };
+        }
+
+        // Sin catálogo: petición al API por región
+        const response = await fetch(`/api/comunas/${regionId}/`);
+        if (!response.ok) {
+            throw new Error('Error al cargar las comunas');
+        }
+        return response.json();
+    }
+
+    loadCatalogo() {
+        if (!this.catalogoUrl) {
+            return Promise.resolve(null);
+        }
+
+        const catalogos = RegionComunaCascade.catalogos;
+        if (!catalogos.has(this.catalogoUrl)) {
+            const descarga = fetch(this.catalogoUrl)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Error al cargar el catálogo de comunas');
+                    }
+                    return response.json();
+                })
+                .catch(error => {
+                    console.warn('Se usará el API por región:', error);
+                    catalogos.delete(this.catalogoUrl); // Reintentar en el próximo cambio
+                    return null;
+                });
+            catalogos.set(this.catalogoUrl, descarga);
+        }
+        return catalogos.get(this.catalogoUrl);
+    }
+
     clearComunas() {
         this.comunaSelect.innerHTML = '<option value="">Primero seleccione una región</option>';
         this.comunaSelect.disabled = true;
@@ -1,3 +1,479 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import ai_assistant, ai_tools, limpieza_archivos
+from .almacenamiento import PREFIJO_CONTENIDO
+from .busqueda import ORDEN_RELEVANCIA, buscar, paginar_busqueda
+from .descargas import RangoNoSatisfacible, _rango_aplicable, parsear_rango
+from .models import (
+    ArchivoEvidencia, CategoriaIncidencia, ChatMessage, ChatSession, Comuna, Condominio,
+    ContadorIncidencias, EvidenciaIncidencia, Incidencia, Region, Usuario,
+)
+from .paginacion import _codificar_cursor, paginar_por_cursor
+
+
+class DatosBaseMixin:
+    """Condominio, categoría y usuario comunes a las pruebas."""
+
+    @staticmethod
+    def crear_datos_base():
+        region = Region.objects.create(codigo='13', nombre='Metropolitana')
+        comuna = Comuna.objects.create(region=region, nombre='Santiago')
+        condominio = Condominio.objects.create(
+            rut='76123456-7', nombre='Condominio Los Aromos', direccion='Av. Siempre Viva 123',
+            region=region, comuna=comuna, mail_contacto='aromos@example.com'
+        )
+        categoria = CategoriaIncidencia.objects.create(nombre_categoria_incidencia='Ascensores')
+        usuario = Usuario.objects.create(
+            condominio=condominio, nombres='Ana', apellido='Rojas', rut='12345678-5',
+            correo='ana@example.com', tipo_usuario=Usuario.TipoUsuario.CONSERJE
+        )
+        return condominio, categoria, usuario
+
+    def crear_incidencia(self, **campos):
+        datos = {
+            'condominio': self.condominio,
+            'tipo_incidencia': self.categoria,
+            'usuario_reporta': self.usuario,
+            'titulo': 'Ascensor detenido',
+        }
+        datos.update(campos)
+        return Incidencia.objects.create(**datos)
+
+
+class DatosBaseTestCase(DatosBaseMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.condominio, cls.categoria, cls.usuario = cls.crear_datos_base()
+
+
+class ContadorIncidenciasTests(DatosBaseTestCase):
+    """Los contadores se ajustan al crear, modificar y eliminar incidencias."""
+
+    def total(self, estado, prioridad=Incidencia.Prioridad.MEDIA):
+        contador = ContadorIncidencias.objects.filter(
+            condominio=self.condominio, tipo_incidencia=self.categoria, estado=estado, prioridad=prioridad
+        ).first()
+        return contador.total if contador else 0
+
+    def test_crear_suma_uno(self):
+        self.crear_incidencia()
+        self.crear_incidencia()
+        self.assertEqual(self.total(Incidencia.Estado.PENDIENTE), 2)
+
+    def test_cambio_de_estado_mueve_la_incidencia(self):
+        incidencia = self.crear_incidencia()
+        incidencia.estado = Incidencia.Estado.RESUELTA
+        incidencia.save()
+
+        self.assertEqual(self.total(Incidencia.Estado.PENDIENTE), 0)
+        self.assertEqual(self.total(Incidencia.Estado.RESUELTA), 1)
+
+    def test_cambio_de_estado_en_una_instancia_leida(self):
+        incidencia = self.crear_incidencia()
+        leida = Incidencia.objects.get(pk=incidencia.pk)
+        leida.prioridad = Incidencia.Prioridad.URGENTE
+        leida.save()
+
+        self.assertEqual(self.total(Incidencia.Estado.PENDIENTE), 0)
+        self.assertEqual(self.total(Incidencia.Estado.PENDIENTE, Incidencia.Prioridad.URGENTE), 1)
+
+    def test_guardar_sin_cambios_no_altera_el_contador(self):
+        incidencia = self.crear_incidencia()
+        incidencia.titulo = 'Ascensor detenido en el piso 3'
+        incidencia.save()
+        self.assertEqual(self.total(Incidencia.Estado.PENDIENTE), 1)
+
+    def test_eliminar_resta_uno(self):
+        incidencia = self.crear_incidencia()
+        self.crear_incidencia()
+        incidencia.delete()
+        self.assertEqual(self.total(Incidencia.Estado.PENDIENTE), 1)
+
+    def test_reconstruir_coincide_con_los_ajustes(self):
+        self.crear_incidencia()
+        self.crear_incidencia(estado=Incidencia.Estado.CERRADA)
+        antes = set(ContadorIncidencias.objects.values_list('estado', 'prioridad', 'total'))
+
+        ContadorIncidencias.reconstruir()
+
+        self.assertEqual(set(ContadorIncidencias.objects.values_list('estado', 'prioridad', 'total')), antes)
+
+
+class BusquedaTests(DatosBaseTestCase):
+    """Búsqueda de texto completo con campos adicionales por subcadena."""
+
+    def test_coincide_por_prefijo_de_la_ultima_palabra(self):
+        incidencia = self.crear_incidencia(titulo='Ascensor detenido')
+        self.crear_incidencia(titulo='Filtración en el techo')
+
+        resultado = list(buscar(Incidencia.objects.all(), 'ascen'))
+
+        self.assertEqual(resultado, [incidencia])
+
+    def test_texto_sin_palabras_no_devuelve_nada(self):
+        self.crear_incidencia()
+        self.assertFalse(buscar(Incidencia.objects.all(), ' :*& ').exists())
+
+    def test_campos_contiene_agrega_filas_con_rango_cero(self):
+        por_titulo = self.crear_incidencia(titulo='Portón de los Aromos no abre')
+        por_condominio = self.crear_incidencia(titulo='Luz quemada')
+
+        resultado = list(
+            buscar(Incidencia.objects.all(), 'Aromos', campos_contiene=('condominio__nombre',))
+            .order_by(*ORDEN_RELEVANCIA)
+        )
+
+        self.assertEqual(resultado, [por_titulo, por_condominio])
+        self.assertGreater(resultado[0].rango, 0)
+        self.assertEqual(resultado[1].rango, 0)
+
+    def test_campos_contiene_escapa_comodines(self):
+        self.crear_incidencia(titulo='Luz quemada')
+        resultado = buscar(Incidencia.objects.all(), 'Los_Aromos', campos_contiene=('condominio__nombre',))
+        self.assertFalse(resultado.exists())
+
+
+class PaginacionCursorTests(DatosBaseTestCase):
+    """Paginación por cursor hacia adelante y hacia atrás."""
+
+    def setUp(self):
+        self.incidencias = [self.crear_incidencia(titulo=f'Incidencia {numero}') for numero in range(7)]
+        self.esperadas = [incidencia.pk for incidencia in reversed(self.incidencias)]
+        self.factory = RequestFactory()
+
+    def pagina(self, query=''):
+        request = self.factory.get('/incidencias/' + query)
+        return paginar_por_cursor(request, Incidencia.objects.all(), ('-fecha_reporte', '-id'), tamano_pagina=3)
+
+    def test_recorre_todas_las_paginas_hacia_adelante_y_hacia_atras(self):
+        paginas = [self.pagina()]
+        while paginas[-1].tiene_siguiente:
+            paginas.append(self.pagina(paginas[-1].url_siguiente))
+
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 1])
+        self.assertEqual([incidencia.pk for pagina in paginas for incidencia in pagina], self.esperadas)
+        self.assertFalse(paginas[0].tiene_anterior)
+
+        anterior = self.pagina(paginas[-1].url_anterior)
+        self.assertEqual([incidencia.pk for incidencia in anterior], self.esperadas[3:6])
+        self.assertTrue(anterior.tiene_siguiente)
+
+        primera = self.pagina(anterior.url_anterior)
+        self.assertEqual([incidencia.pk for incidencia in primera], self.esperadas[:3])
+        self.assertFalse(primera.tiene_anterior)
+
+    def test_conserva_los_demas_parametros(self):
+        pagina = self.pagina('?estado=PENDIENTE')
+        self.assertIn('estado=PENDIENTE', pagina.url_siguiente)
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        for cursor in ('no-es-base64!', 'W10', _codificar_cursor(['no-es-fecha', '1']), _codificar_cursor(['2026-01-01', 'x'])):
+            with self.subTest(cursor=cursor):
+                pagina = self.pagina(f'?despues={cursor}')
+                self.assertEqual([incidencia.pk for incidencia in pagina], self.esperadas[:3])
+
+    def test_busqueda_pagina_por_relevancia(self):
+        request = self.factory.get('/incidencias/', {'q': 'incidencia'})
+        pagina = paginar_busqueda(request, Incidencia.objects.all(), 'incidencia', ('-fecha_reporte', '-id'), tamano_pagina=5)
+        siguiente = paginar_busqueda(
+            self.factory.get('/incidencias/' + pagina.url_siguiente), Incidencia.objects.all(),
+            'incidencia', ('-fecha_reporte', '-id'), tamano_pagina=5
+        )
+
+        self.assertEqual(len(pagina) + len(siguiente), 7)
+        self.assertEqual(
+            {incidencia.pk for incidencia in pagina} | {incidencia.pk for incidencia in siguiente},
+            set(self.esperadas)
+        )
+
+
+class PropuestaPendienteTests(DatosBaseTestCase):
+    """Una propuesta del asistente se reclama y se ejecuta una sola vez."""
+
+    def setUp(self):
+        self.session = ChatSession.objects.create(usuario=self.usuario)
+        ai_assistant._nueva_propuesta(self.session, {'accion': 'accion_prueba', 'datos': {'valor': 1}})
+        self.session.save()
+        self.token = self.session.propuesta_token
+
+    def test_dos_solicitudes_concurrentes_reclaman_una_sola_vez(self):
+        primera = ChatSession.objects.get(pk=self.session.pk)
+        segunda = ChatSession.objects.get(pk=self.session.pk)
+
+        self.assertEqual(ai_assistant._reclamar_propuesta(primera, self.token)['accion'], 'accion_prueba')
+        self.assertIsNone(ai_assistant._reclamar_propuesta(segunda, self.token))
+
+        self.session.refresh_from_db()
+        self.assertIsNone(self.session.propuesta_pendiente)
+        self.assertIsNone(self.session.propuesta_token)
+
+    def test_token_distinto_no_reclama(self):
+        self.assertIsNone(ai_assistant._reclamar_propuesta(self.session, uuid.uuid4()))
+        self.assertTrue(ChatSession.objects.filter(pk=self.session.pk, propuesta_token=self.token).exists())
+
+    def test_propuesta_vencida_no_se_reclama(self):
+        ChatSession.objects.filter(pk=self.session.pk).update(propuesta_expira=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(ai_assistant._reclamar_propuesta(self.session, self.token))
+
+    def test_confirmar_dos_veces_ejecuta_la_accion_una_vez(self):
+        accion = mock.Mock(return_value={'exito': True, 'mensaje': 'Listo'})
+
+        with mock.patch.dict(ai_tools.EXECUTION_FUNCTIONS, {'accion_prueba': accion}):
+            resultado = ai_assistant.confirmar_propuesta(self.usuario, self.token)
+            repetido = ai_assistant.confirmar_propuesta(self.usuario, self.token)
+
+        accion.assert_called_once_with({'valor': 1})
+        self.assertTrue(resultado['exito'])
+        self.assertIsNone(repetido)
+        self.assertEqual(ChatMessage.objects.filter(sesion=self.session, role='assistant').count(), 1)
+
+
+class MediaTemporalMixin:
+    """Guarda los archivos de la prueba en un MEDIA_ROOT temporal."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        ajuste = override_settings(MEDIA_ROOT=self.media_root)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def crear_evidencia(self, incidencia, contenido, nombre='nota.txt'):
+        return EvidenciaIncidencia.objects.create(
+            incidencia=incidencia,
+            tipo_archivo_evidencia=EvidenciaIncidencia.TipoArchivo.DOCUMENTO,
+            archivo_evidencia=ContentFile(contenido, name=nombre),
+        )
+
+    def referencias(self, nombre):
+        return ArchivoEvidencia.objects.get(nombre=nombre).referencias
+
+
+class ArchivoEvidenciaTests(MediaTemporalMixin, DatosBaseTestCase):
+    """Almacenamiento por contenido y conteo de referencias."""
+
+    def setUp(self):
+        super().setUp()
+        self.incidencia = self.crear_incidencia()
+
+    def test_mismo_contenido_comparte_archivo(self):
+        primera = self.crear_evidencia(self.incidencia, b'contenido repetido', 'uno.txt')
+        segunda = self.crear_evidencia(self.incidencia, b'contenido repetido', 'dos.txt')
+
+        nombre = primera.archivo_evidencia.name
+        self.assertEqual(segunda.archivo_evidencia.name, nombre)
+        self.assertTrue(nombre.startswith(PREFIJO_CONTENIDO))
+        self.assertEqual(self.referencias(nombre), 2)
+        self.assertEqual(segunda.nombre_original, 'dos.txt')
+
+    def test_eliminar_una_evidencia_resta_una_referencia(self):
+        primera = self.crear_evidencia(self.incidencia, b'contenido repetido')
+        self.crear_evidencia(self.incidencia, b'contenido repetido')
+        nombre = primera.archivo_evidencia.name
+
+        primera.delete()
+
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertIsNone(ArchivoEvidencia.objects.get(nombre=nombre).liberado_at)
+
+    def test_reemplazar_el_archivo_libera_el_anterior(self):
+        evidencia = self.crear_evidencia(self.incidencia, b'version 1')
+        anterior = evidencia.archivo_evidencia.name
+
+        evidencia.archivo_evidencia = ContentFile(b'version 2', name='nota.txt')
+        evidencia.save()
+
+        self.assertEqual(self.referencias(anterior), 0)
+        self.assertIsNotNone(ArchivoEvidencia.objects.get(nombre=anterior).liberado_at)
+        self.assertEqual(self.referencias(evidencia.archivo_evidencia.name), 1)
+
+    def test_referenciar_y_liberar(self):
+        nombre = f'{PREFIJO_CONTENIDO}ab/cd/{"ab" * 32}.txt'
+
+        ArchivoEvidencia.referenciar(nombre, tamano=10)
+        ArchivoEvidencia.referenciar(nombre)
+        self.assertEqual(self.referencias(nombre), 2)
+        self.assertEqual(ArchivoEvidencia.objects.get(nombre=nombre).sha256, 'ab' * 32)
+
+        ArchivoEvidencia.liberar(nombre)
+        ArchivoEvidencia.liberar(nombre)
+        ArchivoEvidencia.liberar(nombre)
+        archivo = ArchivoEvidencia.objects.get(nombre=nombre)
+        self.assertEqual(archivo.referencias, 0)
+        self.assertIsNotNone(archivo.liberado_at)
+
+        ArchivoEvidencia.referenciar(nombre)
+        archivo.refresh_from_db()
+        self.assertEqual(archivo.referencias, 1)
+        self.assertIsNone(archivo.liberado_at)
+
+
+class RangoTests(SimpleTestCase):
+    """Interpretación de los encabezados Range e If-Range."""
+
+    def test_parsear_rango(self):
+        casos = [
+            ('bytes=0-99', (0, 99)),
+            ('bytes=100-', (100, 999)),
+            ('bytes=-100', (900, 999)),
+            ('bytes=-5000', (0, 999)),
+            ('bytes=900-5000', (900, 999)),
+            ('bytes = 10 - 20', (10, 20)),
+            ('', None),
+            (None, None),
+            ('bytes=-', None),
+            ('bytes=0-1,5-9', None),
+            ('items=0-10', None),
+        ]
+        for encabezado, esperado in casos:
+            with self.subTest(encabezado=encabezado):
+                self.assertEqual(parsear_rango(encabezado, 1000), esperado)
+
+    def test_rango_no_satisfacible(self):
+        for encabezado, tamano in (('bytes=1000-', 1000), ('bytes=20-10', 1000), ('bytes=-0', 1000), ('bytes=-10', 0)):
+            with self.subTest(encabezado=encabezado, tamano=tamano):
+                with self.assertRaises(RangoNoSatisfacible):
+                    parsear_rango(encabezado, tamano)
+
+    def test_rango_aplicable_con_if_range(self):
+        factory = RequestFactory()
+        modificado = 1_700_000_000
+        etag = '"abc"'
+
+        self.assertTrue(_rango_aplicable(factory.get('/'), etag, modificado))
+        self.assertTrue(_rango_aplicable(factory.get('/', HTTP_IF_RANGE='"abc"'), etag, modificado))
+        self.assertFalse(_rango_aplicable(factory.get('/', HTTP_IF_RANGE='"otro"'), etag, modificado))
+        self.assertFalse(_rango_aplicable(factory.get('/', HTTP_IF_RANGE='W/"abc"'), etag, modificado))
+        self.assertTrue(_rango_aplicable(factory.get('/', HTTP_IF_RANGE=http_date(modificado)), etag, modificado))
+        self.assertFalse(_rango_aplicable(factory.get('/', HTTP_IF_RANGE=http_date(modificado - 60)), etag, modificado))
+        self.assertFalse(_rango_aplicable(factory.get('/', HTTP_IF_RANGE='no es fecha'), etag, modificado))
+
+
+class DescargaEvidenciaTests(MediaTemporalMixin, DatosBaseTestCase):
+    """Descarga parcial de evidencias a través de la vista."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_user('revisor', password='clave-segura-123'))
+        self.evidencia = self.crear_evidencia(self.crear_incidencia(), b'0123456789' * 10)
+        self.url = reverse('evidencia_descargar', args=[self.evidencia.pk])
+
+    def test_rango_responde_206(self):
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(respuesta.streaming_content), b'0123456789')
+
+    def test_if_range_distinto_entrega_el_archivo_completo(self):
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"otro"')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(b''.join(respuesta.streaming_content)), 100)
+
+    def test_rango_fuera_del_archivo_responde_416(self):
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta['Content-Range'], 'bytes */100')
+
+    def test_tipo_no_seguro_se_descarga_como_adjunto(self):
+        evidencia = self.crear_evidencia(self.evidencia.incidencia, b'<script>alert(1)</script>', 'pagina.html')
+        respuesta = self.client.get(reverse('evidencia_descargar', args=[evidencia.pk]))
+
+        self.assertTrue(respuesta['Content-Disposition'].startswith('attachment'))
+        self.assertIn('sandbox', respuesta['Content-Security-Policy'])
+
+
+class EliminacionAlConfirmarTests(MediaTemporalMixin, DatosBaseMixin, TransactionTestCase):
+    """Los archivos liberados se eliminan solo cuando la transacción se confirma."""
+
+    def setUp(self):
+        super().setUp()
+        self.condominio, self.categoria, self.usuario = self.crear_datos_base()
+        self.evidencia = self.crear_evidencia(self.crear_incidencia(), b'contenido a eliminar')
+        self.nombre = self.evidencia.archivo_evidencia.name
+        self.ruta = self.evidencia.archivo_evidencia.path
+        # Fuera del margen en que el almacenamiento puede estar reutilizándolo
+        antiguo = time.time() - 3600
+        os.utime(self.ruta, (antiguo, antiguo))
+
+    def esperar_limpieza(self):
+        limpieza_archivos._pool_limpieza().submit(lambda: None).result(timeout=10)
+
+    def test_eliminar_la_ultima_evidencia_borra_el_archivo(self):
+        self.evidencia.delete()
+        self.esperar_limpieza()
+
+        self.assertFalse(os.path.exists(self.ruta))
+        self.assertFalse(ArchivoEvidencia.objects.filter(nombre=self.nombre).exists())
+
+    def test_transaccion_revertida_conserva_el_archivo(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.evidencia.delete()
+                raise RuntimeError('revertir')
+        self.esperar_limpieza()
+
+        self.assertTrue(os.path.exists(self.ruta))
+        self.assertEqual(ArchivoEvidencia.objects.get(nombre=self.nombre).referencias, 1)
+
+    def test_archivo_con_otra_referencia_no_se_elimina(self):
+        self.crear_evidencia(self.evidencia.incidencia, b'contenido a eliminar')
+        self.evidencia.delete()
+        self.esperar_limpieza()
+
+        self.assertTrue(os.path.exists(self.ruta))
+        self.assertEqual(ArchivoEvidencia.objects.get(nombre=self.nombre).referencias, 1)
+
+
+class EliminarRutaTests(SimpleTestCase):
+    """Eliminación con lápida: un archivo reutilizado a tiempo no se pierde."""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.ruta = os.path.join(directorio, 'archivo.txt')
+        with open(self.ruta, 'wb') as archivo:
+            archivo.write(b'12345')
+        antiguo = time.time() - 3600
+        os.utime(self.ruta, (antiguo, antiguo))
+        self.limite = timezone.now() - timedelta(minutes=15)
+
+    def test_elimina_un_archivo_antiguo_sin_uso(self):
+        self.assertEqual(limpieza_archivos.eliminar_ruta(self.ruta, self.limite, lambda: False), 5)
+        self.assertEqual(os.listdir(os.path.dirname(self.ruta)), [])
+
+    def test_no_elimina_un_archivo_reciente(self):
+        os.utime(self.ruta)
+        self.assertIsNone(limpieza_archivos.eliminar_ruta(self.ruta, self.limite, lambda: False))
+        self.assertTrue(os.path.exists(self.ruta))
+
+    def test_restaura_el_archivo_si_se_registra_durante_la_eliminacion(self):
+        # La primera consulta ve el archivo libre; la segunda, ya renombrado, en uso
+        en_uso = mock.Mock(side_effect=[False, True])
+
+        self.assertIsNone(limpieza_archivos.eliminar_ruta(self.ruta, self.limite, en_uso))
+
+        self.assertEqual(os.listdir(os.path.dirname(self.ruta)), ['archivo.txt'])
+        self.assertEqual(en_uso.call_count, 2)
+
+    def test_simular_no_modifica_el_disco(self):
+        self.assertEqual(limpieza_archivos.eliminar_ruta(self.ruta, self.limite, simular=True), 5)
+        self.assertTrue(os.path.exists(self.ruta))
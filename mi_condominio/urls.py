@@ -16,6 +16,8 @@ urlpatterns = [
 
     # API para obtener comunas por región
     path("api/comunas/<int:region_id>/", views.get_comunas_by_region, name="get_comunas_by_region"),
+    # API con todas las regiones y comunas (catálogo en caché)
+    path("api/catalogo/regiones-comunas/", views.catalogo_regiones_comunas, name="catalogo_regiones_comunas"),
 
     # URLs para gestión de reuniones
     path("reuniones/", views.reunion_list, name="reunion_list"),
@@ -52,6 +54,11 @@ urlpatterns = [
     path("evidencias/crear/", views.evidencia_create, name="evidencia_create"),
     path("evidencias/<int:pk>/editar/", views.evidencia_edit, name="evidencia_edit"),
     path("evidencias/<int:pk>/eliminar/", views.evidencia_delete, name="evidencia_delete"),
+    path("evidencias/<int:pk>/archivo/", views.evidencia_descargar, name="evidencia_descargar"),
+    path("evidencias/<int:pk>/archivo/<str:variante>/", views.evidencia_descargar, name="evidencia_descargar"),
+    path("evidencias/subidas/", views.evidencia_subida_iniciar, name="evidencia_subida_iniciar"),
+    path("evidencias/subidas/<uuid:pk>/", views.evidencia_subida_estado, name="evidencia_subida_estado"),
+    path("evidencias/subidas/<uuid:pk>/bloque/", views.evidencia_subida_bloque, name="evidencia_subida_bloque"),
 
     # URLs para gestión de amonestaciones
     path("amonestaciones/", views.amonestacion_list, name="amonestacion_list"),
@@ -62,9 +69,11 @@ urlpatterns = [
     # URLs para asistente de IA
     path("ai-chat/", views.ai_chat_interface, name="ai_chat"),
     path("ai-chat/send/", views.ai_chat_send_message, name="ai_chat_send"),
+    path("ai-chat/stream/", views.ai_chat_stream, name="ai_chat_stream"),
     path("ai-chat/history/", views.ai_chat_history, name="ai_chat_history"),
     path("ai-chat/clear/", views.ai_chat_clear, name="ai_chat_clear"),
     path("ai-chat/confirm/", views.ai_chat_confirm_action, name="ai_chat_confirm"),
+    path("ai-chat/cache/", views.ai_cache_estadisticas, name="ai_cache_estadisticas"),
 
     # TODO: Borrar esta ruta después cuando ya no sea necesaria
     # path("old/", views.index, name="index"),
@@ -0,0 +1,164 @@
+"""
+Validación de los archivos de evidencia.
+
+Reglas comunes al formulario de evidencias (subida en un solo POST) y a la
+subida por bloques (ver ``SubidaEvidencia``):
+
+- tamaño máximo de ``TAMANO_MAXIMO`` bytes,
+- extensión permitida según el tipo de evidencia,
+- firma del contenido (magic bytes) acorde a la extensión, para que un
+  archivo renombrado no pase por otro tipo.
+
+La importación masiva (comando importar_evidencias) usa las mismas reglas y
+``detectar_extension`` para los archivos sin extensión conocida.
+
+La firma se revisa solo con los primeros ``BYTES_CABECERA`` bytes, así que
+en la subida por bloques el tipo se valida con el primer bloque, sin esperar
+al archivo completo.
+"""
+
+import os
+
+from django.core.exceptions import ValidationError
+
+
+# Tamaño máximo de un archivo de evidencia (50MB)
+TAMANO_MAXIMO = 50 * 1024 * 1024
+
+# Extensiones permitidas por tipo de evidencia (OTRO acepta cualquiera)
+EXTENSIONES_POR_TIPO = {
+    'IMAGEN': ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp'],
+    'VIDEO': ['.mp4', '.avi', '.mov', '.wmv', '.webm', '.mkv'],
+    'DOCUMENTO': ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.txt', '.odt', '.ods'],
+    'AUDIO': ['.mp3', '.wav', '.ogg', '.m4a', '.aac'],
+    'OTRO': [],
+}
+
+# Firmas por extensión: el archivo es válido si cumple alguna de las
+# alternativas, y cada alternativa es una lista de (posición, bytes).
+# Las extensiones sin firma fija (.svg, .txt) no se revisan.
+_OLE = [[(0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1')]]
+_ZIP = [[(0, b'PK\x03\x04')]]
+_ISO_BMFF = [[(4, b'ftyp')]]
+_MATROSKA = [[(0, b'\x1a\x45\xdf\xa3')]]
+_ID3 = [(0, b'ID3')]
+
+FIRMAS = {
+    '.jpg': [[(0, b'\xff\xd8\xff')]],
+    '.jpeg': [[(0, b'\xff\xd8\xff')]],
+    '.png': [[(0, b'\x89PNG\r\n\x1a\n')]],
+    '.gif': [[(0, b'GIF87a')], [(0, b'GIF89a')]],
+    '.webp': [[(0, b'RIFF'), (8, b'WEBP')]],
+    '.bmp': [[(0, b'BM')]],
+    '.mp4': _ISO_BMFF,
+    '.m4a': _ISO_BMFF,
+    '.mov': _ISO_BMFF + [[(4, atomo)] for atomo in (b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot')],
+    '.avi': [[(0, b'RIFF'), (8, b'AVI ')]],
+    '.wav': [[(0, b'RIFF'), (8, b'WAVE')]],
+    '.wmv': [[(0, b'\x30\x26\xb2\x75\x8e\x66\xcf\x11')]],
+    '.webm': _MATROSKA,
+    '.mkv': _MATROSKA,
+    '.pdf': [[(0, b'%PDF-')]],
+    '.doc': _OLE,
+    '.xls': _OLE,
+    '.docx': _ZIP,
+    '.xlsx': _ZIP,
+    '.odt': _ZIP,
+    '.ods': _ZIP,
+    '.mp3': [_ID3] + [[(0, sincronia)] for sincronia in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2', b'\xff\xfa')],
+    '.ogg': [[(0, b'OggS')]],
+    '.aac': [_ID3, [(0, b'ADIF')], [(0, b'\xff\xf1')], [(0, b'\xff\xf9')]],
+}
+
+# Bytes iniciales necesarios para revisar cualquier firma de FIRMAS
+BYTES_CABECERA = 16
+
+# Extensiones que se pueden deducir solo de la firma, en orden de prueba.
+# Quedan fuera las firmas compartidas por formatos distintos (ZIP, OLE).
+EXTENSIONES_DETECTABLES = [
+    '.jpg', '.png', '.gif', '.webp', '.bmp', '.pdf',
+    '.mp4', '.avi', '.wmv', '.webm', '.wav', '.ogg', '.mp3',
+]
+
+
+def extension_de(nombre):
+    """Extensión del archivo en minúsculas (con el punto)."""
+    return os.path.splitext(nombre)[1].lower()
+
+
+def detectar_tipo(nombre):
+    """Tipo de evidencia que corresponde a la extensión del archivo."""
+    extension = extension_de(nombre)
+    for tipo, extensiones in EXTENSIONES_POR_TIPO.items():
+        if extension in extensiones:
+            return tipo
+    return 'OTRO'
+
+
+def detectar_extension(cabecera):
+    """
+    Extensión que corresponde a la firma de ``cabecera``, o None.
+
+    Sirve para los archivos sin extensión o con una extensión desconocida
+    (por ejemplo, fotos exportadas como "IMG_0001").
+    """
+    for extension in EXTENSIONES_DETECTABLES:
+        for alternativa in FIRMAS[extension]:
+            if all(cabecera[posicion:posicion + len(firma)] == firma for posicion, firma in alternativa):
+                return extension
+    return None
+
+
+def validar_tamano(tamano):
+    """Verifica que el tamaño no supere TAMANO_MAXIMO."""
+    if tamano > TAMANO_MAXIMO:
+        raise ValidationError(
+            f'El archivo es demasiado grande. Tamaño máximo: {TAMANO_MAXIMO // (1024 * 1024)}MB. '
+            f'Tamaño actual: {tamano / (1024 * 1024):.2f}MB'
+        )
+
+
+def validar_extension(nombre, tipo):
+    """Verifica que la extensión del archivo corresponda al tipo de evidencia."""
+    extensiones = EXTENSIONES_POR_TIPO.get(tipo)
+    if extensiones and extension_de(nombre) not in extensiones:
+        raise ValidationError(
+            f'El archivo no corresponde al tipo "{tipo}". '
+            f'Extensiones válidas: {", ".join(extensiones)}'
+        )
+
+
+def validar_cabecera(nombre, cabecera):
+    """
+    Verifica que los primeros bytes del archivo correspondan a su extensión.
+
+    Args:
+        nombre: nombre del archivo (se usa su extensión)
+        cabecera: primeros BYTES_CABECERA bytes (o el archivo completo si es más corto)
+    """
+    alternativas = FIRMAS.get(extension_de(nombre))
+    if not alternativas:
+        return
+
+    for alternativa in alternativas:
+        if all(cabecera[posicion:posicion + len(firma)] == firma for posicion, firma in alternativa):
+            return
+
+    raise ValidationError(
+        f'El contenido del archivo no corresponde a un archivo {extension_de(nombre)}.'
+    )
+
+
+def validar_archivo(archivo, tipo):
+    """
+    Valida un archivo subido (UploadedFile) completo: tamaño, extensión y firma.
+
+    Solo lee la cabecera del archivo y lo deja posicionado al inicio.
+    """
+    validar_tamano(archivo.size)
+    validar_extension(archivo.name, tipo)
+
+    archivo.seek(0)
+    cabecera = archivo.read(BYTES_CABECERA)
+    archivo.seek(0)
+    validar_cabecera(archivo.name, cabecera)
@@ -1,11 +1,18 @@
+import os
+import re
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
-from .models import Condominio, Reunion, Usuario, Incidencia, CategoriaIncidencia, Bitacora, EvidenciaIncidencia, Amonestacion, Region, Comuna
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_http_methods
+from .models import Condominio, Reunion, Usuario, Incidencia, CategoriaIncidencia, Bitacora, EvidenciaIncidencia, SubidaEvidencia, Amonestacion
 from django.contrib.auth.models import User
 from .forms import (
     CondominioForm,
@@ -17,6 +24,11 @@ from .forms import (
     EvidenciaIncidenciaForm,
     AmonestacionForm
 )
+from .paginacion import paginar_por_cursor
+from .busqueda import paginar_busqueda
+from .estadisticas import obtener_resumen
+from . import descargas, validacion_archivos
+from .catalogo import obtener_catalogo
 
 
 # TODO: Borrar esta vista después cuando ya no sea necesaria
@@ -68,27 +80,13 @@ def dashboard(request):
     Vista principal del dashboard.
     Muestra estadísticas y gráficos del sistema.
     """
-    from datetime import date
-
-    # TODO: Agregar lógica para obtener estadísticas reales de la base de datos
-    total_condominios = Condominio.objects.count()
-
-    # Contar reuniones próximas (desde hoy en adelante)
-    reuniones_proximas = Reunion.objects.filter(fecha_reunion__gte=date.today()).count()
-
-    # Contar usuarios activos
-    total_usuarios = Usuario.objects.filter(estado_cuenta='ACTIVO').count()
-
-    # Contar incidencias abiertas (no cerradas ni canceladas)
-    incidencias_abiertas = Incidencia.objects.exclude(
-        estado__in=['CERRADA', 'CANCELADA']
-    ).count()
+    resumen = obtener_resumen()
 
     context = {
-        'total_condominios': total_condominios,
-        'total_usuarios': total_usuarios,
-        'incidencias_abiertas': incidencias_abiertas,
-        'reuniones_proximas': reuniones_proximas,
+        'total_condominios': resumen['total_condominios'],
+        'total_usuarios': resumen['usuarios_activos'],
+        'incidencias_abiertas': resumen['incidencias_abiertas'],
+        'reuniones_proximas': resumen['reuniones_proximas'],
     }
     return render(request, 'mi_condominio/dashboard/dashboard.html', context)
 
@@ -103,7 +101,7 @@ def condominio_list(request):
     Vista que muestra el listado de todos los condominios.
     Incluye búsqueda y filtros.
     """
-    condominios = Condominio.objects.all()
+    condominios = Condominio.objects.select_related('region', 'comuna').all()
 
     # Búsqueda
     search_query = request.GET.get('search', '')
@@ -111,12 +109,15 @@ def condominio_list(request):
         condominios = condominios.filter(
             models.Q(nombre__icontains=search_query) |
             models.Q(rut__icontains=search_query) |
-            models.Q(comuna__icontains=search_query) |
-            models.Q(region__icontains=search_query)
+            models.Q(comuna__nombre__icontains=search_query) |
+            models.Q(region__nombre__icontains=search_query)
         )
 
+    pagina = paginar_por_cursor(request, condominios, ('nombre', 'id'))
+
     context = {
-        'condominios': condominios,
+        'condominios': pagina,
+        'pagina': pagina,
         'search_query': search_query,
     }
     return render(request, 'mi_condominio/condominios/list.html', context)
@@ -196,13 +197,52 @@ def get_comunas_by_region(request, region_id):
     """
     API endpoint para obtener las comunas de una región específica.
     Retorna JSON con las comunas para usar en selección en cascada.
+
+    Las lee del catálogo en memoria (ver catalogo.py), sin consultar la base
+    de datos. El script de cascada usa ahora catalogo_regiones_comunas; este
+    endpoint se mantiene como respaldo.
     """
-    try:
-        comunas = Comuna.objects.filter(region_id=region_id).order_by('nombre')
-        data = [{'id': c.id, 'nombre': c.nombre} for c in comunas]
-        return JsonResponse({'comunas': data})
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+    comunas = obtener_catalogo().comunas_de(region_id)
+    data = [{'id': comuna_id, 'nombre': nombre} for comuna_id, nombre in comunas]
+    return JsonResponse({'comunas': data})
+
+
+# Cliente que acepta respuestas comprimidas con gzip
+_ACEPTA_GZIP = re.compile(r'\bgzip\b')
+
+
+@require_http_methods(['GET', 'HEAD'])
+def catalogo_regiones_comunas(request):
+    """
+    API endpoint con todas las regiones y comunas en un solo JSON compacto.
+
+    Responde con ETag (304 si el navegador ya tiene esta versión). Si la URL
+    lleva la versión vigente (``?v=``, ver catalogo.url_catalogo) el
+    navegador lo puede guardar un año; si no, lo revalida en cada uso.
+    """
+    from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+    catalogo = obtener_catalogo()
+    comprimido = bool(_ACEPTA_GZIP.search(request.headers.get('Accept-Encoding', '')))
+    # Cada codificación es una representación distinta: su propio ETag
+    etag = f'"{catalogo.version}{"-gz" if comprimido else ""}"'
+
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(
+            catalogo.comprimido if comprimido else catalogo.contenido,
+            content_type='application/json'
+        )
+        if comprimido:
+            respuesta['Content-Encoding'] = 'gzip'
+
+    respuesta['ETag'] = etag
+    patch_vary_headers(respuesta, ['Accept-Encoding'])
+    if request.GET.get('v') == catalogo.version:
+        patch_cache_control(respuesta, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(respuesta, public=True, no_cache=True)
+    return respuesta
 
 
 # ============================================================================
@@ -234,11 +274,14 @@ def reunion_list(request):
             models.Q(lugar_reunion__icontains=search_query)
         )
 
+    pagina = paginar_por_cursor(request, reuniones, ('-fecha_reunion', '-id'))
+
     # Obtener todos los condominios para el filtro
     condominios = Condominio.objects.all().order_by('nombre')
 
     context = {
-        'reuniones': reuniones,
+        'reuniones': pagina,
+        'pagina': pagina,
         'condominios': condominios,
         'search_query': search_query,
         'condominio_id': condominio_id,
@@ -349,11 +392,14 @@ def usuario_list(request):
             models.Q(condominio__nombre__icontains=search_query)
         )
 
+    pagina = paginar_por_cursor(request, usuarios, ('apellido', 'nombres', 'id'))
+
     # Obtener condominios y tipos para filtros
     condominios = Condominio.objects.all().order_by('nombre')
 
     context = {
-        'usuarios': usuarios,
+        'usuarios': pagina,
+        'pagina': pagina,
         'condominios': condominios,
         'tipos_usuario': Usuario.TipoUsuario.choices,
         'search_query': search_query,
@@ -506,23 +552,21 @@ def incidencia_list(request):
     if categoria_id:
         incidencias = incidencias.filter(tipo_incidencia_id=categoria_id)
 
-    # Búsqueda
+    # Búsqueda de texto completo (ordenada por relevancia); también por
+    # condominio y por quien reporta
     search_query = request.GET.get('search', '')
-    if search_query:
-        incidencias = incidencias.filter(
-            models.Q(titulo__icontains=search_query) |
-            models.Q(descripcion__icontains=search_query) |
-            models.Q(condominio__nombre__icontains=search_query) |
-            models.Q(usuario_reporta__nombres__icontains=search_query) |
-            models.Q(usuario_reporta__apellido__icontains=search_query)
-        )
+    pagina = paginar_busqueda(
+        request, incidencias, search_query, ('-fecha_reporte', '-id'),
+        campos_contiene=('condominio__nombre', 'usuario_reporta__nombres', 'usuario_reporta__apellido'),
+    )
 
     # Obtener datos para filtros
     condominios = Condominio.objects.all().order_by('nombre')
     categorias = CategoriaIncidencia.objects.all().order_by('nombre_categoria_incidencia')
 
     context = {
-        'incidencias': incidencias,
+        'incidencias': pagina,
+        'pagina': pagina,
         'condominios': condominios,
         'categorias': categorias,
         'estados': Incidencia.Estado.choices,
@@ -714,27 +758,26 @@ def bitacora_list(request):
     Vista que muestra el listado de todas las bitácoras.
     Incluye búsqueda y filtro por incidencia.
     """
-    bitacoras = Bitacora.objects.select_related('incidencia', 'incidencia__condominio').all().order_by('-fecha_bitacora', '-id')
+    bitacoras = Bitacora.objects.select_related('incidencia', 'incidencia__condominio').all()
 
     # Filtro por incidencia
     incidencia_id = request.GET.get('incidencia', '')
     if incidencia_id:
         bitacoras = bitacoras.filter(incidencia_id=incidencia_id)
 
-    # Búsqueda
+    # Búsqueda de texto completo (ordenada por relevancia)
     search_query = request.GET.get('search', '')
-    if search_query:
-        bitacoras = bitacoras.filter(
-            models.Q(detalle__icontains=search_query) |
-            models.Q(accion__icontains=search_query) |
-            models.Q(incidencia__titulo__icontains=search_query)
-        )
+    pagina = paginar_busqueda(
+        request, bitacoras, search_query, ('-fecha_bitacora', '-id'),
+        campos_contiene=('incidencia__titulo',),
+    )
 
     # Obtener todas las incidencias para el filtro
     incidencias = Incidencia.objects.select_related('condominio').all().order_by('-id')
 
     context = {
-        'bitacoras': bitacoras,
+        'bitacoras': pagina,
+        'pagina': pagina,
         'incidencias': incidencias,
         'search_query': search_query,
         'incidencia_id': incidencia_id,
@@ -815,7 +858,7 @@ def bitacora_delete(request, pk):
 
 @login_required
 def evidencia_list(request):
-    evidencias = EvidenciaIncidencia.objects.select_related('incidencia', 'incidencia__condominio').all().order_by('-id')
+    evidencias = EvidenciaIncidencia.objects.select_related('incidencia', 'incidencia__condominio').all()
 
     # Filtros
     incidencia_id = request.GET.get('incidencia')
@@ -831,15 +874,19 @@ def evidencia_list(request):
     if search:
         evidencias = evidencias.filter(
             Q(incidencia__titulo__icontains=search) |
+            Q(nombre_original__icontains=search) |
             Q(archivo_evidencia__icontains=search)
         )
 
+    pagina = paginar_por_cursor(request, evidencias, ('-id',))
+
     # Para los filtros
     incidencias = Incidencia.objects.select_related('condominio').all().order_by('-id')
     tipos_archivo = EvidenciaIncidencia.TipoArchivo.choices
 
     return render(request, 'mi_condominio/evidencias/list.html', {
-        'evidencias': evidencias,
+        'evidencias': pagina,
+        'pagina': pagina,
         'incidencias': incidencias,
         'tipos_archivo': tipos_archivo,
     })
@@ -896,17 +943,16 @@ def evidencia_edit(request, pk):
 @login_required
 def evidencia_delete(request, pk):
     """
-    Vista para eliminar una evidencia y su archivo asociado del servidor.
+    Vista para eliminar una evidencia.
+
+    El archivo puede ser compartido con otras evidencias (se guarda por
+    contenido): al eliminar el registro se libera su referencia y, si nadie
+    más lo usa, se borra del servidor al confirmarse la transacción.
     """
     evidencia = get_object_or_404(EvidenciaIncidencia, pk=pk)
 
     if request.method == 'POST':
         incidencia_titulo = evidencia.incidencia.titulo
-
-        # Eliminar el archivo del servidor antes de eliminar el registro
-        if evidencia.archivo_evidencia:
-            evidencia.archivo_evidencia.delete(save=False)
-
         evidencia.delete()
         messages.success(request, f'Evidencia de "{incidencia_titulo}" eliminada exitosamente.')
         return redirect('evidencia_list')
@@ -916,11 +962,253 @@ def evidencia_delete(request, pk):
     })
 
 
+# Archivos de una evidencia que se pueden descargar: variante de la URL -> campo
+_ARCHIVOS_DESCARGABLES = {
+    None: 'archivo_evidencia',
+    'miniatura': 'miniatura',
+    'vista_previa': 'vista_previa',
+}
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD'])
+def evidencia_descargar(request, pk, variante=None):
+    """
+    Vista para ver o descargar el archivo de una evidencia (o su miniatura o
+    vista previa) con sesión iniciada.
+
+    Admite peticiones parciales (Range) para adelantar videos y peticiones
+    condicionales (ETag / Last-Modified); ver descargas.py. Con
+    ``?descargar=1`` el navegador guarda el archivo en lugar de mostrarlo.
+    """
+    campo = _ARCHIVOS_DESCARGABLES.get(variante)
+    if campo is None:
+        raise Http404('Variante de archivo inválida')
+
+    evidencia = get_object_or_404(
+        EvidenciaIncidencia.objects.only('archivo_evidencia', 'nombre_original', campo), pk=pk
+    )
+    archivo = getattr(evidencia, campo)
+    if not archivo:
+        raise Http404('La evidencia no tiene este archivo')
+
+    nombre_descarga = evidencia.nombre_archivo
+    if variante:
+        nombre_descarga = f'{os.path.splitext(nombre_descarga)[0]}_{variante}.webp'
+
+    try:
+        return descargas.respuesta_archivo(
+            request, archivo.storage, archivo.name, nombre_descarga,
+            adjunto=bool(request.GET.get('descargar')),
+            versionada=request.GET.get('v') == descargas.version_archivo(archivo.name, archivo.storage),
+        )
+    except NotImplementedError:
+        # Almacenamiento remoto: que lo entregue directamente
+        return redirect(archivo.url)
+    except FileNotFoundError:
+        raise Http404('El archivo de la evidencia no existe')
+
+
+def _estado_subida(subida, exito=True, error=None):
+    """Datos de una subida por bloques para las respuestas JSON."""
+    datos = {
+        'exito': exito,
+        'id': str(subida.id),
+        'nombre': subida.nombre_archivo,
+        'tamano': subida.tamano,
+        'recibido': subida.recibido,
+        'estado': subida.estado,
+        'tamano_bloque': settings.EVIDENCIAS_TAMANO_BLOQUE,
+    }
+    if error or subida.error:
+        datos['error'] = error or subida.error
+    if subida.evidencia_id:
+        datos['evidencia_id'] = subida.evidencia_id
+        datos['redirect'] = reverse('evidencia_list')
+    return datos
+
+
+@login_required
+@require_POST
+def evidencia_subida_iniciar(request):
+    """
+    API endpoint para iniciar la subida por bloques de un archivo de evidencia.
+
+    Recibe JSON {incidencia, nombre, tamano, tipo (opcional)}. Valida el
+    tamaño y la extensión antes de recibir datos y retorna el id de la subida
+    y el tamaño de bloque que debe usar el cliente.
+    """
+    import json
+
+    try:
+        data = json.loads(request.body)
+        incidencia_id = int(data.get('incidencia') or 0)
+        tamano = int(data.get('tamano') or 0)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({
+            'exito': False,
+            'error': 'Datos inválidos: incidencia y tamano deben ser números'
+        }, status=400)
+
+    nombre = os.path.basename(str(data.get('nombre') or '')).strip()[:255]
+    if not nombre:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Falta el nombre del archivo'
+        }, status=400)
+
+    tipo = data.get('tipo') or validacion_archivos.detectar_tipo(nombre)
+    if tipo not in EvidenciaIncidencia.TipoArchivo.values:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Tipo de archivo inválido'
+        }, status=400)
+
+    incidencia = Incidencia.objects.filter(pk=incidencia_id).first()
+    if incidencia is None:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Incidencia no encontrada'
+        }, status=404)
+
+    subida = SubidaEvidencia(
+        user=request.user,
+        incidencia=incidencia,
+        nombre_archivo=nombre,
+        tipo_archivo_evidencia=tipo,
+        tamano=tamano,
+    )
+    try:
+        subida.validar_inicio()
+    except ValidationError as e:
+        return JsonResponse({
+            'exito': False,
+            'error': e.messages[0]
+        }, status=400)
+
+    SubidaEvidencia.descartar_vencidas()
+    subida.save()
+    return JsonResponse(_estado_subida(subida), status=201)
+
+
+@login_required
+def evidencia_subida_estado(request, pk):
+    """
+    API endpoint con el estado de una subida por bloques.
+
+    El cliente lo consulta para reanudar una subida interrumpida desde el
+    byte ``recibido``.
+    """
+    subida = get_object_or_404(SubidaEvidencia, pk=pk, user=request.user)
+
+    if subida.estado == SubidaEvidencia.Estado.PENDIENTE and subida.vencida:
+        subida.rechazar('La subida expiró. Inicie la subida nuevamente.')
+
+    return JsonResponse(_estado_subida(subida))
+
+
+def _verificar_bloque(subida, inicio, total):
+    """
+    Verifica que un bloque pueda escribirse en la subida.
+
+    Returns:
+        JsonResponse con el error, o None si el bloque es válido
+    """
+    if subida.estado == SubidaEvidencia.Estado.PENDIENTE and subida.vencida:
+        subida.rechazar('La subida expiró. Inicie la subida nuevamente.')
+    if subida.estado != SubidaEvidencia.Estado.PENDIENTE:
+        return JsonResponse(_estado_subida(subida, exito=False, error=subida.error or 'La subida ya finalizó'), status=409)
+
+    if total != subida.tamano:
+        return JsonResponse(_estado_subida(subida, exito=False, error='El tamaño total no coincide con el declarado'), status=400)
+
+    if inicio != subida.recibido:
+        return JsonResponse(_estado_subida(subida, exito=False, error='El bloque no continúa la subida'), status=409)
+    return None
+
+
+# Encabezado Content-Range de un bloque: "bytes inicio-fin/total"
+_RANGO_BLOQUE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+
+@login_required
+@require_http_methods(['PUT'])
+def evidencia_subida_bloque(request, pk):
+    """
+    API endpoint que recibe un bloque de una subida por bloques.
+
+    El cuerpo son los bytes del bloque y el encabezado Content-Range indica
+    su posición ("bytes inicio-fin/total"). El bloque se copia al archivo
+    temporal a medida que se lee, sin cargarlo completo en memoria.
+
+    Los bloques deben llegar en orden: si ``inicio`` no coincide con los
+    bytes ya recibidos responde 409 con la posición esperada. Al recibir el
+    último bloque se crea la evidencia.
+    """
+    rango = _RANGO_BLOQUE.fullmatch(request.headers.get('Content-Range', ''))
+    if not rango:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Falta el encabezado Content-Range (bytes inicio-fin/total)'
+        }, status=400)
+
+    inicio, fin, total = (int(valor) for valor in rango.groups())
+    if fin < inicio:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Content-Range inválido'
+        }, status=400)
+
+    largo = fin - inicio + 1
+    subida = get_object_or_404(
+        SubidaEvidencia.objects.select_related('incidencia'), pk=pk, user=request.user
+    )
+    respuesta = _verificar_bloque(subida, inicio, total)
+    if respuesta:
+        return respuesta
+
+    # El cuerpo se lee fuera de toda transacción; el bloqueo del archivo
+    # temporal impide que otro bloque de la misma subida lo escriba a la vez
+    with subida.abrir_temporal() as destino:
+        # Otro bloque pudo avanzar o cerrar la subida mientras se esperaba
+        subida.refresh_from_db(fields=['estado', 'error', 'recibido', 'updated_at'])
+        respuesta = _verificar_bloque(subida, inicio, total)
+        if respuesta:
+            if subida.estado != SubidaEvidencia.Estado.PENDIENTE:
+                # Descarta el temporal vacío que se creó al abrirlo
+                subida.eliminar_temporal()
+            return respuesta
+
+        try:
+            escritos = subida.escribir_bloque(destino, request, inicio, largo)
+        except ValidationError as e:
+            subida.rechazar(e.messages[0])
+            return JsonResponse(_estado_subida(subida, exito=False), status=400)
+
+        if escritos < largo:
+            return JsonResponse(_estado_subida(subida, exito=False, error='El bloque llegó incompleto'), status=400)
+
+        with transaction.atomic():
+            # Transacción corta: solo confirma el avance sobre la fila bloqueada
+            actual = SubidaEvidencia.objects.select_for_update().only('estado', 'recibido').get(pk=subida.pk)
+            if actual.estado != SubidaEvidencia.Estado.PENDIENTE or actual.recibido != inicio:
+                subida.refresh_from_db(fields=['estado', 'error', 'recibido', 'updated_at'])
+                return JsonResponse(_estado_subida(subida, exito=False, error='El bloque no continúa la subida'), status=409)
+
+            if subida.recibido < subida.tamano:
+                subida.save(update_fields=['recibido', 'updated_at'])
+            else:
+                evidencia = subida.completar()
+                messages.success(request, f'Evidencia agregada exitosamente a la incidencia "{evidencia.incidencia.titulo}".')
+
+    return JsonResponse(_estado_subida(subida))
+
+
 # ==================== VISTAS PARA AMONESTACIONES ====================
 
 @login_required
 def amonestacion_list(request):
-    amonestaciones = Amonestacion.objects.select_related('usuario_reporta').all().order_by('-fecha_amonestacion', '-id')
+    amonestaciones = Amonestacion.objects.select_related('usuario_reporta').all()
 
     # Filtros
     usuario_reporta_id = request.GET.get('usuario_reporta')
@@ -937,13 +1225,11 @@ def amonestacion_list(request):
     if motivo:
         amonestaciones = amonestaciones.filter(motivo=motivo)
 
-    if search:
-        amonestaciones = amonestaciones.filter(
-            Q(motivo_detalle__icontains=search) |
-            Q(nombre_amonestado__icontains=search) |
-            Q(apellidos_amonestado__icontains=search) |
-            Q(rut_amonestado__icontains=search)
-        )
+    # Búsqueda de texto completo (ordenada por relevancia)
+    pagina = paginar_busqueda(
+        request, amonestaciones, search, ('-fecha_amonestacion', '-id'),
+        campos_contiene=('rut_amonestado',),
+    )
 
     # Para los filtros
     usuarios = Usuario.objects.all().order_by('apellido', 'nombres')
@@ -951,7 +1237,8 @@ def amonestacion_list(request):
     motivos = Amonestacion.MotivoAmonestacion.choices
 
     return render(request, 'mi_condominio/amonestaciones/list.html', {
-        'amonestaciones': amonestaciones,
+        'amonestaciones': pagina,
+        'pagina': pagina,
         'usuarios': usuarios,
         'tipos_amonestacion': tipos_amonestacion,
         'motivos': motivos,
@@ -1023,9 +1310,21 @@ def amonestacion_delete(request, pk):
 
 # ==================== VISTAS PARA ASISTENTE DE IA ====================
 
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
-from . import ai_assistant
+from . import ai_assistant, ai_cache
+
+
+def _usuario_actual(request):
+    """
+    Usuario vinculado al User autenticado (ver PerfilUsuarioMiddleware).
+
+    Raises:
+        Usuario.DoesNotExist: si el User no tiene un perfil de Usuario
+    """
+    if not request.usuario:
+        raise Usuario.DoesNotExist
+    return request.usuario
 
 
 @login_required
@@ -1050,9 +1349,9 @@ def ai_chat_send_message(request):
                 'error': 'El mensaje no puede estar vacío'
             }, status=400)
 
-        # Obtener el usuario actual (necesitas tener el modelo Usuario vinculado con el User de Django)
+        # Obtener el usuario actual (vinculado con el User de Django)
         try:
-            usuario = Usuario.objects.get(correo=request.user.email)
+            usuario = _usuario_actual(request)
         except Usuario.DoesNotExist:
             return JsonResponse({
                 'exito': False,
@@ -1076,15 +1375,132 @@ def ai_chat_send_message(request):
         }, status=500)
 
 
+def _evento_sse(evento, datos):
+    """Formatea un evento server-sent events con datos JSON."""
+    import json
+
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False, default=str)}\n\n"
+
+
+@login_required
+@require_POST
+async def ai_chat_stream(request):
+    """
+    API endpoint asíncrono que transmite la respuesta del asistente como
+    server-sent events a medida que el modelo la genera.
+
+    Pensado para servirse con ASGI (config/asgi.py): mientras se espera a
+    OpenAI no se ocupa ningún worker.
+    """
+    import json
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Formato de JSON inválido'
+        }, status=400)
+
+    mensaje = data.get('mensaje', '').strip()
+    if not mensaje:
+        return JsonResponse({
+            'exito': False,
+            'error': 'El mensaje no puede estar vacío'
+        }, status=400)
+
+    usuario = await request.ausuario()
+    if usuario is None:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Usuario no encontrado en el sistema'
+        }, status=404)
+
+    async def eventos():
+        async for evento, datos in ai_assistant.chat_stream(usuario, mensaje):
+            yield _evento_sse(evento, datos)
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que nginx acumule la respuesta antes de enviarla
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+def ai_cache_estadisticas(request):
+    """API endpoint (solo staff) con los aciertos y fallos del caché de herramientas"""
+    if not request.user.is_staff:
+        return JsonResponse({
+            'exito': False,
+            'error': 'No tienes permisos para ver esta información'
+        }, status=403)
+
+    return JsonResponse({
+        'exito': True,
+        **ai_cache.obtener_estadisticas()
+    })
+
+
 @login_required
 def ai_chat_history(request):
-    """API endpoint para obtener el historial de la sesión actual"""
+    """
+    API endpoint para obtener el historial del chat por páginas.
+
+    Parámetros GET opcionales:
+        sesion: ID de una sesión del usuario (activa, cerrada o archivada);
+                por defecto la sesión actual
+        antes: ID de mensaje; retorna los mensajes anteriores a él
+        despues: ID de mensaje; retorna los mensajes posteriores a él
+        limite: mensajes por página
+
+    Responde con ETag; si el cliente envía If-None-Match y la sesión no
+    cambió, retorna 304 sin leer los mensajes.
+    """
+    from django.utils.cache import get_conditional_response
+
     try:
-        usuario = Usuario.objects.get(correo=request.user.email)
-        session = ai_assistant.get_or_create_session(usuario)
-        history = ai_assistant.get_session_history(session.id)
+        parametros = {}
+        for nombre in ('sesion', 'antes', 'despues', 'limite'):
+            valor = request.GET.get(nombre)
+            parametros[nombre] = int(valor) if valor else None
+    except ValueError:
+        return JsonResponse({
+            'exito': False,
+            'error': 'Parámetros inválidos: sesion, antes, despues y limite deben ser números'
+        }, status=400)
 
-        return JsonResponse(history)
+    try:
+        usuario = _usuario_actual(request)
+        if parametros['sesion'] is None:
+            session = ai_assistant.get_or_create_session(usuario)
+        else:
+            session, _ = ai_assistant.obtener_sesion_historial(parametros['sesion'], usuario)
+            if session is None:
+                return JsonResponse({
+                    'exito': False,
+                    'error': 'Sesión no encontrada'
+                }, status=404)
+
+        etag = ai_assistant.etag_historial(session, **parametros)
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is None:
+            history = ai_assistant.get_session_history(
+                parametros['sesion'] or session.id,
+                usuario=usuario,
+                antes=parametros['antes'],
+                despues=parametros['despues'],
+                limite=parametros['limite'] or ai_assistant.LIMITE_HISTORIAL,
+                session=session
+            )
+            response = JsonResponse(history)
+        else:
+            response = no_modificado
+
+        response['ETag'] = etag
+        # El navegador debe revalidar siempre: el historial cambia con cada mensaje
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     except Usuario.DoesNotExist:
         return JsonResponse({
@@ -1103,7 +1519,7 @@ def ai_chat_history(request):
 def ai_chat_clear(request):
     """API endpoint para limpiar la sesión y comenzar una nueva conversación"""
     try:
-        usuario = Usuario.objects.get(correo=request.user.email)
+        usuario = _usuario_actual(request)
         resultado = ai_assistant.clear_session(usuario)
 
         return JsonResponse(resultado)
@@ -1123,47 +1539,43 @@ def ai_chat_clear(request):
 @login_required
 @require_POST
 def ai_chat_confirm_action(request):
-    """API endpoint para ejecutar una acción después de la confirmación del usuario"""
+    """
+    API endpoint para ejecutar una acción después de la confirmación del usuario.
+
+    Recibe el token de la propuesta pendiente (no sus datos): la acción se
+    toma de la sesión y solo se ejecuta una vez aunque llegue repetida.
+    """
+    import json
+    import uuid
+
     try:
         data = json.loads(request.body)
-        accion = data.get('accion')
-        datos = data.get('datos')
+        token = data.get('token')
 
-        if not accion or not datos:
+        if not token:
             return JsonResponse({
                 'exito': False,
-                'error': 'Faltan parámetros: accion y datos son requeridos'
+                'error': 'Falta el parámetro token'
             }, status=400)
 
-        # Importar las funciones de ejecución
-        from . import ai_tools
-
-        # Ejecutar la acción correspondiente
-        if accion in ai_tools.EXECUTION_FUNCTIONS:
-            resultado = ai_tools.EXECUTION_FUNCTIONS[accion](datos)
-
-            # Guardar en el historial del chat el resultado
-            usuario = Usuario.objects.get(correo=request.user.email)
-            session = ai_assistant.get_or_create_session(usuario)
-
-            if resultado.get('exito'):
-                mensaje_confirmacion = f"✓ {resultado['mensaje']}"
-            else:
-                mensaje_confirmacion = f"✗ Error: {resultado.get('error', 'Error desconocido')}"
+        try:
+            token = uuid.UUID(str(token))
+        except ValueError:
+            return JsonResponse({
+                'exito': False,
+                'error': 'Token inválido'
+            }, status=400)
 
-            # Crear mensaje del asistente con el resultado
-            ChatMessage.objects.create(
-                sesion=session,
-                role='assistant',
-                contenido=mensaje_confirmacion
-            )
+        usuario = _usuario_actual(request)
+        resultado = ai_assistant.confirmar_propuesta(usuario, token)
 
-            return JsonResponse(resultado)
-        else:
+        if resultado is None:
             return JsonResponse({
                 'exito': False,
-                'error': f'Acción "{accion}" no reconocida'
-            }, status=400)
+                'error': 'La operación ya fue procesada o expiró'
+            }, status=409)
+
+        return JsonResponse(resultado)
 
     except Usuario.DoesNotExist:
         return JsonResponse({